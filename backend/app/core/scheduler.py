@@ -1,5 +1,6 @@
 from typing import Optional
 import logging
+from datetime import datetime
 from contextlib import contextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -8,11 +9,20 @@ from sqlalchemy.exc import SQLAlchemyError
 from app.core.database import SessionLocal
 from app.features.newsfeed.crud.newsfeed_crud import get_newsfeed_config
 from app.features.newsfeed.service.newsfeed_service import fetch_and_store_news
+from app.core.settings.api_keys.crud.api_keys_settings_crud import get_apikey_snapshot
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import lookup_cache, threat_feed_index
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service import bulk_lookup_jobs
 
 logger = logging.getLogger(__name__)
 
 JOB_ID = 'news_fetch'
 DEFAULT_INTERVAL = 30  # fallback interval in minutes if config fails
+CACHE_PURGE_JOB_ID = 'ioc_lookup_cache_purge'
+CACHE_PURGE_INTERVAL = 60  # minutes
+BULK_JOB_PURGE_JOB_ID = 'bulk_lookup_job_purge'
+BULK_JOB_PURGE_INTERVAL = 60  # minutes
+THREAT_FEED_SYNC_JOB_ID = 'threat_feed_sync'
+THREAT_FEED_SYNC_INTERVAL = 30  # minutes; the MalwareBazaar recent dump covers the last hour
 
 scheduler = AsyncIOScheduler()
 
@@ -38,6 +48,30 @@ async def fetch_news_job():
         logger.error(f"Error in news fetch job: {str(e)}")
         # Don't raise the exception to prevent the scheduler from removing the job
 
+def purge_lookup_cache_job():
+    """Remove expired IOC lookup cache entries."""
+    try:
+        lookup_cache.purge_expired()
+    except Exception as e:
+        logger.error(f"Error in IOC lookup cache purge job: {str(e)}")
+
+def purge_bulk_lookup_jobs_job():
+    """Remove finished bulk lookup jobs past their retention period."""
+    try:
+        bulk_lookup_jobs.purge_finished_jobs()
+    except Exception as e:
+        logger.error(f"Error in bulk lookup job purge job: {str(e)}")
+
+def sync_threat_feeds_job():
+    """Load the offline abuse.ch feed indexes and merge the latest dumps into them."""
+    try:
+        threat_feed_index.load_all()
+        with get_db_session() as db:
+            apikeys = get_apikey_snapshot(db)
+        threat_feed_index.sync_all(apikeys)
+    except Exception as e:
+        logger.error(f"Error in threat feed sync job: {str(e)}")
+
 def get_scheduler_config() -> tuple[bool, int]:
     """Get scheduler configuration from database.
     
@@ -81,6 +115,28 @@ def start_scheduler() -> None:
     try:
         enabled, interval = get_scheduler_config()
         configure_scheduler(enabled, interval)
+        scheduler.add_job(
+            purge_lookup_cache_job,
+            IntervalTrigger(minutes=CACHE_PURGE_INTERVAL),
+            id=CACHE_PURGE_JOB_ID,
+            replace_existing=True,
+            max_instances=1
+        )
+        scheduler.add_job(
+            purge_bulk_lookup_jobs_job,
+            IntervalTrigger(minutes=BULK_JOB_PURGE_INTERVAL),
+            id=BULK_JOB_PURGE_JOB_ID,
+            replace_existing=True,
+            max_instances=1
+        )
+        scheduler.add_job(
+            sync_threat_feeds_job,
+            IntervalTrigger(minutes=THREAT_FEED_SYNC_INTERVAL),
+            id=THREAT_FEED_SYNC_JOB_ID,
+            replace_existing=True,
+            max_instances=1,
+            next_run_time=datetime.now()  # load the indexes right after startup
+        )
         
         if not scheduler.running:
             scheduler.start()
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from app.core.settings.api_keys.config.service_config import get_all_service_definitions
 from app.core.settings.api_keys.models.api_keys_settings_models import Apikey
+from app.core.settings.api_keys.crud.api_keys_settings_crud import invalidate_apikey_snapshot
 import logging
 
 async def add_default_api_keys(db: Session) -> None:
@@ -35,6 +36,7 @@ async def add_default_api_keys(db: Session) -> None:
                     logging.debug(f"Created free service entry: {service_key}")
         
         db.commit()
+        invalidate_apikey_snapshot()
         logging.info('Default API keys checked/created')
         
     except SQLAlchemyError as e:
@@ -1,14 +1,23 @@
+import threading
+from typing import Any, Dict, Optional
 from sqlalchemy.orm import Session
 from fastapi.exceptions import HTTPException
 from app.core.settings.api_keys.models.api_keys_settings_models import Apikey
 from app.core.settings.api_keys.schemas.api_keys_settings_schemas import ApikeySchema
 
+# In-memory copy of all API key rows, keyed by name. Rebuilt on first use
+# after invalidate_apikey_snapshot(), which every write path must call.
+_snapshot: Optional[Dict[str, Dict[str, Any]]] = None
+_snapshot_generation = 0
+_snapshot_lock = threading.Lock()
+
 
 def create_new_apikey(db: Session, apikey: ApikeySchema):
     """Creates a new API key in the database."""
     db_apikey = Apikey(**apikey.dict())
     db.add(db_apikey)
     db.commit()
+    invalidate_apikey_snapshot()
     db.refresh(db_apikey)
     return db_apikey
 
@@ -33,4 +42,29 @@ def delete_existing_apikey(db: Session, name: str):
         raise HTTPException(status_code=404, detail="API key not found")
     db.delete(db_apikey)
     db.commit()
+    invalidate_apikey_snapshot()
     return
+
+
+def get_apikey_snapshot(db: Session) -> Dict[str, Dict[str, Any]]:
+    """Returns all API keys as dictionaries keyed by name, loading them in one query when needed."""
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None:
+        return snapshot
+
+    generation = _snapshot_generation
+    snapshot = {apikey.name: apikey.to_dict() for apikey in db.query(Apikey).all()}
+    with _snapshot_lock:
+        # A write that committed while the rows were loading makes them stale
+        if generation == _snapshot_generation:
+            _snapshot = snapshot
+    return snapshot
+
+
+def invalidate_apikey_snapshot() -> None:
+    """Discards the API key snapshot; call after every committed API key write."""
+    global _snapshot, _snapshot_generation
+    with _snapshot_lock:
+        _snapshot = None
+        _snapshot_generation += 1
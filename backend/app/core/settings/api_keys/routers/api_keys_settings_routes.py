@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.core.dependencies import get_db
-from app.core.settings.api_keys.crud.api_keys_settings_crud import get_apikey, get_apikeys, delete_existing_apikey, create_new_apikey
+from app.core.settings.api_keys.crud.api_keys_settings_crud import get_apikey, get_apikeys, delete_existing_apikey, create_new_apikey, invalidate_apikey_snapshot
 from app.core.settings.api_keys.schemas.api_keys_settings_schemas import ApikeySchema, ApikeyStateResponse, DeleteApikeyResponse, ApikeyBulkLookupStateResponse
 from app.core.settings.api_keys.models.api_keys_settings_models import Apikey
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import circuit_breaker, oauth_token_cache
 import logging
 from typing import Dict, Any, List
 
@@ -23,6 +24,8 @@ def create_apikey(apikey: ApikeySchema, db: Session = Depends(get_db)):
     existing_apikey = get_apikey(db, apikey.name)
     if existing_apikey['name'] == "None":
         db_apikey = create_new_apikey(db, apikey)
+        circuit_breaker.reset()
+        oauth_token_cache.clear()
         logging.debug(f"Added API key: {apikey.name}")
         return db_apikey.to_dict()
     logging.error(f"Could not add API key. API key already exists: {apikey.name}")
@@ -38,6 +41,8 @@ def delete_apikey(name: str, db: Session = Depends(get_db)):
         logging.error("Could not delete API key: API key not found")
         raise HTTPException(status_code=404, detail="API key not found")
     delete_existing_apikey(db=db, name=name)
+    circuit_breaker.reset()
+    oauth_token_cache.clear()
     logging.info(f"Deleted API key: {name}")
     return DeleteApikeyResponse(apikey=ApikeySchema(**apikey), message="API key deleted successfully")
 
@@ -89,6 +94,9 @@ def update_apikey_is_active(name: str, is_active: bool, db: Session = Depends(ge
         raise HTTPException(status_code=404, detail="Apikey not found")
     db_apikey.is_active = is_active
     db.commit()
+    invalidate_apikey_snapshot()
+    circuit_breaker.reset()
+    oauth_token_cache.clear()
     db.refresh(db_apikey)
     return db_apikey.to_dict()
 
@@ -117,6 +125,7 @@ def update_apikey_bulk_lookup(name: str, bulk_ioc_lookup: bool, db: Session = De
         raise HTTPException(status_code=404, detail="Apikey not found")
     db_apikey.bulk_ioc_lookup = bulk_ioc_lookup
     db.commit()
+    invalidate_apikey_snapshot()
     db.refresh(db_apikey)
     return db_apikey.to_dict()
 
@@ -138,6 +147,11 @@ def update_apikey(name: str, apikey: ApikeySchema, db: Session = Depends(get_db)
     db_apikey.bulk_ioc_lookup = apikey.bulk_ioc_lookup
     
     db.commit()
+    invalidate_apikey_snapshot()
+    # New credentials get a fresh chance with services that rejected the old ones,
+    # and tokens issued for the old ones are not reused
+    circuit_breaker.reset()
+    oauth_token_cache.clear()
     db.refresh(db_apikey)
     logging.info(f"Updated API key: {name}")
     return db_apikey.to_dict()
@@ -1,6 +1,6 @@
 import regex as re
 from collections import OrderedDict
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterable, List, Set, Tuple, Any
 import logging
 from functools import lru_cache
 
@@ -58,6 +58,30 @@ def extract_iocs_from_line(line: str) -> Dict[str, List[str]]:
         for ioc_type, pattern in COMPILED_PATTERNS.items()
     }
 
+def extract_new_iocs(lines: Iterable[str], seen: Set[str]) -> List[Tuple[str, str]]:
+    """
+    Extract the IOCs of some lines that have not been seen before.
+
+    Lets a caller extract a large input a few lines at a time with the same
+    patterns and domain filter as :func:`extract_iocs`.
+
+    Args:
+        lines: Lines of text
+        seen: Values already extracted; updated with the new ones
+
+    Returns:
+        List of (IOC type, value) tuples in the order they were found
+    """
+    found = []
+    for line in lines:
+        for ioc_type, iocs in extract_iocs_from_line(line).items():
+            for ioc in iocs:
+                if ioc in seen or (ioc_type == 'domains' and is_ip_address(ioc)):
+                    continue
+                seen.add(ioc)
+                found.append((ioc_type, ioc))
+    return found
+
 def calculate_statistics(
     extracted_iocs: Dict[str, List[str]],
     unique_iocs: Dict[str, List[str]],
@@ -0,0 +1,114 @@
+from sqlalchemy.orm import Session
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.models.bulk_lookup_job_models import (
+    BulkLookupJob, BulkLookupResult
+)
+from typing import Any, Dict, List, Optional, Set, Tuple
+from datetime import datetime
+import json
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.payload_codec import encode_payload
+
+
+def create_job(db: Session, iocs: List[str], services: List[str], force_refresh: bool) -> BulkLookupJob:
+    """Creates a queued bulk lookup job."""
+    job = BulkLookupJob(
+        iocs=json.dumps(iocs),
+        services=json.dumps(services),
+        force_refresh=force_refresh,
+        status='queued'
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: str) -> Optional[BulkLookupJob]:
+    """Retrieves a bulk lookup job by ID."""
+    return db.query(BulkLookupJob).filter(BulkLookupJob.id == job_id).first()
+
+
+def get_jobs(db: Session, skip: int = 0, limit: int = 50) -> List[BulkLookupJob]:
+    """Retrieves bulk lookup jobs, newest first."""
+    return db.query(BulkLookupJob).order_by(BulkLookupJob.created_at.desc()).offset(skip).limit(limit).all()
+
+
+def get_unfinished_jobs(db: Session) -> List[BulkLookupJob]:
+    """Retrieves jobs that were queued or running, oldest first."""
+    return db.query(BulkLookupJob).filter(
+        BulkLookupJob.status.in_(['queued', 'running'])
+    ).order_by(BulkLookupJob.created_at).all()
+
+
+def update_job(db: Session, job_id: str, **fields: Any) -> None:
+    """Updates fields of a bulk lookup job."""
+    db.query(BulkLookupJob).filter(BulkLookupJob.id == job_id).update(fields, synchronize_session=False)
+    db.commit()
+
+
+def add_results(db: Session, job_id: str, events: List[Dict[str, Any]], done: int) -> None:
+    """Stores result events of a job, large ones compressed, and its progress in one transaction."""
+    db.bulk_save_objects([
+        BulkLookupResult(
+            job_id=job_id,
+            seq=event['seq'],
+            ioc=event.get('ioc'),
+            service=event.get('service'),
+            event=encode_payload(event)
+        )
+        for event in events
+    ])
+    db.query(BulkLookupJob).filter(BulkLookupJob.id == job_id).update(
+        {'done': done, 'last_seq': events[-1]['seq']}, synchronize_session=False
+    )
+    db.commit()
+
+
+def get_results(db: Session, job_id: str, after_seq: int = 0, limit: int = 500) -> List[BulkLookupResult]:
+    """Retrieves result events of a job with a sequence number above ``after_seq``."""
+    return db.query(BulkLookupResult).filter(
+        BulkLookupResult.job_id == job_id,
+        BulkLookupResult.seq > after_seq
+    ).order_by(BulkLookupResult.seq).limit(limit).all()
+
+
+def get_result(db: Session, job_id: str, seq: int) -> Optional[BulkLookupResult]:
+    """Retrieves one result event of a job by its sequence number."""
+    return db.query(BulkLookupResult).filter(
+        BulkLookupResult.job_id == job_id,
+        BulkLookupResult.seq == seq
+    ).first()
+
+
+def get_completed_pairs(db: Session, job_id: str) -> Set[Tuple[str, str]]:
+    """Retrieves the (IOC, service) pairs a job already has results for."""
+    rows = db.query(BulkLookupResult.ioc, BulkLookupResult.service).filter(
+        BulkLookupResult.job_id == job_id
+    ).all()
+    return {(ioc, service) for ioc, service in rows}
+
+
+def delete_job(db: Session, job_id: str) -> bool:
+    """Deletes a job and its results."""
+    db.query(BulkLookupResult).filter(BulkLookupResult.job_id == job_id).delete(synchronize_session=False)
+    deleted = db.query(BulkLookupJob).filter(BulkLookupJob.id == job_id).delete(synchronize_session=False)
+    db.commit()
+    return bool(deleted)
+
+
+def finish_job(db: Session, job_id: str, status: str, error: Optional[str] = None) -> None:
+    """Marks a job as finished."""
+    update_job(db, job_id, status=status, error=error, finished_at=datetime.utcnow())
+
+
+def delete_finished_jobs(db: Session, finished_before: datetime) -> int:
+    """Deletes jobs, and their results, that finished before the given time."""
+    job_ids = [job_id for (job_id,) in db.query(BulkLookupJob.id).filter(
+        BulkLookupJob.status.in_(['completed', 'failed', 'cancelled']),
+        BulkLookupJob.finished_at < finished_before
+    ).all()]
+    if not job_ids:
+        return 0
+    db.query(BulkLookupResult).filter(BulkLookupResult.job_id.in_(job_ids)).delete(synchronize_session=False)
+    db.query(BulkLookupJob).filter(BulkLookupJob.id.in_(job_ids)).delete(synchronize_session=False)
+    db.commit()
+    return len(job_ids)
@@ -0,0 +1,64 @@
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, UniqueConstraint
+from app.core.database import Base
+import datetime
+import json
+import uuid
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.payload_codec import decode_payload
+
+
+def generate_job_id():
+    return str(uuid.uuid4())
+
+
+class BulkLookupJob(Base):
+    __tablename__ = "bulk_lookup_jobs"
+    id = Column(String, primary_key=True, index=True, default=generate_job_id)
+    status = Column(String, index=True, default='queued')
+    iocs = Column(Text)
+    services = Column(Text)
+    force_refresh = Column(Boolean, default=False)
+    total = Column(Integer, default=0)
+    done = Column(Integer, default=0)
+    last_seq = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def to_dict(self):
+        try:
+            services = json.loads(self.services) if self.services else []
+        except json.JSONDecodeError:
+            services = []
+
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'services': services,
+            'force_refresh': self.force_refresh,
+            'total': self.total,
+            'done': self.done,
+            'last_seq': self.last_seq,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class BulkLookupResult(Base):
+    __tablename__ = "bulk_lookup_results"
+    __table_args__ = (UniqueConstraint('job_id', 'seq', name='uq_bulk_lookup_results_job_seq'),)
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, index=True)
+    seq = Column(Integer)
+    ioc = Column(String)
+    service = Column(String)
+    event = Column(Text)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    def to_dict(self):
+        try:
+            return decode_payload(self.event) if self.event else {}
+        except ValueError:
+            return {'seq': self.seq, 'ioc': self.ioc, 'service': self.service}
@@ -1,15 +1,19 @@
 import asyncio
 import json
 import logging
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Tuple
 from app.core.dependencies import get_db
-from app.features.ioc_tools.ioc_lookup.bulk_lookup.service.bulk_ioc_lookup_service import (
-    process_bulk_lookups
+from app.core.database import SessionLocal
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service import (
+    bulk_lookup_jobs, bulk_lookup_streams, bulk_result_export, bulk_ioc_upload
 )
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.crud import bulk_lookup_job_crud
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import result_projection
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -19,50 +23,502 @@ class BulkLookupRequest(BaseModel):
     """Request model for bulk IOC lookups."""
     iocs: List[str]
     services: List[str]
+    force_refresh: bool = False
+    deadline_seconds: Optional[float] = Field(
+        None, gt=0, le=300,
+        description="Answer with the results finished by then and a verdict summary instead of a stream"
+    )
 
 
 @router.post("/api/ioc-lookup/bulk", tags=["IOC Lookup"])
 async def bulk_ioc_lookup(
     request: BulkLookupRequest, 
-    db: Session = Depends(get_db)
+    fields: str = Query(
+        "summary", pattern="^(summary|full)$",
+        description="'summary' sends only the fields the UI renders per service, 'full' the complete results"
+    ),
+    last_event_id: Optional[str] = Header(None)
 ):
     """
     Perform bulk IOC lookups across multiple services with streaming results.
     
+    The lookups start at once and are not stored: they do not wait for a
+    bulk job slot, and only the latest ``BULK_STREAM_REPLAY_BUFFER_SIZE``
+    events are kept, in memory. The run's ID is returned in the
+    ``X-Bulk-Job-ID`` header. Every event carries an ``id:`` of the form
+    ``<run_id>:<seq>``. A client that reconnects with that value in the
+    ``Last-Event-ID`` header gets only the events it missed, replayed from
+    the run's buffer, and the request body is not run again.
+    
+    Once no client has been attached for ``BULK_STREAM_DISCONNECT_GRACE``
+    seconds, the run's lookups are cancelled and lookups not started yet are
+    dropped. Use ``/api/ioc-lookup/bulk/jobs`` for lookups that should be
+    stored and finish without a client.
+    
+    By default events carry only each service's summary fields, marked with
+    ``"fields": "summary"``; the full result of an event is available from
+    ``/api/ioc-lookup/bulk/jobs/{run_id}/results/{seq}`` while it is
+    buffered, or for all events with ``fields=full``.
+    
+    Each result is preceded by an ``event: aggregate`` event with the updated
+    verdict of its IOC: score, verdict, top contributing service and the
+    number of services flagging it. When all lookups are done, an
+    ``event: summary`` event lists every IOC's aggregate, most severe first.
+    
+    With ``deadline_seconds`` the request is answered as JSON once the job
+    finishes or the deadline passes, whichever comes first, with the results
+    finished by then and a per-IOC verdict summary listing the services that
+    have not answered yet. The job starts at once, without waiting for a
+    bulk job slot, and keeps running in the background; its
+    remaining results are fetched from the job endpoints, and
+    ``/api/ioc-lookup/bulk/jobs/{job_id}/summary`` gives the updated summary.
+    
     Args:
         request: Bulk lookup request containing IOCs and services
-        db: Database session dependency
+        fields: 'summary' or 'full'
+        last_event_id: ID of the last event the client received before reconnecting
         
     Returns:
-        StreamingResponse with Server-Sent Events containing results
+        StreamingResponse with Server-Sent Events containing results, or the
+        results and verdict summary if a deadline was given
         
     Raises:
-        HTTPException: For invalid requests
+        HTTPException: For invalid requests or an unknown stream in ``Last-Event-ID``
     """
-    logger.info(f"Starting bulk lookup for {len(request.iocs)} IOCs across {len(request.services)} services")
-    
-    if not request.iocs:
-        raise HTTPException(status_code=400, detail="No IOCs provided")
-    
-    if not request.services:
-        raise HTTPException(status_code=400, detail="No services specified")
+    job_id, after_seq = _parse_last_event_id(last_event_id)
+    if job_id:
+        if not bulk_lookup_streams.has_stream(job_id):
+            raise HTTPException(status_code=404, detail="Stream in Last-Event-ID not found")
+        logger.info(f"Resuming bulk lookup stream {job_id} after event {after_seq}")
+    else:
+        logger.info(f"Starting bulk lookup for {len(request.iocs)} IOCs across {len(request.services)} services")
+        
+        if not request.iocs:
+            raise HTTPException(status_code=400, detail="No IOCs provided")
+        
+        if not request.services:
+            raise HTTPException(status_code=400, detail="No services specified")
+
+        if request.deadline_seconds:
+            return await _fast_verdict(request, fields)
+
+        job_id = bulk_lookup_streams.start_stream(request.iocs, request.services, request.force_refresh)
 
     async def event_stream():
         """Generate Server-Sent Events stream for bulk lookup results."""
         try:
-            async for result in process_bulk_lookups(
-                request.iocs, 
-                request.services, 
-                db
-            ):
-                data = json.dumps(result)
-                yield f"data: {data}\n\n"
+            async for result in bulk_lookup_streams.follow_stream(job_id, after_seq):
+                result = result_projection.project_event(result, fields)
+                yield _format_stream_event(f"{job_id}:{result['seq']}", result)
                 
         except Exception as e:
             logger.error(f"Error in bulk lookup stream: {str(e)}", exc_info=True)
             error_data = json.dumps({"error": str(e), "service": "system"})
             yield f"data: {error_data}\n\n"
     
+    return StreamingResponse(
+        event_stream(), 
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+            "X-Bulk-Job-ID": job_id
+        }
+    )
+
+
+async def _fast_verdict(request: BulkLookupRequest, fields: str) -> dict:
+    """
+    Run a bulk lookup as a background job and answer with what finished by the deadline.
+    
+    The job starts at once, next to running jobs, and its database work runs
+    in worker threads.
+    
+    Args:
+        request: Bulk lookup request with ``deadline_seconds``
+        fields: 'summary' or 'full'
+        
+    Returns:
+        The job's status and verdict summary, the finished results and whether the job completed
+    """
+    job = await bulk_lookup_jobs.submit_job_async(
+        request.iocs, request.services, request.force_refresh, immediate=True
+    )
+    job_id = job['job_id']
+    events, complete = await bulk_lookup_jobs.collect_job(job_id, request.deadline_seconds)
+    summary = await asyncio.to_thread(_job_summary, job_id, events)
+    logger.info(
+        f"Bulk lookup job {job_id} answered after deadline of {request.deadline_seconds:g}s with "
+        f"{len(events)} results, {summary['pending_lookups']} lookups pending"
+    )
+    return {
+        **summary,
+        "complete": complete,
+        "deadline_seconds": request.deadline_seconds,
+        "results": [
+            result_projection.project_event(_without_aggregate(event), fields)
+            for event in events if event.get('type') != 'summary'
+        ]
+    }
+
+
+def _parse_last_event_id(last_event_id: Optional[str]) -> Tuple[Optional[str], int]:
+    """
+    Split a ``Last-Event-ID`` value into job ID and sequence number.
+    
+    Args:
+        last_event_id: Header value, ``<job_id>:<seq>`` or just ``<seq>``
+        
+    Returns:
+        Tuple of (job ID or None, sequence number); (None, 0) if the value is missing or malformed
+    """
+    if not last_event_id:
+        return None, 0
+    job_id, _, seq = last_event_id.strip().rpartition(':')
+    try:
+        return job_id or None, max(int(seq), 0)
+    except ValueError:
+        logger.warning(f"Ignoring malformed Last-Event-ID: {last_event_id[:80]}")
+        return None, 0
+
+
+def _format_event(event_id: str, result: dict) -> str:
+    """
+    Format a result as a Server-Sent Event with an ID.
+    
+    Args:
+        event_id: Event ID the client sends back as ``Last-Event-ID``
+        result: Event data
+        
+    Returns:
+        The encoded event
+    """
+    return f"id: {event_id}\ndata: {json.dumps(result)}\n\n"
+
+
+def _format_stream_event(event_id: str, result: dict) -> str:
+    """
+    Format a bulk lookup event, sending its IOC aggregate and the final summary as typed events.
+    
+    The aggregate goes out before its result and without an ID, so a client
+    that reconnects after the result was cut off gets both again.
+    
+    Args:
+        event_id: Event ID the client sends back as ``Last-Event-ID``
+        result: Event data
+        
+    Returns:
+        The encoded event or events
+    """
+    if result.get('type') == 'summary':
+        return f"id: {event_id}\nevent: summary\ndata: {json.dumps(result['summary'])}\n\n"
+    if 'aggregate' not in result:
+        return _format_event(event_id, result)
+    aggregate = f"event: aggregate\ndata: {json.dumps(result['aggregate'])}\n\n"
+    return aggregate + _format_event(event_id, _without_aggregate(result))
+
+
+def _without_aggregate(result: dict) -> dict:
+    """Copy an event without its IOC aggregate; stored events are shared and must not change."""
+    if 'aggregate' not in result:
+        return result
+    return {key: value for key, value in result.items() if key != 'aggregate'}
+
+
+@router.post("/api/ioc-lookup/bulk/jobs", status_code=202, tags=["IOC Lookup"])
+async def submit_bulk_lookup_job(
+    request: BulkLookupRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Submit a bulk lookup as a persistent job.
+    
+    The job runs in the background independent of any client connection.
+    Results are stored as they complete, and unfinished jobs are resumed
+    after a restart without repeating stored lookups.
+    
+    Args:
+        request: Bulk lookup request containing IOCs and services
+        db: Database session dependency
+        
+    Returns:
+        The job's status including its ``job_id``
+        
+    Raises:
+        HTTPException: For invalid requests
+    """
+    if not request.iocs:
+        raise HTTPException(status_code=400, detail="No IOCs provided")
+    
+    if not request.services:
+        raise HTTPException(status_code=400, detail="No services specified")
+
+    return bulk_lookup_jobs.submit_job(db, request.iocs, request.services, request.force_refresh)
+
+
+@router.post("/api/ioc-lookup/bulk/upload", status_code=202, tags=["IOC Lookup"])
+async def upload_bulk_lookup_job(
+    request: Request,
+    services: List[str] = Query(..., description="Services to query, repeated or comma-separated"),
+    force_refresh: bool = Query(False)
+):
+    """
+    Submit a bulk lookup job for the IOCs found in an uploaded file.
+    
+    The body is a ``multipart/form-data`` upload of TXT, CSV or log files,
+    an NDJSON body (``application/x-ndjson``) with one IOC string,
+    ``{"ioc": ...}`` or ``{"text": ...}`` per line, or the text itself
+    (``text/plain``, ``text/csv``). IOCs are extracted with the IOC
+    extractor's patterns while the body is read, and spooled to a temporary
+    file the job reads from, so the upload is never held in memory as a
+    whole. Upload jobs start at once, without waiting for a job slot, and
+    their lookups start before the upload finished. While the upload is read
+    the job is listed under ``/api/ioc-lookup/bulk/jobs`` as ``uploading``.
+    
+    The response is sent once the body is read, however far the lookups
+    got; results are followed with
+    ``/api/ioc-lookup/bulk/jobs/{job_id}/stream``.
+    
+    Args:
+        request: The upload request
+        services: Service names to query
+        force_refresh: Bypass the result cache for every lookup
+        
+    Returns:
+        The job's status including its ``job_id`` and the number of IOCs read
+        
+    Raises:
+        HTTPException: For unsupported uploads or missing services
+    """
+    services = [name.strip() for value in services for name in value.split(',') if name.strip()]
+    if not services:
+        raise HTTPException(status_code=400, detail="No services specified")
+    content_type = request.headers.get('content-type', '')
+    try:
+        bulk_ioc_upload.upload_format(content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    job = await bulk_lookup_jobs.submit_upload_job(services, force_refresh)
+    stats = {}
+    try:
+        uploaded = await bulk_lookup_jobs.feed_upload(
+            job['job_id'], bulk_ioc_upload.iter_upload_iocs(request.stream(), content_type, stats)
+        )
+    except ClientDisconnect:
+        logger.warning(f"Client disconnected during the upload of bulk lookup job {job['job_id']}")
+        raise HTTPException(status_code=400, detail=bulk_lookup_jobs.UPLOAD_INTERRUPTED)
+    status = await asyncio.to_thread(_job_status, job['job_id'])
+    status.update(uploaded_iocs=uploaded, uploaded_lines=stats['lines'], skipped_lines=stats['skipped'])
+    return JSONResponse(status, status_code=202, headers={"X-Bulk-Job-ID": job['job_id']})
+
+
+def _job_status(job_id: str) -> Optional[dict]:
+    """Get a job's status with a session of its own, for use in a worker thread."""
+    with SessionLocal() as db:
+        return bulk_lookup_jobs.get_job_status(db, job_id)
+
+
+def _job_summary(job_id: str, events: List[dict]) -> Optional[dict]:
+    """Build a job's verdict summary with a session of its own, for use in a worker thread."""
+    with SessionLocal() as db:
+        return bulk_lookup_jobs.get_job_summary(db, job_id, events)
+
+
+@router.get("/api/ioc-lookup/bulk/stats", tags=["IOC Lookup"])
+def get_bulk_lookup_stats():
+    """
+    Get counters of running bulk jobs and streams and of lookups stopped before they finished.
+    
+    ``detached_streams_cancelled`` counts ``/api/ioc-lookup/bulk`` streams
+    cancelled after their client disconnected; ``stopped_lookups`` counts the
+    running lookups those and cancelled jobs cancelled and the lookups they
+    dropped unstarted.
+    
+    Returns:
+        Dictionary of bulk lookup counters
+    """
+    return {**bulk_lookup_jobs.get_stats(), **bulk_lookup_streams.get_stats()}
+
+
+@router.get("/api/ioc-lookup/bulk/jobs", tags=["IOC Lookup"])
+def list_bulk_lookup_jobs(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    List bulk lookup jobs, newest first.
+    
+    Args:
+        skip: Number of jobs to skip
+        limit: Maximum number of jobs to return
+        db: Database session dependency
+        
+    Returns:
+        Dictionary containing the jobs' status
+    """
+    return {"jobs": [job.to_dict() for job in bulk_lookup_job_crud.get_jobs(db, skip, limit)]}
+
+
+@router.get("/api/ioc-lookup/bulk/jobs/{job_id}", tags=["IOC Lookup"])
+def get_bulk_lookup_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Get the status and progress of a bulk lookup job.
+    
+    Args:
+        job_id: Job ID
+        db: Database session dependency
+        
+    Returns:
+        The job's status
+        
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    status = bulk_lookup_jobs.get_job_status(db, job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+@router.get("/api/ioc-lookup/bulk/jobs/{job_id}/results", tags=["IOC Lookup"])
+def get_bulk_lookup_job_results(
+    job_id: str,
+    after_seq: int = Query(0, ge=0, description="Return results with a higher sequence number"),
+    limit: int = Query(500, ge=1, le=5000),
+    fields: str = Query(
+        "full", pattern="^(summary|full)$",
+        description="'summary' sends only the fields the UI renders per service, 'full' the complete results"
+    ),
+    db: Session = Depends(get_db)
+):
+    """
+    Page through the results of a bulk lookup job.
+    
+    Pass the returned ``next_after_seq`` as ``after_seq`` to get the next page.
+    
+    Args:
+        job_id: Job ID
+        after_seq: Only return results with a higher sequence number
+        limit: Maximum number of results to return
+        fields: 'summary' or 'full'
+        db: Database session dependency
+        
+    Returns:
+        Dictionary containing the results in sequence order
+        
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    if not bulk_lookup_job_crud.get_job(db, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    results = bulk_lookup_jobs.get_results_page(db, job_id, after_seq, limit)
+    return {
+        "job_id": job_id,
+        "results": [result_projection.project_event(result, fields) for result in results],
+        "next_after_seq": results[-1]['seq'] if results else after_seq,
+        "has_more": len(results) == limit
+    }
+
+
+@router.get("/api/ioc-lookup/bulk/jobs/{job_id}/summary", tags=["IOC Lookup"])
+def get_bulk_lookup_job_summary(job_id: str, db: Session = Depends(get_db)):
+    """
+    Get the per-IOC verdict summary of a bulk lookup job from its results so far.
+    
+    IOCs are ordered by score, most severe first. Each lists the services
+    that answered, failed or are still pending.
+    
+    Args:
+        job_id: Job ID
+        db: Database session dependency
+        
+    Returns:
+        The job's status with the verdict summary
+        
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    summary = bulk_lookup_jobs.get_job_summary(db, job_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return summary
+
+
+@router.get("/api/ioc-lookup/bulk/jobs/{job_id}/results/{seq}", tags=["IOC Lookup"])
+def get_bulk_lookup_job_result(job_id: str, seq: int, db: Session = Depends(get_db)):
+    """
+    Get the full result of one bulk lookup event, e.g. to show the details of a summary event.
+    
+    Events of ``/api/ioc-lookup/bulk`` streams are found while they are buffered.
+    
+    Args:
+        job_id: Job or stream ID
+        seq: Sequence number of the event
+        db: Database session dependency
+        
+    Returns:
+        The complete result event
+        
+    Raises:
+        HTTPException: If the job has no such event
+    """
+    result = bulk_lookup_streams.get_event(job_id, seq)
+    if result is None:
+        result = bulk_lookup_jobs.get_result(db, job_id, seq)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return result
+
+
+@router.get("/api/ioc-lookup/bulk/jobs/{job_id}/stream", tags=["IOC Lookup"])
+async def stream_bulk_lookup_job(
+    job_id: str,
+    after_seq: int = Query(0, ge=0, description="Only stream results with a higher sequence number"),
+    fields: str = Query(
+        "summary", pattern="^(summary|full)$",
+        description="'summary' sends only the fields the UI renders per service, 'full' the complete results"
+    ),
+    db: Session = Depends(get_db),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Attach to a bulk lookup job as a Server-Sent Events stream.
+    
+    Stored results are replayed first, then new results follow live until
+    the job finishes, with ``event: aggregate`` and ``event: summary``
+    events as on ``/api/ioc-lookup/bulk``. Disconnecting does not affect
+    the job. Every event's
+    ``id:`` is its sequence number, so an ``EventSource`` reconnecting with
+    ``Last-Event-ID`` only receives the events it missed. Events carry only
+    the summary fields unless ``fields=full`` is passed.
+    
+    Args:
+        job_id: Job ID
+        after_seq: Only stream results with a higher sequence number
+        fields: 'summary' or 'full'
+        db: Database session dependency
+        last_event_id: ID of the last event the client received before reconnecting
+        
+    Returns:
+        StreamingResponse with Server-Sent Events containing results
+        
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    if not bulk_lookup_job_crud.get_job(db, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    after_seq = max(after_seq, _parse_last_event_id(last_event_id)[1])
+
+    async def event_stream():
+        """Generate Server-Sent Events stream for the job's results."""
+        async for result in bulk_lookup_jobs.stream_job(job_id, after_seq):
+            yield _format_stream_event(str(result['seq']), result_projection.project_event(result, fields))
+
     return StreamingResponse(
         event_stream(), 
         media_type="text/event-stream",
@@ -74,6 +530,114 @@ async def bulk_ioc_lookup(
     )
 
 
+@router.get("/api/ioc-lookup/bulk/jobs/{job_id}/export", tags=["IOC Lookup"])
+def export_bulk_lookup_job(
+    job_id: str,
+    format: str = Query("ndjson", description="Export format: 'ndjson' or 'csv'"),
+    fields: Optional[List[str]] = Query(
+        None, description="Columns to export per service as 'service:dotted.path', repeatable or comma-separated"
+    ),
+    gzip: Optional[bool] = Query(None, description="Compress the export; defaults to the client's Accept-Encoding"),
+    accept_encoding: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Export the stored results of a bulk lookup job as NDJSON or CSV.
+    
+    The export is streamed from the database page by page, so memory use
+    does not grow with the number of results. Results of a running job are
+    exported as far as they have been stored.
+    
+    Args:
+        job_id: Job ID
+        format: 'ndjson' or 'csv'
+        fields: Column projection per service
+        gzip: Compress the response with gzip
+        accept_encoding: Accept-Encoding request header
+        db: Database session dependency
+        
+    Returns:
+        StreamingResponse with the exported results
+        
+    Raises:
+        HTTPException: If the job does not exist or the format or fields are invalid
+    """
+    if format not in bulk_result_export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    try:
+        projection = bulk_result_export.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not bulk_lookup_job_crud.get_job(db, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    logger.info(f"Exporting bulk lookup job {job_id} as {format}")
+    chunks = (
+        bulk_result_export.iter_csv(job_id, projection)
+        if format == 'csv'
+        else bulk_result_export.iter_ndjson(job_id, projection)
+    )
+    headers = {
+        "Content-Disposition": f'attachment; filename="bulk-lookup-{job_id}.{format}"',
+        # The body is compressed or not depending on Accept-Encoding
+        "Vary": "Accept-Encoding"
+    }
+    if gzip is None:
+        gzip = 'gzip' in (accept_encoding or '').lower()
+    if gzip:
+        chunks = bulk_result_export.gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=bulk_result_export.EXPORT_FORMATS[format],
+        headers=headers
+    )
+
+
+@router.post("/api/ioc-lookup/bulk/jobs/{job_id}/cancel", tags=["IOC Lookup"])
+async def cancel_bulk_lookup_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Cancel a queued or running bulk lookup job. Stored results are kept.
+    
+    Args:
+        job_id: Job ID
+        db: Database session dependency
+        
+    Returns:
+        The job's status
+        
+    Raises:
+        HTTPException: If the job does not exist or has already finished
+    """
+    if not bulk_lookup_job_crud.get_job(db, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not bulk_lookup_jobs.cancel_job(db, job_id):
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    return bulk_lookup_jobs.get_job_status(db, job_id)
+
+
+@router.delete("/api/ioc-lookup/bulk/jobs/{job_id}", tags=["IOC Lookup"])
+async def delete_bulk_lookup_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Delete a bulk lookup job and its results, cancelling it if it still runs.
+    
+    Args:
+        job_id: Job ID
+        db: Database session dependency
+        
+    Returns:
+        Dictionary containing success status
+        
+    Raises:
+        HTTPException: If the job does not exist
+    """
+    bulk_lookup_jobs.cancel_job(db, job_id)
+    if not bulk_lookup_job_crud.delete_job(db, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "message": f"Deleted job {job_id}"}
+
+
 @router.get("/api/apikeys/bulk_ioc_lookup", tags=["IOC Lookup"])
 async def get_bulk_lookup_settings(db: Session = Depends(get_db)):
     """
@@ -1,137 +1,397 @@
-import asyncio
 import logging
-from typing import Dict, Any, List, AsyncGenerator
+from contextlib import aclosing
+from typing import Dict, Any, AsyncIterable, Iterable, List, AsyncGenerator, Optional, Set, Tuple, Union
 from sqlalchemy.orm import Session
 from app.features.ioc_tools.ioc_lookup.single_lookup.service.ioc_lookup_engine import (
-    lookup_ioc, get_all_service_configs
+    lookup_ioc_async_with_meta, lookup_ioc_batch_async, get_all_service_configs
 )
 from app.features.ioc_tools.ioc_lookup.single_lookup.service.service_registry import service_registry
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import rate_limiter
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service.bulk_lookup_scheduler import BulkLookupScheduler
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service.bulk_ioc_normalizer import (
+    normalize_bulk_iocs, classify_input, NormalizedIoc
+)
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.ioc_utils import IOC_TYPES
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service.bulk_verdict_summary import VerdictAggregator
 
 logger = logging.getLogger(__name__)
 
+# Lookups of bulk runs that stopped before finishing, e.g. after the client disconnected
+_stopped_stats = {'runs': 0, 'cancelled': 0, 'dropped': 0}
+
 
 async def run_single_lookup(
     service_name: str, 
     ioc: str, 
     ioc_type: str, 
-    db: Session
-) -> Dict[str, Any]:
+    db: Session,
+    force_refresh: bool = False
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
     Execute a single IOC lookup asynchronously.
     
+    The lookup runs on the event loop through the service's async client, so
+    the number of requests in flight is not bound by the executor's thread pool.
+    Lookups over a service's rate limit wait in its queue instead of failing.
+    
     Args:
         service_name: The service to query
         ioc: The IOC value to lookup
         ioc_type: The type of IOC
         db: Database session
+        force_refresh: Bypass the result cache
         
     Returns:
-        Dictionary containing lookup result or error information
+        Tuple of (lookup result or error information, lookup metadata)
     """
+    meta = {'cache': 'miss', 'age': 0.0}
     try:
         service_config = service_registry.get_service(service_name)
         if not service_config:
             logger.warning(f"Service not configured: {service_name}")
-            return {"error": f"Service '{service_name}' not configured"}
+            return {"error": f"Service '{service_name}' not configured"}, meta
         
         if ioc_type not in service_config.get('supported_ioc_types', []):
             logger.debug(f"Service {service_name} doesn't support IOC type {ioc_type}")
-            return {"error": f"Service '{service_name}' doesn't support {ioc_type}"}
+            return {"error": f"Service '{service_name}' doesn't support {ioc_type}"}, meta
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: lookup_ioc(service_name, ioc, ioc_type, db)
+        result, meta = await lookup_ioc_async_with_meta(
+            service_name, ioc, ioc_type, db, 
+            force_refresh=force_refresh, max_wait=rate_limiter.MAX_QUEUE_WAIT
         )
         
         logger.debug(f"Completed lookup for {service_name}: {ioc}")
-        return result
+        return result, meta
         
     except Exception as e:
         logger.error(f"Exception in {service_name} lookup for {ioc}: {str(e)}", exc_info=True)
-        return {"error": f"Exception in {service_name} lookup: {str(e)}"}
+        return {"error": f"Exception in {service_name} lookup: {str(e)}"}, meta
 
 
-async def process_bulk_lookups(
+async def run_batch_lookup(
+    service_name: str,
     iocs: List[str],
-    services: List[str],
-    db: Session
-) -> AsyncGenerator[Dict[str, Any], None]:
+    ioc_type: str,
+    db: Session,
+    force_refresh: bool = False
+) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
     """
-    Process bulk IOC lookups and yield results as they complete.
+    Execute a lookup of several IOCs of one type through the service's batch client.
     
     Args:
-        iocs: List of IOC values to lookup
-        services: List of service names to query
+        service_name: The service to query
+        iocs: The IOC values to lookup
+        ioc_type: The type of the IOCs
         db: Database session
+        force_refresh: Bypass the result cache
         
-    Yields:
-        Dictionary containing individual lookup results or errors
+    Returns:
+        Dictionary mapping each IOC to its (lookup result or error information, lookup metadata)
     """
-    logger.info(f"Starting bulk lookup for {len(iocs)} IOCs across {len(services)} services")
-    
-    from app.features.ioc_tools.ioc_lookup.single_lookup.utils.ioc_utils import determine_ioc_type
+    meta = {'cache': 'miss', 'age': 0.0}
+    service_config = service_registry.get_service(service_name)
+    if ioc_type not in service_config.get('supported_ioc_types', []):
+        logger.debug(f"Service {service_name} doesn't support IOC type {ioc_type}")
+        error = {"error": f"Service '{service_name}' doesn't support {ioc_type}"}
+        return {ioc: (error, meta) for ioc in iocs}
+
+    try:
+        results = await lookup_ioc_batch_async(
+            service_name, iocs, ioc_type, db,
+            force_refresh=force_refresh, max_wait=rate_limiter.MAX_QUEUE_WAIT
+        )
+        logger.debug(f"Completed batch lookup of {len(iocs)} IOCs for {service_name}")
+        return results
+    except Exception as e:
+        logger.error(f"Exception in {service_name} batch lookup: {str(e)}", exc_info=True)
+        error = {"error": f"Exception in {service_name} lookup: {str(e)}"}
+        return {ioc: (error, meta) for ioc in iocs}
+
+
+def select_services(db: Session, services: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Pick the requested services that are configured and enabled for bulk lookups.
     
+    Args:
+        db: Database session
+        services: Requested service names
+        
+    Returns:
+        Tuple of (services to query, all configured services)
+    """
     all_service_configs = get_all_service_configs(db)
-    
     enabled_and_requested_services = {
         s['key'] for s in all_service_configs
         if s['key'] in services and s['is_configured'] and s['is_bulk_enabled']
     }
+    return list(enabled_and_requested_services), [s['key'] for s in all_service_configs if s['is_configured']]
+
+
+async def process_bulk_lookups(
+    iocs: Union[List[str], AsyncIterable[str]],
+    services: List[str],
+    db: Session,
+    force_refresh: bool = False,
+    completed: Optional[Set[Tuple[str, str]]] = None,
+    start_seq: int = 0,
+    delivered: Optional[Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]] = None
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Process bulk IOC lookups and yield results as they complete.
+    
+    Lookups are run by a :class:`BulkLookupScheduler`, which bounds the number
+    of running and queued lookups and shares the slots fairly between services.
+    Services with a ``batch`` entry in the registry get their IOCs grouped
+    into multi-indicator calls.
+    The input is trimmed, refanged, canonicalized and deduplicated first, so
+    each distinct IOC is looked up once; ``ioc`` holds the canonical value and
+    ``inputs`` every original input line it stands for.
+    Results are yielded in completion order. Every event carries a ``seq``
+    number and ``progress`` counters (done/total overall and per service).
+    A resumed run passes the (IOC, service) pairs it already has results for
+    in ``completed``; those are counted as done and not looked up again.
+    
+    ``iocs`` may also be an async iterable, e.g. IOCs extracted from an
+    upload that is still arriving. Its IOCs are normalized and looked up as
+    they come, and the progress totals grow with every new IOC; values of
+    unknown type are reported once the input ended.
+    
+    Result events carry the running ``aggregate`` of their IOC: its score,
+    verdict, top contributing service and the counts of services flagging
+    it, from the services' ``score`` extractors. Once every lookup finished,
+    a last event of ``"type": "summary"`` holds all aggregates, most severe
+    first.
+    
+    Args:
+        iocs: List or async iterable of IOC values to lookup
+        services: List of service names to query
+        db: Database session
+        force_refresh: Bypass the result cache for every lookup
+        completed: (canonical IOC, service) pairs to skip
+        start_seq: Sequence number of the last event already delivered
+        delivered: Events already delivered by a resumed run, to restore the
+            aggregates; a list or async iterable
+        
+    Yields:
+        Dictionary containing individual lookup results or errors
+    """
+    streamed = hasattr(iocs, '__aiter__')
+    logger.info(
+        f"Starting bulk lookup for {'streamed' if streamed else len(iocs)} IOCs across {len(services)} services"
+    )
     
-    services_to_query = list(enabled_and_requested_services)
+    services_to_query, available_services = select_services(db, services)
     
     if not services_to_query:
         logger.warning("No services available for bulk lookup")
         yield {
             "error": "No selected services are available or enabled for bulk lookup.",
             "service": "system",
-            "available_services": [s['key'] for s in all_service_configs if s['is_configured']]
+            "available_services": available_services
         }
         return
     
     logger.info(f"Using services: {services_to_query}")
     
-    tasks = []
-    for ioc_value in iocs:
-        ioc_type = determine_ioc_type(ioc_value)
-        if ioc_type == "unknown":
-            logger.warning(f"Unknown IOC type for: {ioc_value}")
-            yield {
-                "ioc": ioc_value,
-                "service": "system",
-                "error": "Unknown IOC type"
-            }
+    lookup_iocs, unknown_iocs = ([], []) if streamed else normalize_bulk_iocs(iocs)
+    inputs_by_ioc = {entry.ioc: entry.inputs for entry in lookup_iocs}
+
+    completed = completed or set()
+    progress = {
+        "done": 0,
+        "total": len(lookup_iocs) * len(services_to_query),
+        "services": {s: {"done": 0, "total": len(lookup_iocs)} for s in services_to_query}
+    }
+    if completed:
+        for entry in lookup_iocs:
+            for service_name in services_to_query:
+                if (entry.ioc, service_name) in completed:
+                    progress["done"] += 1
+                    progress["services"][service_name]["done"] += 1
+        logger.info(f"Resuming bulk lookup with {progress['done']} of {progress['total']} lookups done")
+    seq = start_seq
+
+    aggregator = VerdictAggregator(lookup_iocs, services_to_query)
+    if hasattr(delivered, '__aiter__'):
+        async with aclosing(delivered) as replayed:
+            async for event in replayed:
+                aggregator.add(event)
+    else:
+        for event in delivered or ():
+            aggregator.add(event)
+
+    for entry in unknown_iocs:
+        if (entry.ioc, "system") in completed:
             continue
-        
-        for service_name in services_to_query:
-            coro = run_single_lookup(service_name, ioc_value, ioc_type, db)
-            task = asyncio.create_task(coro)
-            tasks.append((ioc_value, service_name, task))
-    
-    logger.info(f"Created {len(tasks)} lookup tasks")
-    
-    for ioc_value, service_name, task in tasks:
-        try:
-            result = await task
-            if isinstance(result, dict) and 'error' in result:
-                yield {
-                    "ioc": ioc_value, 
-                    "service": service_name, 
-                    "error": result.get("message", "Service error")
-                }
-            else:
-                yield {
-                    "ioc": ioc_value, 
-                    "service": service_name, 
-                    "data": result
-                }
-        except Exception as e:
-            logger.error(f"Error awaiting task for {ioc_value}/{service_name}: {str(e)}")
-            yield {
-                "ioc": ioc_value,
-                "service": service_name,
-                "error": str(e)
-            }
+        seq += 1
+        yield _unknown_event(entry, seq, progress)
+
+    async def lookup(service_name: str, ioc_value: str, ioc_type: str):
+        return await run_single_lookup(service_name, ioc_value, ioc_type, db, force_refresh)
+
+    async def batch_lookup(service_name: str, ioc_type: str, ioc_values: List[str]):
+        return await run_batch_lookup(service_name, ioc_values, ioc_type, db, force_refresh)
+
+    batching = {}
+    for service_name in services_to_query:
+        batch = (service_registry.get_service(service_name) or {}).get('batch')
+        if batch:
+            batching[service_name] = (batch['max_size'], batch['max_wait'])
+
+    scheduler = BulkLookupScheduler(
+        services_to_query, lookup, batch_lookup=batch_lookup, batching=batching,
+        skip=(lambda ioc_value, service_name: (ioc_value, service_name) in completed) if completed else None
+    )
     
+    async def admit_streamed():
+        unique: Dict[Tuple[str, str], NormalizedIoc] = {}
+        async for raw in iocs:
+            if not raw or not raw.strip():
+                continue
+            value, ioc_type = classify_input(raw)
+            entry = unique.get((value, ioc_type))
+            if entry is not None:
+                entry.inputs.append(raw)
+                continue
+            entry = unique[(value, ioc_type)] = NormalizedIoc(ioc=value, ioc_type=ioc_type, inputs=[raw])
+            if ioc_type == IOC_TYPES['UNKNOWN']:
+                unknown_iocs.append(entry)
+                continue
+            inputs_by_ioc[value] = entry.inputs
+            aggregator.track(entry)
+            progress["total"] += len(services_to_query)
+            for service_name in services_to_query:
+                progress["services"][service_name]["total"] += 1
+            yield value, ioc_type
+
+    if streamed:
+        items = admit_streamed()
+    else:
+        items = ((e.ioc, e.ioc_type) for e in lookup_iocs)
+
+    finished = False
+    try:
+        async with aclosing(scheduler.run(items)) as results:
+            async for ioc_value, service_name, outcome in results:
+                seq += 1
+                progress["done"] += 1
+                progress["services"][service_name]["done"] += 1
+
+                event = _result_event(ioc_value, service_name, outcome)
+                event["seq"] = seq
+                event["inputs"] = inputs_by_ioc[ioc_value]
+                event["progress"] = _progress_snapshot(progress)
+                aggregate = aggregator.add(event)
+                if aggregate:
+                    event["aggregate"] = aggregate
+                yield event
+        finished = True
+    finally:
+        if not finished:
+            _record_stopped(scheduler.stats, progress)
+
+    if streamed:
+        for entry in unknown_iocs:
+            seq += 1
+            yield _unknown_event(entry, seq, progress)
+
+    yield {"seq": seq + 1, "type": "summary", "service": "system", "summary": aggregator.summary()}
+
+    logger.info(f"Bulk lookup stats: {scheduler.stats}")
     logger.info("Completed bulk lookup processing")
+
+
+def _unknown_event(entry: NormalizedIoc, seq: int, progress: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the event reporting an input value of unknown IOC type."""
+    logger.warning(f"Unknown IOC type for: {entry.ioc}")
+    return {
+        "seq": seq,
+        "ioc": entry.ioc,
+        "inputs": entry.inputs,
+        "service": "system",
+        "error": "Unknown IOC type",
+        "progress": _progress_snapshot(progress)
+    }
+
+
+def _record_stopped(stats: Dict[str, Any], progress: Dict[str, Any]) -> None:
+    """
+    Count and log the lookups of a bulk run that was closed or cancelled before it finished.
+    
+    Lookups that were queued or not read from the input yet count as dropped.
+    
+    Args:
+        stats: Scheduler stats of the run
+        progress: Progress counters of the run
+    """
+    dropped = max(progress["total"] - progress["done"] - stats['cancelled'], 0)
+    _stopped_stats['runs'] += 1
+    _stopped_stats['cancelled'] += stats['cancelled']
+    _stopped_stats['dropped'] += dropped
+    logger.info(
+        f"Bulk lookup stopped after {progress['done']} of {progress['total']} lookups: "
+        f"{stats['cancelled']} running lookups cancelled, {dropped} not started lookups dropped"
+    )
+
+
+def get_stopped_stats() -> Dict[str, int]:
+    """
+    Get the totals of bulk runs stopped before they finished.
+    
+    Returns:
+        Dictionary with the number of stopped runs and of their cancelled and dropped lookups
+    """
+    return dict(_stopped_stats)
+
+
+def _result_event(ioc_value: str, service_name: str, outcome: Any) -> Dict[str, Any]:
+    """
+    Build the stream event for a finished lookup.
+    
+    Args:
+        ioc_value: The IOC value
+        service_name: The service that was queried
+        outcome: ``(result, meta)`` from :func:`run_single_lookup` or the raised exception
+        
+    Returns:
+        Event dictionary with either ``data`` or ``error``
+    """
+    if isinstance(outcome, Exception):
+        logger.error(f"Error in lookup task for {ioc_value}/{service_name}: {str(outcome)}")
+        return {
+            "ioc": ioc_value,
+            "service": service_name,
+            "error": str(outcome)
+        }
+
+    result, meta = outcome
+    if isinstance(result, dict) and 'error' in result:
+        return {
+            "ioc": ioc_value, 
+            "service": service_name, 
+            "error": result.get("message", "Service error"),
+            "cache": meta
+        }
+    return {
+        "ioc": ioc_value, 
+        "service": service_name, 
+        "data": result,
+        "cache": meta
+    }
+
+
+def _progress_snapshot(progress: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy the progress counters for a single event.
+    
+    Args:
+        progress: Running progress counters
+        
+    Returns:
+        Independent copy of the counters
+    """
+    return {
+        "done": progress["done"],
+        "total": progress["total"],
+        "services": {name: dict(counts) for name, counts in progress["services"].items()}
+    }
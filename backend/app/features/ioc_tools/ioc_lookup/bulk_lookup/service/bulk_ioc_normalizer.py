@@ -0,0 +1,73 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from app.features.ioc_tools.ioc_defanger.service.defang_service import fang_ioc
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.ioc_utils import (
+    determine_ioc_type, normalize_ioc, IOC_TYPES
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class NormalizedIoc:
+    """A unique IOC to look up and the raw input lines it was read from."""
+    ioc: str
+    ioc_type: str
+    inputs: List[str] = field(default_factory=list)
+
+
+def classify_input(raw: str) -> Tuple[str, str]:
+    """
+    Turn one raw input line into a canonical IOC value and its type.
+
+    Values that cannot be classified as they are get refanged with the
+    defanger's rules first, so ``hxxp://evil[.]com`` becomes a URL while a
+    valid domain like ``myfxpsite.com`` is left untouched.
+
+    Args:
+        raw: Input line as submitted
+
+    Returns:
+        Tuple of (canonical IOC value, IOC type); the type is 'unknown' if
+        the value could not be classified
+    """
+    value = raw.strip()
+    ioc_type = determine_ioc_type(value)
+    if ioc_type == IOC_TYPES['UNKNOWN']:
+        fanged = fang_ioc(value)
+        if fanged != value:
+            ioc_type = determine_ioc_type(fanged)
+            if ioc_type != IOC_TYPES['UNKNOWN']:
+                value = fanged
+    if ioc_type == IOC_TYPES['UNKNOWN']:
+        return value, ioc_type
+    return normalize_ioc(value, ioc_type), ioc_type
+
+
+def normalize_bulk_iocs(iocs: List[str]) -> Tuple[List[NormalizedIoc], List[NormalizedIoc]]:
+    """
+    Trim, refang, canonicalize and deduplicate bulk lookup input.
+
+    Args:
+        iocs: Raw input lines
+
+    Returns:
+        Tuple of (IOCs to look up, unclassifiable values), both in first-seen
+        order with every original input line mapped to its entry
+    """
+    unique: Dict[Tuple[str, str], NormalizedIoc] = {}
+    for raw in iocs:
+        if not raw or not raw.strip():
+            continue
+        value, ioc_type = classify_input(raw)
+        entry = unique.get((value, ioc_type))
+        if entry is None:
+            entry = unique[(value, ioc_type)] = NormalizedIoc(ioc=value, ioc_type=ioc_type)
+        entry.inputs.append(raw)
+
+    known = [e for e in unique.values() if e.ioc_type != IOC_TYPES['UNKNOWN']]
+    unknown = [e for e in unique.values() if e.ioc_type == IOC_TYPES['UNKNOWN']]
+    if len(unique) < len(iocs):
+        logger.info(f"Bulk input normalized: {len(iocs)} lines, {len(unique)} unique IOCs")
+    return known, unknown
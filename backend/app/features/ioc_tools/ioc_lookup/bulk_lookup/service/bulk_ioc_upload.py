@@ -0,0 +1,233 @@
+import os
+import json
+import codecs
+import asyncio
+import logging
+from typing import AsyncGenerator, AsyncIterable, Dict, List, Optional, Set, Tuple
+from app.features.ioc_tools.ioc_extractor.service.ioc_extractor_service import extract_new_iocs
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Longest line read from an upload in characters; longer lines are cut into pieces of this size
+MAX_LINE_LENGTH = int(os.getenv("BULK_UPLOAD_MAX_LINE_LENGTH", "65536"))
+# Most lines handed to the IOC extractor at once; fewer when the body arrives slower
+EXTRACT_BATCH_LINES = int(os.getenv("BULK_UPLOAD_EXTRACT_BATCH_LINES", "500"))
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+TEXT_TYPES = ('text/plain', 'text/csv', 'text/x-log', 'application/octet-stream', 'application/csv')
+# Extracted IOC types that can be looked up
+LOOKUP_TYPES = ('ips', 'md5', 'sha1', 'sha256', 'urls', 'domains', 'emails', 'cves')
+
+
+def upload_format(content_type: str) -> str:
+    """
+    Tell how an upload is read from its Content-Type header.
+
+    Args:
+        content_type: The request's Content-Type header
+
+    Returns:
+        'multipart', 'ndjson' or 'text'
+
+    Raises:
+        ValueError: If the content type is not supported or a multipart body has no boundary
+    """
+    media_type, options = parse_options_header(content_type or '')
+    media_type = media_type.decode('latin-1').lower()
+    if media_type == 'multipart/form-data':
+        if not options.get(b'boundary'):
+            raise ValueError("Multipart upload without a boundary")
+        return 'multipart'
+    if media_type in NDJSON_TYPES:
+        return 'ndjson'
+    if media_type in TEXT_TYPES or not media_type:
+        return 'text'
+    raise ValueError(f"Unsupported upload type: {media_type}")
+
+
+async def iter_upload_iocs(
+    chunks: AsyncIterable[bytes],
+    content_type: str,
+    stats: Optional[Dict[str, int]] = None
+) -> AsyncGenerator[List[str], None]:
+    """
+    Read IOCs from an uploaded body while it is still arriving, a batch of lines at a time.
+
+    The body is one of:
+
+    - ``multipart/form-data`` with one or more files (TXT, CSV, logs); form
+      fields without a filename are ignored
+    - NDJSON, one JSON value per line: an IOC string, ``{"ioc": "..."}`` for
+      a single IOC or ``{"text": "..."}`` for text to extract IOCs from
+    - plain text, CSV or logs sent as the body itself
+
+    Text is run through the IOC extractor's patterns in a worker thread as
+    soon as a chunk of the body arrived, at most ``EXTRACT_BATCH_LINES``
+    lines at a time, so the event loop is not blocked and only the lines of
+    one chunk are held in memory. Every value is yielded once, in the batch
+    it is first found in.
+
+    Args:
+        chunks: Body as it arrives
+        content_type: The request's Content-Type header
+        stats: Counters of read lines and skipped NDJSON lines, updated while reading
+
+    Yields:
+        Lists of new raw IOC values, ready for bulk lookup normalization
+
+    Raises:
+        ValueError: If the content type is not supported or a multipart body has no boundary
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault('lines', 0)
+    stats.setdefault('skipped', 0)
+    upload = upload_format(content_type)
+    if upload == 'multipart':
+        batches = _multipart_lines(chunks, parse_options_header(content_type)[1][b'boundary'])
+    else:
+        batches = _text_lines(chunks)
+
+    seen: Set[str] = set()
+    async for lines in batches:
+        stats['lines'] += len(lines)
+        if upload == 'ndjson':
+            texts, found = [], []
+            for line in lines:
+                ioc, text = _ndjson_line(line, stats)
+                if ioc is not None and ioc not in seen:
+                    seen.add(ioc)
+                    found.append(ioc)
+                elif text is not None:
+                    texts.append(text)
+            if found:
+                yield found
+            lines = texts
+        for start in range(0, len(lines), max(EXTRACT_BATCH_LINES, 1)):
+            found = await _extract(lines[start:start + max(EXTRACT_BATCH_LINES, 1)], seen)
+            if found:
+                yield found
+
+
+async def _extract(lines: List[str], seen: Set[str]) -> List[str]:
+    """Extract the new lookup IOCs of a batch of lines in a worker thread."""
+    found = await asyncio.to_thread(extract_new_iocs, lines, seen)
+    return [ioc for ioc_type, ioc in found if ioc_type in LOOKUP_TYPES]
+
+
+def _ndjson_line(line: str, stats: Dict[str, int]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Read one NDJSON line.
+
+    Args:
+        line: Line of the body
+        stats: Upload counters; invalid lines are counted as skipped
+
+    Returns:
+        Tuple of (IOC of an IOC line, text of a text line); both are None for
+        blank and invalid lines
+    """
+    if not line.strip():
+        return None, None
+    try:
+        value = json.loads(line)
+    except ValueError:
+        stats['skipped'] += 1
+        return None, None
+    if isinstance(value, dict):
+        if isinstance(value.get('text'), str) and 'ioc' not in value:
+            return None, value['text']
+        value = value.get('ioc')
+    if isinstance(value, str) and value.strip():
+        return value.strip(), None
+    stats['skipped'] += 1
+    return None, None
+
+
+async def _text_lines(chunks: AsyncIterable[bytes]) -> AsyncGenerator[List[str], None]:
+    """Split a UTF-8 body into the complete lines of each chunk as it arrives."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer = ''
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = _split(buffer)
+        if lines:
+            yield lines
+    buffer += decoder.decode(b'', final=True)
+    lines = [line for line in _split(buffer) if line]
+    if lines:
+        yield lines
+
+
+async def _multipart_lines(chunks: AsyncIterable[bytes], boundary: bytes) -> AsyncGenerator[List[str], None]:
+    """Split the files of a multipart body into the complete lines of each chunk as it arrives."""
+    state = {'is_file': False, 'header_field': b'', 'header_value': b'', 'headers': {}}
+    pending: List[bytes] = []
+
+    def on_part_begin():
+        state['headers'] = {}
+
+    def on_header_field(data: bytes, start: int, end: int):
+        state['header_field'] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        state['header_value'] += data[start:end]
+
+    def on_header_end():
+        state['headers'][state['header_field'].lower()] = state['header_value']
+        state['header_field'] = state['header_value'] = b''
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state['headers'].get(b'content-disposition', b''))
+        state['is_file'] = b'filename' in disposition
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if state['is_file']:
+            pending.append(data[start:end])
+
+    def on_part_end():
+        if state['is_file']:
+            pending.append(b'\n')
+
+    parser = MultipartParser(boundary, {
+        'on_part_begin': on_part_begin,
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished,
+        'on_part_data': on_part_data,
+        'on_part_end': on_part_end,
+    })
+
+    async def file_chunks():
+        async for chunk in chunks:
+            parser.write(chunk)
+            if pending:
+                yield b''.join(pending)
+                pending.clear()
+        parser.finalize()
+        if pending:
+            yield b''.join(pending)
+
+    async for lines in _text_lines(file_chunks()):
+        yield lines
+
+
+def _split(text: str) -> List[str]:
+    """Split text into lines, cutting lines over MAX_LINE_LENGTH; the last item is the unfinished rest."""
+    *lines, rest = text.split('\n')
+    result = []
+    for line in lines:
+        line = line.rstrip('\r')
+        result.extend(line[i:i + MAX_LINE_LENGTH] for i in range(0, len(line), MAX_LINE_LENGTH))
+        if not line:
+            result.append(line)
+    while len(rest) > MAX_LINE_LENGTH:
+        result.append(rest[:MAX_LINE_LENGTH])
+        rest = rest[MAX_LINE_LENGTH:]
+    result.append(rest)
+    return result
@@ -0,0 +1,735 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import itertools
+import tempfile
+from datetime import datetime, timedelta
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, AsyncIterable, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.crud import bulk_lookup_job_crud as job_crud
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service.bulk_ioc_lookup_service import (
+    process_bulk_lookups, get_stopped_stats, select_services
+)
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service.bulk_ioc_normalizer import normalize_bulk_iocs
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service.bulk_verdict_summary import summarize_results
+
+logger = logging.getLogger(__name__)
+
+# Result events written to the database in one transaction
+FLUSH_SIZE = int(os.getenv("BULK_JOB_FLUSH_SIZE", "100"))
+# Longest time in seconds finished results are held before they are written
+FLUSH_INTERVAL = float(os.getenv("BULK_JOB_FLUSH_INTERVAL", "1"))
+# Jobs running at the same time; later jobs wait in submission order
+MAX_RUNNING_JOBS = int(os.getenv("BULK_JOB_MAX_RUNNING", "2"))
+# Live events buffered per stream before the stream falls back to reading the database
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("BULK_JOB_SUBSCRIBER_QUEUE_SIZE", "1000"))
+# Stored results read per query when a stream replays a job
+REPLAY_PAGE_SIZE = 500
+# Days finished jobs and their results are kept
+RETENTION_DAYS = float(os.getenv("BULK_JOB_RETENTION_DAYS", "7"))
+# IOCs of an upload the job's lookups read from its spool file at once
+UPLOAD_READ_SIZE = int(os.getenv("BULK_JOB_UPLOAD_READ_SIZE", "500"))
+# Error stored with upload jobs whose upload did not finish
+UPLOAD_INTERRUPTED = "Upload interrupted"
+
+# Queue marker telling a stream it missed live events and has to re-read them
+_LAGGED = object()
+
+
+class _UploadSpool:
+    """
+    IOCs of an upload, spooled to a temporary file as they are read and followed by the job's lookups.
+
+    The upload and the job each release the spool when they are done with
+    it; the file is removed once both have.
+    """
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix='bulk-upload-', suffix='.ndjson')
+        self.writer = os.fdopen(fd, 'w', encoding='utf-8')
+        self.count = 0
+        self.finished = False
+        self.closed = False
+        self.changed = asyncio.Event()
+        self.users = 2
+
+    def write(self, values: List[str]) -> None:
+        """Append IOCs to the file; runs in a worker thread, ``count`` is raised on the loop afterwards."""
+        self.writer.write(''.join(json.dumps(value) + '\n' for value in values))
+        self.writer.flush()
+
+    def read(self) -> List[str]:
+        """Read all IOCs spooled so far."""
+        with open(self.path, encoding='utf-8') as reader:
+            return [json.loads(line) for line in itertools.islice(reader, self.count)]
+
+    async def iterate(self) -> AsyncGenerator[str, None]:
+        """Yield the spooled IOCs, waiting for more until the upload finished."""
+        reader = await asyncio.to_thread(open, self.path, encoding='utf-8')
+        try:
+            read = 0
+            while True:
+                self.changed.clear()
+                if self.closed:
+                    return
+                if read < self.count:
+                    lines = await asyncio.to_thread(
+                        _read_lines, reader, min(self.count - read, max(UPLOAD_READ_SIZE, 1))
+                    )
+                    read += len(lines)
+                    for line in lines:
+                        yield json.loads(line)
+                elif self.finished:
+                    return
+                else:
+                    await self.changed.wait()
+        finally:
+            reader.close()
+
+    def close(self) -> None:
+        """Stop taking IOCs and wake up the job's lookups waiting for more."""
+        self.closed = True
+        self.changed.set()
+
+    def release(self) -> None:
+        """Drop the upload's or the job's use of the spool, removing the file after the last one."""
+        self.users -= 1
+        if self.users == 0:
+            self.writer.close()
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                logger.warning(f"Could not remove upload spool {self.path}: {str(e)}")
+
+
+def _read_lines(reader: TextIO, count: int) -> List[str]:
+    """Read the next ``count`` lines of a file."""
+    return [reader.readline() for _ in range(count)]
+
+
+class _ActiveJob:
+    """A queued or running job of this process and the streams attached to it."""
+
+    def __init__(self, job_id: str, immediate: bool = False):
+        self.job_id = job_id
+        self.immediate = immediate
+        self.task: Optional[asyncio.Task] = None
+        self.unflushed: List[Dict[str, Any]] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.progress: Optional[Dict[str, Any]] = None
+        self.last_seq = 0
+        self.feed: Optional[_UploadSpool] = None
+
+    def publish(self, item: Any) -> None:
+        """Hand an event, or None at the end of the job, to every attached stream."""
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_LAGGED if item is not None else None)
+
+
+_active: Dict[str, _ActiveJob] = {}
+_stopping = False
+
+
+def submit_job(
+    db: Session,
+    iocs: List[str],
+    services: List[str],
+    force_refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Store a new bulk lookup job and start it once a job slot is free.
+
+    Args:
+        db: Database session
+        iocs: Raw IOC input lines
+        services: Service names to query
+        force_refresh: Bypass the result cache for every lookup
+
+    Returns:
+        The job's status dictionary
+    """
+    return _queue_job(job_crud.create_job(db, iocs, services, force_refresh), len(iocs))
+
+
+async def submit_job_async(
+    iocs: List[str],
+    services: List[str],
+    force_refresh: bool = False,
+    immediate: bool = False
+) -> Dict[str, Any]:
+    """
+    Store a new bulk lookup job in a worker thread and start it.
+
+    Args:
+        iocs: Raw IOC input lines
+        services: Service names to query
+        force_refresh: Bypass the result cache for every lookup
+        immediate: Start the job at once instead of waiting for a job slot
+
+    Returns:
+        The job's status dictionary
+    """
+    job = await _in_session(job_crud.create_job, iocs, services, force_refresh)
+    return _queue_job(job, len(iocs), immediate)
+
+
+def _queue_job(job: Any, ioc_count: int, immediate: bool = False) -> Dict[str, Any]:
+    """Hand a stored job to this process's job queue and start what can start."""
+    logger.info(
+        f"Submitted bulk lookup job {job.id} with {ioc_count} IOCs across {len(json.loads(job.services))} services"
+    )
+    _active[job.id] = _ActiveJob(job.id, immediate)
+    _start_pending()
+    return job.to_dict()
+
+
+async def submit_upload_job(services: List[str], force_refresh: bool = False) -> Dict[str, Any]:
+    """
+    Store a new bulk lookup job whose IOCs are read from an upload, and start it.
+
+    Upload jobs start at once, without waiting for a job slot, and look up
+    the IOCs spooled by :func:`feed_upload` as they are found.
+
+    Args:
+        services: Service names to query
+        force_refresh: Bypass the result cache for every lookup
+
+    Returns:
+        The job's status dictionary
+    """
+    job = await _in_session(job_crud.create_job, [], services, force_refresh)
+    logger.info(f"Submitted bulk lookup upload job {job.id} across {len(services)} services")
+    active = _ActiveJob(job.id, immediate=True)
+    active.feed = _UploadSpool()
+    _active[job.id] = active
+    _start_pending()
+    return job.to_dict()
+
+
+async def feed_upload(job_id: str, batches: AsyncIterable[List[str]]) -> int:
+    """
+    Spool the IOCs of an upload for its job while the upload is read.
+
+    Reading the upload does not wait for the job's lookups: IOCs are written
+    to the job's spool file, which the lookups follow at their own pace.
+    Once the upload is read, its IOCs are stored with the job, so the job can
+    be resumed and summarized like any other. If reading the upload fails,
+    the job is cancelled.
+
+    Args:
+        job_id: ID of a job from :func:`submit_upload_job`
+        batches: Lists of IOC values read from the upload
+
+    Returns:
+        Number of IOCs read
+
+    Raises:
+        KeyError: If the job is not an upload job of this process
+    """
+    active = _active.get(job_id)
+    if active is None or active.feed is None:
+        raise KeyError(job_id)
+    feed = active.feed
+    finished = False
+    try:
+        async for values in batches:
+            if feed.closed:
+                break
+            await asyncio.to_thread(feed.write, values)
+            feed.count += len(values)
+            feed.changed.set()
+        finished = True
+        await _in_session(_store_upload, job_id, feed)
+    finally:
+        feed.finished = True
+        feed.changed.set()
+        if not finished:
+            feed.close()
+            logger.warning(f"Upload of bulk lookup job {job_id} stopped after {feed.count} IOCs")
+            await cancel_job_async(job_id, UPLOAD_INTERRUPTED)
+        feed.release()
+    logger.info(f"Read {feed.count} IOCs from the upload of bulk lookup job {job_id}")
+    return feed.count
+
+
+def _store_upload(db: Session, job_id: str, feed: _UploadSpool) -> None:
+    """Store the IOCs read from an upload with its job."""
+    job_crud.update_job(db, job_id, iocs=json.dumps(feed.read()))
+
+
+def resume_jobs() -> int:
+    """
+    Re-queue jobs that were queued or running when the application stopped.
+
+    Lookups that already have a stored result are not repeated. Upload jobs
+    whose upload had not been read completely are failed, as their input is
+    gone.
+
+    Returns:
+        Number of jobs re-queued
+    """
+    global _stopping
+    _stopping = False
+    with SessionLocal() as db:
+        job_ids = []
+        for job in job_crud.get_unfinished_jobs(db):
+            # Upload jobs store their IOCs once the upload is read
+            if json.loads(job.iocs or '[]'):
+                job_ids.append(job.id)
+            else:
+                job_crud.finish_job(db, job.id, 'failed', UPLOAD_INTERRUPTED)
+    for job_id in job_ids:
+        _active.setdefault(job_id, _ActiveJob(job_id))
+    if job_ids:
+        logger.info(f"Resuming {len(job_ids)} unfinished bulk lookup job(s)")
+    _start_pending()
+    return len(job_ids)
+
+
+async def stop_jobs() -> None:
+    """Stop running jobs on shutdown; they keep their status and are resumed on the next start."""
+    global _stopping
+    _stopping = True
+    tasks = [active.task for active in _active.values() if active.task]
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"Stopped {len(tasks)} running bulk lookup job(s)")
+    _active.clear()
+
+
+def cancel_job(db: Session, job_id: str, error: Optional[str] = None) -> bool:
+    """
+    Cancel a queued or running job; results stored so far are kept.
+
+    Args:
+        db: Database session
+        job_id: Job ID
+        error: Reason stored with the job
+
+    Returns:
+        True if the job was queued or running
+    """
+    if not _finish_cancelled(db, job_id, error):
+        return False
+    _stop_active(job_id)
+    return True
+
+
+async def cancel_job_async(job_id: str, error: Optional[str] = None) -> bool:
+    """
+    Cancel a queued or running job like :func:`cancel_job`, writing to the database in a worker thread.
+
+    Args:
+        job_id: Job ID
+        error: Reason stored with the job
+
+    Returns:
+        True if the job was queued or running
+    """
+    if not await _in_session(_finish_cancelled, job_id, error):
+        return False
+    _stop_active(job_id)
+    return True
+
+
+def _finish_cancelled(db: Session, job_id: str, error: Optional[str]) -> bool:
+    """Mark a queued or running job as cancelled; False if it does not exist or already finished."""
+    job = job_crud.get_job(db, job_id)
+    if not job or job.status not in ('queued', 'running'):
+        return False
+    job_crud.finish_job(db, job_id, 'cancelled', error)
+    return True
+
+
+def _stop_active(job_id: str) -> None:
+    """Stop a cancelled job's lookups in this process."""
+    active = _active.get(job_id)
+    if active and active.feed:
+        active.feed.close()
+    if active and active.task:
+        active.task.cancel()
+    elif active:
+        _active.pop(job_id, None)
+        active.publish(None)
+    logger.info(f"Cancelled bulk lookup job {job_id}")
+
+
+def get_job_status(db: Session, job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a job's status, with per-service progress while it runs in this process.
+
+    Upload jobs still reading their upload are flagged as ``uploading``, with
+    the number of IOCs read so far.
+
+    Args:
+        db: Database session
+        job_id: Job ID
+
+    Returns:
+        Status dictionary or None if the job does not exist
+    """
+    job = job_crud.get_job(db, job_id)
+    if not job:
+        return None
+    status = job.to_dict()
+    active = _active.get(job_id)
+    if active and active.progress:
+        status['done'] = active.progress['done']
+        status['total'] = active.progress['total']
+        status['progress'] = active.progress
+    if active and active.feed and not active.feed.finished:
+        status['uploading'] = True
+        status['uploaded_iocs'] = active.feed.count
+    return status
+
+
+def get_results_page(db: Session, job_id: str, after_seq: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+    """
+    Get a page of a job's result events, including finished results not written yet.
+
+    Args:
+        db: Database session
+        job_id: Job ID
+        after_seq: Only return events with a higher sequence number
+        limit: Most events returned
+
+    Returns:
+        Result events in sequence order
+    """
+    events = [row.to_dict() for row in job_crud.get_results(db, job_id, after_seq, limit)]
+    active = _active.get(job_id)
+    if active and len(events) < limit:
+        last_seq = events[-1]['seq'] if events else after_seq
+        events.extend(e for e in list(active.unflushed) if e['seq'] > last_seq)
+    return events[:limit]
+
+
+def get_result(db: Session, job_id: str, seq: int) -> Optional[Dict[str, Any]]:
+    """
+    Get one result event of a job, including a finished result not written yet.
+
+    Args:
+        db: Database session
+        job_id: Job ID
+        seq: Sequence number of the event
+
+    Returns:
+        The event or None if the job has no such event
+    """
+    row = job_crud.get_result(db, job_id, seq)
+    if row:
+        return row.to_dict()
+    active = _active.get(job_id)
+    if active:
+        return next((e for e in list(active.unflushed) if e['seq'] == seq), None)
+    return None
+
+
+async def stream_job(job_id: str, after_seq: int = 0) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Replay a job's stored results and follow it live until it finishes.
+
+    Stored results are read page by page in a worker thread, so a long replay
+    does not hold up the event loop.
+
+    Args:
+        job_id: Job ID
+        after_seq: Only yield events with a higher sequence number
+
+    Yields:
+        Result events in sequence order
+    """
+    active = _active.get(job_id)
+    queue: Optional[asyncio.Queue] = None
+    snapshot: List[Dict[str, Any]] = []
+    if active:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        active.subscribers.append(queue)
+        snapshot = list(active.unflushed)
+
+    last_seq = after_seq
+    try:
+        while True:
+            # Everything published before the stream attached is stored or in the snapshot
+            async with aclosing(_stored_results(job_id, last_seq)) as stored:
+                async for event in stored:
+                    last_seq = event['seq']
+                    yield event
+            for event in snapshot:
+                if event['seq'] > last_seq:
+                    last_seq = event['seq']
+                    yield event
+            if queue is None:
+                return
+
+            item = await queue.get()
+            while item is not _LAGGED and item is not None:
+                if item['seq'] > last_seq:
+                    last_seq = item['seq']
+                    yield item
+                item = await queue.get()
+            if item is None:
+                queue = None
+                snapshot = []
+            else:
+                logger.debug(f"Stream of bulk lookup job {job_id} fell behind, re-reading stored results")
+                snapshot = list(active.unflushed)
+    finally:
+        if active and queue is not None and queue in active.subscribers:
+            active.subscribers.remove(queue)
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get counters of queued and running jobs and of lookups stopped early.
+
+    Returns:
+        Dictionary of job and lookup counters
+    """
+    return {
+        "active_jobs": len(_active),
+        "running_jobs": sum(1 for active in _active.values() if active.task),
+        "stopped_lookups": get_stopped_stats()
+    }
+
+
+async def collect_job(job_id: str, timeout: float) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Collect a job's result events until it finishes or the timeout expires.
+
+    The job itself is not affected by the timeout; lookups still running keep
+    storing their results.
+
+    Args:
+        job_id: Job ID
+        timeout: Longest time to wait in seconds
+
+    Returns:
+        Tuple of (events received so far, True if the job finished in time)
+    """
+    events: List[Dict[str, Any]] = []
+    try:
+        async with asyncio.timeout(timeout):
+            async with aclosing(stream_job(job_id)) as stream:
+                async for event in stream:
+                    events.append(event)
+    except TimeoutError:
+        logger.debug(f"Deadline of {timeout:g}s reached for bulk lookup job {job_id} after {len(events)} events")
+        return events, False
+    return events, True
+
+
+def get_job_summary(db: Session, job_id: str, events: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Build the per-IOC verdict summary of a job.
+
+    Args:
+        db: Database session
+        job_id: Job ID
+        events: Result events to summarize; all stored results when omitted
+
+    Returns:
+        The job's status with the verdict summary, or None if the job does not exist
+    """
+    status = get_job_status(db, job_id)
+    if status is None:
+        return None
+    job = job_crud.get_job(db, job_id)
+    active = _active.get(job_id)
+    if active and active.feed and not active.feed.finished:
+        lookup_iocs, _ = normalize_bulk_iocs(active.feed.read())
+    else:
+        lookup_iocs, _ = normalize_bulk_iocs(json.loads(job.iocs))
+    if events is None:
+        events = list(_iter_results(db, job_id))
+    # Events carry the services the job actually queries; before the first one, pick them like the job does
+    services = next((list(e['progress']['services']) for e in events if e.get('progress')), None)
+    if services is None:
+        services = select_services(db, json.loads(job.services))[0]
+    return {**status, **summarize_results(lookup_iocs, services, events)}
+
+
+def _iter_results(db: Session, job_id: str) -> Iterator[Dict[str, Any]]:
+    """Iterate over all result events of a job, including those not written yet."""
+    after_seq = 0
+    while True:
+        page = get_results_page(db, job_id, after_seq, REPLAY_PAGE_SIZE)
+        yield from page
+        if len(page) < REPLAY_PAGE_SIZE:
+            return
+        after_seq = page[-1]['seq']
+
+
+async def _stored_results(job_id: str, after_seq: int = 0) -> AsyncGenerator[Dict[str, Any], None]:
+    """Yield a job's stored result events, reading each page in a worker thread."""
+    while True:
+        page = await _in_session(_results_page, job_id, after_seq)
+        for event in page:
+            yield event
+        if len(page) < REPLAY_PAGE_SIZE:
+            return
+        after_seq = page[-1]['seq']
+
+
+def _results_page(db: Session, job_id: str, after_seq: int) -> List[Dict[str, Any]]:
+    """Read and decode one page of a job's stored result events."""
+    return [row.to_dict() for row in job_crud.get_results(db, job_id, after_seq, REPLAY_PAGE_SIZE)]
+
+
+async def _in_session(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a database function in a worker thread with a session of its own.
+
+    Args:
+        func: Function taking the session as its first argument
+        *args: Further arguments of the function
+        **kwargs: Keyword arguments of the function
+
+    Returns:
+        The function's result
+    """
+    def run():
+        with SessionLocal() as db:
+            return func(db, *args, **kwargs)
+    return await asyncio.to_thread(run)
+
+
+def purge_finished_jobs() -> int:
+    """
+    Delete jobs that finished more than ``RETENTION_DAYS`` ago, with their results.
+
+    Returns:
+        Number of jobs deleted
+    """
+    with SessionLocal() as db:
+        deleted = job_crud.delete_finished_jobs(db, datetime.utcnow() - timedelta(days=RETENTION_DAYS))
+    if deleted:
+        logger.info(f"Purged {deleted} finished bulk lookup job(s)")
+    return deleted
+
+
+def _start_pending() -> None:
+    """Start queued jobs, in submission order, while job slots are free; immediate jobs start at once."""
+    if _stopping:
+        return
+    running = sum(1 for active in _active.values() if active.task and not active.immediate)
+    for active in list(_active.values()):
+        if active.task is None and (active.immediate or running < max(MAX_RUNNING_JOBS, 1)):
+            active.task = asyncio.get_running_loop().create_task(_run_job(active))
+            active.task.add_done_callback(lambda _, active=active: _release_feed(active))
+            running += 0 if active.immediate else 1
+
+
+def _release_feed(active: _ActiveJob) -> None:
+    """Release an upload job's spool once the job's task is done, even if it was cancelled before it ran."""
+    if active.feed:
+        active.feed.close()
+        active.feed.release()
+
+
+async def _flush(active: _ActiveJob) -> None:
+    """
+    Write buffered result events and the job's progress in a worker thread.
+
+    The events stay in ``unflushed``, where streams and result pages find
+    them, until they are committed. A job cancelled while the write is in
+    progress waits for it, so no event is written twice.
+    """
+    if not active.unflushed:
+        return
+    events = list(active.unflushed)
+    done = active.progress['done'] if active.progress else 0
+    write = asyncio.ensure_future(_in_session(job_crud.add_results, active.job_id, events, done))
+    try:
+        await asyncio.shield(write)
+    except asyncio.CancelledError:
+        await write
+        del active.unflushed[:len(events)]
+        raise
+    del active.unflushed[:len(events)]
+
+
+async def _fail(active: _ActiveJob, event: Dict[str, Any]) -> None:
+    """Store and publish a job-level error event and mark the job as failed."""
+    active.last_seq += 1
+    event['seq'] = active.last_seq
+    active.unflushed.append(event)
+    active.publish(event)
+    await _flush(active)
+    await _in_session(job_crud.finish_job, active.job_id, 'failed', event.get('error'))
+
+
+async def _run_job(active: _ActiveJob) -> None:
+    """
+    Run a job's lookups and store every result event as it completes.
+
+    The job's own reads and writes run in worker threads, each with its own
+    session; the lookups get a session of their own for the service settings.
+
+    Args:
+        active: The job to run
+    """
+    job_id = active.job_id
+    db = SessionLocal()
+    try:
+        job = await _in_session(job_crud.get_job, job_id)
+        if not job:
+            return
+        iocs = active.feed.iterate() if active.feed else json.loads(job.iocs)
+        services = json.loads(job.services)
+        completed = await _in_session(job_crud.get_completed_pairs, job_id) if job.last_seq else set()
+        delivered = _stored_results(job_id) if job.last_seq else None
+        await _in_session(
+            job_crud.update_job, job_id, status='running', started_at=job.started_at or datetime.utcnow()
+        )
+        logger.info(f"Running bulk lookup job {job_id}" + (f", {len(completed)} results already stored" if completed else ""))
+
+        total = job.total
+        active.last_seq = job.last_seq or 0
+        last_flush = time.monotonic()
+        async with aclosing(process_bulk_lookups(
+            iocs, services, db,
+            force_refresh=job.force_refresh, completed=completed, start_seq=job.last_seq, delivered=delivered
+        )) as events:
+            async for event in events:
+                if 'seq' not in event:
+                    await _fail(active, event)
+                    return
+                active.last_seq = event['seq']
+                active.progress = event.get('progress', active.progress)
+                if active.progress and active.progress['total'] != total:
+                    total = active.progress['total']
+                    await _in_session(job_crud.update_job, job_id, total=total)
+                active.unflushed.append(event)
+                active.publish(event)
+                if len(active.unflushed) >= FLUSH_SIZE or time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                    await _flush(active)
+                    last_flush = time.monotonic()
+
+        await _flush(active)
+        await _in_session(job_crud.finish_job, job_id, 'completed')
+        logger.info(f"Completed bulk lookup job {job_id}")
+    except asyncio.CancelledError:
+        await _flush(active)
+        raise
+    except Exception as e:
+        logger.error(f"Bulk lookup job {job_id} failed: {str(e)}", exc_info=True)
+        db.rollback()
+        await _fail(active, {"error": str(e), "service": "system"})
+    finally:
+        db.close()
+        if _active.get(job_id) is active:
+            del _active[job_id]
+        active.publish(None)
+        _start_pending()
@@ -0,0 +1,362 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import (
+    Any, AsyncGenerator, AsyncIterable, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+)
+
+logger = logging.getLogger(__name__)
+
+# Lookups running at the same time across all services
+MAX_IN_FLIGHT = int(os.getenv("BULK_LOOKUP_MAX_IN_FLIGHT", "50"))
+# Lookups running at the same time for one service
+MAX_PER_SERVICE = int(os.getenv("BULK_LOOKUP_MAX_PER_SERVICE", "10"))
+# Lookups read from the input but not started yet, across all services
+MAX_PENDING = int(os.getenv("BULK_LOOKUP_MAX_PENDING", "1000"))
+
+LookupFunc = Callable[[str, str, str], Awaitable[Any]]
+BatchLookupFunc = Callable[[str, str, List[str]], Awaitable[Dict[str, Any]]]
+
+
+class _InputPending(Exception):
+    """Raised by :class:`_AsyncInput` when no item has arrived yet."""
+
+
+class _AsyncInput:
+    """
+    Reads an async iterable ahead into a small buffer, so the scheduler can
+    take items without waiting, e.g. IOCs found in an upload still in progress.
+    """
+
+    def __init__(self, items: AsyncIterable[Tuple[str, str]], size: int):
+        self._items = items
+        self._size = max(size, 1)
+        self._buffer: Deque[Tuple[str, str]] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._waiter: Optional[asyncio.Task] = None
+        self._task = asyncio.create_task(self._pump())
+
+    async def _pump(self) -> None:
+        try:
+            async for item in self._items:
+                while len(self._buffer) >= self._size:
+                    self._space.clear()
+                    await self._space.wait()
+                self._buffer.append(item)
+                self._ready.set()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+            self._ready.set()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Tuple[str, str]:
+        if self._buffer:
+            item = self._buffer.popleft()
+            self._space.set()
+            return item
+        if self._done:
+            if self._error:
+                raise self._error
+            raise StopIteration
+        self._ready.clear()
+        raise _InputPending
+
+    def waiter(self) -> asyncio.Task:
+        """Get a task that finishes once the next item or the end of the input arrives."""
+        if self._waiter is None or self._waiter.done():
+            self._waiter = asyncio.create_task(self._ready.wait())
+        return self._waiter
+
+    async def aclose(self) -> None:
+        """Stop reading ahead and close the source."""
+        for task in (self._task, self._waiter):
+            if task and not task.done():
+                task.cancel()
+        await asyncio.gather(*(t for t in (self._task, self._waiter) if t), return_exceptions=True)
+        aclose = getattr(self._items, 'aclose', None)
+        if aclose:
+            await aclose()
+
+
+class BulkLookupScheduler:
+    """
+    Runs (IOC, service) lookups with a global and a per-service concurrency cap.
+
+    IOCs are read from the input lazily, only when a service has a free slot
+    and nothing queued, and at most ``max_pending`` lookups wait at any time,
+    so memory use does not grow with the length of the IOC list. Services are
+    served round-robin, so a slow vendor only ever holds its own slots.
+    Results are yielded as lookups complete; no new lookups are started while
+    the consumer has not taken the previous result.
+
+    When the run is closed or cancelled before it finishes, running lookups
+    are cancelled and awaited, and queued lookups are dropped; their numbers
+    are kept in ``stats['cancelled']`` and ``stats['dropped']``.
+
+    The input may also be an async iterable. It is read ahead by a
+    background task, and the scheduler waits for new items together with
+    the running lookups, so results keep flowing while the input is slow.
+
+    Services listed in ``batching`` get up to ``max_size`` queued IOCs of one
+    type per call. A partial batch is started once the input is exhausted or
+    its oldest IOC has waited ``max_wait`` seconds. A batch takes one slot.
+    """
+
+    def __init__(
+        self,
+        services: List[str],
+        lookup: LookupFunc,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_per_service: int = MAX_PER_SERVICE,
+        max_pending: int = MAX_PENDING,
+        batch_lookup: Optional[BatchLookupFunc] = None,
+        batching: Optional[Dict[str, Tuple[int, float]]] = None,
+        skip: Optional[Callable[[str, str], bool]] = None
+    ):
+        """
+        Args:
+            services: Service names every IOC is looked up in
+            lookup: Coroutine function called as ``lookup(service, ioc, ioc_type)``
+            max_in_flight: Global limit of running lookups
+            max_per_service: Per-service limit of running lookups
+            max_pending: Limit of queued lookups across all services
+            batch_lookup: Coroutine function called as ``batch_lookup(service, ioc_type, iocs)``,
+                returning a result per IOC
+            batching: Maps batch-capable services to their (max_size, max_wait)
+            skip: Called as ``skip(ioc, service)``; pairs it returns True for are not looked up
+        """
+        self.services = list(services)
+        self.lookup = lookup
+        self.batch_lookup = batch_lookup
+        self.skip = skip
+        self.batching = {
+            s: (max(int(size), 1), float(wait))
+            for s, (size, wait) in (batching or {}).items()
+            if s in services and batch_lookup is not None
+        }
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_per_service = max(max_per_service, 1)
+        self.max_pending = max(max_pending, len(self.services))
+
+        self._pending: Dict[str, Deque[Tuple[str, str]]] = {s: deque() for s in self.services}
+        self._pending_count = 0
+        self._running: Dict[asyncio.Task, Tuple[List[str], str]] = {}
+        self._running_per_service: Dict[str, int] = {s: 0 for s in self.services}
+        self._next_service = 0
+        self._exhausted = False
+        self._queued_since: Dict[str, float] = {}
+        self.stats = {
+            'started': 0, 'completed': 0, 'batches': 0, 'peak_in_flight': 0, 'peak_pending': 0,
+            'cancelled': 0, 'dropped': 0
+        }
+
+    def _batch_target(self, service_name: str) -> int:
+        """Number of queued IOCs a service wants before it starts a call."""
+        return self.batching[service_name][0] if service_name in self.batching else 1
+
+    def _wants_input(self) -> bool:
+        """Check whether a service could start a lookup but has nothing queued."""
+        if self._exhausted or self._pending_count + len(self.services) > self.max_pending:
+            return False
+        if len(self._running) >= self.max_in_flight:
+            return False
+        return any(
+            len(self._pending[s]) < self._batch_target(s) and self._running_per_service[s] < self.max_per_service
+            for s in self.services
+        )
+
+    def _fill(self, items) -> None:
+        """Read IOCs from the input until every service with a free slot has work."""
+        while self._wants_input():
+            try:
+                ioc, ioc_type = next(items)
+            except StopIteration:
+                self._exhausted = True
+                break
+            except _InputPending:
+                break
+            for service_name in self.services:
+                if self.skip and self.skip(ioc, service_name):
+                    continue
+                if not self._pending[service_name]:
+                    self._queued_since[service_name] = time.monotonic()
+                self._pending[service_name].append((ioc, ioc_type))
+                self._pending_count += 1
+        self.stats['peak_pending'] = max(self.stats['peak_pending'], self._pending_count)
+
+    def _take_batch(self, service_name: str) -> Optional[Tuple[str, List[str]]]:
+        """
+        Take the next batch for a batch-capable service if it is due.
+
+        Args:
+            service_name: Service to take the batch for
+
+        Returns:
+            Tuple of (IOC type, IOC values) or None if the batch should wait for more IOCs
+        """
+        queue = self._pending[service_name]
+        max_size, max_wait = self.batching[service_name]
+        if len(queue) < max_size and not self._exhausted:
+            if time.monotonic() - self._queued_since.get(service_name, 0.0) < max_wait:
+                return None
+
+        ioc_type = queue[0][1]
+        iocs, rest = [], deque()
+        while queue:
+            ioc, item_type = queue.popleft()
+            if item_type == ioc_type and len(iocs) < max_size:
+                iocs.append(ioc)
+            else:
+                rest.append((ioc, item_type))
+        queue.extend(rest)
+        if queue:
+            self._queued_since[service_name] = time.monotonic()
+        return ioc_type, iocs
+
+    def _next_batch_deadline(self) -> Optional[float]:
+        """Seconds until the earliest waiting partial batch is due, or None if there is none."""
+        deadlines = [
+            self._queued_since.get(s, 0.0) + wait - time.monotonic()
+            for s, (_, wait) in self.batching.items()
+            if self._pending[s] and self._running_per_service[s] < self.max_per_service
+        ]
+        return max(min(deadlines), 0.0) if deadlines else None
+
+    def _start(self, service_name: str) -> bool:
+        """
+        Start the next lookup or batch of a service.
+
+        Returns:
+            True if something was started
+        """
+        if service_name in self.batching:
+            batch = self._take_batch(service_name)
+            if batch is None:
+                return False
+            ioc_type, iocs = batch
+            coro = self.batch_lookup(service_name, ioc_type, iocs)
+            self.stats['batches'] += 1
+        else:
+            ioc, ioc_type = self._pending[service_name].popleft()
+            iocs = [ioc]
+            coro = self.lookup(service_name, ioc, ioc_type)
+
+        task = asyncio.create_task(coro)
+        self._pending_count -= len(iocs)
+        self._running[task] = (iocs, service_name)
+        self._running_per_service[service_name] += 1
+        self.stats['started'] += len(iocs)
+        return True
+
+    def _dispatch(self) -> bool:
+        """
+        Start queued lookups round-robin across services until a cap is reached.
+
+        Returns:
+            True if at least one lookup was started
+        """
+        started_any = False
+        count = len(self.services)
+        while len(self._running) < self.max_in_flight:
+            started = False
+            for offset in range(count):
+                service_name = self.services[(self._next_service + offset) % count]
+                if not self._pending[service_name] or self._running_per_service[service_name] >= self.max_per_service:
+                    continue
+                if not self._start(service_name):
+                    continue
+                started = True
+                if len(self._running) >= self.max_in_flight:
+                    break
+            self._next_service = (self._next_service + 1) % count
+            if not started:
+                break
+            started_any = True
+        self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], len(self._running))
+        return started_any
+
+    async def run(
+        self, items: Union[Iterable[Tuple[str, str]], AsyncIterable[Tuple[str, str]]]
+    ) -> AsyncGenerator[Tuple[str, str, Any], None]:
+        """
+        Look up every (IOC, IOC type) pair from ``items`` in every service.
+
+        Args:
+            items: Iterable or async iterable of (IOC value, IOC type) pairs, read lazily
+
+        Yields:
+            Tuples of (IOC value, service name, result); the result is the
+            exception instance if the lookup raised
+        """
+        async_input = _AsyncInput(items, self.max_pending) if hasattr(items, '__aiter__') else None
+        items = async_input or iter(items)
+        try:
+            while True:
+                self._fill(items)
+                while self._dispatch():
+                    self._fill(items)
+
+                timeout = self._next_batch_deadline()
+                waiting = [async_input.waiter()] if async_input and self._wants_input() else []
+                if not self._running:
+                    if self._exhausted and not self._pending_count:
+                        break
+                    if waiting:
+                        await asyncio.wait(waiting, timeout=timeout)
+                    elif timeout is not None:
+                        await asyncio.sleep(timeout)
+                    continue
+
+                done, _ = await asyncio.wait(
+                    [*self._running, *waiting], timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task not in self._running:
+                        continue
+                    iocs, service_name = self._running.pop(task)
+                    self._running_per_service[service_name] -= 1
+                    self.stats['completed'] += len(iocs)
+                    outcome = task.exception() if task.exception() else task.result()
+                    if len(iocs) == 1 and service_name not in self.batching:
+                        yield iocs[0], service_name, outcome
+                        continue
+                    for ioc in iocs:
+                        if isinstance(outcome, BaseException):
+                            yield ioc, service_name, outcome
+                        else:
+                            yield ioc, service_name, outcome[ioc]
+        finally:
+            if async_input:
+                await async_input.aclose()
+            await self._abort()
+            logger.debug(f"Bulk lookup scheduler finished: {self.stats}")
+
+    async def _abort(self) -> None:
+        """Cancel and await running lookups and drop queued ones when a run stops early."""
+        tasks = [task for task in self._running if not task.done()]
+        if tasks:
+            for task in tasks:
+                task.cancel()
+            # Wait for the lookups to unwind so none of them outlives the run
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.stats['cancelled'] += sum(len(self._running[task][0]) for task in tasks)
+        self._running.clear()
+        if self._pending_count:
+            self.stats['dropped'] += self._pending_count
+            for queue in self._pending.values():
+                queue.clear()
+            self._pending_count = 0
+        if tasks or self.stats['dropped']:
+            logger.info(
+                f"Stopped bulk lookups early: cancelled {self.stats['cancelled']} running, "
+                f"dropped {self.stats['dropped']} queued"
+            )
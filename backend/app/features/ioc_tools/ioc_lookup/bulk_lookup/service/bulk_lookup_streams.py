@@ -0,0 +1,255 @@
+import os
+import uuid
+import asyncio
+import logging
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from app.core.database import SessionLocal
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service.bulk_ioc_lookup_service import (
+    process_bulk_lookups, get_stopped_stats
+)
+
+logger = logging.getLogger(__name__)
+
+# Latest events of a stream kept in memory for reconnects and full result requests
+REPLAY_BUFFER_SIZE = int(os.getenv("BULK_STREAM_REPLAY_BUFFER_SIZE", "5000"))
+# Seconds a stream's lookups keep running without a client attached, so the client can reconnect
+DISCONNECT_GRACE = float(os.getenv("BULK_STREAM_DISCONNECT_GRACE", "15"))
+# Seconds a finished stream's events are kept for a client reconnecting after the last event
+RETENTION_SECONDS = float(os.getenv("BULK_STREAM_RETENTION_SECONDS", "300"))
+# Live events buffered per client before it falls back to reading the replay buffer
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("BULK_STREAM_SUBSCRIBER_QUEUE_SIZE", "1000"))
+
+# Queue marker telling a client it missed live events and has to re-read them
+_LAGGED = object()
+
+
+class _StreamRun:
+    """A bulk lookup bound to its client stream, with its latest events kept for reconnects."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.task: Optional[asyncio.Task] = None
+        self.events: deque = deque(maxlen=max(REPLAY_BUFFER_SIZE, 1))
+        self.subscribers: List[asyncio.Queue] = []
+        self.last_seq = 0
+        self.finished = False
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+    def publish(self, item: Any) -> None:
+        """Hand an event, or None at the end of the run, to every attached client."""
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_LAGGED if item is not None else None)
+
+    def set_timer(self, delay: float, callback) -> None:
+        """Replace the run's pending timer."""
+        if self.timer:
+            self.timer.cancel()
+        self.timer = asyncio.get_running_loop().call_later(delay, callback, self)
+
+
+_runs: Dict[str, _StreamRun] = {}
+_detached_cancels = 0
+
+
+def start_stream(iocs: List[str], services: List[str], force_refresh: bool = False) -> str:
+    """
+    Start a bulk lookup for a client stream.
+
+    The lookups start at once, next to any bulk jobs, and their results are
+    only kept in memory: the latest ``REPLAY_BUFFER_SIZE`` events, until
+    ``RETENTION_SECONDS`` after the run finished. Once no client has been
+    attached for ``DISCONNECT_GRACE`` seconds, running lookups are cancelled
+    and lookups not started yet are dropped.
+
+    Args:
+        iocs: Raw IOC input lines
+        services: Service names to query
+        force_refresh: Bypass the result cache for every lookup
+
+    Returns:
+        The run's ID
+    """
+    run = _StreamRun(str(uuid.uuid4()))
+    _runs[run.run_id] = run
+    run.task = asyncio.get_running_loop().create_task(_run_stream(run, iocs, services, force_refresh))
+    run.set_timer(DISCONNECT_GRACE, _cancel_detached)
+    logger.info(f"Started bulk lookup stream {run.run_id} with {len(iocs)} IOCs across {len(services)} services")
+    return run.run_id
+
+
+def has_stream(run_id: str) -> bool:
+    """Whether a stream run is running or its events are still kept."""
+    return run_id in _runs
+
+
+def get_event(run_id: str, seq: int) -> Optional[Dict[str, Any]]:
+    """
+    Get one buffered event of a stream run.
+
+    Args:
+        run_id: Stream run ID
+        seq: Sequence number of the event
+
+    Returns:
+        The event, or None if the run or the event is no longer kept
+    """
+    run = _runs.get(run_id)
+    if run is None:
+        return None
+    return next((event for event in list(run.events) if event['seq'] == seq), None)
+
+
+async def follow_stream(run_id: str, after_seq: int = 0) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Replay a stream run's buffered events and follow it live until it finishes.
+
+    If events after ``after_seq`` have already left the replay buffer, an
+    error event says how many were missed before the buffered ones follow.
+
+    Args:
+        run_id: Stream run ID
+        after_seq: Only yield events with a higher sequence number
+
+    Yields:
+        Events in sequence order
+
+    Raises:
+        KeyError: If the run is not kept anymore
+    """
+    run = _runs[run_id]
+    queue: Optional[asyncio.Queue] = None
+    if not run.finished:
+        queue = asyncio.Queue(maxsize=max(SUBSCRIBER_QUEUE_SIZE, 1))
+        run.subscribers.append(queue)
+        if run.timer:
+            run.timer.cancel()
+            run.timer = None
+
+    last_seq = after_seq
+    try:
+        while True:
+            buffered = list(run.events)
+            if buffered and buffered[0]['seq'] > last_seq + 1:
+                missed = buffered[0]['seq'] - last_seq - 1
+                logger.warning(f"Client of bulk lookup stream {run_id} missed {missed} events no longer buffered")
+                yield {
+                    "seq": buffered[0]['seq'] - 1,
+                    "service": "system",
+                    "error": f"{missed} events are no longer available",
+                    "progress": buffered[0].get('progress')
+                }
+            for event in buffered:
+                if event['seq'] > last_seq:
+                    last_seq = event['seq']
+                    yield event
+            if queue is None:
+                return
+
+            item = await queue.get()
+            while item is not _LAGGED and item is not None:
+                if item['seq'] > last_seq:
+                    last_seq = item['seq']
+                    yield item
+                item = await queue.get()
+            if item is None:
+                queue = None
+            else:
+                logger.debug(f"Client of bulk lookup stream {run_id} fell behind, re-reading buffered events")
+    finally:
+        if queue is not None and queue in run.subscribers:
+            run.subscribers.remove(queue)
+            if not run.subscribers and not run.finished:
+                run.set_timer(DISCONNECT_GRACE, _cancel_detached)
+
+
+async def stop_streams() -> None:
+    """Cancel all stream runs on shutdown."""
+    runs = list(_runs.values())
+    tasks = [run.task for run in runs if run.task and not run.task.done()]
+    for run in runs:
+        if run.timer:
+            run.timer.cancel()
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"Stopped {len(tasks)} running bulk lookup stream(s)")
+    _runs.clear()
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get counters of stream runs and of runs cancelled after their client went away.
+
+    Returns:
+        Dictionary of stream counters
+    """
+    return {
+        "active_streams": sum(1 for run in _runs.values() if not run.finished),
+        "detached_streams_cancelled": _detached_cancels,
+        "stopped_lookups": get_stopped_stats()
+    }
+
+
+async def _run_stream(run: _StreamRun, iocs: List[str], services: List[str], force_refresh: bool) -> None:
+    """
+    Run a stream's lookups and buffer every event as it completes.
+
+    Args:
+        run: The stream run
+        iocs: Raw IOC input lines
+        services: Service names to query
+        force_refresh: Bypass the result cache for every lookup
+    """
+    db = SessionLocal()
+    try:
+        async with aclosing(process_bulk_lookups(iocs, services, db, force_refresh=force_refresh)) as events:
+            async for event in events:
+                if 'seq' not in event:
+                    event['seq'] = run.last_seq + 1
+                run.last_seq = event['seq']
+                run.events.append(event)
+                run.publish(event)
+        logger.info(f"Completed bulk lookup stream {run.run_id}")
+    except asyncio.CancelledError:
+        logger.info(f"Cancelled bulk lookup stream {run.run_id} after {run.last_seq} events")
+        raise
+    except Exception as e:
+        logger.error(f"Bulk lookup stream {run.run_id} failed: {str(e)}", exc_info=True)
+        event = {"seq": run.last_seq + 1, "error": str(e), "service": "system"}
+        run.last_seq = event['seq']
+        run.events.append(event)
+        run.publish(event)
+    finally:
+        db.close()
+        run.finished = True
+        run.publish(None)
+        run.subscribers.clear()
+        if _runs.get(run.run_id) is run:
+            run.set_timer(RETENTION_SECONDS, _forget)
+
+
+def _cancel_detached(run: _StreamRun) -> None:
+    """Cancel a stream run whose client went away and did not come back in time."""
+    global _detached_cancels
+    run.timer = None
+    if run.subscribers or run.finished or _runs.get(run.run_id) is not run:
+        return
+    _runs.pop(run.run_id, None)
+    run.task.cancel()
+    _detached_cancels += 1
+    logger.info(f"Cancelled bulk lookup stream {run.run_id}: no client attached for {DISCONNECT_GRACE:g}s")
+
+
+def _forget(run: _StreamRun) -> None:
+    """Drop a finished stream run's events."""
+    run.timer = None
+    if _runs.get(run.run_id) is run:
+        del _runs[run.run_id]
@@ -0,0 +1,199 @@
+import io
+import csv
+import json
+import zlib
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from app.core.database import SessionLocal
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.crud import bulk_lookup_job_crud as job_crud
+
+logger = logging.getLogger(__name__)
+
+# Stored results read per query while exporting
+EXPORT_PAGE_SIZE = 1000
+# Columns every CSV export starts with
+BASE_COLUMNS = ['seq', 'ioc', 'inputs', 'service', 'status', 'error', 'cache']
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def parse_fields(specs: Optional[List[str]]) -> Dict[str, List[str]]:
+    """
+    Parse column projections given as ``service:dotted.path``.
+
+    Args:
+        specs: Projection specs, e.g. ``virustotal:data.attributes.reputation``
+
+    Returns:
+        Dictionary mapping service names to the paths exported for them
+
+    Raises:
+        ValueError: If a spec has no service or no path
+    """
+    fields: Dict[str, List[str]] = {}
+    for spec in specs or []:
+        for part in spec.split(','):
+            service_name, _, path = part.strip().partition(':')
+            if not service_name or not path:
+                raise ValueError(f"Invalid field '{part}', expected 'service:path'")
+            fields.setdefault(service_name, []).append(path)
+    return fields
+
+
+def extract_path(data: Any, path: str) -> Any:
+    """
+    Get the value at a dotted path; list items are addressed by index.
+
+    Args:
+        data: Result data
+        path: Dotted path, e.g. ``data.attributes.tags.0``
+
+    Returns:
+        The value or None if the path does not exist
+    """
+    value = data
+    for key in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, list) and key.lstrip('-').isdigit() and -len(value) <= int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return None
+        if value is None:
+            return None
+    return value
+
+
+def iter_ndjson(job_id: str, fields: Dict[str, List[str]]) -> Iterator[bytes]:
+    """
+    Stream a job's results as NDJSON, one result per line.
+
+    Results of services with a projection carry ``fields`` instead of the full ``data``.
+
+    Args:
+        job_id: Job ID
+        fields: Projection per service from :func:`parse_fields`
+
+    Yields:
+        Encoded chunks of lines
+    """
+    for page in _iter_pages(job_id):
+        lines = []
+        for event in page:
+            if event.get('type') == 'summary':
+                continue
+            record = {key: event.get(key) for key in ('seq', 'ioc', 'inputs', 'service')}
+            if 'error' in event:
+                record['error'] = event['error']
+            elif event.get('service') in fields:
+                record['fields'] = {
+                    path: extract_path(event.get('data'), path) for path in fields[event['service']]
+                }
+            else:
+                record['data'] = event.get('data')
+            record['cache'] = (event.get('cache') or {}).get('cache')
+            lines.append(json.dumps(record))
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def iter_csv(job_id: str, fields: Dict[str, List[str]]) -> Iterator[bytes]:
+    """
+    Stream a job's results as CSV, one row per result.
+
+    Without a projection the full result is written as JSON in a ``data``
+    column; with one, every projected path gets a ``service:path`` column
+    that is empty for the other services' rows.
+
+    Args:
+        job_id: Job ID
+        fields: Projection per service from :func:`parse_fields`
+
+    Yields:
+        Encoded chunks of rows
+    """
+    projected = [(service_name, path) for service_name, paths in fields.items() for path in paths]
+    header = BASE_COLUMNS + ([f"{s}:{p}" for s, p in projected] if projected else ['data'])
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for page in _iter_pages(job_id):
+        for event in page:
+            if event.get('type') == 'summary':
+                continue
+            service_name = event.get('service')
+            row = [
+                event.get('seq'),
+                event.get('ioc'),
+                '; '.join(event.get('inputs') or []),
+                service_name,
+                'error' if 'error' in event else 'ok',
+                event.get('error', ''),
+                (event.get('cache') or {}).get('cache', ''),
+            ]
+            if projected:
+                row.extend(
+                    _cell(extract_path(event.get('data'), path)) if s == service_name else ''
+                    for s, path in projected
+                )
+            else:
+                row.append(_cell(event.get('data')))
+            writer.writerow(row)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compress a stream of chunks into one gzip stream.
+
+    Args:
+        chunks: Uncompressed chunks
+        level: Compression level
+
+    Yields:
+        Compressed chunks
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _cell(value: Any) -> Any:
+    """Format a value for a CSV cell; nested values are written as JSON."""
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _iter_pages(job_id: str) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read a job's stored results page by page, so memory use does not depend on the job's size.
+
+    Args:
+        job_id: Job ID
+
+    Yields:
+        Lists of result events in sequence order
+    """
+    after_seq = 0
+    exported = 0
+    while True:
+        with SessionLocal() as db:
+            rows = job_crud.get_results(db, job_id, after_seq, EXPORT_PAGE_SIZE)
+            page = [row.to_dict() for row in rows]
+        if page:
+            exported += len(page)
+            after_seq = rows[-1].seq
+            yield page
+        if len(page) < EXPORT_PAGE_SIZE:
+            logger.info(f"Exported {exported} results of bulk lookup job {job_id}")
+            return
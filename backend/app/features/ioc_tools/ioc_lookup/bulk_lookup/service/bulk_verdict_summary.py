@@ -0,0 +1,160 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+from app.features.ioc_tools.ioc_lookup.single_lookup.service.service_registry import service_registry
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import score_extractors
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service.bulk_ioc_normalizer import NormalizedIoc
+
+logger = logging.getLogger(__name__)
+
+VERDICTS = ('malicious', 'suspicious', 'clean', 'unknown')
+
+
+class VerdictAggregator:
+    """
+    Running per-IOC verdicts of a bulk lookup, updated one result event at a time.
+
+    An IOC's score is the highest score any service gave it (see
+    :func:`score_extractors.score_result`), and that service is its
+    ``top_service``. ``malicious`` and ``suspicious`` count the services
+    that flagged it. Services that support the IOC's type and have not
+    answered yet are listed as ``pending``, so an aggregate taken before the
+    lookup finished says which verdicts may still change. Every update is
+    O(1) in the number of IOCs and results.
+    """
+
+    def __init__(self, lookup_iocs: List[NormalizedIoc], services: List[str]):
+        """
+        Args:
+            lookup_iocs: Normalized IOCs of the bulk lookup
+            services: Services the IOCs are looked up in
+        """
+        self._services = list(services)
+        self._configs = {name: service_registry.get_service(name) or {} for name in services}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._pending_lookups = 0
+        for ioc in lookup_iocs:
+            self.track(ioc)
+
+    def track(self, ioc: NormalizedIoc) -> None:
+        """
+        Start the aggregate of an IOC, e.g. one just found in an upload.
+
+        Args:
+            ioc: Normalized IOC
+        """
+        expected = [
+            name for name in self._services
+            if ioc.ioc_type in self._configs[name].get('supported_ioc_types', [])
+        ]
+        self._pending_lookups += len(expected)
+        self._entries[ioc.ioc] = {
+            "ioc": ioc.ioc,
+            "ioc_type": ioc.ioc_type,
+            "inputs": ioc.inputs,
+            "score": None,
+            "verdict": 'unknown',
+            "top_service": None,
+            "malicious": 0,
+            "suspicious": 0,
+            "scores": {},
+            "answered": [],
+            "errors": [],
+            "pending": expected,
+            "complete": not expected
+        }
+
+    def add(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Fold a result event into its IOC's aggregate.
+
+        Args:
+            event: Result event, full or summary projection
+
+        Returns:
+            A copy of the IOC's updated aggregate, or None if the event does not
+            belong to a pending lookup of a known IOC
+        """
+        entry = self._entries.get(event.get('ioc'))
+        service_name = event.get('service')
+        if entry is None or service_name not in entry['pending']:
+            return None
+        entry['pending'].remove(service_name)
+        entry['complete'] = not entry['pending']
+        self._pending_lookups -= 1
+        if 'error' in event or 'data' not in event:
+            entry['errors'].append(service_name)
+            return self._snapshot(entry)
+
+        entry['answered'].append(service_name)
+        score = score_extractors.score_result(self._configs[service_name], event['data'])
+        if score is not None:
+            entry['scores'][service_name] = score
+            if score >= score_extractors.MALICIOUS_SCORE:
+                entry['malicious'] += 1
+            elif score >= score_extractors.SUSPICIOUS_SCORE:
+                entry['suspicious'] += 1
+            if entry['score'] is None or score > entry['score']:
+                entry['score'] = score
+                entry['top_service'] = service_name
+                entry['verdict'] = score_extractors.verdict(score)
+        return self._snapshot(entry)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get every IOC's aggregate, most severe first.
+
+        IOCs are ordered by score, then by the number of services flagging
+        them; IOCs without a score come last.
+
+        Returns:
+            Dictionary with the per-IOC aggregates, the number of IOCs per
+            verdict and the number of lookups still pending
+        """
+        verdicts = dict.fromkeys(VERDICTS, 0)
+        for entry in self._entries.values():
+            verdicts[entry['verdict']] += 1
+        iocs = sorted(self._entries.values(), key=_severity, reverse=True)
+        return {
+            "iocs": [self._snapshot(entry) for entry in iocs],
+            "verdicts": verdicts,
+            "pending_lookups": self._pending_lookups
+        }
+
+    @staticmethod
+    def _snapshot(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy an aggregate so later updates do not change events already sent."""
+        return {
+            **entry,
+            "scores": dict(entry['scores']),
+            "answered": list(entry['answered']),
+            "errors": list(entry['errors']),
+            "pending": list(entry['pending'])
+        }
+
+
+def summarize_results(
+    lookup_iocs: List[NormalizedIoc],
+    services: List[str],
+    events: Iterable[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Build the per-IOC verdict summary from the result events a bulk lookup has so far.
+
+    Args:
+        lookup_iocs: Normalized IOCs of the bulk lookup
+        services: Services the IOCs are looked up in
+        events: Result events, full or summary projections, in any order
+
+    Returns:
+        The summary of a :class:`VerdictAggregator` fed with the events
+    """
+    aggregator = VerdictAggregator(lookup_iocs, services)
+    for event in events:
+        aggregator.add(event)
+    return aggregator.summary()
+
+
+def _severity(entry: Dict[str, Any]) -> tuple:
+    """Sort key putting the highest scores first and IOCs without a score last."""
+    score: Optional[float] = entry['score']
+    return (-1.0 if score is None else score, entry['malicious'], entry['suspicious'])
@@ -0,0 +1,48 @@
+from sqlalchemy.orm import Session
+from app.features.ioc_tools.ioc_lookup.single_lookup.models.lookup_cache_models import LookupCacheEntry
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+
+def get_cache_entry(db: Session, cache_key: str) -> Optional[LookupCacheEntry]:
+    """Retrieves a cache entry by key if it has not expired."""
+    return db.query(LookupCacheEntry).filter(
+        LookupCacheEntry.cache_key == cache_key,
+        LookupCacheEntry.expires_at > datetime.utcnow()
+    ).first()
+
+
+def upsert_cache_entries(db: Session, entries: List[Dict[str, Any]]) -> None:
+    """Creates or replaces cache entries, given as column dictionaries, in one transaction."""
+    existing = {
+        entry.cache_key: entry for entry in db.query(LookupCacheEntry).filter(
+            LookupCacheEntry.cache_key.in_([fields['cache_key'] for fields in entries])
+        ).all()
+    }
+    for fields in entries:
+        entry = existing.get(fields['cache_key'])
+        if not entry:
+            entry = existing[fields['cache_key']] = LookupCacheEntry(cache_key=fields['cache_key'])
+            db.add(entry)
+        for column, value in fields.items():
+            setattr(entry, column, value)
+    db.commit()
+
+
+def delete_expired_cache_entries(db: Session) -> int:
+    """Deletes all expired cache entries and returns the number removed."""
+    deleted = db.query(LookupCacheEntry).filter(
+        LookupCacheEntry.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def delete_cache_entries(db: Session, service: Optional[str] = None) -> int:
+    """Deletes all cache entries, or only those of one service."""
+    query = db.query(LookupCacheEntry)
+    if service:
+        query = query.filter(LookupCacheEntry.service == service)
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -0,0 +1,33 @@
+from sqlalchemy import Boolean, Column, String, DateTime, Text
+from app.core.database import Base
+import datetime
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.payload_codec import decode_payload
+
+
+class LookupCacheEntry(Base):
+    __tablename__ = "ioc_lookup_cache"
+    cache_key = Column(String, primary_key=True, index=True)
+    service = Column(String, index=True)
+    ioc_type = Column(String)
+    ioc = Column(String)
+    result = Column(Text)
+    is_negative = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
+
+    def to_dict(self):
+        try:
+            result_data = decode_payload(self.result) if self.result else {}
+        except ValueError:
+            result_data = {}
+
+        return {
+            'cache_key': self.cache_key,
+            'service': self.service,
+            'ioc_type': self.ioc_type,
+            'ioc': self.ioc,
+            'result': result_data,
+            'is_negative': self.is_negative,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+        }
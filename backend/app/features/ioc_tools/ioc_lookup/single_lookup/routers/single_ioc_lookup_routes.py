@@ -1,32 +1,50 @@
 import logging
-from fastapi import APIRouter, Query, Depends, HTTPException
+from fastapi import APIRouter, Query, Depends, HTTPException, Response
 from typing import Optional
 from sqlalchemy.orm import Session
 from app.core.dependencies import get_db
 from app.features.ioc_tools.ioc_lookup.single_lookup.service.ioc_lookup_engine import (
-    lookup_ioc, get_all_service_configs
+    lookup_ioc_with_meta, get_all_service_configs
 )
 from app.features.ioc_tools.ioc_lookup.single_lookup.utils.ioc_utils import determine_ioc_type, IOC_TYPES
 from app.features.ioc_tools.ioc_lookup.single_lookup.service.service_registry import get_all_services
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import (
+    circuit_breaker, http_client, local_geoip, lookup_cache, lookup_deadline, oauth_token_cache, rate_limiter,
+    result_projection, single_flight, threat_feed_index
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 @router.get("/api/ioc/lookup/{service}", tags=["IOC Lookup"])
-async def unified_lookup(
+def unified_lookup(
     service: str,
+    response: Response,
     ioc: str = Query(..., description="The IOC value to lookup"),
     ioc_type: Optional[str] = Query(None, description="The IOC type (e.g., IPv4, Domain, MD5)"),
+    force_refresh: bool = Query(False, description="Bypass the result cache and query the service"),
+    fields: str = Query(
+        "full", pattern="^(summary|full)$",
+        description="'summary' returns only the fields the UI renders for its verdict, 'full' the complete result"
+    ),
     db: Session = Depends(get_db)
 ):
     """
     Unified endpoint for all single IOC lookups.
 
+    The cache status is reported in the ``X-Cache`` header (HIT, MISS or BYPASS)
+    and the age of the result in seconds in the ``Age`` header. The endpoint is
+    synchronous so that waiting for a rate limit slot blocks a worker thread
+    instead of the event loop.
+
     Args:
         service: The unique key for the service (e.g., 'virustotal', 'abuseipdb')
+        response: Response object used to set cache headers
         ioc: The indicator value to lookup
         ioc_type: Optional IOC type. If not provided, it will be auto-detected
+        force_refresh: Bypass the result cache
+        fields: 'summary' or 'full'
         db: Database session dependency
 
     Returns:
@@ -45,9 +63,11 @@ async def unified_lookup(
             detail=f"Invalid or unsupported IOC format for: {ioc}"
         )
 
-    result = lookup_ioc(service, ioc, detected_ioc_type, db)
-    logger.info(f"Completed lookup for service={service}")
-    return result
+    result, meta = lookup_ioc_with_meta(service, ioc, detected_ioc_type, db, force_refresh=force_refresh)
+    response.headers["X-Cache"] = meta['cache'].upper()
+    response.headers["Age"] = str(int(meta['age']))
+    logger.info(f"Completed lookup for service={service}, cache={meta['cache']}")
+    return result_projection.project_result(service, result, fields)
 
 
 @router.get("/api/ioc/services", tags=["IOC Lookup"])
@@ -58,6 +78,9 @@ async def get_available_services(
     """
     Get a list of all available services with their configuration and status.
 
+    Each service carries its circuit breaker state; services whose circuit is
+    ``open`` fail fast and should be left out of new bulk jobs.
+
     Args:
         ioc_type: Optional IOC type filter
         db: Database session dependency
@@ -94,6 +117,30 @@ async def get_supported_ioc_types():
     return {"types": IOC_TYPES}
 
 
+@router.get("/api/ioc/metrics", tags=["IOC Lookup"])
+async def get_lookup_metrics():
+    """
+    Get runtime metrics of the IOC lookup pipeline.
+
+    Returns:
+        Dictionary containing outbound connection pool, result cache, rate limiter,
+        OAuth token cache, request coalescing, circuit breaker, deadline, local
+        GeoIP index and offline threat feed statistics
+    """
+    logger.debug("Retrieving IOC lookup metrics")
+    return {
+        "http_pool": http_client.get_pool_stats(),
+        "cache": lookup_cache.get_stats(),
+        "rate_limits": rate_limiter.get_stats(),
+        "oauth_tokens": oauth_token_cache.get_stats(),
+        "coalescing": single_flight.get_stats(),
+        "circuits": circuit_breaker.get_stats(),
+        "deadlines": lookup_deadline.get_stats(),
+        "local_geoip": local_geoip.get_stats(),
+        "threat_feeds": threat_feed_index.get_stats(),
+    }
+
+
 @router.get("/api/ioc/service-definitions", tags=["IOC Lookup"])
 async def get_service_definitions(db: Session = Depends(get_db)):
     """
@@ -125,6 +172,7 @@ async def get_service_definitions(db: Session = Depends(get_db)):
             'supportedIocTypes': config.get('supported_ioc_types', []),
             'isAvailable': is_available,
             'icon': f"{service_name}_logo_small",
+            **lookup_deadline.get_settings(service_name, config),
         }
     
     logger.debug(f"Retrieved {len(service_definitions)} service definitions")
@@ -0,0 +1,175 @@
+import logging
+from typing import Dict, Any, List
+import requests
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import http_client, oauth_token_cache
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import external_api_clients as clients
+from app.features.ioc_tools.ioc_lookup.single_lookup.service.external_api_clients import VendorCall, VendorRequest
+
+logger = logging.getLogger(__name__)
+
+# Async counterparts of the clients in external_api_clients. Each function sends the
+# same request as its sync version and parses it the same way, but runs on the event
+# loop through the shared aiohttp session so bulk lookups do not need a thread per
+# in-flight request.
+
+
+async def send_vendor_request(call: VendorCall) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.send_vendor_request`."""
+    if isinstance(call, dict):
+        return call
+    if isinstance(call, VendorRequest):
+        return call.parse_response(await http_client.async_request(call.method, call.url, **call.kwargs))
+
+    async def fetch_token() -> Dict[str, Any]:
+        logger.debug(f"Authenticating with {call.service}")
+        return await send_vendor_request(call.token_request)
+
+    async def send(access_token: str) -> requests.Response:
+        request = call.lookup(access_token)
+        return await http_client.async_request(request.method, request.url, **request.kwargs)
+
+    response = await oauth_token_cache.send_with_token_async(
+        call.service, call.token_url, call.client_id, call.client_secret, fetch_token, send
+    )
+    if isinstance(response, dict):
+        return response
+    return call.parse_response(response)
+
+
+async def abuseipdb_ip_check(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.abuseipdb_ip_check`."""
+    return await send_vendor_request(clients.abuseipdb_ip_check_request(ioc, apikey))
+
+
+async def alienvaultotx(ioc: str, type: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.alienvaultotx`."""
+    return await send_vendor_request(clients.alienvaultotx_request(ioc, type, apikey))
+
+
+async def check_bgpview(ioc: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.check_bgpview`."""
+    return await send_vendor_request(clients.check_bgpview_request(ioc))
+
+
+async def checkphish_ai(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.checkphish_ai`."""
+    return await send_vendor_request(clients.checkphish_ai_request(ioc, apikey))
+
+
+async def crowdsec(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.crowdsec`."""
+    return await send_vendor_request(clients.crowdsec_request(ioc, apikey))
+
+
+async def crowdstrike_indicators_lookup(ioc: str, client_id: str, client_secret: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.crowdstrike_indicators_lookup`."""
+    return await send_vendor_request(clients.crowdstrike_indicators_lookup_request(ioc, client_id, client_secret))
+
+
+async def emailrep_email_check(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.emailrep_email_check`."""
+    return await send_vendor_request(clients.emailrep_email_check_request(ioc, apikey))
+
+
+async def search_github(ioc: str, access_token: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.search_github`."""
+    return await send_vendor_request(clients.search_github_request(ioc, access_token))
+
+
+async def haveibeenpwnd_email_check(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.haveibeenpwnd_email_check`."""
+    return await send_vendor_request(clients.haveibeenpwnd_email_check_request(ioc, apikey))
+
+
+async def hunter_email_check(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.hunter_email_check`."""
+    return await send_vendor_request(clients.hunter_email_check_request(ioc, apikey))
+
+
+async def ipqualityscore_ip_check(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.ipqualityscore_ip_check`."""
+    return await send_vendor_request(clients.ipqualityscore_ip_check_request(ioc, apikey))
+
+
+async def maltiverse_check(ioc: str, endpoint: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.maltiverse_check`."""
+    return await send_vendor_request(clients.maltiverse_check_request(ioc, endpoint, apikey))
+
+
+async def malwarebazaar_hash_check(ioc: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.malwarebazaar_hash_check`."""
+    return await send_vendor_request(clients.malwarebazaar_hash_check_request(ioc))
+
+
+async def mandiant_ioc_lookup(ioc: str, ioc_type: str, api_key: str, api_secret: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.mandiant_ioc_lookup`."""
+    return await send_vendor_request(clients.mandiant_ioc_lookup_request(ioc, ioc_type, api_key, api_secret))
+
+
+async def search_nist_nvd(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.search_nist_nvd`."""
+    return await send_vendor_request(clients.search_nist_nvd_request(ioc, apikey))
+
+
+async def check_pulsedive(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.check_pulsedive`."""
+    return await send_vendor_request(clients.check_pulsedive_request(ioc, apikey))
+
+
+async def search_reddit(ioc: str, client_id: str, client_secret: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.search_reddit`."""
+    return await send_vendor_request(clients.search_reddit_request(ioc, client_id, client_secret))
+
+
+async def safeBrowse_url_check(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.safeBrowse_url_check`."""
+    return await send_vendor_request(clients.safeBrowse_url_check_request(ioc, apikey))
+
+
+async def check_shodan(ioc: str, method: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.check_shodan`."""
+    return await send_vendor_request(clients.check_shodan_request(ioc, method, apikey))
+
+
+async def threatfox_ip_check(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.threatfox_ip_check`."""
+    return await send_vendor_request(clients.threatfox_ip_check_request(ioc, apikey))
+
+
+async def search_twitter(ioc: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.search_twitter`."""
+    return await send_vendor_request(clients.search_twitter_request(ioc, apikey))
+
+
+async def urlhaus_url_check(ioc: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.urlhaus_url_check`."""
+    return await send_vendor_request(clients.urlhaus_url_check_request(ioc))
+
+
+async def urlscanio(ioc: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.urlscanio`."""
+    return await send_vendor_request(clients.urlscanio_request(ioc))
+
+
+async def virustotal(ioc: str, type: str, apikey: str) -> Dict[str, Any]:
+    """Async version of :func:`external_api_clients.virustotal`."""
+    return await send_vendor_request(clients.virustotal_request(ioc, type, apikey))
+
+
+# Batch clients used by bulk lookups for vendors that accept many indicators per
+# call, see the batch requests in external_api_clients.
+
+
+async def safeBrowse_url_check_batch(iocs: List[str], apikey: str) -> Dict[str, Any]:
+    """Check many URLs with one Google Safe Browsing request."""
+    return await send_vendor_request(clients.safeBrowse_url_check_batch_request(iocs, apikey))
+
+
+async def crowdstrike_indicators_lookup_batch(iocs: List[str], client_id: str, client_secret: str) -> Dict[str, Any]:
+    """Look up many indicators with one CrowdStrike Falcon Intelligence query."""
+    return await send_vendor_request(clients.crowdstrike_indicators_lookup_batch_request(iocs, client_id, client_secret))
+
+
+async def mandiant_ioc_lookup_batch(iocs: List[str], ioc_type: str, api_key: str, api_secret: str) -> Dict[str, Any]:
+    """Look up many indicators of one type with one Mandiant Advantage request."""
+    return await send_vendor_request(clients.mandiant_ioc_lookup_batch_request(iocs, ioc_type, api_key, api_secret))
@@ -0,0 +1,334 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failed vendor calls that open a service's circuit
+FAILURE_THRESHOLD = int(os.getenv("IOC_CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Seconds an open circuit fails fast before probe calls are let through
+COOLDOWN = float(os.getenv("IOC_CIRCUIT_COOLDOWN", "60"))
+# Probe calls allowed at the same time while a circuit is half-open
+HALF_OPEN_PROBES = int(os.getenv("IOC_CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Result status codes counted as a failure of the service rather than of the lookup
+FAILURE_STATUSES = {401}
+
+# What a call was let through as: the circuit's generation at that time and whether it is a probe
+Ticket = Tuple[int, bool]
+
+
+class _Circuit:
+    """
+    Failure counter and state of one service's circuit.
+
+    The generation changes with every transition between closed, open and
+    half-open probing. A call only counts towards the circuit if it finishes
+    in the generation it started in, so a call that started while the circuit
+    was closed cannot count as the probe of a later half-open state.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.generation = 0
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.last_error: Optional[str] = None
+        self.stats = {'opened': 0, 'rejected': 0}
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        self.generation += 1
+        self.probes = 0
+
+    def cooling_down(self) -> bool:
+        """Whether the circuit is open and its cooldown has not passed yet; counted as a rejection."""
+        with self.lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at < COOLDOWN:
+                self.stats['rejected'] += 1
+                return True
+            return False
+
+    def allow(self) -> Optional[Ticket]:
+        """
+        Check whether a call may go to the vendor, taking a probe slot if the circuit is half-open.
+
+        Returns:
+            The call's ticket if it may proceed, None if it is rejected
+        """
+        with self.lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < COOLDOWN:
+                    self.stats['rejected'] += 1
+                    return None
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self.probes >= max(HALF_OPEN_PROBES, 1):
+                    self.stats['rejected'] += 1
+                    return None
+                self.probes += 1
+                return self.generation, True
+            return self.generation, False
+
+    def record(self, service_name: str, ticket: Ticket, failed: bool, error: Optional[str] = None) -> None:
+        """
+        Record the outcome of a call that was let through.
+
+        Outcomes of calls that started before the circuit last changed state are ignored.
+
+        Args:
+            service_name: Service the call belongs to, used for logging
+            ticket: Ticket the call was let through with
+            failed: Whether the call counts as a failure
+            error: Short description of the failure
+        """
+        generation, probe = ticket
+        with self.lock:
+            if generation != self.generation:
+                logger.debug(f"Ignoring outcome of a {service_name} call that started before its circuit changed state")
+                return
+            if probe:
+                self.probes = max(self.probes - 1, 0)
+            if not failed:
+                if self.state != CLOSED:
+                    logger.info(f"Circuit for {service_name} closed after a successful probe")
+                    self._set_state(CLOSED)
+                self.failures = 0
+                return
+
+            self.failures += 1
+            self.last_error = error
+            if probe or self.failures >= FAILURE_THRESHOLD:
+                self._set_state(OPEN)
+                self.opened_at = time.monotonic()
+                self.stats['opened'] += 1
+                logger.warning(
+                    f"Circuit for {service_name} opened after {self.failures} consecutive failures "
+                    f"({error}), failing fast for {COOLDOWN:.0f}s"
+                )
+
+    def release(self, ticket: Ticket) -> None:
+        """Give back the probe slot of a call that ended without an outcome, e.g. when cancelled."""
+        generation, probe = ticket
+        with self.lock:
+            if probe and generation == self.generation:
+                self.probes = max(self.probes - 1, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            state = self.state
+            retry_in = 0.0
+            if state == OPEN:
+                retry_in = max(COOLDOWN - (time.monotonic() - self.opened_at), 0.0)
+                if not retry_in:
+                    state = HALF_OPEN
+            return {
+                'state': state,
+                'failures': self.failures,
+                'retry_in': round(retry_in, 1),
+                'last_error': self.last_error,
+                **self.stats,
+            }
+
+
+_circuits: Dict[str, _Circuit] = {}
+_circuits_lock = threading.Lock()
+
+
+def _get_circuit(service_name: str) -> _Circuit:
+    with _circuits_lock:
+        circuit = _circuits.get(service_name)
+        if circuit is None:
+            circuit = _circuits[service_name] = _Circuit()
+        return circuit
+
+
+def _failure(result: Any) -> Optional[str]:
+    """
+    Check whether a service result counts against the circuit.
+
+    Server errors, timeouts, connection failures and rejected credentials count;
+    "not found", bad requests and rate limiting do not.
+
+    Args:
+        result: Lookup result dictionary
+
+    Returns:
+        Short description of the failure or None if the call succeeded
+    """
+    if not isinstance(result, dict) or 'error' not in result:
+        return None
+    status = result.get('error')
+    if isinstance(status, int) and (status >= 500 or status in FAILURE_STATUSES):
+        return f"{status}: {result.get('message', 'error')}"
+    return None
+
+
+def _open_error(service_name: str) -> Dict[str, Any]:
+    circuit = _get_circuit(service_name).snapshot()
+    logger.debug(f"Circuit for {service_name} is {circuit['state']}, failing fast")
+    return {
+        "error": 503,
+        "message": (
+            f"'{service_name}' is temporarily disabled after repeated failures; "
+            f"retrying in {circuit['retry_in']:.0f}s."
+        ),
+        "circuit": circuit['state'],
+        "retry_after": circuit['retry_in'],
+    }
+
+
+def check(service_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Fail fast while a service's circuit is open, before a call waits for a rate limit slot.
+
+    Takes no probe slot: a half-open circuit only admits a probe in :func:`call`,
+    once the call's rate limit slot was granted.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+
+    Returns:
+        A 503 error dictionary if the circuit is open, otherwise None
+    """
+    with _circuits_lock:
+        circuit = _circuits.get(service_name)
+    if circuit is not None and circuit.cooling_down():
+        return _open_error(service_name)
+    return None
+
+
+def call(service_name: str, invoke: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Run a vendor call unless the service's circuit is open.
+
+    Call it once the call's rate limit slot was granted, so a half-open probe
+    slot is never held by a call still waiting for its turn.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        invoke: Callable performing the vendor call
+
+    Returns:
+        The service result, or a 503 error dictionary if the circuit is open
+
+    Raises:
+        Exception: Whatever ``invoke`` raised; the exception counts as a failure
+    """
+    circuit = _get_circuit(service_name)
+    ticket = circuit.allow()
+    if ticket is None:
+        return _open_error(service_name)
+    recorded = False
+    try:
+        result = invoke()
+        error = _failure(result)
+        circuit.record(service_name, ticket, error is not None, error)
+        recorded = True
+        return result
+    except Exception as e:
+        circuit.record(service_name, ticket, True, type(e).__name__)
+        recorded = True
+        raise
+    finally:
+        if not recorded:
+            circuit.release(ticket)
+
+
+async def call_async(service_name: str, invoke: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Async version of :func:`call`.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        invoke: Coroutine function performing the vendor call
+
+    Returns:
+        The service result, or a 503 error dictionary if the circuit is open
+    """
+    circuit = _get_circuit(service_name)
+    ticket = circuit.allow()
+    if ticket is None:
+        return _open_error(service_name)
+    recorded = False
+    try:
+        result = await invoke()
+        error = _failure(result)
+        circuit.record(service_name, ticket, error is not None, error)
+        recorded = True
+        return result
+    except Exception as e:
+        circuit.record(service_name, ticket, True, type(e).__name__)
+        recorded = True
+        raise
+    finally:
+        if not recorded:
+            circuit.release(ticket)
+
+
+def is_open(service_name: str) -> bool:
+    """
+    Check whether a service currently fails fast.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+
+    Returns:
+        True if the circuit is open and its cooldown has not passed yet
+    """
+    with _circuits_lock:
+        circuit = _circuits.get(service_name)
+    return circuit is not None and circuit.snapshot()['state'] == OPEN
+
+
+def get_state(service_name: str) -> Dict[str, Any]:
+    """
+    Get the circuit state of a service.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+
+    Returns:
+        Dictionary with the state ('closed', 'open' or 'half_open'), the number of
+        consecutive failures and the seconds until an open circuit lets probes through
+    """
+    with _circuits_lock:
+        circuit = _circuits.get(service_name)
+    if circuit is None:
+        return {'state': CLOSED, 'failures': 0, 'retry_in': 0.0}
+    snapshot = circuit.snapshot()
+    return {key: snapshot[key] for key in ('state', 'failures', 'retry_in')}
+
+
+def reset(service_name: Optional[str] = None) -> None:
+    """
+    Close a service's circuit, or all circuits, e.g. after its API key was replaced.
+
+    Args:
+        service_name: Service to reset, None for all services
+    """
+    with _circuits_lock:
+        if service_name is None:
+            _circuits.clear()
+        else:
+            _circuits.pop(service_name, None)
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get the state and counters of every service seen so far.
+
+    Returns:
+        Dictionary mapping service names to their circuit state
+    """
+    with _circuits_lock:
+        circuits = dict(_circuits)
+    return {name: circuit.snapshot() for name, circuit in sorted(circuits.items())}
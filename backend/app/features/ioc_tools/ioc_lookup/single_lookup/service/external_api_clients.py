@@ -2,10 +2,15 @@ import requests
 import json
 import logging
 from base64 import b64encode
-from typing import Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import http_client, oauth_token_cache
 
 logger = logging.getLogger(__name__)
 
+CROWDSTRIKE_TOKEN_URL = 'https://api.crowdstrike.com/oauth2/token'
+MANDIANT_TOKEN_URL = 'https://api.intelligence.mandiant.com/token'
+REDDIT_TOKEN_URL = 'https://www.reddit.com/api/v1/access_token'
+
 
 def handle_request_errors(service_name: str, response: requests.Response) -> Dict[str, Any]:
     """
@@ -75,6 +80,99 @@ def handle_request_errors(service_name: str, response: requests.Response) -> Dic
         return {"error": 500, "message": f"Failed to parse response from {service_name}."}
 
 
+
+class VendorRequest:
+    """
+    A vendor API request and how to parse its response, independent of the transport.
+
+    The clients below and their async versions in ``async_external_api_clients``
+    build the same requests and only differ in how they send them.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        method: str,
+        url: str,
+        parse: Optional[Callable[[requests.Response], Dict[str, Any]]] = None,
+        **kwargs
+    ):
+        self.service = service
+        self.method = method
+        self.url = url
+        self.parse = parse
+        self.kwargs = kwargs
+
+    def parse_response(self, response: requests.Response) -> Dict[str, Any]:
+        """Parse the vendor response, by default with :func:`handle_request_errors`."""
+        if self.parse:
+            return self.parse(response)
+        return handle_request_errors(self.service, response)
+
+
+class OAuthVendorRequest:
+    """A vendor API request authorized with a cached client-credentials token."""
+
+    def __init__(
+        self,
+        service: str,
+        token_url: str,
+        client_id: str,
+        client_secret: str,
+        token_request: VendorRequest,
+        lookup: Callable[[str], VendorRequest],
+        parse: Optional[Callable[[requests.Response], Dict[str, Any]]] = None
+    ):
+        self.service = service
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_request = token_request
+        self.lookup = lookup
+        self.parse = parse
+
+    def parse_response(self, response: requests.Response) -> Dict[str, Any]:
+        """Parse the vendor response, by default with :func:`handle_request_errors`."""
+        if self.parse:
+            return self.parse(response)
+        return handle_request_errors(self.service, response)
+
+
+# A request to send, or the error dictionary to return without sending one
+VendorCall = Union[VendorRequest, OAuthVendorRequest, Dict[str, Any]]
+
+
+def send_vendor_request(call: VendorCall) -> Dict[str, Any]:
+    """
+    Send a vendor request through the shared pooled session and parse the response.
+
+    Args:
+        call: Request built by one of the ``*_request`` functions
+
+    Returns:
+        Dictionary containing parsed response data or error information
+    """
+    if isinstance(call, dict):
+        return call
+    if isinstance(call, VendorRequest):
+        return call.parse_response(http_client.request(call.method, call.url, **call.kwargs))
+
+    def fetch_token() -> Dict[str, Any]:
+        logger.debug(f"Authenticating with {call.service}")
+        return send_vendor_request(call.token_request)
+
+    def send(access_token: str) -> requests.Response:
+        request = call.lookup(access_token)
+        return http_client.request(request.method, request.url, **request.kwargs)
+
+    response = oauth_token_cache.send_with_token(
+        call.service, call.token_url, call.client_id, call.client_secret, fetch_token, send
+    )
+    if isinstance(response, dict):
+        return response
+    return call.parse_response(response)
+
+
 def abuseipdb_ip_check(ioc: str, apikey: str) -> Dict[str, Any]:
     """
     Perform IP reputation lookup using AbuseIPDB API.
@@ -86,17 +184,22 @@ def abuseipdb_ip_check(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing lookup results or error information
     """
+    return send_vendor_request(abuseipdb_ip_check_request(ioc, apikey))
+
+
+def abuseipdb_ip_check_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`abuseipdb_ip_check`."""
     if not apikey:
         return {"error": 401, "message": "AbuseIPDB API key is missing."}
     
     logger.debug(f"Checking IP {ioc} with AbuseIPDB")
     
-    response = requests.get(
+    return VendorRequest(
+        "AbuseIPDB", 'GET',
         url='https://api.abuseipdb.com/api/v2/check',
-        params={'ipAddress': ioc, 'maxAgeInDays': '90', 'verbose': True},
+        params={'ipAddress': ioc, 'maxAgeInDays': '90', 'verbose': 'True'},
         headers={'Accept': 'application/json', 'Key': apikey}
     )
-    return handle_request_errors("AbuseIPDB", response)
 
 
 def alienvaultotx(ioc: str, type: str, apikey: str) -> Dict[str, Any]:
@@ -111,6 +214,11 @@ def alienvaultotx(ioc: str, type: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing lookup results or error information
     """
+    return send_vendor_request(alienvaultotx_request(ioc, type, apikey))
+
+
+def alienvaultotx_request(ioc: str, type: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`alienvaultotx`."""
     if not apikey:
         return {"error": 401, "message": "AlienVault OTX API key is missing."}
     
@@ -119,11 +227,11 @@ def alienvaultotx(ioc: str, type: str, apikey: str) -> Dict[str, Any]:
     
     logger.debug(f"Checking {indicator_type} {ioc} with AlienVault OTX")
     
-    response = requests.get(
+    return VendorRequest(
+        "AlienVault OTX", 'GET',
         url=f'https://otx.alienvault.com/api/v1/indicators/{indicator_type}/{ioc}/general',
         headers={'X-OTX-API-KEY': apikey}
     )
-    return handle_request_errors("AlienVault OTX", response)
 
 
 def check_bgpview(ioc: str) -> Dict[str, Any]:
@@ -136,10 +244,14 @@ def check_bgpview(ioc: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing BGP information or error information
     """
+    return send_vendor_request(check_bgpview_request(ioc))
+
+
+def check_bgpview_request(ioc: str) -> VendorCall:
+    """Build the request of :func:`check_bgpview`."""
     logger.debug(f"Checking IP {ioc} with BGPView")
     
-    response = requests.get(url=f'https://api.bgpview.io/ip/{ioc}')
-    return handle_request_errors("BGPView", response)
+    return VendorRequest("BGPView", 'GET', url=f'https://api.bgpview.io/ip/{ioc}')
 
 
 def checkphish_ai(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -153,16 +265,21 @@ def checkphish_ai(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing scan results or error information
     """
+    return send_vendor_request(checkphish_ai_request(ioc, apikey))
+
+
+def checkphish_ai_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`checkphish_ai`."""
     if not apikey:
         return {"error": 401, "message": "CheckPhish API key is missing."}
 
     logger.debug(f"Checking URL {ioc} with CheckPhish")
     
-    response = requests.post(
+    return VendorRequest(
+        "CheckPhish", 'POST',
         url='https://developers.checkphish.ai/api/neo/scan',
         json={'apiKey': apikey, 'urlInfo': {'url': ioc}}
     )
-    return handle_request_errors("CheckPhish", response)
 
 
 def crowdsec(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -176,16 +293,21 @@ def crowdsec(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing reputation data or error information
     """
+    return send_vendor_request(crowdsec_request(ioc, apikey))
+
+
+def crowdsec_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`crowdsec`."""
     if not apikey:
         return {"error": 401, "message": "CrowdSec API key is missing."}
     
     logger.debug(f"Checking IP {ioc} with CrowdSec")
     
-    response = requests.get(
+    return VendorRequest(
+        "CrowdSec", 'GET',
         url=f'https://cti.api.crowdsec.net/v2/smoke/{ioc}',
         headers={'x-api-key': apikey}
     )
-    return handle_request_errors("CrowdSec", response)
 
 
 def crowdstrike_indicators_lookup(ioc: str, client_id: str, client_secret: str) -> Dict[str, Any]:
@@ -200,32 +322,45 @@ def crowdstrike_indicators_lookup(ioc: str, client_id: str, client_secret: str)
     Returns:
         Dictionary containing intelligence data or error information
     """
+    return send_vendor_request(crowdstrike_indicators_lookup_request(ioc, client_id, client_secret))
+
+
+def crowdstrike_indicators_lookup_request(ioc: str, client_id: str, client_secret: str) -> VendorCall:
+    """Build the request of :func:`crowdstrike_indicators_lookup`."""
     if not client_id or not client_secret:
         return {"error": 401, "message": "CrowdStrike credentials missing."}
 
-    logger.debug(f"Authenticating with CrowdStrike")
-    
-    token_res = requests.post(
-        url='https://api.crowdstrike.com/oauth2/token',
-        data={'client_id': client_id, 'client_secret': client_secret},
-        headers={'Content-Type': 'application/x-www-form-urlencoded'}
+    logger.debug(f"Looking up IOC {ioc} with CrowdStrike")
+
+    return _crowdstrike_request(
+        client_id, client_secret,
+        lambda access_token: VendorRequest(
+            "CrowdStrike", 'GET',
+            url='https://api.crowdstrike.com/intel/combined/indicators/v1',
+            params={'filter': f"indicator:'{ioc}'"},
+            headers={'Authorization': f'Bearer {access_token}'}
+        )
     )
-    token_data = handle_request_errors("CrowdStrike Auth", token_res)
-    if 'error' in token_data:
-        return token_data
 
-    access_token = token_data.get('access_token')
-    if not access_token:
-        return {"error": 500, "message": "Failed to retrieve CrowdStrike access token."}
-    
-    logger.debug(f"Looking up IOC {ioc} with CrowdStrike")
-    
-    response = requests.get(
-        url='https://api.crowdstrike.com/intel/combined/indicators/v1',
-        params={'filter': f"indicator:'{ioc}'"},
-        headers={'Authorization': f'Bearer {access_token}'}
+
+def _crowdstrike_request(
+    client_id: str,
+    client_secret: str,
+    lookup: Callable[[str], VendorRequest],
+    parse: Optional[Callable[[requests.Response], Dict[str, Any]]] = None
+) -> OAuthVendorRequest:
+    """Wrap a CrowdStrike API request with the client-credentials token it needs."""
+    return OAuthVendorRequest(
+        "CrowdStrike", CROWDSTRIKE_TOKEN_URL, client_id, client_secret,
+        token_request=VendorRequest(
+            "CrowdStrike Auth", 'POST',
+            url=CROWDSTRIKE_TOKEN_URL,
+            data={'client_id': client_id, 'client_secret': client_secret},
+            headers={'Content-Type': 'application/x-www-form-urlencoded'}
+        ),
+        lookup=lookup,
+        parse=parse
     )
-    return handle_request_errors("CrowdStrike", response)
 
 
 def emailrep_email_check(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -239,16 +374,21 @@ def emailrep_email_check(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing email reputation data or error information
     """
+    return send_vendor_request(emailrep_email_check_request(ioc, apikey))
+
+
+def emailrep_email_check_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`emailrep_email_check`."""
     if not apikey:
         return {"error": 401, "message": "EmailRep.io API key is missing."}
     
     logger.debug(f"Checking email {ioc} with EmailRep.io")
     
-    response = requests.get(
+    return VendorRequest(
+        "EmailRep.io", 'GET',
         url=f'https://emailrep.io/{ioc}',
         headers={'Key': apikey, 'User-Agent': 'OSINT-Toolkit'}
     )
-    return handle_request_errors("EmailRep.io", response)
 
 
 def search_github(ioc: str, access_token: str) -> Dict[str, Any]:
@@ -262,17 +402,22 @@ def search_github(ioc: str, access_token: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing search results or error information
     """
+    return send_vendor_request(search_github_request(ioc, access_token))
+
+
+def search_github_request(ioc: str, access_token: str) -> VendorCall:
+    """Build the request of :func:`search_github`."""
     if not access_token:
         return {"error": 401, "message": "GitHub PAT is missing."}
     
     logger.debug(f"Searching for IOC {ioc} on GitHub")
     
-    response = requests.get(
+    return VendorRequest(
+        "GitHub", 'GET',
         url='https://api.github.com/search/code',
         params={'q': f'"{ioc}"'},
         headers={'Authorization': f'Bearer {access_token}', 'Accept': 'application/vnd.github.v3+json'}
     )
-    return handle_request_errors("GitHub", response)
 
 
 def haveibeenpwnd_email_check(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -286,18 +431,27 @@ def haveibeenpwnd_email_check(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing breach information or error information
     """
+    return send_vendor_request(haveibeenpwnd_email_check_request(ioc, apikey))
+
+
+def haveibeenpwnd_email_check_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`haveibeenpwnd_email_check`."""
     if not apikey:
         return {"error": 401, "message": "HIBP API key is missing."}
     
     logger.debug(f"Checking email {ioc} with HIBP")
-    
-    response = requests.get(
+
+    def parse(response: requests.Response) -> Dict[str, Any]:
+        if response.status_code == 404:
+            return {"message": "Not found in any breaches."}
+        return handle_request_errors("HIBP", response)
+
+    return VendorRequest(
+        "HIBP", 'GET',
         url=f'https://haveibeenpwned.com/api/v3/breachedaccount/{ioc}',
+        parse=parse,
         headers={'hibp-api-key': apikey, 'User-Agent': 'OSINT-Toolkit'}
     )
-    if response.status_code == 404:
-        return {"message": "Not found in any breaches."}
-    return handle_request_errors("HIBP", response)
 
 
 def hunter_email_check(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -311,16 +465,21 @@ def hunter_email_check(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing verification results or error information
     """
+    return send_vendor_request(hunter_email_check_request(ioc, apikey))
+
+
+def hunter_email_check_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`hunter_email_check`."""
     if not apikey:
         return {"error": 401, "message": "Hunter.io API key is missing."}
 
     logger.debug(f"Verifying email {ioc} with Hunter.io")
     
-    response = requests.get(
+    return VendorRequest(
+        "Hunter.io", 'GET',
         url=f'https://api.hunter.io/v2/email-verifier',
         params={'email': ioc, 'api_key': apikey}
     )
-    return handle_request_errors("Hunter.io", response)
 
 
 def ipqualityscore_ip_check(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -334,13 +493,17 @@ def ipqualityscore_ip_check(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing quality score data or error information
     """
+    return send_vendor_request(ipqualityscore_ip_check_request(ioc, apikey))
+
+
+def ipqualityscore_ip_check_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`ipqualityscore_ip_check`."""
     if not apikey:
         return {"error": 401, "message": "IPQualityScore API key is missing."}
     
     logger.debug(f"Checking IP {ioc} with IPQualityScore")
     
-    response = requests.get(url=f'https://www.ipqualityscore.com/api/json/ip/{apikey}/{ioc}')
-    return handle_request_errors("IPQualityScore", response)
+    return VendorRequest("IPQualityScore", 'GET', url=f'https://www.ipqualityscore.com/api/json/ip/{apikey}/{ioc}')
 
 
 def maltiverse_check(ioc: str, endpoint: str, apikey: str) -> Dict[str, Any]:
@@ -355,16 +518,21 @@ def maltiverse_check(ioc: str, endpoint: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing threat intelligence data or error information
     """
+    return send_vendor_request(maltiverse_check_request(ioc, endpoint, apikey))
+
+
+def maltiverse_check_request(ioc: str, endpoint: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`maltiverse_check`."""
     if not apikey:
         return {"error": 401, "message": "Maltiverse API key is missing."}
     
     logger.debug(f"Checking {endpoint} {ioc} with Maltiverse")
     
-    response = requests.get(
+    return VendorRequest(
+        "Maltiverse", 'GET',
         url=f'https://api.maltiverse.com/{endpoint}/{ioc}',
         headers={'Authorization': f'Bearer {apikey}'}
     )
-    return handle_request_errors("Maltiverse", response)
 
 
 def malwarebazaar_hash_check(ioc: str) -> Dict[str, Any]:
@@ -377,13 +545,18 @@ def malwarebazaar_hash_check(ioc: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing malware information or error information
     """
+    return send_vendor_request(malwarebazaar_hash_check_request(ioc))
+
+
+def malwarebazaar_hash_check_request(ioc: str) -> VendorCall:
+    """Build the request of :func:`malwarebazaar_hash_check`."""
     logger.debug(f"Checking hash {ioc} with MalwareBazaar")
     
-    response = requests.post(
+    return VendorRequest(
+        "MalwareBazaar", 'POST',
         url='https://mb-api.abuse.ch/api/v1/',
         data={'query': 'get_info', 'hash': ioc}
     )
-    return handle_request_errors("MalwareBazaar", response)
 
 
 def mandiant_ioc_lookup(ioc: str, ioc_type: str, api_key: str, api_secret: str) -> Dict[str, Any]:
@@ -399,31 +572,41 @@ def mandiant_ioc_lookup(ioc: str, ioc_type: str, api_key: str, api_secret: str)
     Returns:
         Dictionary containing threat intelligence data or error information
     """
+    return send_vendor_request(mandiant_ioc_lookup_request(ioc, ioc_type, api_key, api_secret))
+
+
+def mandiant_ioc_lookup_request(ioc: str, ioc_type: str, api_key: str, api_secret: str) -> VendorCall:
+    """Build the request of :func:`mandiant_ioc_lookup`."""
     if not api_key or not api_secret:
         return {"error": 401, "message": "Mandiant credentials missing."}
 
-    logger.debug(f"Authenticating with Mandiant")
-    
-    token_res = requests.post(
-        url='https://api.intelligence.mandiant.com/token',
-        data={'grant_type': 'client_credentials', 'client_id': api_key, 'client_secret': api_secret}
-    )
-    token_data = handle_request_errors("Mandiant Auth", token_res)
-    if 'error' in token_data:
-        return token_data
-
-    access_token = token_data.get('access_token')
-    if not access_token:
-        return {"error": 500, "message": "Failed to retrieve Mandiant access token."}
-    
     logger.debug(f"Looking up {ioc_type} {ioc} with Mandiant")
-    
-    response = requests.post(
-        url='https://api.intelligence.mandiant.com/v4/indicator',
-        headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json', 'Accept': 'application/json'},
-        json={"requests": [{"type": ioc_type, "value": ioc}]}
+
+    return _mandiant_request(api_key, api_secret, [{"type": ioc_type, "value": ioc}])
+
+
+def _mandiant_request(
+    api_key: str,
+    api_secret: str,
+    indicators: List[Dict[str, str]],
+    parse: Optional[Callable[[requests.Response], Dict[str, Any]]] = None
+) -> OAuthVendorRequest:
+    """Build a Mandiant indicator request with the client-credentials token it needs."""
+    return OAuthVendorRequest(
+        "Mandiant", MANDIANT_TOKEN_URL, api_key, api_secret,
+        token_request=VendorRequest(
+            "Mandiant Auth", 'POST',
+            url=MANDIANT_TOKEN_URL,
+            data={'grant_type': 'client_credentials', 'client_id': api_key, 'client_secret': api_secret}
+        ),
+        lookup=lambda access_token: VendorRequest(
+            "Mandiant", 'POST',
+            url='https://api.intelligence.mandiant.com/v4/indicator',
+            headers={'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json', 'Accept': 'application/json'},
+            json={"requests": indicators}
+        ),
+        parse=parse
     )
-    return handle_request_errors("Mandiant", response)
 
 
 def search_nist_nvd(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -437,17 +620,22 @@ def search_nist_nvd(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing CVE information or error information
     """
+    return send_vendor_request(search_nist_nvd_request(ioc, apikey))
+
+
+def search_nist_nvd_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`search_nist_nvd`."""
     if not apikey:
         return {"error": 401, "message": "NIST NVD API key is missing."}
     
     logger.debug(f"Looking up CVE {ioc} with NIST NVD")
     
-    response = requests.get(
+    return VendorRequest(
+        "NIST NVD", 'GET',
         url=f'https://services.nvd.nist.gov/rest/json/cves/2.0',
         params={'cveId': ioc},
         headers={'apiKey': apikey}
     )
-    return handle_request_errors("NIST NVD", response)
 
 
 def check_pulsedive(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -461,16 +649,21 @@ def check_pulsedive(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing threat intelligence data or error information
     """
+    return send_vendor_request(check_pulsedive_request(ioc, apikey))
+
+
+def check_pulsedive_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`check_pulsedive`."""
     if not apikey:
         return {"error": 401, "message": "Pulsedive API key is missing."}
 
     logger.debug(f"Checking IOC {ioc} with Pulsedive")
     
-    response = requests.get(
+    return VendorRequest(
+        "Pulsedive", 'GET',
         url='https://pulsedive.com/api/info.php',
         params={'indicator': ioc, 'key': apikey, 'pretty': '1'}
     )
-    return handle_request_errors("Pulsedive", response)
 
 
 def search_reddit(ioc: str, client_id: str, client_secret: str) -> Dict[str, Any]:
@@ -485,34 +678,33 @@ def search_reddit(ioc: str, client_id: str, client_secret: str) -> Dict[str, Any
     Returns:
         Dictionary containing search results or error information
     """
-    if not client_id or not client_secret:
-        return {"error": 401, "message": "Reddit credentials missing."}
+    return send_vendor_request(search_reddit_request(ioc, client_id, client_secret))
 
-    logger.debug(f"Authenticating with Reddit")
-    
-    auth = requests.auth.HTTPBasicAuth(client_id, client_secret)
-    token_res = requests.post(
-        url='https://www.reddit.com/api/v1/access_token',
-        data={'grant_type': 'client_credentials'},
-        headers={'User-Agent': 'OSINT-Toolkit/0.1'},
-        auth=auth
-    )
-    token_data = handle_request_errors("Reddit Auth", token_res)
-    if 'error' in token_data:
-        return token_data
 
-    access_token = token_data.get('access_token')
-    if not access_token:
-        return {"error": 500, "message": "Failed to retrieve Reddit access token."}
+def search_reddit_request(ioc: str, client_id: str, client_secret: str) -> VendorCall:
+    """Build the request of :func:`search_reddit`."""
+    if not client_id or not client_secret:
+        return {"error": 401, "message": "Reddit credentials missing."}
 
     logger.debug(f"Searching for IOC {ioc} on Reddit")
-    
-    response = requests.get(
-        url='https://oauth.reddit.com/search',
-        params={'q': f'"{ioc}"', 'limit': 25},
-        headers={'Authorization': f'bearer {access_token}', 'User-Agent': 'OSINT-Toolkit/0.1'}
+
+    # Basic auth as a plain header, so requests and aiohttp send the same request
+    basic_auth = b64encode(f'{client_id}:{client_secret}'.encode('latin1')).decode()
+    return OAuthVendorRequest(
+        "Reddit", REDDIT_TOKEN_URL, client_id, client_secret,
+        token_request=VendorRequest(
+            "Reddit Auth", 'POST',
+            url=REDDIT_TOKEN_URL,
+            data={'grant_type': 'client_credentials'},
+            headers={'User-Agent': 'OSINT-Toolkit/0.1', 'Authorization': f'Basic {basic_auth}'}
+        ),
+        lookup=lambda access_token: VendorRequest(
+            "Reddit", 'GET',
+            url='https://oauth.reddit.com/search',
+            params={'q': f'"{ioc}"', 'limit': 25},
+            headers={'Authorization': f'bearer {access_token}', 'User-Agent': 'OSINT-Toolkit/0.1'}
+        )
     )
-    return handle_request_errors("Reddit", response)
 
 
 def safeBrowse_url_check(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -526,25 +718,40 @@ def safeBrowse_url_check(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing safety information or error information
     """
+    return send_vendor_request(safeBrowse_url_check_request(ioc, apikey))
+
+
+def safeBrowse_url_check_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`safeBrowse_url_check`."""
     if not apikey:
         return {"error": 401, "message": "Google Safe Browse API key is missing."}
     
     logger.debug(f"Checking URL {ioc} with Google Safe Browsing")
     
+    return _safe_browse_request([ioc], apikey)
+
+
+def _safe_browse_request(
+    urls: List[str],
+    apikey: str,
+    parse: Optional[Callable[[requests.Response], Dict[str, Any]]] = None
+) -> VendorRequest:
+    """Build a Google Safe Browsing lookup of one or more URLs."""
     payload = {
         "client": {"clientId": "osint-toolkit", "clientVersion": "1.0.0"},
         "threatInfo": {
             "threatTypes": ["MALWARE", "SOCIAL_ENGINEERING", "UNWANTED_SOFTWARE", "POTENTIALLY_HARMFUL_APPLICATION"],
             "platformTypes": ["ANY_PLATFORM"],
             "threatEntryTypes": ["URL"],
-            "threatEntries": [{"url": ioc}]
+            "threatEntries": [{"url": url} for url in urls]
         }
     }
-    response = requests.post(
+    return VendorRequest(
+        "Google Safe Browse", 'POST',
         url=f'https://safeBrowse.googleapis.com/v4/threatMatches:find?key={apikey}',
+        parse=parse,
         json=payload
     )
-    return handle_request_errors("Google Safe Browse", response)
 
 
 def check_shodan(ioc: str, method: str, apikey: str) -> Dict[str, Any]:
@@ -559,6 +766,11 @@ def check_shodan(ioc: str, method: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing host information or error information
     """
+    return send_vendor_request(check_shodan_request(ioc, method, apikey))
+
+
+def check_shodan_request(ioc: str, method: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`check_shodan`."""
     if not apikey:
         return {"error": 401, "message": "Shodan API key is missing."}
     
@@ -566,11 +778,11 @@ def check_shodan(ioc: str, method: str, apikey: str) -> Dict[str, Any]:
     
     logger.debug(f"Checking {method} {ioc} with Shodan")
     
-    response = requests.get(
+    return VendorRequest(
+        "Shodan", 'GET',
         url=f'https://api.shodan.io/shodan/{endpoint}/{ioc}',
         params={'key': apikey}
     )
-    return handle_request_errors("Shodan", response)
 
 
 def threatfox_ip_check(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -584,17 +796,22 @@ def threatfox_ip_check(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing threat information or error information
     """
+    return send_vendor_request(threatfox_ip_check_request(ioc, apikey))
+
+
+def threatfox_ip_check_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`threatfox_ip_check`."""
     if not apikey:
         return {"error": 401, "message": "ThreatFox API key is missing."}
     
     logger.debug(f"Checking IOC {ioc} with ThreatFox")
     
-    response = requests.post(
+    return VendorRequest(
+        "ThreatFox", 'POST',
         url='https://threatfox-api.abuse.ch/api/v1/',
         headers={'API-KEY': apikey},
         json={'query': 'search_ioc', 'search_term': ioc}
     )
-    return handle_request_errors("ThreatFox", response)
 
 
 def search_twitter(ioc: str, apikey: str) -> Dict[str, Any]:
@@ -608,17 +825,22 @@ def search_twitter(ioc: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing search results or error information
     """
+    return send_vendor_request(search_twitter_request(ioc, apikey))
+
+
+def search_twitter_request(ioc: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`search_twitter`."""
     if not apikey:
         return {"error": 401, "message": "Twitter Bearer Token is missing."}
     
     logger.debug(f"Searching for IOC {ioc} on Twitter/X")
     
-    response = requests.get(
+    return VendorRequest(
+        "Twitter/X", 'GET',
         url='https://api.twitter.com/2/tweets/search/recent',
         params={'query': f'"{ioc}" -is:retweet'},
         headers={'Authorization': f'Bearer {apikey}'}
     )
-    return handle_request_errors("Twitter/X", response)
 
 
 def urlhaus_url_check(ioc: str) -> Dict[str, Any]:
@@ -631,13 +853,18 @@ def urlhaus_url_check(ioc: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing URL information or error information
     """
+    return send_vendor_request(urlhaus_url_check_request(ioc))
+
+
+def urlhaus_url_check_request(ioc: str) -> VendorCall:
+    """Build the request of :func:`urlhaus_url_check`."""
     logger.debug(f"Checking URL {ioc} with URLhaus")
     
-    response = requests.post(
+    return VendorRequest(
+        "URLhaus", 'POST',
         url='https://urlhaus-api.abuse.ch/v1/url/',
         data={'url': ioc}
     )
-    return handle_request_errors("URLhaus", response)
 
 
 def urlscanio(ioc: str) -> Dict[str, Any]:
@@ -650,13 +877,18 @@ def urlscanio(ioc: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing scan information or error information
     """
+    return send_vendor_request(urlscanio_request(ioc))
+
+
+def urlscanio_request(ioc: str) -> VendorCall:
+    """Build the request of :func:`urlscanio`."""
     logger.debug(f"Searching for IOC {ioc} on URLScan.io")
     
-    response = requests.get(
+    return VendorRequest(
+        "URLScan.io", 'GET',
         url='https://urlscan.io/api/v1/search/',
         params={'q': f'page.ip:"{ioc}" OR page.domain:"{ioc}"'}
     )
-    return handle_request_errors("URLScan.io", response)
 
 
 def virustotal(ioc: str, type: str, apikey: str) -> Dict[str, Any]:
@@ -671,6 +903,11 @@ def virustotal(ioc: str, type: str, apikey: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing analysis results or error information
     """
+    return send_vendor_request(virustotal_request(ioc, type, apikey))
+
+
+def virustotal_request(ioc: str, type: str, apikey: str) -> VendorCall:
+    """Build the request of :func:`virustotal`."""
     if not apikey:
         return {"error": 401, "message": "VirusTotal API key is missing."}
 
@@ -684,8 +921,87 @@ def virustotal(ioc: str, type: str, apikey: str) -> Dict[str, Any]:
     
     logger.debug(f"Checking {type} {ioc} with VirusTotal")
         
-    response = requests.get(
+    return VendorRequest(
+        "VirusTotal", 'GET',
         url=f'https://www.virustotal.com/api/v3/{indicator_type}/{ioc_safe}',
         headers={'x-apikey': apikey}
     )
-    return handle_request_errors("VirusTotal", response)
+
+
+# Batch requests used by bulk lookups for vendors that accept many indicators per
+# call. Each parses to {"results": {ioc: result}} where every result has the shape
+# the single-IOC client would have returned, or to an error dictionary when the
+# whole call failed.
+
+
+def safeBrowse_url_check_batch_request(iocs: List[str], apikey: str) -> VendorCall:
+    """Build a check of many URLs with one Google Safe Browsing request."""
+    if not apikey:
+        return {"error": 401, "message": "Google Safe Browse API key is missing."}
+
+    logger.debug(f"Checking {len(iocs)} URLs with Google Safe Browsing")
+
+    def parse(response: requests.Response) -> Dict[str, Any]:
+        data = handle_request_errors("Google Safe Browse", response)
+        if 'error' in data:
+            return data
+        results = {}
+        for ioc in iocs:
+            matches = [m for m in data.get('matches', []) if m.get('threat', {}).get('url') == ioc]
+            results[ioc] = {"matches": matches} if matches else {}
+        return {"results": results}
+
+    return _safe_browse_request(iocs, apikey, parse)
+
+
+def crowdstrike_indicators_lookup_batch_request(iocs: List[str], client_id: str, client_secret: str) -> VendorCall:
+    """Build a lookup of many indicators with one CrowdStrike Falcon Intelligence query."""
+    if not client_id or not client_secret:
+        return {"error": 401, "message": "CrowdStrike credentials missing."}
+
+    logger.debug(f"Looking up {len(iocs)} IOCs with CrowdStrike")
+
+    values = ','.join(f"'{ioc}'" for ioc in iocs)
+
+    def parse(response: requests.Response) -> Dict[str, Any]:
+        data = handle_request_errors("CrowdStrike", response)
+        if 'error' in data:
+            return data
+        resources = data.get('resources') or []
+        results = {}
+        for ioc in iocs:
+            matching = [r for r in resources if str(r.get('indicator', '')).lower() == ioc.lower()]
+            results[ioc] = {**data, "resources": matching}
+        return {"results": results}
+
+    return _crowdstrike_request(
+        client_id, client_secret,
+        lambda access_token: VendorRequest(
+            "CrowdStrike", 'GET',
+            url='https://api.crowdstrike.com/intel/combined/indicators/v1',
+            params={'filter': f"indicator:[{values}]", 'limit': 5000},
+            headers={'Authorization': f'Bearer {access_token}'}
+        ),
+        parse
+    )
+
+
+def mandiant_ioc_lookup_batch_request(iocs: List[str], ioc_type: str, api_key: str, api_secret: str) -> VendorCall:
+    """Build a lookup of many indicators of one type with one Mandiant Advantage request."""
+    if not api_key or not api_secret:
+        return {"error": 401, "message": "Mandiant credentials missing."}
+
+    logger.debug(f"Looking up {len(iocs)} {ioc_type} IOCs with Mandiant")
+
+    def parse(response: requests.Response) -> Dict[str, Any]:
+        data = handle_request_errors("Mandiant", response)
+        if 'error' in data:
+            return data
+        indicators = data.get('indicators') or []
+        results = {}
+        for ioc in iocs:
+            matching = [i for i in indicators if str(i.get('value', '')).lower() == ioc.lower()]
+            results[ioc] = {**data, "indicators": matching}
+        return {"results": results}
+
+    return _mandiant_request(api_key, api_secret, [{"type": ioc_type, "value": ioc} for ioc in iocs], parse)
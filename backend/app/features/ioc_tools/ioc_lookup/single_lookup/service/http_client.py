@@ -0,0 +1,638 @@
+import os
+import asyncio
+import contextvars
+import random
+import socket
+import threading
+import time
+import logging
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, NameResolutionError, NewConnectionError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = float(os.getenv("OUTBOUND_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("OUTBOUND_READ_TIMEOUT", "30"))
+POOL_CONNECTIONS = int(os.getenv("OUTBOUND_POOL_CONNECTIONS", "32"))
+POOL_MAXSIZE = int(os.getenv("OUTBOUND_POOL_MAXSIZE", "16"))
+MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "2"))
+BACKOFF_FACTOR = float(os.getenv("OUTBOUND_BACKOFF_FACTOR", "0.5"))
+BACKOFF_JITTER = float(os.getenv("OUTBOUND_BACKOFF_JITTER", "0.5"))
+# Longest wait before a retry, in seconds; a Retry-After asking for more fails the request instead
+MAX_BACKOFF = float(os.getenv("OUTBOUND_MAX_BACKOFF", "30"))
+DNS_CACHE_TTL = float(os.getenv("OUTBOUND_DNS_CACHE_TTL", "300"))
+# Most (host, port) resolutions the outbound DNS cache keeps; the least recently used go first
+DNS_CACHE_SIZE = int(os.getenv("OUTBOUND_DNS_CACHE_SIZE", "256"))
+ASYNC_LIMIT = int(os.getenv("OUTBOUND_ASYNC_LIMIT", "200"))
+ASYNC_LIMIT_PER_HOST = int(os.getenv("OUTBOUND_ASYNC_LIMIT_PER_HOST", "50"))
+# Base URL of a stand-in for the vendor APIs, such as benchmarks/mock_vendor_server.py. When set,
+# every outbound request goes to <MOCK_URL>/<vendor host><path> instead of the vendor.
+MOCK_URL = os.getenv("OUTBOUND_MOCK_URL", "")
+
+RETRY_STATUS_CODES = frozenset({502, 503, 504})
+RETRY_METHODS = frozenset({'GET', 'HEAD'})
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_settings: Dict[str, Any] = {
+    'connect_timeout': CONNECT_TIMEOUT,
+    'read_timeout': READ_TIMEOUT,
+    'pool_connections': POOL_CONNECTIONS,
+    'pool_maxsize': POOL_MAXSIZE,
+    'max_retries': MAX_RETRIES,
+    'backoff_factor': BACKOFF_FACTOR,
+    'backoff_jitter': BACKOFF_JITTER,
+    'max_backoff': MAX_BACKOFF,
+    'async_limit': ASYNC_LIMIT,
+    'async_limit_per_host': ASYNC_LIMIT_PER_HOST,
+    'mock_url': MOCK_URL,
+}
+
+# Monotonic time by which the vendor call of the current thread has to be answered
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('outbound_deadline', default=None)
+
+_async_session: Optional[aiohttp.ClientSession] = None
+_async_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_retired_async_sessions: List[aiohttp.ClientSession] = []
+_async_in_flight = 0
+
+_host_stats: Dict[str, Dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+_response_hooks: List[Callable[[requests.Response], None]] = []
+
+
+class _DnsCache:
+    """
+    Bounded TTL cache of the vendor hosts' addresses, used by the outbound session only.
+
+    Keep-alive pools already avoid most resolutions, but new connections to the
+    same handful of vendor hosts would otherwise hit the resolver every time.
+    ``getaddrinfo`` does not report the records' TTLs, so entries live at most
+    ``ttl`` seconds, and a host whose cached addresses all refuse connections is
+    resolved again on the next attempt, e.g. after a vendor failed over.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max(max_size, 1)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def resolve(self, host: str, port: int) -> List[Tuple]:
+        """Get the addresses of a host, from the cache while they are fresh."""
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        result = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (now + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def forget(self, host: str, port: int) -> None:
+        """Drop a host's cached addresses."""
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ttl': self.ttl,
+                'max_size': self.max_size,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+_dns_cache: Optional[_DnsCache] = _DnsCache(DNS_CACHE_TTL, DNS_CACHE_SIZE) if DNS_CACHE_TTL > 0 else None
+
+
+class _CachedDnsConnectionMixin:
+    """Open the connection to an address from the DNS cache, trying each until one accepts it."""
+
+    def _new_conn(self):
+        if _dns_cache is None:
+            return super()._new_conn()
+        host = self._dns_host
+        try:
+            addresses = [info[4][0] for info in _dns_cache.resolve(host, self.port)]
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        error: Optional[Exception] = None
+        try:
+            # urllib3 derives the TLS server name and Host header from _dns_host, so it is only
+            # swapped for the socket connect and restored before the handshake
+            for address in dict.fromkeys(addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+        finally:
+            self._dns_host = host
+        _dns_cache.forget(host, self.port)
+        raise error
+
+
+class _CachedDnsHTTPConnection(_CachedDnsConnectionMixin, HTTPConnection):
+    pass
+
+
+class _CachedDnsHTTPSConnection(_CachedDnsConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CachedDnsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDnsHTTPConnection
+
+
+class _CachedDnsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDnsHTTPSConnection
+
+
+class _CachedDnsAdapter(HTTPAdapter):
+    """Adapter whose pools resolve hosts through the outbound DNS cache."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CachedDnsHTTPConnectionPool,
+            'https': _CachedDnsHTTPSConnectionPool,
+        }
+
+
+class _CappedRetry(Retry):
+    """Retry policy that gives up instead of honouring a Retry-After longer than ``max_backoff``."""
+
+    def get_retry_after(self, response) -> Optional[float]:
+        return _retry_after_seconds(response.headers.get('Retry-After'))
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None:
+            retry_after = _retry_after_seconds(response.headers.get('Retry-After'))
+            if retry_after is not None and retry_after > _settings['max_backoff']:
+                logger.warning(
+                    f"Not retrying {url}: Retry-After of {retry_after:.0f}s exceeds "
+                    f"the {_settings['max_backoff']:g}s limit"
+                )
+                raise MaxRetryError(_pool, url, "Retry-After exceeds the backoff limit")
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def _build_session() -> requests.Session:
+    """
+    Build a session with per-host keep-alive pools and the configured retry policy.
+
+    Returns:
+        Configured requests session
+    """
+    retry = _CappedRetry(
+        total=_settings['max_retries'],
+        connect=_settings['max_retries'],
+        read=_settings['max_retries'],
+        status=_settings['max_retries'],
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=RETRY_METHODS,
+        backoff_factor=_settings['backoff_factor'],
+        backoff_jitter=_settings['backoff_jitter'],
+        backoff_max=_settings['max_backoff'],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = _CachedDnsAdapter(
+        pool_connections=_settings['pool_connections'],
+        pool_maxsize=_settings['pool_maxsize'],
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Get the shared outbound session, creating it on first use.
+
+    Returns:
+        Shared requests session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+                if _settings['mock_url']:
+                    logger.warning(f"Outbound requests are sent to the mock vendor server at {_settings['mock_url']}")
+    return _session
+
+
+def configure(**settings) -> Dict[str, Any]:
+    """
+    Update outbound client settings and rebuild the shared session.
+
+    Args:
+        **settings: Any of connect_timeout, read_timeout, pool_connections,
+            pool_maxsize, max_retries, backoff_factor, backoff_jitter,
+            max_backoff, async_limit, async_limit_per_host, mock_url
+
+    Returns:
+        Dictionary of the effective settings
+
+    Raises:
+        ValueError: If an unknown setting is passed
+    """
+    global _session, _async_session
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown outbound client setting(s): {', '.join(sorted(unknown))}")
+
+    with _session_lock:
+        _settings.update(settings)
+        old_session, _session = _session, None
+        if _async_session is not None:
+            _retired_async_sessions.append(_async_session)
+            _async_session = None
+    if old_session is not None:
+        old_session.close()
+    logger.info(f"Outbound HTTP client reconfigured: {_settings}")
+    return dict(_settings)
+
+
+def _route(url: str) -> str:
+    """Point a vendor URL at the mock vendor server, if one is configured."""
+    mock_url = _settings['mock_url']
+    if not mock_url:
+        return url
+    parts = requests.utils.urlparse(url)
+    return f"{mock_url.rstrip('/')}/{parts.hostname}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+def get_default_timeout() -> Tuple[float, float]:
+    """Get the default (connect, read) timeout tuple."""
+    return (_settings['connect_timeout'], _settings['read_timeout'])
+
+
+def set_deadline(deadline: Optional[float]) -> None:
+    """
+    Bound the timeouts of the sync requests sent from the current context.
+
+    Args:
+        deadline: ``time.monotonic()`` value by which requests have to be answered, None for no bound
+    """
+    _deadline.set(deadline)
+
+
+def _cap_timeout(timeout: Any, remaining: float) -> Tuple[float, float]:
+    """
+    Shorten a requests timeout to the time left until the deadline.
+
+    Raises:
+        requests.exceptions.Timeout: If the deadline has passed
+    """
+    if remaining <= 0:
+        raise requests.exceptions.Timeout("Lookup deadline passed before the request was sent")
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return (
+        remaining if connect is None else min(connect, remaining),
+        remaining if read is None else min(read, remaining)
+    )
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Send a request through the shared pooled session.
+
+    A default connect/read timeout is applied unless the caller passes one,
+    shortened to the time left when a lookup deadline was set with
+    :func:`set_deadline`. With ``OUTBOUND_MOCK_URL`` set, the request goes to
+    the mock vendor server.
+
+    Args:
+        method: HTTP method
+        url: Target URL
+        **kwargs: Arguments accepted by ``requests.Session.request``
+
+    Returns:
+        HTTP response object
+
+    Raises:
+        requests.exceptions.RequestException: On connection errors or timeouts
+    """
+    kwargs.setdefault('timeout', get_default_timeout())
+    deadline = _deadline.get()
+    if deadline is not None:
+        kwargs['timeout'] = _cap_timeout(kwargs['timeout'], deadline - time.monotonic())
+    host = requests.utils.urlparse(url).hostname or 'unknown'
+    started = time.monotonic()
+    try:
+        response = get_session().request(method, _route(url), **kwargs)
+    except requests.exceptions.RequestException:
+        _record(host, time.monotonic() - started, failed=True)
+        raise
+    _record(host, time.monotonic() - started, failed=False)
+    _run_response_hooks(response)
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """Send a GET request through the shared pooled session."""
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """Send a POST request through the shared pooled session."""
+    return request('POST', url, **kwargs)
+
+
+async def _get_async_session() -> aiohttp.ClientSession:
+    """
+    Get the shared aiohttp session for the running event loop, creating it on first use.
+
+    Returns:
+        Shared aiohttp client session
+    """
+    global _async_session, _async_session_loop
+    loop = asyncio.get_running_loop()
+    while _retired_async_sessions:
+        await _retired_async_sessions.pop().close()
+    if _async_session is None or _async_session.closed or _async_session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=_settings['async_limit'],
+            limit_per_host=_settings['async_limit_per_host'],
+            ttl_dns_cache=DNS_CACHE_TTL if DNS_CACHE_TTL > 0 else None,
+            use_dns_cache=DNS_CACHE_TTL > 0,
+        )
+        _async_session = aiohttp.ClientSession(connector=connector)
+        _async_session_loop = loop
+    return _async_session
+
+
+def _retry_after_seconds(retry_after: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given either as seconds or as an HTTP date.
+
+    Args:
+        retry_after: Header value
+
+    Returns:
+        Seconds to wait, or None if the header is missing or malformed
+    """
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> Optional[float]:
+    """
+    Compute the sleep before a retry, honouring Retry-After when present.
+
+    Args:
+        attempt: Number of the failed attempt, starting at 0
+        retry_after: Retry-After header of the failed response, if any
+
+    Returns:
+        Seconds to sleep, at most ``max_backoff``, or None if Retry-After asks
+        for a longer wait and the request should fail instead
+    """
+    max_backoff = _settings['max_backoff']
+    wait = _retry_after_seconds(retry_after)
+    if wait is not None:
+        return wait if wait <= max_backoff else None
+    delay = _settings['backoff_factor'] * (2 ** attempt)
+    return min(delay + random.uniform(0, _settings['backoff_jitter']), max_backoff)
+
+
+def _build_response(url: str, status: int, reason: Optional[str], headers, body: bytes) -> requests.Response:
+    """
+    Wrap an aiohttp result in a ``requests.Response`` so the sync error handling can be shared.
+
+    Args:
+        url: Final request URL
+        status: HTTP status code
+        reason: HTTP reason phrase
+        headers: Response headers
+        body: Raw response body
+
+    Returns:
+        Populated requests response object
+    """
+    response = requests.models.Response()
+    response.status_code = status
+    response.reason = reason
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response._content = body
+    return response
+
+
+async def async_request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Send a request through the shared aiohttp session.
+
+    Applies the same default timeouts and retry policy as the sync client and
+    translates aiohttp errors into their ``requests`` equivalents. With
+    ``OUTBOUND_MOCK_URL`` set, the request goes to the mock vendor server.
+
+    Args:
+        method: HTTP method
+        url: Target URL
+        **kwargs: Arguments accepted by ``aiohttp.ClientSession.request``
+
+    Returns:
+        HTTP response object
+
+    Raises:
+        requests.exceptions.RequestException: On connection errors or timeouts
+    """
+    global _async_in_flight
+    timeout = kwargs.pop('timeout', None) or get_default_timeout()
+    if not isinstance(timeout, aiohttp.ClientTimeout):
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+    host = requests.utils.urlparse(url).hostname or 'unknown'
+    retryable = method.upper() in RETRY_METHODS
+    max_retries = _settings['max_retries'] if retryable else 0
+    session = await _get_async_session()
+    started = time.monotonic()
+
+    for attempt in range(max_retries + 1):
+        _async_in_flight += 1
+        try:
+            async with session.request(method, _route(url), timeout=timeout, **kwargs) as resp:
+                body = await resp.read()
+                response = _build_response(str(resp.url), resp.status, resp.reason, resp.headers, body)
+        except asyncio.TimeoutError as e:
+            if attempt < max_retries:
+                await asyncio.sleep(_backoff_delay(attempt))
+                continue
+            _record(host, time.monotonic() - started, failed=True)
+            raise requests.exceptions.Timeout(f"Request to {host} timed out") from e
+        except aiohttp.ClientError as e:
+            if attempt < max_retries:
+                await asyncio.sleep(_backoff_delay(attempt))
+                continue
+            _record(host, time.monotonic() - started, failed=True)
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        finally:
+            _async_in_flight -= 1
+
+        if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+            delay = _backoff_delay(attempt, response.headers.get('Retry-After'))
+            if delay is not None:
+                await asyncio.sleep(delay)
+                continue
+            logger.warning(
+                f"Not retrying {url}: Retry-After of {_retry_after_seconds(response.headers.get('Retry-After')):.0f}s "
+                f"exceeds the {_settings['max_backoff']:g}s limit"
+            )
+        break
+
+    _record(host, time.monotonic() - started, failed=False)
+    _run_response_hooks(response)
+    return response
+
+
+async def async_get(url: str, **kwargs) -> requests.Response:
+    """Send a GET request through the shared aiohttp session."""
+    return await async_request('GET', url, **kwargs)
+
+
+async def async_post(url: str, **kwargs) -> requests.Response:
+    """Send a POST request through the shared aiohttp session."""
+    return await async_request('POST', url, **kwargs)
+
+
+def add_response_hook(hook: Callable[[requests.Response], None]) -> None:
+    """
+    Register a callable that receives every response returned by the sync and async clients.
+
+    Args:
+        hook: Callable taking the HTTP response object
+    """
+    if hook not in _response_hooks:
+        _response_hooks.append(hook)
+
+
+def _run_response_hooks(response: requests.Response) -> None:
+    """Pass a response to the registered hooks; hook errors never fail the request."""
+    for hook in _response_hooks:
+        try:
+            hook(response)
+        except Exception as e:
+            logger.error(f"Response hook {getattr(hook, '__name__', hook)} failed: {str(e)}")
+
+
+def _record(host: str, elapsed: float, failed: bool) -> None:
+    """Record per-host request counters."""
+    with _stats_lock:
+        stats = _host_stats.setdefault(host, {'requests': 0, 'failures': 0, 'total_seconds': 0.0})
+        stats['requests'] += 1
+        stats['total_seconds'] += elapsed
+        if failed:
+            stats['failures'] += 1
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Get statistics for the shared connection pools.
+
+    Returns:
+        Dictionary with settings, DNS cache counters and per-host pool usage
+    """
+    hosts: Dict[str, Dict[str, Any]] = {}
+    with _stats_lock:
+        for host, stats in _host_stats.items():
+            hosts[host] = {
+                'requests': stats['requests'],
+                'failures': stats['failures'],
+                'avg_latency_ms': round(stats['total_seconds'] / stats['requests'] * 1000, 1),
+            }
+
+    session = _session
+    if session is not None:
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                entry = hosts.setdefault(pool.host, {})
+                entry.update({
+                    'connections_opened': pool.num_connections,
+                    'pool_requests': pool.num_requests,
+                    'idle_connections': sum(1 for conn in list(pool.pool.queue) if conn) if pool.pool else 0,
+                    'max_connections': pool.pool.maxsize if pool.pool else 0,
+                })
+
+    async_session = _async_session
+    async_stats = None
+    if async_session is not None and not async_session.closed:
+        async_stats = {
+            'in_flight': _async_in_flight,
+            'limit': async_session.connector.limit,
+            'limit_per_host': async_session.connector.limit_per_host,
+        }
+
+    return {
+        'settings': dict(_settings),
+        'dns_cache': _dns_cache.stats() if _dns_cache else None,
+        'async': async_stats,
+        'hosts': hosts,
+    }
+
+
+def close() -> None:
+    """Close the shared session and release pooled connections."""
+    global _session
+    with _session_lock:
+        old_session, _session = _session, None
+    if old_session is not None:
+        old_session.close()
+
+
+async def async_close() -> None:
+    """Close the shared aiohttp session and any sessions retired by ``configure``."""
+    global _async_session
+    sessions = _retired_async_sessions + ([_async_session] if _async_session else [])
+    _retired_async_sessions.clear()
+    _async_session = None
+    for session in sessions:
+        if not session.closed:
+            await session.close()
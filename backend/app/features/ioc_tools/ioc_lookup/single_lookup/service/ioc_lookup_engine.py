@@ -1,14 +1,30 @@
+import asyncio
+import contextvars
+import functools
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import requests
 from sqlalchemy.orm import Session
-from app.core.settings.api_keys.crud.api_keys_settings_crud import get_apikey
+from app.core.settings.api_keys.crud.api_keys_settings_crud import get_apikey_snapshot
 from .service_registry import service_registry
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import (
+    circuit_breaker, lookup_cache, lookup_deadline, rate_limiter, single_flight
+)
 from app.features.ioc_tools.ioc_lookup.single_lookup.service import external_api_clients as service_functions
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import async_external_api_clients as async_service_functions
 
 logger = logging.getLogger(__name__)
 
 
-def lookup_ioc(service_name: str, ioc: str, ioc_type: str, db: Session, **kwargs) -> Dict[str, Any]:
+def lookup_ioc(
+    service_name: str, 
+    ioc: str, 
+    ioc_type: str, 
+    db: Session, 
+    force_refresh: bool = False, 
+    max_wait: Optional[float] = rate_limiter.MAX_WAIT, 
+    **kwargs
+) -> Dict[str, Any]:
     """
     Perform a unified IOC lookup by dispatching to the appropriate service function.
     
@@ -17,6 +33,8 @@ def lookup_ioc(service_name: str, ioc: str, ioc_type: str, db: Session, **kwargs
         ioc: The indicator of compromise value to lookup
         ioc_type: The type of IOC (e.g., 'ipv4', 'domain', 'hash')
         db: Database session for API key retrieval
+        force_refresh: Skip the result cache and query the vendor
+        max_wait: Longest time to queue for a rate limit slot in seconds, None for no limit
         **kwargs: Additional arguments passed to the service function
         
     Returns:
@@ -25,16 +43,401 @@ def lookup_ioc(service_name: str, ioc: str, ioc_type: str, db: Session, **kwargs
     Raises:
         None - All exceptions are caught and returned as error dictionaries
     """
+    result, _ = lookup_ioc_with_meta(
+        service_name, ioc, ioc_type, db, force_refresh=force_refresh, max_wait=max_wait, **kwargs
+    )
+    return result
+
+
+def lookup_ioc_with_meta(
+    service_name: str, 
+    ioc: str, 
+    ioc_type: str, 
+    db: Session, 
+    force_refresh: bool = False, 
+    max_wait: Optional[float] = rate_limiter.MAX_WAIT, 
+    **kwargs
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Perform a unified IOC lookup and report how the result was obtained.
+    
+    Concurrent lookups of the same service and normalized IOC share one vendor call.
+    While the service's circuit is open the lookup fails fast with a 503 error, and
+    a vendor call that outlives the service's deadline fails with a 504 error.
+    Local services answer from disk and are called directly.
+    
+    Args:
+        service_name: The unique identifier for the lookup service
+        ioc: The indicator of compromise value to lookup
+        ioc_type: The type of IOC (e.g., 'ipv4', 'domain', 'hash')
+        db: Database session for API key retrieval
+        force_refresh: Skip the result cache and query the vendor
+        max_wait: Longest time to queue for a rate limit slot in seconds, None for no limit
+        **kwargs: Additional arguments passed to the service function
+        
+    Returns:
+        Tuple of (result, meta) where meta holds the cache status ('hit', 'miss'
+        or 'bypass') and the result's age in seconds
+    """
     logger.info(f"Starting IOC lookup for service={service_name}, ioc_type={ioc_type}")
     
+    service_config, func_args, error = _prepare_lookup(service_name, ioc, ioc_type, db, **kwargs)
+    if error:
+        return error, _new_meta()
+    if service_config.get('local'):
+        return _call_local(service_name, service_config, func_args), _new_meta('bypass')
+
+    cached, meta = _check_cache(service_name, ioc, ioc_type, force_refresh, kwargs)
+    if cached is not None:
+        return cached, meta
+
+    def fetch() -> Dict[str, Any]:
+        logger.debug(f"Calling {service_name} lookup function with args: {list(func_args.keys())}")
+        result = circuit_breaker.check(service_name) or rate_limiter.call(
+            service_name, service_config, lambda: circuit_breaker.call(service_name, lambda: lookup_deadline.call(
+                service_name, service_config, lambda: service_config['func'](**func_args)
+            )), max_wait
+        )
+        if not kwargs:
+            lookup_cache.store_result(service_name, service_config, ioc_type, ioc, result)
+        return result
+
+    try:
+        if kwargs:
+            result = fetch()
+        else:
+            result = single_flight.do(lookup_cache.make_cache_key(service_name, ioc_type, ioc), fetch)
+        logger.info(f"Successfully completed lookup for {service_name}")
+    except Exception as e:
+        return _exception_to_error(service_name, e), meta
+
+    return result, meta
+
+
+async def lookup_ioc_async(
+    service_name: str, 
+    ioc: str, 
+    ioc_type: str, 
+    db: Session, 
+    force_refresh: bool = False, 
+    max_wait: Optional[float] = rate_limiter.MAX_WAIT, 
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    Perform a unified IOC lookup without blocking the event loop.
+    
+    Args:
+        service_name: The unique identifier for the lookup service
+        ioc: The indicator of compromise value to lookup
+        ioc_type: The type of IOC (e.g., 'ipv4', 'domain', 'hash')
+        db: Database session for API key retrieval
+        force_refresh: Skip the result cache and query the vendor
+        max_wait: Longest time to queue for a rate limit slot in seconds, None for no limit
+        **kwargs: Additional arguments passed to the service function
+        
+    Returns:
+        Dict containing the lookup result or error information
+    """
+    result, _ = await lookup_ioc_async_with_meta(
+        service_name, ioc, ioc_type, db, force_refresh=force_refresh, max_wait=max_wait, **kwargs
+    )
+    return result
+
+
+async def lookup_ioc_async_with_meta(
+    service_name: str, 
+    ioc: str, 
+    ioc_type: str, 
+    db: Session, 
+    force_refresh: bool = False, 
+    max_wait: Optional[float] = rate_limiter.MAX_WAIT, 
+    **kwargs
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Perform a unified IOC lookup on the event loop and report how the result was obtained.
+    
+    Uses the service's native async client when the registry provides one and
+    falls back to running the sync client in the default executor otherwise.
+    Concurrent lookups of the same service and normalized IOC share one vendor call.
+    Cache reads and writes run in a worker thread so they do not stall other lookups.
+    
+    Args:
+        service_name: The unique identifier for the lookup service
+        ioc: The indicator of compromise value to lookup
+        ioc_type: The type of IOC (e.g., 'ipv4', 'domain', 'hash')
+        db: Database session for API key retrieval
+        force_refresh: Skip the result cache and query the vendor
+        max_wait: Longest time to queue for a rate limit slot in seconds, None for no limit
+        **kwargs: Additional arguments passed to the service function
+        
+    Returns:
+        Tuple of (result, meta) where meta holds the cache status and the result's age
+    """
+    logger.info(f"Starting async IOC lookup for service={service_name}, ioc_type={ioc_type}")
+    
+    service_config, func_args, error = _prepare_lookup(service_name, ioc, ioc_type, db, **kwargs)
+    if error:
+        return error, _new_meta()
+    if service_config.get('local'):
+        return _call_local(service_name, service_config, func_args), _new_meta('bypass')
+
+    cached, meta = await _check_cache_async(service_name, ioc, ioc_type, force_refresh, kwargs)
+    if cached is not None:
+        return cached, meta
+
+    async def fetch() -> Dict[str, Any]:
+        logger.debug(f"Calling {service_name} lookup function with args: {list(func_args.keys())}")
+        result = circuit_breaker.check(service_name) or await rate_limiter.call_async(
+            service_name, service_config, lambda: circuit_breaker.call_async(service_name, lambda: lookup_deadline.call_async(
+                service_name, service_config, lambda: _invoke_async(service_config, func_args)
+            )), max_wait
+        )
+        if not kwargs:
+            await asyncio.to_thread(lookup_cache.store_result, service_name, service_config, ioc_type, ioc, result)
+        return result
+
+    try:
+        if kwargs:
+            result = await fetch()
+        else:
+            result = await single_flight.do_async(lookup_cache.make_cache_key(service_name, ioc_type, ioc), fetch)
+        logger.info(f"Successfully completed lookup for {service_name}")
+    except Exception as e:
+        return _exception_to_error(service_name, e), meta
+
+    return result, meta
+
+
+async def lookup_ioc_batch_async(
+    service_name: str, 
+    iocs: List[str], 
+    ioc_type: str, 
+    db: Session, 
+    force_refresh: bool = False, 
+    max_wait: Optional[float] = rate_limiter.MAX_WAIT
+) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Look up several IOCs of one type through the service's batch client.
+    
+    Cached IOCs are answered from the cache; the rest are sent in calls of at
+    most the batch's ``max_size`` IOCs, each taking one rate limit slot. The
+    cache is read once for all IOCs and written once per call, in a worker thread.
+    Services without a batch client fall back to one lookup per IOC.
+    
+    Args:
+        service_name: The unique identifier for the lookup service
+        iocs: The IOC values to lookup, all of type ``ioc_type``
+        ioc_type: The type of the IOCs
+        db: Database session for API key retrieval
+        force_refresh: Skip the result cache and query the vendor
+        max_wait: Longest time to queue for a rate limit slot in seconds, None for no limit
+        
+    Returns:
+        Dictionary mapping each IOC to its (result, meta) tuple
+    """
+    service_config = service_registry.get_service(service_name)
+    batch = service_config.get('batch') if service_config else None
+    if not batch:
+        results = await asyncio.gather(*(
+            lookup_ioc_async_with_meta(service_name, ioc, ioc_type, db, force_refresh=force_refresh, max_wait=max_wait)
+            for ioc in iocs
+        ))
+        return dict(zip(iocs, results))
+
+    logger.info(f"Starting batch IOC lookup for service={service_name}, ioc_type={ioc_type}, size={len(iocs)}")
+
+    service_config, func_args, error = _prepare_lookup(service_name, iocs[0], ioc_type, db)
+    if error:
+        return {ioc: (error, _new_meta()) for ioc in iocs}
+    func_args.pop('ioc')
+
+    results = {}
+    misses = []
+    checked = await asyncio.to_thread(
+        lambda: [_check_cache(service_name, ioc, ioc_type, force_refresh, {}) for ioc in iocs]
+    )
+    for ioc, (cached, meta) in zip(iocs, checked):
+        if cached is not None:
+            results[ioc] = (cached, meta)
+        else:
+            misses.append((ioc, meta))
+
+    max_size = max(int(batch.get('max_size', 1)), 1)
+    for start in range(0, len(misses), max_size):
+        chunk = misses[start:start + max_size]
+        chunk_iocs = [ioc.strip() for ioc, _ in chunk]
+        try:
+            logger.debug(f"Calling {service_name} batch function with {len(chunk_iocs)} IOCs")
+            response = circuit_breaker.check(service_name) or await rate_limiter.call_async(
+                service_name, service_config, lambda: circuit_breaker.call_async(service_name, lambda: lookup_deadline.call_async(
+                    service_name, service_config, lambda: batch['func'](iocs=chunk_iocs, **func_args), hedge=False
+                )), max_wait
+            )
+        except Exception as e:
+            response = _exception_to_error(service_name, e)
+
+        if 'error' in response:
+            for ioc, meta in chunk:
+                results[ioc] = (response, meta)
+            continue
+
+        batch_results = response.get('results', {})
+        found = []
+        for (ioc, meta), sent in zip(chunk, chunk_iocs):
+            result = batch_results.get(sent)
+            if result is None:
+                result = {"error": 502, "message": f"'{service_name}' returned no result for this IOC."}
+            else:
+                found.append((ioc, result))
+            results[ioc] = (result, meta)
+        if found:
+            await asyncio.to_thread(lookup_cache.store_results, service_name, service_config, ioc_type, found)
+
+    logger.info(f"Completed batch lookup for {service_name}: {len(misses)} of {len(iocs)} IOCs sent")
+    return results
+
+
+async def _invoke_async(service_config: Dict[str, Any], func_args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Call a service's async client, or its sync client in the default executor.
+    
+    The executor call runs in a copy of the current context so the rate limiter
+    still sees which service the request belongs to.
+    
+    Args:
+        service_config: Service configuration dictionary
+        func_args: Prepared function arguments
+        
+    Returns:
+        The service result
+    """
+    async_func = service_config.get('async_func')
+    if async_func:
+        return await async_func(**func_args)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        None, functools.partial(context.run, service_config['func'], **func_args)
+    )
+
+
+def _call_local(service_name: str, service_config: Dict[str, Any], func_args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Call a local service, which answers from data on disk in microseconds.
+    
+    Caching, rate limiting, the circuit breaker and the deadline only pay off
+    for vendor calls, so the function is called directly, also on the event loop.
+    
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+        func_args: Prepared function arguments
+        
+    Returns:
+        The service result or an error dictionary
+    """
+    try:
+        return service_config['func'](**func_args)
+    except Exception as e:
+        return _exception_to_error(service_name, e)
+
+
+def _new_meta(cache_status: str = 'miss', age: float = 0.0) -> Dict[str, Any]:
+    """
+    Build the metadata dictionary returned alongside a lookup result.
+    
+    Args:
+        cache_status: 'hit', 'miss' or 'bypass'
+        age: Age of the result in seconds
+        
+    Returns:
+        Metadata dictionary
+    """
+    return {'cache': cache_status, 'age': round(age, 1)}
+
+
+def _check_cache(
+    service_name: str, 
+    ioc: str, 
+    ioc_type: str, 
+    force_refresh: bool, 
+    extra_args: Dict[str, Any]
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Look up a cached result unless the caller asked for a fresh one.
+    
+    Lookups with extra service arguments are never served from the cache
+    because the cache key does not cover them.
+    
+    Args:
+        service_name: The unique identifier for the lookup service
+        ioc: The IOC value
+        ioc_type: The IOC type
+        force_refresh: Skip the cache
+        extra_args: Additional service function arguments
+        
+    Returns:
+        Tuple of (cached result or None, metadata)
+    """
+    if force_refresh or extra_args:
+        lookup_cache.record_bypass()
+        return None, _new_meta('bypass')
+
+    cached = lookup_cache.get_cached_result(service_name, ioc_type, ioc)
+    if cached is None:
+        return None, _new_meta('miss')
+
+    result, age = cached
+    logger.info(f"Serving cached {service_name} result (age {age:.0f}s)")
+    return result, _new_meta('hit', age)
+
+
+async def _check_cache_async(
+    service_name: str, 
+    ioc: str, 
+    ioc_type: str, 
+    force_refresh: bool, 
+    extra_args: Dict[str, Any]
+) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Run :func:`_check_cache` in a worker thread, unless the cache is skipped anyway.
+    
+    Returns:
+        Tuple of (cached result or None, metadata)
+    """
+    if force_refresh or extra_args:
+        return _check_cache(service_name, ioc, ioc_type, force_refresh, extra_args)
+    return await asyncio.to_thread(_check_cache, service_name, ioc, ioc_type, force_refresh, extra_args)
+
+
+def _prepare_lookup(
+    service_name: str, 
+    ioc: str, 
+    ioc_type: str, 
+    db: Session, 
+    **kwargs
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Validate a lookup request and build the arguments for the service function.
+    
+    Args:
+        service_name: The unique identifier for the lookup service
+        ioc: The IOC value to lookup
+        ioc_type: The IOC type
+        db: Database session for API key retrieval
+        **kwargs: Additional arguments passed to the service function
+        
+    Returns:
+        Tuple of (service_config, func_args, error); error is None when the lookup can proceed
+    """
     service_config = service_registry.get_service(service_name)
     if not service_config:
         logger.warning(f"Service not found: {service_name}")
-        return {"error": 404, "message": f"Service '{service_name}' not found."}
+        return None, None, {"error": 404, "message": f"Service '{service_name}' not found."}
 
     if ioc_type not in service_config.get('supported_ioc_types', []):
         logger.warning(f"Unsupported IOC type {ioc_type} for service {service_name}")
-        return {
+        return None, None, {
             "error": 400,
             "message": f"Service '{service_name}' does not support IOC type '{ioc_type}'.",
             "supported_types": service_config.get('supported_ioc_types', [])
@@ -43,27 +446,40 @@ def lookup_ioc(service_name: str, ioc: str, ioc_type: str, db: Session, **kwargs
     api_keys = _get_api_keys(service_config, db)
     if api_keys is None and _requires_api_key(service_config):
         logger.error(f"Missing API keys for service: {service_name}")
-        return {"error": 401, "message": f"Required API key(s) for '{service_name}' are missing or inactive."}
+        return None, None, {"error": 401, "message": f"Required API key(s) for '{service_name}' are missing or inactive."}
 
     func_args = _prepare_function_args(service_config, ioc, ioc_type, api_keys, **kwargs)
+    return service_config, func_args, None
 
-    try:
-        logger.debug(f"Calling {service_name} lookup function with args: {list(func_args.keys())}")
-        result = service_config['func'](**func_args)
-        logger.info(f"Successfully completed lookup for {service_name}")
-        return result
-    except Exception as e:
-        logger.error(f"Critical error in {service_name} lookup: {str(e)}", exc_info=True)
-        return {"error": 500, "message": f"An unexpected error occurred in service '{service_name}'."}
+
+def _exception_to_error(service_name: str, exc: Exception) -> Dict[str, Any]:
+    """
+    Convert an exception raised by a service function into an error dictionary.
+    
+    Args:
+        service_name: The unique identifier for the lookup service
+        exc: The raised exception
+        
+    Returns:
+        Error dictionary with an HTTP-like status code
+    """
+    if isinstance(exc, requests.exceptions.Timeout):
+        logger.warning(f"Timeout in {service_name} lookup: {str(exc)}")
+        return {"error": 504, "message": f"Request to '{service_name}' timed out."}
+    if isinstance(exc, requests.exceptions.RequestException):
+        logger.warning(f"Connection error in {service_name} lookup: {str(exc)}")
+        return {"error": 503, "message": f"Could not connect to '{service_name}'."}
+    logger.error(f"Critical error in {service_name} lookup: {str(exc)}", exc_info=exc)
+    return {"error": 500, "message": f"An unexpected error occurred in service '{service_name}'."}
 
 
 def _get_api_keys(service_config: Dict[str, Any], db: Session) -> Optional[Dict[str, str]]:
     """
-    Retrieve required API keys for a service from the database.
+    Retrieve required API keys for a service from the API key snapshot.
     
     Args:
         service_config: Service configuration dictionary
-        db: Database session
+        db: Database session, used if the snapshot has to be loaded
         
     Returns:
         Dictionary of API keys or None if required keys are missing
@@ -75,9 +491,10 @@ def _get_api_keys(service_config: Dict[str, Any], db: Session) -> Optional[Dict[
     if not key_names:
         return {}
 
+    apikeys = get_apikey_snapshot(db)
     keys = {}
     for key_name in key_names:
-        key_data = get_apikey(name=key_name, db=db)
+        key_data = apikeys.get(key_name)
         if not key_data or not key_data.get('is_active'):
             logger.warning(f"Missing or inactive API key: {key_name}")
             return None
@@ -142,6 +559,12 @@ def get_all_service_configs(db: Session) -> List[Dict[str, Any]]:
     """
     Get configuration for all services with their availability status.
     
+    API key and bulk lookup status come from the in-memory API key snapshot,
+    so this costs at most one query however many services are registered.
+    ``circuit`` reports whether the service currently fails fast after repeated
+    failures ('open') so clients can leave it out of new bulk jobs. ``timeout``
+    is the service's deadline in seconds and ``hedge`` whether slow calls are hedged.
+    
     Args:
         db: Database session
         
@@ -166,6 +589,8 @@ def get_all_service_configs(db: Session) -> List[Dict[str, Any]]:
             'supported_ioc_types': config.get('supported_ioc_types', []),
             'is_configured': is_configured,
             'is_bulk_enabled': is_bulk_enabled,
+            'circuit': circuit_breaker.get_state(service_key),
+            **lookup_deadline.get_settings(service_key, config),
         })
     
     logger.debug(f"Retrieved {len(services_with_status)} service configurations")
@@ -178,7 +603,7 @@ def _check_bulk_lookup_enabled(service_config: Dict[str, Any], db: Session) -> b
     
     Args:
         service_config: Service configuration dictionary
-        db: Database session
+        db: Database session, used if the API key snapshot has to be loaded
         
     Returns:
         True if bulk lookup is enabled, False otherwise
@@ -190,9 +615,10 @@ def _check_bulk_lookup_enabled(service_config: Dict[str, Any], db: Session) -> b
     if not key_names:
         return True
 
+    apikeys = get_apikey_snapshot(db)
     bulk_statuses = []
     for key_name in key_names:
-        key_data = get_apikey(name=key_name, db=db)
+        key_data = apikeys.get(key_name)
         if key_data and key_data.get('is_active'):
             bulk_statuses.append(key_data.get('bulk_ioc_lookup', False))
     
@@ -207,7 +633,7 @@ def initialize_service_registry():
     """
     if not service_registry.services:
         logger.info("Initializing service registry")
-        service_registry.register_services(service_functions)
+        service_registry.register_services(service_functions, async_service_functions)
         logger.info(f"Registered {len(service_registry.services)} services")
 
 
@@ -0,0 +1,426 @@
+import io
+import os
+import csv
+import sys
+import gzip
+import socket
+import mmap
+import time
+import struct
+import bisect
+import logging
+import argparse
+import ipaddress
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import http_client
+
+logger = logging.getLogger(__name__)
+
+# The index is compiled from an IP range table such as iptoasn.com's ip2asn-combined.tsv
+# (range start, range end, AS number, country code, AS description; tab- or
+# comma-separated, optionally gzipped) into one file of sorted fixed-width arrays.
+# Lookups binary-search the memory-mapped file: no network, and only the pages
+# they touch are read.
+
+# Compiled range index read by the lookups
+DB_PATH = os.getenv("GEOIP_DB_PATH", "./data/geoip/ip2asn.idx")
+# Range table compiled by refresh(); a URL or a local file path
+SOURCE_URL = os.getenv("GEOIP_SOURCE_URL", "https://iptoasn.com/data/ip2asn-combined.tsv.gz")
+# Seconds between checks whether another process replaced the index file
+RELOAD_CHECK_INTERVAL = float(os.getenv("GEOIP_RELOAD_CHECK_INTERVAL", "60"))
+
+# File layout, all little-endian: header, IPv4 range starts (uint32), IPv4 rows,
+# IPv6 range starts (16-byte big-endian so bytes compare in address order),
+# IPv6 rows, AS name offsets (names + 1 uint32) and the UTF-8 AS name blob.
+_MAGIC = b'OTKGEO01'
+_HEADER = struct.Struct('<8sIIIId')
+_V4_START = struct.Struct('<I')
+_V4_ROW = struct.Struct('<II2sI')
+_V6_ROW = struct.Struct('<16sI2sI')
+_NAME_OFFSET = struct.Struct('<I')
+
+# Rows with AS 0 are unrouted space, not worth an index entry
+_UNROUTED_ASN = 0
+
+
+class _PackedKeys:
+    """Read-only sequence over fixed-width keys in the mapped file, for bisect."""
+
+    def __init__(self, buffer, offset: int, count: int, width: int):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+        self.width = width
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = self.offset + index * self.width
+        return self.buffer[start:start + self.width]
+
+
+class _V4Starts(_PackedKeys):
+    """IPv4 range starts as integers, for hosts where a native uint32 view is not available."""
+
+    def __getitem__(self, index: int) -> int:
+        return _V4_START.unpack_from(self.buffer, self.offset + index * 4)[0]
+
+
+class _GeoIPIndex:
+    """A compiled range index mapped into memory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.v4_count, self.v6_count, self.names_count, names_size, self.built_at = _HEADER.unpack_from(self.mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a GeoIP range index")
+
+        offset = _HEADER.size
+        v4_starts_offset = offset
+        offset += self.v4_count * _V4_START.size
+        self.v4_rows_offset = offset
+        offset += self.v4_count * _V4_ROW.size
+        v6_starts_offset = offset
+        offset += self.v6_count * 16
+        self.v6_rows_offset = offset
+        offset += self.v6_count * _V6_ROW.size
+        self.names_offset = offset
+        self.blob_offset = offset + (self.names_count + 1) * _NAME_OFFSET.size
+        if self.blob_offset + names_size != len(self.mm):
+            raise ValueError(f"{path} is truncated or corrupt")
+
+        # A native uint32 view lets bisect run entirely in C
+        if sys.byteorder == 'little':
+            self.v4_starts = memoryview(self.mm)[v4_starts_offset:self.v4_rows_offset].cast('I')
+        else:
+            self.v4_starts = _V4Starts(self.mm, v4_starts_offset, self.v4_count, _V4_START.size)
+        self.v6_starts = _PackedKeys(self.mm, v6_starts_offset, self.v6_count, 16)
+
+    def _name(self, index: int) -> str:
+        start, end = struct.unpack_from('<II', self.mm, self.names_offset + index * _NAME_OFFSET.size)
+        return self.mm[self.blob_offset + start:self.blob_offset + end].decode('utf-8')
+
+    def find(self, packed: bytes) -> Optional[Tuple[bytes, bytes, int, str, str]]:
+        """
+        Find the range containing an address.
+
+        Args:
+            packed: Address in network byte order, 4 bytes for IPv4 and 16 for IPv6
+
+        Returns:
+            Tuple of (packed range start, packed range end, asn, country, AS name), or None
+        """
+        if len(packed) == 4:
+            key = int.from_bytes(packed, 'big')
+            i = bisect.bisect_right(self.v4_starts, key) - 1
+            if i < 0:
+                return None
+            end, asn, country, name = _V4_ROW.unpack_from(self.mm, self.v4_rows_offset + i * _V4_ROW.size)
+            if key > end:
+                return None
+            start, end = self.v4_starts[i].to_bytes(4, 'big'), end.to_bytes(4, 'big')
+        else:
+            i = bisect.bisect_right(self.v6_starts, packed) - 1
+            if i < 0:
+                return None
+            end, asn, country, name = _V6_ROW.unpack_from(self.mm, self.v6_rows_offset + i * _V6_ROW.size)
+            if packed > end:
+                return None
+            start = self.v6_starts[i]
+        return start, end, asn, country.decode('ascii').strip(), self._name(name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'ipv4_ranges': self.v4_count,
+            'ipv6_ranges': self.v6_count,
+            'as_names': self.names_count,
+            'size_bytes': len(self.mm),
+            'built_at': self.built_at,
+        }
+
+
+_index: Optional[_GeoIPIndex] = None
+_index_lock = threading.Lock()
+_checked_at: Optional[float] = None
+_stats = {'lookups': 0, 'found': 0, 'reloads': 0}
+
+
+def load(path: Optional[str] = None) -> bool:
+    """
+    Map the compiled index, replacing the one in use.
+
+    Lookups still running on the previous mapping finish on it; it is unmapped
+    once the last reference is gone.
+
+    Args:
+        path: Index file, defaults to GEOIP_DB_PATH
+
+    Returns:
+        True if an index is loaded
+    """
+    global _index, _checked_at
+    path = path or DB_PATH
+    with _index_lock:
+        _checked_at = time.monotonic()
+        if not os.path.exists(path):
+            logger.warning(f"GeoIP index {path} not found; run the local_geoip refresh command")
+            return _index is not None
+        try:
+            _index = _GeoIPIndex(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"Could not load GeoIP index {path}: {e}")
+            return _index is not None
+        _stats['reloads'] += 1
+    logger.info(f"Loaded GeoIP index {path}: {_index.v4_count} IPv4 and {_index.v6_count} IPv6 ranges")
+    return True
+
+
+def _get_index() -> Optional[_GeoIPIndex]:
+    """Get the index in use, loading it or picking up a replaced file at most every RELOAD_CHECK_INTERVAL."""
+    global _checked_at
+    index = _index
+    if _checked_at is not None and time.monotonic() - _checked_at < RELOAD_CHECK_INTERVAL:
+        return index
+    try:
+        mtime = os.stat(index.path if index else DB_PATH).st_mtime
+    except OSError:
+        mtime = None
+    if index is None or (mtime is not None and mtime != index.mtime):
+        load(index.path if index else None)
+    else:
+        _checked_at = time.monotonic()
+    return _index
+
+
+def _pack_address(value: str) -> Optional[bytes]:
+    """Get an IP address in network byte order; inet_pton is several times faster than ipaddress."""
+    try:
+        return socket.inet_pton(socket.AF_INET6 if ':' in value else socket.AF_INET, value)
+    except OSError:
+        pass
+    try:
+        # Forms inet_pton rejects, such as scoped IPv6 addresses
+        return ipaddress.ip_address(value).packed
+    except ValueError:
+        return None
+
+
+def _format_address(packed: bytes) -> str:
+    return socket.inet_ntop(socket.AF_INET if len(packed) == 4 else socket.AF_INET6, packed)
+
+
+def lookup_ip(ioc: str) -> Dict[str, Any]:
+    """
+    Look up the ASN and country of an IPv4 or IPv6 address in the local index.
+
+    Args:
+        ioc: IP address
+
+    Returns:
+        Dictionary with the AS number, AS name, country and matching range;
+        ``found`` is False for addresses outside every announced range
+    """
+    index = _get_index()
+    if index is None:
+        return {"error": 503, "message": "Local GeoIP/ASN database is not loaded. Run the local_geoip refresh command."}
+    packed = _pack_address(ioc.strip())
+    if packed is None:
+        return {"error": 400, "message": f"'{ioc}' is not an IP address."}
+
+    match = index.find(packed)
+    _stats['lookups'] += 1
+    if match is None:
+        return {'ip': _format_address(packed), 'found': False, 'asn': None, 'as_name': None, 'country': None, 'range': None}
+    _stats['found'] += 1
+    start, end, asn, country, as_name = match
+    return {
+        'ip': _format_address(packed),
+        'found': True,
+        'asn': asn,
+        'as_name': as_name,
+        'country': country or None,
+        'range': {'start': _format_address(start), 'end': _format_address(end)},
+    }
+
+
+def _read_source(source: str) -> bytes:
+    """Get the raw range table from a URL or a file."""
+    if source.startswith(('http://', 'https://')):
+        response = http_client.get(source, timeout=(10, 300))
+        response.raise_for_status()
+        return response.content
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def parse_ranges(data: bytes) -> Iterator[Tuple[Any, Any, int, str, str]]:
+    """
+    Parse a range table into (start, end, asn, country, AS name) rows.
+
+    Gzipped input is detected by its magic bytes. Header lines, malformed rows
+    and unrouted ranges (AS 0) are skipped.
+
+    Args:
+        data: Raw range table
+
+    Yields:
+        Rows with ipaddress start and end addresses
+    """
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    text = io.StringIO(data.decode('utf-8', errors='replace'))
+    first = text.readline()
+    text.seek(0)
+    reader = csv.reader(text, delimiter='\t' if '\t' in first else ',')
+    for row in reader:
+        if len(row) < 3:
+            continue
+        try:
+            start = ipaddress.ip_address(row[0].strip())
+            end = ipaddress.ip_address(row[1].strip())
+            asn = int(row[2].strip().upper().removeprefix('AS') or 0)
+        except ValueError:
+            continue
+        if asn == _UNROUTED_ASN or start.version != end.version or end < start:
+            continue
+        country = row[3].strip().upper() if len(row) > 3 else ''
+        if len(country) != 2 or not country.isalpha():
+            country = ''
+        yield start, end, asn, country, row[4].strip() if len(row) > 4 else ''
+
+
+def compile_index(rows: Iterable[Tuple[Any, Any, int, str, str]], path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Write a range index file, replacing the old one atomically.
+
+    Ranges overlapping an earlier range are dropped so every address maps to
+    at most one row.
+
+    Args:
+        rows: (start, end, asn, country, AS name) rows as yielded by :func:`parse_ranges`
+        path: Index file, defaults to GEOIP_DB_PATH
+
+    Returns:
+        Dictionary with the path and the number of ranges written and dropped
+    """
+    path = path or DB_PATH
+    families: Dict[int, List[Tuple[Any, Any, int, str, str]]] = {4: [], 6: []}
+    for row in rows:
+        families[row[0].version].append(row)
+
+    names: Dict[str, int] = {}
+    sections = {}
+    dropped = 0
+    for version, ranges in families.items():
+        ranges.sort(key=lambda row: row[0])
+        starts, table = bytearray(), bytearray()
+        previous_end = None
+        for start, end, asn, country, name in ranges:
+            if previous_end is not None and start <= previous_end:
+                dropped += 1
+                continue
+            previous_end = end
+            name_index = names.setdefault(name, len(names))
+            country_code = (country or '  ').encode('ascii')
+            if version == 4:
+                starts += _V4_START.pack(int(start))
+                table += _V4_ROW.pack(int(end), asn, country_code, name_index)
+            else:
+                starts += start.packed
+                table += _V6_ROW.pack(end.packed, asn, country_code, name_index)
+        sections[version] = (starts, table)
+
+    v4_count = len(sections[4][0]) // _V4_START.size
+    v6_count = len(sections[6][0]) // 16
+    offsets, blob = bytearray(), bytearray()
+    for name in names:
+        offsets += _NAME_OFFSET.pack(len(blob))
+        blob += name.encode('utf-8')
+    offsets += _NAME_OFFSET.pack(len(blob))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, v4_count, v6_count, len(names), len(blob), time.time()))
+        for version in (4, 6):
+            f.write(sections[version][0])
+            f.write(sections[version][1])
+        f.write(offsets)
+        f.write(blob)
+    os.replace(temp_path, path)
+
+    logger.info(f"Compiled GeoIP index {path}: {v4_count} IPv4 and {v6_count} IPv6 ranges, {dropped} overlapping dropped")
+    return {'path': path, 'ipv4_ranges': v4_count, 'ipv6_ranges': v6_count, 'dropped': dropped}
+
+
+def refresh(source: Optional[str] = None, path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Download or read a range table, compile it and load the new index.
+
+    Args:
+        source: URL or file of the range table, defaults to GEOIP_SOURCE_URL
+        path: Index file, defaults to GEOIP_DB_PATH
+
+    Returns:
+        Dictionary with the compile statistics
+
+    Raises:
+        requests.exceptions.RequestException: If the download fails
+        OSError: If the source cannot be read or the index cannot be written
+    """
+    source = source or SOURCE_URL
+    logger.info(f"Refreshing GeoIP index from {source}")
+    result = compile_index(parse_ranges(_read_source(source)), path)
+    load(result['path'])
+    return result
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get the loaded index and lookup counters.
+
+    Returns:
+        Dictionary with the index size and build time, or ``loaded`` False
+    """
+    index = _index
+    return {
+        'loaded': index is not None,
+        **(index.stats() if index else {'path': DB_PATH}),
+        **_stats,
+    }
+
+
+def main() -> int:
+    """
+    Build or query the index from the command line (from the backend directory)::
+
+        python -m app.features.ioc_tools.ioc_lookup.single_lookup.service.local_geoip refresh [--source PATH_OR_URL]
+        python -m app.features.ioc_tools.ioc_lookup.single_lookup.service.local_geoip lookup 1.1.1.1
+    """
+    parser = argparse.ArgumentParser(description="Build and query the local GeoIP/ASN range index")
+    commands = parser.add_subparsers(dest='command', required=True)
+    refresh_parser = commands.add_parser('refresh', help='download or read a range table and compile the index')
+    refresh_parser.add_argument('--source', default=None, help=f'URL or file of the range table (default {SOURCE_URL})')
+    refresh_parser.add_argument('--path', default=None, help=f'index file to write (default {DB_PATH})')
+    lookup_parser = commands.add_parser('lookup', help='look up addresses in the index')
+    lookup_parser.add_argument('ips', nargs='+')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.command == 'refresh':
+        print(refresh(args.source, args.path))
+    else:
+        for ip in args.ips:
+            print(lookup_ip(ip))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.database import SessionLocal
+from app.features.ioc_tools.ioc_lookup.single_lookup.crud.lookup_cache_crud import (
+    get_cache_entry, upsert_cache_entries, delete_expired_cache_entries, delete_cache_entries
+)
+from app.features.ioc_tools.ioc_lookup.single_lookup.service.service_registry import (
+    DEFAULT_CACHE_TTL, DEFAULT_NEGATIVE_CACHE_TTL
+)
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.ioc_utils import normalize_ioc
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.payload_codec import decode_payload, encode_payload
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("IOC_LOOKUP_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+# Results written to the cache in one transaction
+WRITE_BATCH_SIZE = int(os.getenv("IOC_LOOKUP_CACHE_WRITE_BATCH_SIZE", "100"))
+# Longest time in seconds a stored result waits before it is written
+WRITE_INTERVAL = float(os.getenv("IOC_LOOKUP_CACHE_WRITE_INTERVAL", "1"))
+
+# Vendor answers that mean "we know nothing about this indicator" rather than an error
+NOT_FOUND_QUERY_STATUSES = {'hash_not_found', 'no_result', 'no_results', 'not_found', 'ioc_not_found'}
+NOT_FOUND_MESSAGES = {'Not found in any breaches.'}
+
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'negative_stores': 0, 'bypasses': 0}
+_stats_lock = threading.Lock()
+
+# Entries stored but not written yet, by cache key; reads find them here until they are committed
+_pending: Dict[str, Dict[str, Any]] = {}
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flush_timer: Optional[threading.Timer] = None
+
+
+def make_cache_key(service_name: str, ioc_type: str, ioc: str) -> str:
+    """
+    Build the cache key for a lookup.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        ioc_type: The IOC type
+        ioc: The IOC value (normalized here)
+
+    Returns:
+        Cache key string
+    """
+    return f"{service_name}|{ioc_type}|{normalize_ioc(ioc, ioc_type)}"
+
+
+def is_not_found(result: Dict[str, Any]) -> bool:
+    """
+    Check whether a result is a vendor "not found" answer.
+
+    Args:
+        result: Lookup result dictionary
+
+    Returns:
+        True if the vendor reported no data for the indicator
+    """
+    if not isinstance(result, dict):
+        return False
+    if result.get('error') == 404:
+        return True
+    if result.get('query_status') in NOT_FOUND_QUERY_STATUSES:
+        return True
+    return 'error' not in result and result.get('message') in NOT_FOUND_MESSAGES
+
+
+def _is_cacheable(result: Dict[str, Any]) -> bool:
+    """Only successful answers and "not found" answers are cached, never transient errors."""
+    return isinstance(result, dict) and ('error' not in result or is_not_found(result))
+
+
+def _record(stat: str) -> None:
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def get_cached_result(service_name: str, ioc_type: str, ioc: str) -> Optional[Tuple[Dict[str, Any], float]]:
+    """
+    Retrieve a cached lookup result.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        ioc_type: The IOC type
+        ioc: The IOC value
+
+    Returns:
+        Tuple of (result, age in seconds) or None on a miss
+    """
+    if not CACHE_ENABLED:
+        return None
+
+    cache_key = make_cache_key(service_name, ioc_type, ioc)
+    with _pending_lock:
+        pending = _pending.get(cache_key)
+    try:
+        if pending is not None and pending['expires_at'] > datetime.utcnow():
+            result = decode_payload(pending['result'])
+            age = (datetime.utcnow() - pending['created_at']).total_seconds()
+        else:
+            with SessionLocal() as db:
+                entry = get_cache_entry(db, cache_key)
+                if entry is None:
+                    _record('misses')
+                    return None
+                result = decode_payload(entry.result)
+                age = (datetime.utcnow() - entry.created_at).total_seconds()
+    except Exception as e:
+        logger.error(f"Failed to read lookup cache for {service_name}: {str(e)}")
+        return None
+
+    _record('hits')
+    logger.debug(f"Cache hit for {cache_key} (age {age:.0f}s)")
+    return result, age
+
+
+def store_result(
+    service_name: str,
+    service_config: Dict[str, Any],
+    ioc_type: str,
+    ioc: str,
+    result: Dict[str, Any]
+) -> bool:
+    """
+    Store a lookup result using the service's TTL.
+
+    "Not found" answers use the shorter negative TTL; errors are not stored.
+    Large results are stored compressed. Results are written in batches of
+    ``WRITE_BATCH_SIZE``, at the latest ``WRITE_INTERVAL`` seconds after
+    they were stored, and are found by reads in the meantime.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+        ioc_type: The IOC type
+        ioc: The IOC value
+        result: Lookup result dictionary
+
+    Returns:
+        True if the result was stored, False otherwise
+    """
+    return store_results(service_name, service_config, ioc_type, [(ioc, result)]) == 1
+
+
+def store_results(
+    service_name: str,
+    service_config: Dict[str, Any],
+    ioc_type: str,
+    results: List[Tuple[str, Dict[str, Any]]]
+) -> int:
+    """
+    Store the lookup results of several IOCs of one service and type, like :func:`store_result`.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+        ioc_type: The IOC type
+        results: List of (IOC value, lookup result) tuples
+
+    Returns:
+        Number of results stored
+    """
+    if not CACHE_ENABLED:
+        return 0
+
+    now = datetime.utcnow()
+    entries = []
+    for ioc, result in results:
+        if not _is_cacheable(result):
+            continue
+        is_negative = is_not_found(result)
+        ttl = (
+            service_config.get('negative_cache_ttl', DEFAULT_NEGATIVE_CACHE_TTL)
+            if is_negative
+            else service_config.get('cache_ttl', DEFAULT_CACHE_TTL)
+        )
+        if not ttl:
+            continue
+        try:
+            payload = encode_payload(result)
+        except Exception as e:
+            logger.error(f"Failed to encode lookup result of {service_name} for the cache: {str(e)}")
+            continue
+        entries.append({
+            'cache_key': make_cache_key(service_name, ioc_type, ioc),
+            'service': service_name,
+            'ioc_type': ioc_type,
+            'ioc': normalize_ioc(ioc, ioc_type),
+            'result': payload,
+            'is_negative': is_negative,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=ttl)
+        })
+        _record('negative_stores' if is_negative else 'stores')
+
+    if entries:
+        _queue_writes(entries)
+    return len(entries)
+
+
+def _queue_writes(entries: List[Dict[str, Any]]) -> None:
+    """Add entries to the pending writes, writing them at once when a batch is full."""
+    global _flush_timer
+    with _pending_lock:
+        for entry in entries:
+            _pending[entry['cache_key']] = entry
+        full = len(_pending) >= max(WRITE_BATCH_SIZE, 1)
+        if not full and _flush_timer is None:
+            _flush_timer = threading.Timer(WRITE_INTERVAL, flush)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+    if full:
+        flush()
+
+
+def flush() -> int:
+    """
+    Write the pending cache entries in one transaction.
+
+    Returns:
+        Number of entries written
+    """
+    global _flush_timer
+    with _flush_lock:
+        with _pending_lock:
+            if _flush_timer is not None:
+                _flush_timer.cancel()
+                _flush_timer = None
+            entries = list(_pending.values())
+        if not entries:
+            return 0
+        try:
+            with SessionLocal() as db:
+                upsert_cache_entries(db, entries)
+            logger.debug(f"Wrote {len(entries)} lookup cache entries")
+        except Exception as e:
+            logger.error(f"Failed to write {len(entries)} lookup cache entries: {str(e)}")
+        with _pending_lock:
+            for entry in entries:
+                # An entry stored again while this write ran waits for the next one
+                if _pending.get(entry['cache_key']) is entry:
+                    del _pending[entry['cache_key']]
+    return len(entries)
+
+
+def record_bypass() -> None:
+    """Count a lookup that skipped the cache because of ``force_refresh``."""
+    _record('bypasses')
+
+
+def purge_expired() -> int:
+    """
+    Delete expired cache entries.
+
+    Returns:
+        Number of deleted entries
+    """
+    with SessionLocal() as db:
+        deleted = delete_expired_cache_entries(db)
+    if deleted:
+        logger.info(f"Purged {deleted} expired IOC lookup cache entries")
+    return deleted
+
+
+def clear(service_name: Optional[str] = None) -> int:
+    """
+    Delete all cache entries, or only those of one service.
+
+    Args:
+        service_name: Optional service to clear
+
+    Returns:
+        Number of deleted entries
+    """
+    with _pending_lock:
+        for cache_key in [key for key, entry in _pending.items() if not service_name or entry['service'] == service_name]:
+            del _pending[cache_key]
+    with SessionLocal() as db:
+        return delete_cache_entries(db, service_name)
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get cache counters.
+
+    Returns:
+        Dictionary with hit/miss/store counters and the hit ratio
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['enabled'] = CACHE_ENABLED
+    stats['pending_writes'] = len(_pending)
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+    return stats
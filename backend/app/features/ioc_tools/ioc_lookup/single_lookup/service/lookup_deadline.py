@@ -0,0 +1,302 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import http_client, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Seconds a vendor call may take before the lookup fails with 504
+DEFAULT_TIMEOUT = float(os.getenv("IOC_LOOKUP_TIMEOUT", "30"))
+# Threads running synchronous vendor calls under a deadline; waiting for one does not count against it
+MAX_WORKERS = int(os.getenv("IOC_LOOKUP_MAX_WORKERS", "32"))
+# Set to 0 to never send hedged requests, whatever the registry says
+HEDGING_ENABLED = os.getenv("IOC_LOOKUP_HEDGING", "1") not in ('0', 'false', 'False')
+# Shortest delay in seconds before a hedged request is sent
+HEDGE_MIN_DELAY = float(os.getenv("IOC_LOOKUP_HEDGE_MIN_DELAY", "0.5"))
+# Latency samples a service needs before its p95 is trusted for hedging
+HEDGE_MIN_SAMPLES = 20
+# Latest call durations kept per service
+LATENCY_WINDOW = 200
+
+_executor = ThreadPoolExecutor(max_workers=max(MAX_WORKERS, 1), thread_name_prefix='ioc-lookup')
+
+
+class _Latency:
+    """Recent call durations and deadline counters of one service."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {'calls': 0, 'timed_out': 0, 'hedged': 0, 'hedge_won': 0}
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.samples.append(seconds)
+            self.stats['calls'] += 1
+
+    def count(self, counter: str) -> None:
+        with self.lock:
+            self.stats[counter] += 1
+
+    def p95(self) -> Optional[float]:
+        """95th percentile of the recent durations, or None while there are too few samples."""
+        with self.lock:
+            if len(self.samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        with self.lock:
+            return {'samples': len(self.samples), 'p95': round(p95, 3) if p95 is not None else None, **self.stats}
+
+
+_latencies: Dict[str, _Latency] = {}
+_latencies_lock = threading.Lock()
+
+
+def _get_latency(service_name: str) -> _Latency:
+    with _latencies_lock:
+        latency = _latencies.get(service_name)
+        if latency is None:
+            latency = _latencies[service_name] = _Latency()
+        return latency
+
+
+def get_timeout(service_name: str, service_config: Dict[str, Any]) -> float:
+    """
+    Get a service's deadline, overridable with e.g. ``IOC_LOOKUP_TIMEOUT_NISTNVD``.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+
+    Returns:
+        Deadline in seconds
+    """
+    override = os.getenv(f"IOC_LOOKUP_TIMEOUT_{service_name.upper()}")
+    if override:
+        return float(override)
+    return float(service_config.get('timeout') or DEFAULT_TIMEOUT)
+
+
+def get_settings(service_name: str, service_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the deadline settings of a service as shown by the service config endpoints.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+
+    Returns:
+        Dictionary with the deadline in seconds and whether hedging is enabled
+    """
+    return {
+        'timeout': get_timeout(service_name, service_config),
+        'hedge': HEDGING_ENABLED and bool(service_config.get('hedge')),
+    }
+
+
+def _hedge_delay(service_name: str, service_config: Dict[str, Any], timeout: float) -> Optional[float]:
+    """
+    Get the delay after which a second request is sent, or None if the call is not hedged.
+
+    Only services marked ``hedge`` in the registry are hedged, and only once
+    enough of their calls were observed to know their p95 latency.
+    """
+    if not HEDGING_ENABLED or not service_config.get('hedge'):
+        return None
+    p95 = _get_latency(service_name).p95()
+    if p95 is None:
+        return None
+    delay = max(p95, HEDGE_MIN_DELAY)
+    return delay if delay < timeout else None
+
+
+def _timeout_error(service_name: str, timeout: float) -> Dict[str, Any]:
+    logger.warning(f"{service_name} lookup did not finish within {timeout:.0f}s")
+    return {"error": 504, "message": f"'{service_name}' did not answer within {timeout:.0f}s."}
+
+
+def _failed(future: Any) -> bool:
+    """Whether a finished call raised or returned a server error, so the other request may still do better."""
+    if future.cancelled() or future.exception() is not None:
+        return True
+    result = future.result()
+    error = result.get('error') if isinstance(result, dict) else None
+    return isinstance(error, int) and error >= 500
+
+
+def _first_success(done: set, primary: Any) -> Any:
+    """Pick a successful call of the finished ones, the primary request first; None if all failed."""
+    return next((future for future in sorted(done, key=lambda f: f is not primary) if not _failed(future)), None)
+
+
+def _run_until(
+    deadline: Optional[float],
+    timeout: float,
+    began: threading.Event,
+    invoke: Callable[[], Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Run a vendor call on a worker thread, its requests timing out by the deadline, or ``timeout`` from now."""
+    http_client.set_deadline(deadline if deadline is not None else time.monotonic() + timeout)
+    began.set()
+    return invoke()
+
+
+def call(
+    service_name: str,
+    service_config: Dict[str, Any],
+    invoke: Callable[[], Dict[str, Any]],
+    hedge: bool = True
+) -> Dict[str, Any]:
+    """
+    Run a vendor call with the service's deadline, hedging it if the service allows it.
+
+    The call runs on a worker thread so the caller is released when the
+    deadline passes even if the connection hangs. The deadline starts when a
+    worker picks the call up, and the requests of the call time out by then,
+    so a worker is not held much longer than the deadline. If the first
+    request to finish fails while a hedged one is still running, the hedged
+    one is waited for.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+        invoke: Callable performing the vendor call
+        hedge: Allow a hedged second request
+
+    Returns:
+        The service result, or a 504 error dictionary if the deadline passed
+
+    Raises:
+        Exception: Whatever the finished call raised
+    """
+    timeout = get_timeout(service_name, service_config)
+    latency = _get_latency(service_name)
+    began = threading.Event()
+    primary = _executor.submit(contextvars.copy_context().run, _run_until, None, timeout, began, invoke)
+    began.wait()
+    started = time.monotonic()
+    deadline = started + timeout
+    futures = {primary: started}
+
+    done = set()
+    delay = _hedge_delay(service_name, service_config, timeout) if hedge else None
+    if delay is not None:
+        done, _ = wait(futures, timeout=delay)
+        if not done and rate_limiter.try_acquire(service_name, service_config):
+            logger.debug(f"Hedging {service_name} lookup after {delay:.2f}s")
+            latency.count('hedged')
+            hedged = _executor.submit(
+                contextvars.copy_context().run, _run_until, deadline, timeout, threading.Event(), invoke
+            )
+            futures[hedged] = time.monotonic()
+
+    finished = list(done)
+    winner = _first_success(done, primary)
+    pending = set(futures) - done
+    while winner is None and pending:
+        done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0.0), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        finished.extend(done)
+        winner = _first_success(done, primary)
+
+    if winner is None and not finished:
+        for future in futures:
+            future.cancel()
+        latency.record(timeout)
+        latency.count('timed_out')
+        return _timeout_error(service_name, timeout)
+
+    winner = winner or (primary if primary in finished else finished[0])
+    latency.record(time.monotonic() - futures[winner])
+    if winner is not primary:
+        latency.count('hedge_won')
+    return winner.result()
+
+
+async def call_async(
+    service_name: str,
+    service_config: Dict[str, Any],
+    invoke: Callable[[], Awaitable[Dict[str, Any]]],
+    hedge: bool = True
+) -> Dict[str, Any]:
+    """
+    Async version of :func:`call`; the losing or overdue request is cancelled.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+        invoke: Coroutine function performing the vendor call
+        hedge: Allow a hedged second request
+
+    Returns:
+        The service result, or a 504 error dictionary if the deadline passed
+    """
+    timeout = get_timeout(service_name, service_config)
+    latency = _get_latency(service_name)
+    started = time.monotonic()
+    deadline = started + timeout
+    primary = asyncio.ensure_future(invoke())
+    tasks = {primary: started}
+
+    try:
+        done = set()
+        delay = _hedge_delay(service_name, service_config, timeout) if hedge else None
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and rate_limiter.try_acquire(service_name, service_config):
+                logger.debug(f"Hedging {service_name} lookup after {delay:.2f}s")
+                latency.count('hedged')
+                tasks[asyncio.ensure_future(invoke())] = time.monotonic()
+
+        finished = list(done)
+        winner = _first_success(done, primary)
+        pending = set(tasks) - done
+        while winner is None and pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(deadline - time.monotonic(), 0.0), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            finished.extend(done)
+            winner = _first_success(done, primary)
+
+        if winner is None and not finished:
+            latency.record(timeout)
+            latency.count('timed_out')
+            return _timeout_error(service_name, timeout)
+
+        winner = winner or (primary if primary in finished else finished[0])
+        latency.record(time.monotonic() - tasks[winner])
+        if winner is not primary:
+            latency.count('hedge_won')
+        return winner.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            else:
+                # Retrieve the loser's outcome so a failure is not reported as unhandled
+                task.cancelled() or task.exception()
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get latency percentiles, timeouts and hedging counters of every service seen so far.
+
+    Returns:
+        Dictionary mapping service names to their deadline statistics
+    """
+    with _latencies_lock:
+        latencies = dict(_latencies)
+    return {name: latency.snapshot() for name, latency in sorted(latencies.items())}
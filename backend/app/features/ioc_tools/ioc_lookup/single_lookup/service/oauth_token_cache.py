@@ -0,0 +1,309 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Tokens are refreshed this many seconds before the vendor's expiry
+REFRESH_AHEAD = float(os.getenv("OAUTH_TOKEN_REFRESH_AHEAD", "60"))
+# Lifetime assumed when the token response carries no expires_in
+DEFAULT_EXPIRES_IN = float(os.getenv("OAUTH_TOKEN_DEFAULT_EXPIRES_IN", "1800"))
+
+TokenKey = Tuple[str, str, str]
+
+
+@dataclass
+class _CachedToken:
+    access_token: str
+    refresh_at: float
+    expires_at: float
+
+
+_tokens: Dict[TokenKey, _CachedToken] = {}
+_tokens_lock = threading.Lock()
+_sync_locks: Dict[TokenKey, threading.Lock] = {}
+_async_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[TokenKey, asyncio.Lock]]" = (
+    weakref.WeakKeyDictionary()
+)
+_stats = {'hits': 0, 'refreshes': 0, 'failures': 0, 'invalidations': 0}
+
+
+def _make_key(token_url: str, client_id: str, client_secret: str) -> TokenKey:
+    """Cache key for a set of client credentials; the secret is only kept as a hash."""
+    secret_hash = hashlib.sha256(client_secret.encode('utf-8')).hexdigest()
+    return token_url, client_id, secret_hash
+
+
+def _valid_token(key: TokenKey, fresh: bool) -> Optional[str]:
+    """
+    Return the cached token for a key.
+
+    Args:
+        key: Token cache key
+        fresh: Only return tokens that are not yet due for refresh
+
+    Returns:
+        The access token or None
+    """
+    entry = _tokens.get(key)
+    if entry is None:
+        return None
+    now = time.monotonic()
+    if now < (entry.refresh_at if fresh else entry.expires_at):
+        return entry.access_token
+    return None
+
+
+def _store(key: TokenKey, service_label: str, token_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cache a token response and drop tokens of older credentials for the same endpoint.
+
+    Args:
+        key: Token cache key
+        service_label: Service name used in error messages
+        token_data: Parsed token endpoint response
+
+    Returns:
+        The token response, or an error dictionary if it holds no access token
+    """
+    if 'error' in token_data:
+        _stats['failures'] += 1
+        return token_data
+
+    access_token = token_data.get('access_token')
+    if not access_token:
+        _stats['failures'] += 1
+        return {"error": 500, "message": f"Failed to retrieve {service_label} access token."}
+
+    try:
+        expires_in = float(token_data.get('expires_in') or DEFAULT_EXPIRES_IN)
+    except (TypeError, ValueError):
+        expires_in = DEFAULT_EXPIRES_IN
+    now = time.monotonic()
+    entry = _CachedToken(
+        access_token=access_token,
+        refresh_at=now + max(expires_in - REFRESH_AHEAD, expires_in / 2),
+        expires_at=now + expires_in
+    )
+
+    with _tokens_lock:
+        stale = [k for k in _tokens if k[0] == key[0] and k != key]
+        for stale_key in stale:
+            del _tokens[stale_key]
+        _tokens[key] = entry
+        _stats['refreshes'] += 1
+    if stale:
+        logger.info(f"Credentials for {service_label} changed, dropped {len(stale)} cached token(s)")
+    logger.debug(f"Cached {service_label} access token for {expires_in:.0f}s")
+    return token_data
+
+
+def _sync_lock(key: TokenKey) -> threading.Lock:
+    with _tokens_lock:
+        return _sync_locks.setdefault(key, threading.Lock())
+
+
+def _async_lock(key: TokenKey) -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    with _tokens_lock:
+        locks = _async_locks.setdefault(loop, {})
+        return locks.setdefault(key, asyncio.Lock())
+
+
+def get_token(
+    service_label: str,
+    token_url: str,
+    client_id: str,
+    client_secret: str,
+    fetch_token: Callable[[], Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Get an access token for client credentials, fetching one only when needed.
+
+    Only one refresh per credentials runs at a time. While a token is due for
+    refresh but not yet expired, other callers keep using it instead of waiting.
+
+    Args:
+        service_label: Service name used in error messages
+        token_url: Token endpoint URL
+        client_id: OAuth client ID
+        client_secret: OAuth client secret
+        fetch_token: Callable requesting a new token, returning the parsed response
+
+    Returns:
+        Dictionary with an ``access_token`` or error information
+    """
+    key = _make_key(token_url, client_id, client_secret)
+    token = _valid_token(key, fresh=True)
+    if token:
+        _stats['hits'] += 1
+        return {'access_token': token}
+
+    lock = _sync_lock(key)
+    still_valid = _valid_token(key, fresh=False)
+    if still_valid and not lock.acquire(blocking=False):
+        _stats['hits'] += 1
+        return {'access_token': still_valid}
+    if not still_valid:
+        lock.acquire()
+    try:
+        token = _valid_token(key, fresh=True)
+        if token:
+            _stats['hits'] += 1
+            return {'access_token': token}
+        result = _store(key, service_label, fetch_token())
+        if 'error' in result and still_valid:
+            logger.warning(f"{service_label} token refresh failed, using current token until it expires")
+            return {'access_token': still_valid}
+        return result
+    finally:
+        lock.release()
+
+
+async def get_token_async(
+    service_label: str,
+    token_url: str,
+    client_id: str,
+    client_secret: str,
+    fetch_token: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    Async version of :func:`get_token`.
+
+    Args:
+        service_label: Service name used in error messages
+        token_url: Token endpoint URL
+        client_id: OAuth client ID
+        client_secret: OAuth client secret
+        fetch_token: Coroutine function requesting a new token
+
+    Returns:
+        Dictionary with an ``access_token`` or error information
+    """
+    key = _make_key(token_url, client_id, client_secret)
+    token = _valid_token(key, fresh=True)
+    if token:
+        _stats['hits'] += 1
+        return {'access_token': token}
+
+    lock = _async_lock(key)
+    still_valid = _valid_token(key, fresh=False)
+    if still_valid and lock.locked():
+        _stats['hits'] += 1
+        return {'access_token': still_valid}
+    async with lock:
+        token = _valid_token(key, fresh=True)
+        if token:
+            _stats['hits'] += 1
+            return {'access_token': token}
+        result = _store(key, service_label, await fetch_token())
+        if 'error' in result and still_valid:
+            logger.warning(f"{service_label} token refresh failed, using current token until it expires")
+            return {'access_token': still_valid}
+        return result
+
+
+def invalidate(token_url: str, client_id: str, client_secret: str) -> None:
+    """
+    Drop the cached token for client credentials, e.g. after the API rejected it.
+
+    Args:
+        token_url: Token endpoint URL
+        client_id: OAuth client ID
+        client_secret: OAuth client secret
+    """
+    with _tokens_lock:
+        if _tokens.pop(_make_key(token_url, client_id, client_secret), None):
+            _stats['invalidations'] += 1
+
+
+def send_with_token(
+    service_label: str,
+    token_url: str,
+    client_id: str,
+    client_secret: str,
+    fetch_token: Callable[[], Dict[str, Any]],
+    send: Callable[[str], requests.Response]
+) -> Union[requests.Response, Dict[str, Any]]:
+    """
+    Send an authorized request, fetching a new token once if the cached one is rejected.
+
+    Args:
+        service_label: Service name used in error messages
+        token_url: Token endpoint URL
+        client_id: OAuth client ID
+        client_secret: OAuth client secret
+        fetch_token: Callable requesting a new token
+        send: Callable sending the request with the given access token
+
+    Returns:
+        The HTTP response, or an error dictionary if no token could be obtained
+    """
+    for attempt in range(2):
+        token_data = get_token(service_label, token_url, client_id, client_secret, fetch_token)
+        if 'error' in token_data:
+            return token_data
+        response = send(token_data['access_token'])
+        if response.status_code != 401 or attempt:
+            return response
+        logger.info(f"{service_label} rejected the cached access token, fetching a new one")
+        invalidate(token_url, client_id, client_secret)
+    return response
+
+
+async def send_with_token_async(
+    service_label: str,
+    token_url: str,
+    client_id: str,
+    client_secret: str,
+    fetch_token: Callable[[], Awaitable[Dict[str, Any]]],
+    send: Callable[[str], Awaitable[requests.Response]]
+) -> Union[requests.Response, Dict[str, Any]]:
+    """
+    Async version of :func:`send_with_token`.
+
+    Args:
+        service_label: Service name used in error messages
+        token_url: Token endpoint URL
+        client_id: OAuth client ID
+        client_secret: OAuth client secret
+        fetch_token: Coroutine function requesting a new token
+        send: Coroutine function sending the request with the given access token
+
+    Returns:
+        The HTTP response, or an error dictionary if no token could be obtained
+    """
+    for attempt in range(2):
+        token_data = await get_token_async(service_label, token_url, client_id, client_secret, fetch_token)
+        if 'error' in token_data:
+            return token_data
+        response = await send(token_data['access_token'])
+        if response.status_code != 401 or attempt:
+            return response
+        logger.info(f"{service_label} rejected the cached access token, fetching a new one")
+        invalidate(token_url, client_id, client_secret)
+    return response
+
+
+def clear() -> None:
+    """Drop all cached tokens."""
+    with _tokens_lock:
+        _tokens.clear()
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get token cache counters.
+
+    Returns:
+        Dictionary with hit/refresh counters and the number of cached tokens
+    """
+    with _tokens_lock:
+        return {**_stats, 'cached_tokens': len(_tokens)}
@@ -0,0 +1,409 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import requests
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import http_client
+from app.features.ioc_tools.ioc_lookup.single_lookup.service.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+# Longest time an interactive lookup waits for a slot before failing with 429
+MAX_WAIT = float(os.getenv("IOC_RATE_LIMIT_MAX_WAIT", "60"))
+# Longest time a queued (bulk) lookup waits for a slot
+MAX_QUEUE_WAIT = float(os.getenv("IOC_RATE_LIMIT_MAX_QUEUE_WAIT", str(3 * 60 * 60)))
+# How often a lookup answered with 429 is re-queued before the error is returned
+MAX_RATE_LIMIT_RETRIES = int(os.getenv("IOC_RATE_LIMIT_MAX_RETRIES", "3"))
+# Pause applied after a 429 that carries neither Retry-After nor X-RateLimit-Reset
+DEFAULT_RETRY_AFTER = float(os.getenv("IOC_RATE_LIMIT_DEFAULT_RETRY_AFTER", "30"))
+
+_buckets: Dict[str, "_TokenBucket"] = {}
+_buckets_lock = threading.Lock()
+
+# Service whose vendor call is running in the current thread or task
+_current_service: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    'ioc_rate_limit_service', default=None
+)
+
+
+class _TokenBucket:
+    """
+    Token bucket for one service, kept in its GCRA form.
+
+    Every caller reserves the next free slot under the lock and then sleeps
+    until that slot, so waiting lookups are served in arrival order without a
+    separate queue structure.
+    """
+
+    def __init__(self, per_second: Optional[float] = None, burst: int = 1, per_day: Optional[int] = None):
+        self.per_second = per_second
+        self.burst = max(int(burst), 1)
+        self.per_day = per_day
+        self.lock = threading.Lock()
+        self.tat = 0.0
+        self.blocked_until = 0.0
+        self.day = _utc_day()
+        self.day_used = 0
+        self.stats = {'granted': 0, 'delayed': 0, 'rejected': 0, 'throttled': 0, 'waited_seconds': 0.0}
+
+    def reserve(self, max_wait: Optional[float], count_rejection: bool = True) -> Tuple[Optional[float], Optional[str]]:
+        """
+        Reserve a request slot.
+
+        Args:
+            max_wait: Longest acceptable wait in seconds, None for no limit
+            count_rejection: Count a refused reservation in the ``rejected`` counter
+
+        Returns:
+            Tuple of (seconds to wait, None) or (None, reason) when no slot is available
+        """
+        with self.lock:
+            now = time.monotonic()
+            today = _utc_day()
+            if today != self.day:
+                self.day, self.day_used = today, 0
+
+            if self.per_day is not None and self.day_used >= self.per_day:
+                if count_rejection:
+                    self.stats['rejected'] += 1
+                return None, 'daily'
+
+            start = max(now, self.blocked_until)
+            interval = 1.0 / self.per_second if self.per_second else 0.0
+            if interval:
+                start = max(start, self.tat - (self.burst - 1) * interval)
+
+            wait = start - now
+            if max_wait is not None and wait > max_wait:
+                if count_rejection:
+                    self.stats['rejected'] += 1
+                return None, 'queue'
+
+            if interval:
+                self.tat = max(self.tat, start) + interval
+            self.day_used += 1
+            self.stats['granted'] += 1
+            if wait > 0:
+                self.stats['delayed'] += 1
+                self.stats['waited_seconds'] += wait
+            return wait, None
+
+    def block(self, seconds: float) -> None:
+        """Hold back all requests for the given number of seconds."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.stats['throttled'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current limits, usage and counters of the bucket."""
+        with self.lock:
+            now = time.monotonic()
+            stats = dict(self.stats)
+            stats['waited_seconds'] = round(stats['waited_seconds'], 1)
+            return {
+                'per_second': self.per_second,
+                'burst': self.burst,
+                'per_day': self.per_day,
+                'used_today': self.day_used if self.day == _utc_day() else 0,
+                'blocked_for': round(max(self.blocked_until - now, 0.0), 1),
+                'queued_for': round(max(self.tat - now, 0.0), 1) if self.per_second else 0.0,
+                **stats,
+            }
+
+
+def _utc_day() -> str:
+    """Vendor daily quotas reset at midnight UTC."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+def _env_limits(service_name: str) -> Dict[str, float]:
+    """
+    Read limit overrides such as ``IOC_RATE_LIMIT_VIRUSTOTAL_PER_DAY`` from the environment.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+
+    Returns:
+        Dictionary with the overridden limit fields
+    """
+    overrides = {}
+    prefix = f"IOC_RATE_LIMIT_{service_name.upper()}_"
+    for field in ('per_second', 'burst', 'per_day'):
+        value = os.getenv(prefix + field.upper())
+        if value:
+            overrides[field] = float(value)
+    return overrides
+
+
+def _get_bucket(service_name: str, service_config: Optional[Dict[str, Any]] = None) -> _TokenBucket:
+    """
+    Get or create the bucket of a service from its registry ``rate_limit`` entry.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary, looked up in the registry if omitted
+
+    Returns:
+        The service's token bucket
+    """
+    bucket = _buckets.get(service_name)
+    if bucket is not None:
+        return bucket
+    with _buckets_lock:
+        if service_name not in _buckets:
+            service_config = service_config or service_registry.get_service(service_name) or {}
+            limits = dict(service_config.get('rate_limit') or {})
+            limits.update(_env_limits(service_name))
+            per_day = limits.get('per_day')
+            _buckets[service_name] = _TokenBucket(
+                per_second=limits.get('per_second'),
+                burst=int(limits.get('burst', 1)),
+                per_day=int(per_day) if per_day else None
+            )
+        return _buckets[service_name]
+
+
+def configure(service_name: str, **limits) -> Dict[str, Any]:
+    """
+    Change the limits of a service at runtime.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        **limits: Any of per_second, burst and per_day; None removes a limit
+
+    Returns:
+        The service's limits and counters after the change
+
+    Raises:
+        ValueError: If an unknown limit is passed
+    """
+    unknown = set(limits) - {'per_second', 'burst', 'per_day'}
+    if unknown:
+        raise ValueError(f"Unknown rate limit settings: {', '.join(sorted(unknown))}")
+
+    bucket = _get_bucket(service_name)
+    with bucket.lock:
+        if 'per_second' in limits:
+            bucket.per_second = limits['per_second']
+        if 'burst' in limits:
+            bucket.burst = max(int(limits['burst'] or 1), 1)
+        if 'per_day' in limits:
+            bucket.per_day = int(limits['per_day']) if limits['per_day'] else None
+    logger.info(f"Rate limits for {service_name} updated: {limits}")
+    return bucket.snapshot()
+
+
+def _parse_delay(retry_after: Any = None, reset: Any = None) -> Optional[float]:
+    """
+    Turn Retry-After / X-RateLimit-Reset values into a delay in seconds.
+
+    Retry-After is either seconds or an HTTP date. X-RateLimit-Reset is either
+    seconds until the reset or an epoch timestamp, depending on the vendor.
+
+    Args:
+        retry_after: Retry-After header value
+        reset: X-RateLimit-Reset header value
+
+    Returns:
+        Delay in seconds or None if neither value could be parsed
+    """
+    for value in (retry_after, reset):
+        if value in (None, '', 'unknown'):
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            try:
+                number = parsedate_to_datetime(str(value)).timestamp()
+            except (TypeError, ValueError):
+                continue
+        if number > 1_000_000_000:
+            number -= time.time()
+        return max(number, 0.0)
+    return None
+
+
+def _throttle(service_name: str, retry_after: Any = None, reset: Any = None) -> float:
+    """
+    Pause a service after the vendor signalled that its quota is used up.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        retry_after: Retry-After value reported by the vendor
+        reset: X-RateLimit-Reset value reported by the vendor
+
+    Returns:
+        The applied pause in seconds
+    """
+    delay = _parse_delay(retry_after, reset)
+    if delay is None:
+        delay = DEFAULT_RETRY_AFTER
+    _get_bucket(service_name).block(delay)
+    logger.warning(f"Rate limit reached for {service_name}, holding requests for {delay:.0f}s")
+    return delay
+
+
+def _observe_response(response: requests.Response) -> None:
+    """
+    Response hook that pauses a service once the vendor reports no remaining requests.
+
+    Args:
+        response: HTTP response of a vendor call
+    """
+    service_name = _current_service.get()
+    if service_name is None:
+        return
+
+    # 429 answers are handled by call()/call_async() from the parsed error result
+    headers = response.headers
+    if response.status_code != 429 and headers.get('X-RateLimit-Remaining') == '0':
+        _throttle(service_name, None, headers.get('X-RateLimit-Reset'))
+
+
+def _is_rate_limited(result: Any) -> bool:
+    """Check whether a service result is a vendor 429 answer."""
+    return isinstance(result, dict) and bool(result.get('is_rate_limited')) and result.get('error') == 429
+
+
+def _rejection(service_name: str, service_config: Dict[str, Any], reason: str) -> Dict[str, Any]:
+    """
+    Build the error returned when a lookup cannot get a slot.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+        reason: 'daily' when the daily budget is used up, 'queue' when the wait is too long
+
+    Returns:
+        Error dictionary shaped like the vendor 429 errors
+    """
+    name = service_config.get('name', service_name)
+    if reason == 'daily':
+        message = f"{name} daily request budget is used up. Please try again tomorrow."
+    else:
+        message = f"{name} rate limit exceeded. Please try again later."
+    return {
+        "error": 429,
+        "message": message,
+        "rate_limit_scope": reason,
+        "is_rate_limited": True
+    }
+
+
+def call(
+    service_name: str,
+    service_config: Dict[str, Any],
+    invoke: Callable[[], Dict[str, Any]],
+    max_wait: Optional[float] = MAX_WAIT
+) -> Dict[str, Any]:
+    """
+    Run a vendor call within the service's rate limits.
+
+    Waits for a free slot, and re-queues the call when the vendor still answers 429.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+        invoke: Callable performing the vendor call
+        max_wait: Longest acceptable wait for a slot in seconds, None for no limit
+
+    Returns:
+        The service result, or a 429 error dictionary if no slot was available
+    """
+    bucket = _get_bucket(service_name, service_config)
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        wait, reason = bucket.reserve(max_wait)
+        if reason:
+            return _rejection(service_name, service_config, reason)
+        if wait > 0:
+            logger.debug(f"Waiting {wait:.1f}s for a {service_name} rate limit slot")
+            time.sleep(wait)
+
+        token = _current_service.set(service_name)
+        try:
+            result = invoke()
+        finally:
+            _current_service.reset(token)
+
+        if not _is_rate_limited(result) or attempt == MAX_RATE_LIMIT_RETRIES:
+            return result
+        _throttle(service_name, result.get('retry_after'), result.get('rate_limit_reset'))
+        logger.info(f"Re-queuing rate limited {service_name} lookup (attempt {attempt + 1})")
+    return result
+
+
+async def call_async(
+    service_name: str,
+    service_config: Dict[str, Any],
+    invoke: Callable[[], Awaitable[Dict[str, Any]]],
+    max_wait: Optional[float] = MAX_WAIT
+) -> Dict[str, Any]:
+    """
+    Async version of :func:`call`; waiting lookups sleep without blocking the event loop.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary
+        invoke: Coroutine function performing the vendor call
+        max_wait: Longest acceptable wait for a slot in seconds, None for no limit
+
+    Returns:
+        The service result, or a 429 error dictionary if no slot was available
+    """
+    bucket = _get_bucket(service_name, service_config)
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        wait, reason = bucket.reserve(max_wait)
+        if reason:
+            return _rejection(service_name, service_config, reason)
+        if wait > 0:
+            logger.debug(f"Waiting {wait:.1f}s for a {service_name} rate limit slot")
+            await asyncio.sleep(wait)
+
+        token = _current_service.set(service_name)
+        try:
+            result = await invoke()
+        finally:
+            _current_service.reset(token)
+
+        if not _is_rate_limited(result) or attempt == MAX_RATE_LIMIT_RETRIES:
+            return result
+        _throttle(service_name, result.get('retry_after'), result.get('rate_limit_reset'))
+        logger.info(f"Re-queuing rate limited {service_name} lookup (attempt {attempt + 1})")
+    return result
+
+
+def try_acquire(service_name: str, service_config: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Take a slot only if one is free right now, e.g. for an optional hedged request.
+
+    A refused slot is not counted as a rejected lookup.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        service_config: Service configuration dictionary, looked up in the registry if omitted
+
+    Returns:
+        True if a slot was taken
+    """
+    _, reason = _get_bucket(service_name, service_config).reserve(0, count_rejection=False)
+    return reason is None
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get limits, daily usage and counters of every service seen so far.
+
+    Returns:
+        Dictionary mapping service names to their bucket state
+    """
+    with _buckets_lock:
+        buckets = dict(_buckets)
+    return {name: bucket.snapshot() for name, bucket in sorted(buckets.items())}
+
+
+http_client.add_response_hook(_observe_response)
@@ -0,0 +1,116 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from app.features.ioc_tools.ioc_lookup.single_lookup.service.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+SUMMARY = 'summary'
+FULL = 'full'
+PROFILES = (SUMMARY, FULL)
+
+# Marks the end of a path in a compiled projection tree
+_LEAF = True
+
+_trees: Dict[str, Optional[Dict[str, Any]]] = {}
+_trees_lock = threading.Lock()
+
+
+def compile_paths(paths: List[str]) -> Dict[str, Any]:
+    """
+    Merge dotted paths into a projection tree.
+
+    Path segments are dictionary keys, list indexes or ``*`` for every list item,
+    e.g. ``results.*.verdicts.overall.malicious`` or ``data.0.signature``.
+
+    Args:
+        paths: Dotted paths to keep
+
+    Returns:
+        Nested dictionary; a path that ends at a segment maps it to ``True``
+    """
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        keys = path.split('.')
+        for key in keys[:-1]:
+            child = node.get(key)
+            if child is _LEAF:
+                break
+            node = node.setdefault(key, {})
+        else:
+            node[keys[-1]] = _LEAF
+    return tree
+
+
+def _apply(value: Any, tree: Any) -> Any:
+    """Keep only the parts of ``value`` named in ``tree``."""
+    if tree is _LEAF:
+        return value
+    if isinstance(value, dict):
+        return {key: _apply(value[key], sub) for key, sub in tree.items() if key in value}
+    if isinstance(value, list):
+        if '*' in tree:
+            return [_apply(item, tree['*']) for item in value]
+        indexes = [int(key) for key in tree if key.isdigit()]
+        if not indexes:
+            return []
+        # Positions up to the highest named index are kept so index paths still resolve
+        return [
+            _apply(item, tree[str(i)]) if str(i) in tree else None
+            for i, item in enumerate(value[:max(indexes) + 1])
+        ]
+    return value
+
+
+def _summary_tree(service_name: str) -> Optional[Dict[str, Any]]:
+    """Get the compiled ``summary_fields`` of a service, or None if it has none."""
+    with _trees_lock:
+        if service_name not in _trees:
+            config = service_registry.get_service(service_name) or {}
+            paths = config.get('summary_fields')
+            _trees[service_name] = compile_paths(paths) if paths else None
+        return _trees[service_name]
+
+
+def project_result(service_name: str, result: Any, profile: str = FULL) -> Any:
+    """
+    Reduce a lookup result to a projection profile.
+
+    ``summary`` keeps the registry's ``summary_fields`` of the service, the
+    fields the UI needs for its verdict and summary line. Error results and
+    results of services without ``summary_fields`` are returned unchanged.
+
+    Args:
+        service_name: The unique identifier for the lookup service
+        result: Lookup result
+        profile: 'summary' or 'full'
+
+    Returns:
+        The projected result
+    """
+    if profile != SUMMARY or not isinstance(result, dict) or 'error' in result:
+        return result
+    tree = _summary_tree(service_name)
+    if tree is None:
+        return result
+    return _apply(result, tree)
+
+
+def project_event(event: Dict[str, Any], profile: str = FULL) -> Dict[str, Any]:
+    """
+    Apply :func:`project_result` to the ``data`` of a bulk lookup result event.
+
+    Args:
+        event: Bulk lookup result event
+        profile: 'summary' or 'full'
+
+    Returns:
+        The event, copied if its data was reduced
+    """
+    if profile != SUMMARY or 'data' not in event:
+        return event
+    data = project_result(event.get('service'), event['data'], profile)
+    if data is event['data']:
+        return event
+    return {**event, 'data': data, 'fields': SUMMARY}
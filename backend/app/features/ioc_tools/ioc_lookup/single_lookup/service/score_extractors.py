@@ -0,0 +1,219 @@
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Scores are normalized to 0-100: from MALICIOUS_SCORE up a service flags the
+# IOC as malicious, from SUSPICIOUS_SCORE up as suspicious, below it as clean.
+# The bands follow the RED/AMBER/GREEN levels the UI shows per service.
+MALICIOUS_SCORE = 75
+SUSPICIOUS_SCORE = 25
+
+def _get(result: Any, path: str) -> Any:
+    """Resolve a dotted path of dictionary keys and list indexes, or None if it does not exist."""
+    value = result
+    for key in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return None
+    return value
+
+
+def _number(value: Any) -> Optional[float]:
+    """Convert a vendor score to a float, or None if it is missing or not numeric."""
+    try:
+        return float(value) if value is not None and not isinstance(value, bool) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _scale(value: float, suspicious: float, malicious: float, top: float) -> float:
+    """
+    Map a vendor score onto the 0-100 scale, keeping the vendor's own thresholds.
+
+    Args:
+        value: Vendor score
+        suspicious: Vendor score from which the IOC counts as suspicious
+        malicious: Vendor score from which the IOC counts as malicious
+        top: Highest vendor score
+
+    Returns:
+        Normalized score
+    """
+    value = min(max(value, 0.0), top)
+    if value >= malicious:
+        return MALICIOUS_SCORE + (100 - MALICIOUS_SCORE) * (value - malicious) / max(top - malicious, 1e-9)
+    if value >= suspicious:
+        return SUSPICIOUS_SCORE + (MALICIOUS_SCORE - SUSPICIOUS_SCORE) * (value - suspicious) / (malicious - suspicious)
+    return SUSPICIOUS_SCORE * value / suspicious
+
+
+def virustotal(result: Dict[str, Any]) -> Optional[float]:
+    """One malicious engine makes the IOC malicious; every further engine adds a point."""
+    stats = _get(result, 'data.attributes.last_analysis_stats')
+    if not isinstance(stats, dict):
+        return None
+    malicious = _number(stats.get('malicious')) or 0
+    suspicious = _number(stats.get('suspicious')) or 0
+    if malicious:
+        return min(100.0, MALICIOUS_SCORE + malicious - 1)
+    if suspicious:
+        return min(MALICIOUS_SCORE - 1.0, SUSPICIOUS_SCORE + suspicious - 1)
+    return 0.0
+
+
+def abuseipdb(result: Dict[str, Any]) -> Optional[float]:
+    """The abuse confidence score is already on the 0-100 scale."""
+    score = _number(_get(result, 'data.abuseConfidenceScore'))
+    return None if score is None else _scale(score, 25, 75, 100)
+
+
+def alienvault(result: Dict[str, Any]) -> Optional[float]:
+    """Malicious reputation activity makes the IOC malicious, any pulse suspicious."""
+    activities = _get(result, 'reputation.activities') or []
+    if any('malicious' in str(activity.get('name', '')).lower() for activity in activities if isinstance(activity, dict)):
+        return 100.0
+    pulses = _number(_get(result, 'pulse_info.count'))
+    if pulses is None:
+        return None
+    return 50.0 if pulses > 0 else 0.0
+
+
+def checkphish(result: Dict[str, Any]) -> Optional[float]:
+    """Phish and clean dispositions of finished scans."""
+    if result.get('status') != 'DONE':
+        return None
+    disposition = str(result.get('disposition') or '').lower()
+    return {'phish': 100.0, 'clean': 0.0}.get(disposition)
+
+
+def crowdsec(result: Dict[str, Any]) -> Optional[float]:
+    """The IP range score, malicious from 0.8 and suspicious from 0.5."""
+    if 'not found' in str(result.get('message') or '').lower():
+        return 0.0
+    score = _number(result.get('ip_range_score'))
+    return None if score is None else _scale(score, 0.5, 0.8, 1)
+
+
+def emailrepio(result: Dict[str, Any]) -> Optional[float]:
+    """Suspicious addresses are malicious, a low reputation is suspicious."""
+    if result.get('suspicious'):
+        return 100.0
+    if not result.get('reputation'):
+        return None
+    return 50.0 if result['reputation'] == 'low' else 0.0
+
+
+def hunterio(result: Dict[str, Any]) -> Optional[float]:
+    """Disposable and undeliverable addresses are malicious, risky ones suspicious."""
+    status = _get(result, 'data.result')
+    if status is None:
+        return None
+    if _get(result, 'data.disposable') or status == 'undeliverable':
+        return 100.0
+    return 50.0 if status == 'risky' else 0.0
+
+
+def ipqualityscore(result: Dict[str, Any]) -> Optional[float]:
+    """The fraud score, malicious from 90 and suspicious from 75."""
+    score = _number(result.get('fraud_score'))
+    return None if score is None else _scale(score, 75, 90, 100)
+
+
+def maltiverse(result: Dict[str, Any]) -> Optional[float]:
+    """The classification; neutral classifications carry no verdict."""
+    classification = str(result.get('classification') or '').lower()
+    return {'malicious': 100.0, 'suspicious': 50.0, 'whitelisted': 0.0}.get(classification)
+
+
+def malwarebazaar(result: Dict[str, Any]) -> Optional[float]:
+    """A known sample is malicious."""
+    return {'ok': 100.0, 'hash_not_found': 0.0}.get(result.get('query_status'))
+
+
+def pulsedive(result: Dict[str, Any]) -> Optional[float]:
+    """The risk level."""
+    risk = str(result.get('risk') or '').lower()
+    return {'critical': 100.0, 'high': 85.0, 'medium': 50.0, 'low': 10.0, 'none': 0.0}.get(risk)
+
+
+def safebrowse(result: Dict[str, Any]) -> Optional[float]:
+    """Any threat match is malicious."""
+    return 100.0 if result.get('matches') else 0.0
+
+
+def threatfox(result: Dict[str, Any]) -> Optional[float]:
+    """A listed IOC is malicious."""
+    return {'ok': 100.0, 'no_result': 0.0}.get(result.get('query_status'))
+
+
+def urlhaus(result: Dict[str, Any]) -> Optional[float]:
+    """Listed URLs that are online are malicious, offline ones suspicious."""
+    status = result.get('query_status')
+    if status == 'no_results':
+        return 0.0
+    if status != 'ok':
+        return None
+    url_status = result.get('url_status') or _get(result, 'urls.0.url_status')
+    return 100.0 if url_status == 'online' else 50.0
+
+
+def urlscanio(result: Dict[str, Any]) -> Optional[float]:
+    """Any scan with a malicious verdict or a phishing or malware tag is malicious."""
+    flagged_tags = {'phishing', 'malware', '@phish_report'}
+    for scan in result.get('results') or []:
+        if not isinstance(scan, dict):
+            continue
+        if _get(scan, 'verdicts.overall.malicious'):
+            return 100.0
+        if any(str(tag).lower() in flagged_tags for tag in _get(scan, 'task.tags') or []):
+            return 100.0
+    return 0.0
+
+
+def score_result(service_config: Optional[Dict[str, Any]], result: Any) -> Optional[float]:
+    """
+    Score a lookup result with the service's ``score`` extractor.
+
+    Extractors only read a service's ``summary_fields``, so summary
+    projections of results score the same as the full results.
+
+    Args:
+        service_config: Service configuration dictionary
+        result: Lookup result, full or summary projection
+
+    Returns:
+        Score from 0 to 100, or None if the service has no extractor, the
+        lookup failed or the result carries no verdict
+    """
+    extractor = (service_config or {}).get('score')
+    if extractor is None or not isinstance(result, dict) or 'error' in result:
+        return None
+    try:
+        score = extractor(result)
+    except Exception as e:
+        logger.warning(f"Could not score {service_config.get('name')} result: {str(e)}")
+        return None
+    return None if score is None else round(min(max(float(score), 0.0), 100.0), 1)
+
+
+def verdict(score: Optional[float]) -> str:
+    """
+    Name the verdict of a score.
+
+    Args:
+        score: Score from 0 to 100, or None
+
+    Returns:
+        'malicious', 'suspicious', 'clean' or 'unknown' if there is no score
+    """
+    if score is None:
+        return 'unknown'
+    if score >= MALICIOUS_SCORE:
+        return 'malicious'
+    if score >= SUSPICIOUS_SCORE:
+        return 'suspicious'
+    return 'clean'
@@ -1,23 +1,102 @@
-from typing import Dict, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional
 from app.features.ioc_tools.ioc_lookup.single_lookup.utils.ioc_utils import IOC_TYPES
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import local_geoip, threat_feed_index, score_extractors
+
+# Result cache lifetimes in seconds. Reputation verdicts change quickly, while
+# routing/registration data and reference records stay valid much longer.
+CACHE_TTL = {
+    'reputation': 60 * 60,
+    'search': 6 * 60 * 60,
+    'reference': 24 * 60 * 60,
+    'infrastructure': 7 * 24 * 60 * 60,
+}
+DEFAULT_CACHE_TTL = CACHE_TTL['reputation']
+DEFAULT_NEGATIVE_CACHE_TTL = 15 * 60
+
+# 'rate_limit' entries follow the vendors' free-tier quotas: 'per_second' is the
+# sustained request rate, 'burst' the bucket size and 'per_day' the daily budget.
+# Services without an entry are only throttled when the vendor answers 429.
+
+# 'timeout' is the deadline of one vendor call in seconds (IOC_LOOKUP_TIMEOUT when
+# omitted). 'hedge' marks idempotent GET lookups with a generous quota: once a call
+# outlives the service's p95 latency, a second request is sent if a rate limit
+# slot is free and whichever answers first is used.
+
+# 'summary_fields' are the dotted paths (list items by index or '*') the UI reads for
+# its verdict and summary line. Bulk streams send only these unless the full result
+# is requested; services without the entry always send the full result.
+
+# 'score' extracts a 0-100 verdict score from a result's summary fields for the
+# bulk verdict summary (see score_extractors). Services without it, such as
+# search and infrastructure lookups, do not count towards an IOC's verdict.
+
+# 'local' services answer from data on disk: they are called directly, without
+# the result cache, rate limits, circuit breaker or deadline of vendor calls.
 
 # Global service registry
 _services: Dict[str, Dict[str, Any]] = {}
 
 
-def register_services(ioc_lookup_service_module) -> None:
+def _async_func(async_lookup_service_module, func_name: str) -> Optional[Callable[..., Awaitable[Dict[str, Any]]]]:
+    """
+    Resolve the async client for a service, if an async module was provided.
+    
+    Args:
+        async_lookup_service_module: Module containing async service functions, or None
+        func_name: Name of the service function
+        
+    Returns:
+        The coroutine function or None when no async client exists
+    """
+    if async_lookup_service_module is None:
+        return None
+    return getattr(async_lookup_service_module, func_name, None)
+
+
+def _batch(async_lookup_service_module, func_name: str, max_size: int, max_wait: float) -> Optional[Dict[str, Any]]:
+    """
+    Build a service's batch capability, if an async module with the batch client was provided.
+    
+    Args:
+        async_lookup_service_module: Module containing async service functions, or None
+        func_name: Name of the batch function
+        max_size: Most IOCs sent in one call
+        max_wait: Longest time in seconds a partial batch waits for more IOCs
+        
+    Returns:
+        Batch configuration dictionary or None
+    """
+    func = _async_func(async_lookup_service_module, func_name)
+    if func is None:
+        return None
+    return {'func': func, 'max_size': max_size, 'max_wait': max_wait}
+
+
+def register_services(ioc_lookup_service_module, async_lookup_service_module=None) -> None:
     """
     Register all IOC lookup services with their configurations.
     
+    Services with an ``async_func`` are called natively on the event loop by the
+    bulk lookup path; ``func`` stays the synchronous entry point. Services with a
+    ``batch`` entry are sent up to ``max_size`` IOCs of one type per call in bulk
+    lookups; the batch function takes ``iocs`` instead of ``ioc``.
+    
     Args:
         ioc_lookup_service_module: Module containing the service functions
+        async_lookup_service_module: Optional module containing async versions
+            of the service functions
     """
     global _services
     
     _services.update({
         'virustotal': {
             'func': ioc_lookup_service_module.virustotal,
+            'async_func': _async_func(async_lookup_service_module, 'virustotal'),
             'name': 'VirusTotal',
+            'summary_fields': ['data.attributes.last_analysis_stats'],
+            'score': score_extractors.virustotal,
+            'cache_ttl': CACHE_TTL['reputation'],
+            'rate_limit': {'per_second': 4 / 60, 'burst': 4, 'per_day': 500},
             'api_key_name': 'virustotal',
             'supported_ioc_types': [
                 IOC_TYPES['IPV4'], IOC_TYPES['IPV6'], IOC_TYPES['DOMAIN'], 
@@ -33,13 +112,24 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'abuseipdb': {
             'func': ioc_lookup_service_module.abuseipdb_ip_check,
+            'async_func': _async_func(async_lookup_service_module, 'abuseipdb_ip_check'),
             'name': 'AbuseIPDB',
+            'summary_fields': ['data.abuseConfidenceScore'],
+            'score': score_extractors.abuseipdb,
+            'cache_ttl': CACHE_TTL['reputation'],
+            'rate_limit': {'per_second': 1, 'burst': 5, 'per_day': 1000},
             'api_key_name': 'abuseipdb',
             'supported_ioc_types': [IOC_TYPES['IPV4']],
         },
         'alienvault': {
             'func': ioc_lookup_service_module.alienvaultotx,
+            'async_func': _async_func(async_lookup_service_module, 'alienvaultotx'),
             'name': 'AlienVault OTX',
+            'summary_fields': ['pulse_info.count', 'reputation.activities.*.name'],
+            'score': score_extractors.alienvault,
+            'cache_ttl': CACHE_TTL['reputation'],
+            'timeout': 20,
+            'hedge': True,
             'api_key_name': 'alienvault',
             'supported_ioc_types': [
                 IOC_TYPES['IPV4'], IOC_TYPES['IPV6'], IOC_TYPES['DOMAIN'], 
@@ -55,25 +145,47 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'bgpview': {
             'func': ioc_lookup_service_module.check_bgpview,
+            'async_func': _async_func(async_lookup_service_module, 'check_bgpview'),
             'name': 'BGPView',
+            'summary_fields': [
+                'data.prefixes.0.asn.asn',
+                'data.prefixes.0.asn.name',
+                'data.asns.0.asn',
+                'data.asns.0.name',
+            ],
+            'cache_ttl': CACHE_TTL['infrastructure'],
+            'timeout': 15,
+            'hedge': True,
             'api_key_name': 'bgpview',
             'supported_ioc_types': [IOC_TYPES['IPV4'], IOC_TYPES['IPV6']],
         },
         'checkphish': {
             'func': ioc_lookup_service_module.checkphish_ai,
+            'async_func': _async_func(async_lookup_service_module, 'checkphish_ai'),
             'name': 'CheckPhish',
+            'summary_fields': ['status', 'disposition'],
+            'score': score_extractors.checkphish,
+            'cache_ttl': CACHE_TTL['reputation'],
             'api_key_name': 'checkphishai',
             'supported_ioc_types': [IOC_TYPES['IPV4'], IOC_TYPES['DOMAIN'], IOC_TYPES['URL']],
         },
         'crowdsec': {
             'func': ioc_lookup_service_module.crowdsec,
+            'async_func': _async_func(async_lookup_service_module, 'crowdsec'),
             'name': 'CrowdSec',
+            'summary_fields': ['message', 'ip_range_score'],
+            'score': score_extractors.crowdsec,
+            'cache_ttl': CACHE_TTL['reputation'],
             'api_key_name': 'crowdsec',
             'supported_ioc_types': [IOC_TYPES['IPV4']],
         },
         'crowdstrike': {
             'func': ioc_lookup_service_module.crowdstrike_indicators_lookup,
+            'async_func': _async_func(async_lookup_service_module, 'crowdstrike_indicators_lookup'),
+            'batch': _batch(async_lookup_service_module, 'crowdstrike_indicators_lookup_batch', max_size=50, max_wait=0.5),
             'name': 'CrowdStrike',
+            'cache_ttl': CACHE_TTL['reputation'],
+            'timeout': 45,
             'multi_key': True,
             'api_key_names': ['crowdstrike_client_id', 'crowdstrike_client_secret'],
             'api_key_params': {
@@ -87,13 +199,21 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'emailrepio': {
             'func': ioc_lookup_service_module.emailrep_email_check,
+            'async_func': _async_func(async_lookup_service_module, 'emailrep_email_check'),
             'name': 'EmailRep.io',
+            'summary_fields': ['reputation', 'suspicious'],
+            'score': score_extractors.emailrepio,
+            'cache_ttl': CACHE_TTL['reputation'],
             'api_key_name': 'emailrepio',
             'supported_ioc_types': [IOC_TYPES['EMAIL']],
         },
         'github': {
             'func': ioc_lookup_service_module.search_github,
+            'async_func': _async_func(async_lookup_service_module, 'search_github'),
             'name': 'GitHub',
+            'summary_fields': ['total_count'],
+            'cache_ttl': CACHE_TTL['search'],
+            'rate_limit': {'per_second': 30 / 60, 'burst': 5},
             'api_key_name': 'github_pat',
             'supported_ioc_types': [
                 IOC_TYPES['IPV4'], IOC_TYPES['IPV6'], IOC_TYPES['DOMAIN'], IOC_TYPES['URL'], 
@@ -103,25 +223,49 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'haveibeenpwned': {
             'func': ioc_lookup_service_module.haveibeenpwnd_email_check,
+            'async_func': _async_func(async_lookup_service_module, 'haveibeenpwnd_email_check'),
             'name': 'Have I Been Pwned',
+            'summary_fields': ['breachedaccount.*.Name'],
+            'cache_ttl': CACHE_TTL['reference'],
+            'rate_limit': {'per_second': 10 / 60, 'burst': 1},
             'api_key_name': 'hibp_api_key',
             'supported_ioc_types': [IOC_TYPES['EMAIL']],
         },
         'hunterio': {
             'func': ioc_lookup_service_module.hunter_email_check,
+            'async_func': _async_func(async_lookup_service_module, 'hunter_email_check'),
             'name': 'Hunter.io',
+            'summary_fields': ['data.result', 'data.disposable'],
+            'score': score_extractors.hunterio,
+            'cache_ttl': CACHE_TTL['reference'],
             'api_key_name': 'hunterio_api_key',
             'supported_ioc_types': [IOC_TYPES['EMAIL']],
         },
         'ipqualityscore': {
             'func': ioc_lookup_service_module.ipqualityscore_ip_check,
+            'async_func': _async_func(async_lookup_service_module, 'ipqualityscore_ip_check'),
             'name': 'IPQualityScore',
+            'summary_fields': ['fraud_score'],
+            'score': score_extractors.ipqualityscore,
+            'cache_ttl': CACHE_TTL['reputation'],
             'api_key_name': 'ipqualityscore',
             'supported_ioc_types': [IOC_TYPES['IPV4']],
         },
+        'localgeoip': {
+            'func': local_geoip.lookup_ip,
+            'name': 'Local GeoIP/ASN',
+            'local': True,
+            'api_key_name': None,
+            'supported_ioc_types': [IOC_TYPES['IPV4'], IOC_TYPES['IPV6']],
+        },
         'maltiverse': {
             'func': ioc_lookup_service_module.maltiverse_check,
+            'async_func': _async_func(async_lookup_service_module, 'maltiverse_check'),
             'name': 'Maltiverse',
+            'summary_fields': ['classification'],
+            'score': score_extractors.maltiverse,
+            'cache_ttl': CACHE_TTL['reputation'],
+            'hedge': True,
             'api_key_name': 'maltiverse',
             'supported_ioc_types': [
                 IOC_TYPES['IPV4'], IOC_TYPES['DOMAIN'], IOC_TYPES['URL'], 
@@ -140,13 +284,30 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'malwarebazaar': {
             'func': ioc_lookup_service_module.malwarebazaar_hash_check,
+            'async_func': _async_func(async_lookup_service_module, 'malwarebazaar_hash_check'),
             'name': 'MalwareBazaar',
+            'summary_fields': ['query_status', 'data.0.signature'],
+            'score': score_extractors.malwarebazaar,
+            'cache_ttl': CACHE_TTL['reputation'],
             'api_key_name': 'malwarebazaar',
             'supported_ioc_types': [IOC_TYPES['MD5'], IOC_TYPES['SHA1'], IOC_TYPES['SHA256']],
         },
+        'malwarebazaaroffline': {
+            'func': threat_feed_index.malwarebazaar_lookup,
+            'name': 'MalwareBazaar (offline)',
+            'summary_fields': ['query_status', 'data.0.signature'],
+            'score': score_extractors.malwarebazaar,
+            'local': True,
+            'api_key_name': None,
+            'supported_ioc_types': [IOC_TYPES['MD5'], IOC_TYPES['SHA1'], IOC_TYPES['SHA256']],
+        },
         'mandiant': {
             'func': ioc_lookup_service_module.mandiant_ioc_lookup,
+            'async_func': _async_func(async_lookup_service_module, 'mandiant_ioc_lookup'),
+            'batch': _batch(async_lookup_service_module, 'mandiant_ioc_lookup_batch', max_size=100, max_wait=0.5),
             'name': 'Mandiant',
+            'cache_ttl': CACHE_TTL['reputation'],
+            'timeout': 45,
             'multi_key': True,
             'api_key_names': ['mandiant_key', 'mandiant_secret'],
             'api_key_params': {'api_key': 'mandiant_key', 'api_secret': 'mandiant_secret'},
@@ -165,13 +326,26 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'nistnvd': {
             'func': ioc_lookup_service_module.search_nist_nvd,
+            'async_func': _async_func(async_lookup_service_module, 'search_nist_nvd'),
             'name': 'NIST NVD',
+            'summary_fields': [
+                'vulnerabilities.0.cve.metrics.cvssMetricV31.0.cvssData.baseSeverity',
+                'vulnerabilities.0.cve.metrics.cvssMetricV30.0.cvssData.baseSeverity',
+            ],
+            'cache_ttl': CACHE_TTL['reference'],
+            'timeout': 60,
+            'rate_limit': {'per_second': 50 / 30, 'burst': 5},
             'api_key_name': 'nist_nvd_api_key',
             'supported_ioc_types': [IOC_TYPES['CVE']],
         },
         'pulsedive': {
             'func': ioc_lookup_service_module.check_pulsedive,
+            'async_func': _async_func(async_lookup_service_module, 'check_pulsedive'),
             'name': 'Pulsedive',
+            'summary_fields': ['risk'],
+            'score': score_extractors.pulsedive,
+            'cache_ttl': CACHE_TTL['reputation'],
+            'hedge': True,
             'api_key_name': 'pulsedive',
             'supported_ioc_types': [
                 IOC_TYPES['IPV4'], IOC_TYPES['DOMAIN'], IOC_TYPES['URL'], 
@@ -180,7 +354,12 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'reddit': {
             'func': ioc_lookup_service_module.search_reddit,
+            'async_func': _async_func(async_lookup_service_module, 'search_reddit'),
             'name': 'Reddit',
+            'summary_fields': ['data.dist'],
+            'cache_ttl': CACHE_TTL['search'],
+            'timeout': 45,
+            'rate_limit': {'per_second': 1, 'burst': 5},
             'multi_key': True,
             'api_key_names': ['reddit_cid', 'reddit_cs'],
             'api_key_params': {'client_id': 'reddit_cid', 'client_secret': 'reddit_cs'},
@@ -192,13 +371,22 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'safeBrowse': {
             'func': ioc_lookup_service_module.safeBrowse_url_check,
+            'async_func': _async_func(async_lookup_service_module, 'safeBrowse_url_check'),
+            'batch': _batch(async_lookup_service_module, 'safeBrowse_url_check_batch', max_size=500, max_wait=0.5),
             'name': 'Google Safe Browse',
+            'summary_fields': ['matches.*.threatType'],
+            'score': score_extractors.safebrowse,
+            'cache_ttl': CACHE_TTL['reputation'],
             'api_key_name': 'safeBrowse',
             'supported_ioc_types': [IOC_TYPES['DOMAIN'], IOC_TYPES['URL']],
         },
         'shodan': {
             'func': ioc_lookup_service_module.check_shodan,
+            'async_func': _async_func(async_lookup_service_module, 'check_shodan'),
             'name': 'Shodan',
+            'summary_fields': ['ip_str', 'hostnames', 'ports', 'vulns'],
+            'cache_ttl': CACHE_TTL['reference'],
+            'rate_limit': {'per_second': 1, 'burst': 1},
             'api_key_name': 'shodan',
             'supported_ioc_types': [IOC_TYPES['IPV4'], IOC_TYPES['DOMAIN']],
             'requires_type': True,
@@ -210,16 +398,37 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'threatfox': {
             'func': ioc_lookup_service_module.threatfox_ip_check,
+            'async_func': _async_func(async_lookup_service_module, 'threatfox_ip_check'),
             'name': 'ThreatFox',
+            'summary_fields': ['query_status', 'data.0.threat_type'],
+            'score': score_extractors.threatfox,
+            'cache_ttl': CACHE_TTL['reputation'],
             'api_key_name': 'threatfox',
             'supported_ioc_types': [
                 IOC_TYPES['IPV4'], IOC_TYPES['IPV6'], IOC_TYPES['DOMAIN'], IOC_TYPES['URL'], 
                 IOC_TYPES['MD5'], IOC_TYPES['SHA1'], IOC_TYPES['SHA256']
             ],
         },
+        'threatfoxoffline': {
+            'func': threat_feed_index.threatfox_lookup,
+            'name': 'ThreatFox (offline)',
+            'summary_fields': ['query_status', 'data.0.threat_type'],
+            'score': score_extractors.threatfox,
+            'local': True,
+            'api_key_name': None,
+            'supported_ioc_types': [
+                IOC_TYPES['IPV4'], IOC_TYPES['IPV6'], IOC_TYPES['DOMAIN'], IOC_TYPES['URL'], 
+                IOC_TYPES['MD5'], IOC_TYPES['SHA1'], IOC_TYPES['SHA256']
+            ],
+            'requires_type': True,
+            'ioc_type_param': 'ioc_type',
+        },
         'twitter': {
             'func': ioc_lookup_service_module.search_twitter,
+            'async_func': _async_func(async_lookup_service_module, 'search_twitter'),
             'name': 'Twitter/X',
+            'summary_fields': ['meta.result_count'],
+            'cache_ttl': CACHE_TTL['search'],
             'api_key_name': 'twitter_bearer_token',
             'supported_ioc_types': [
                 IOC_TYPES['IPV4'], IOC_TYPES['IPV6'], IOC_TYPES['DOMAIN'], IOC_TYPES['URL'], 
@@ -229,13 +438,35 @@ def register_services(ioc_lookup_service_module) -> None:
         },
         'urlhaus': {
             'func': ioc_lookup_service_module.urlhaus_url_check,
+            'async_func': _async_func(async_lookup_service_module, 'urlhaus_url_check'),
             'name': 'URLhaus',
+            'summary_fields': ['query_status', 'url_status', 'urls.0.url_status'],
+            'score': score_extractors.urlhaus,
+            'cache_ttl': CACHE_TTL['reputation'],
             'api_key_name': 'urlhaus',
             'supported_ioc_types': [IOC_TYPES['URL'], IOC_TYPES['DOMAIN'], IOC_TYPES['IPV4']],
         },
+        'urlhausoffline': {
+            'func': threat_feed_index.urlhaus_lookup,
+            'name': 'URLhaus (offline)',
+            'summary_fields': ['query_status', 'url_status', 'urls.0.url_status'],
+            'score': score_extractors.urlhaus,
+            'local': True,
+            'api_key_name': None,
+            'supported_ioc_types': [IOC_TYPES['URL'], IOC_TYPES['DOMAIN'], IOC_TYPES['IPV4']],
+            'requires_type': True,
+            'ioc_type_param': 'ioc_type',
+        },
         'urlscanio': {
             'func': ioc_lookup_service_module.urlscanio,
+            'async_func': _async_func(async_lookup_service_module, 'urlscanio'),
             'name': 'URLScan.io',
+            'summary_fields': ['results.*.verdicts.overall.malicious', 'results.*.task.tags'],
+            'score': score_extractors.urlscanio,
+            'cache_ttl': CACHE_TTL['search'],
+            'timeout': 20,
+            'hedge': True,
+            'rate_limit': {'per_second': 2, 'burst': 5},
             'api_key_name': None,
             'supported_ioc_types': [IOC_TYPES['DOMAIN'], IOC_TYPES['URL'], IOC_TYPES['IPV4']],
         },
@@ -292,9 +523,9 @@ class ServiceRegistry:
         """Get all services."""
         return get_all_services()
     
-    def register_services(self, ioc_lookup_service_module) -> None:
+    def register_services(self, ioc_lookup_service_module, async_lookup_service_module=None) -> None:
         """Register services."""
-        register_services(ioc_lookup_service_module)
+        register_services(ioc_lookup_service_module, async_lookup_service_module)
     
     def get_service(self, service_name: str) -> Optional[Dict[str, Any]]:
         """Get a service by name."""
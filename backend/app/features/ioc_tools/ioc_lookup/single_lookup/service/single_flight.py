@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A vendor call in flight, shared by sync and async callers."""
+
+    __slots__ = ('future', 'loop')
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.future: Future = Future()
+        # Event loop of an async caller making the call, None for a thread
+        self.loop = loop
+
+
+class _LeaderCancelled(Exception):
+    """The task making a shared call was cancelled before it finished."""
+
+
+_calls: Dict[str, _Call] = {}
+_lock = threading.Lock()
+_stats = {'calls': 0, 'coalesced': 0}
+
+
+def _join(key: str, loop: Optional[asyncio.AbstractEventLoop]) -> Tuple[_Call, bool]:
+    """Get the call in flight for a key, or register a new one; returns the call and whether the caller makes it."""
+    with _lock:
+        call = _calls.get(key)
+        if call is None:
+            call = _calls[key] = _Call(loop)
+            _stats['calls'] += 1
+            return call, True
+        _stats['coalesced'] += 1
+        return call, False
+
+
+def _finish(key: str, call: _Call, result: Any = None, error: Optional[BaseException] = None) -> None:
+    """Unregister a call, then hand its outcome to the callers waiting for it."""
+    with _lock:
+        if _calls.get(key) is call:
+            del _calls[key]
+    if error is not None:
+        call.future.set_exception(error)
+    else:
+        call.future.set_result(result)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def do(key: str, fn: Callable[[], Any]) -> Any:
+    """
+    Run ``fn`` unless a call with the same key is already running, then wait for that one.
+
+    Calls made through :func:`do_async` are shared too, so a lookup from a
+    worker thread follows the same lookup of a running bulk job and the
+    other way round.
+
+    Args:
+        key: Identity of the call, e.g. the lookup's cache key
+        fn: Callable making the call
+
+    Returns:
+        The result of ``fn``, shared by every caller that asked while it ran
+
+    Raises:
+        Exception: Whatever ``fn`` raised, re-raised in every waiting caller
+    """
+    call, leader = _join(key, None)
+    if not leader:
+        if call.loop is not None and call.loop is _running_loop():
+            # Waiting here would block the event loop the call runs on
+            return fn()
+        logger.debug(f"Joining in-flight call for {key}")
+        try:
+            return call.future.result()
+        except _LeaderCancelled:
+            return fn()
+
+    try:
+        result = fn()
+    except BaseException as e:
+        _finish(key, call, error=e)
+        raise
+    _finish(key, call, result)
+    return result
+
+
+async def do_async(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Async version of :func:`do` for calls made on the running event loop.
+
+    Calls share one table with :func:`do`: a waiting async caller awaits the
+    call's future without blocking the loop, whichever thread or loop makes
+    the call. If the task making the shared call is cancelled, waiting
+    callers make the call themselves instead of being cancelled with it.
+
+    Args:
+        key: Identity of the call, e.g. the lookup's cache key
+        fn: Coroutine function making the call
+
+    Returns:
+        The result of ``fn``, shared by every caller that asked while it ran
+    """
+    call, leader = _join(key, asyncio.get_running_loop())
+    if not leader:
+        logger.debug(f"Joining in-flight call for {key}")
+        try:
+            return await asyncio.shield(asyncio.wrap_future(call.future))
+        except _LeaderCancelled:
+            return await fn()
+
+    try:
+        result = await fn()
+    except asyncio.CancelledError:
+        _finish(key, call, error=_LeaderCancelled())
+        raise
+    except BaseException as e:
+        _finish(key, call, error=e)
+        raise
+    _finish(key, call, result)
+    return result
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get coalescing counters.
+
+    Returns:
+        Dictionary with the number of calls made, calls saved by coalescing and calls in flight
+    """
+    with _lock:
+        return {**_stats, 'in_flight': len(_calls)}
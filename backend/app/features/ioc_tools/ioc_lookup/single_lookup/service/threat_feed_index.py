@@ -0,0 +1,680 @@
+import io
+import os
+import csv
+import copy
+import sys
+import gzip
+import json
+import time
+import socket
+import zipfile
+import logging
+import argparse
+import ipaddress
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import http_client
+
+logger = logging.getLogger(__name__)
+
+# abuse.ch publishes full and recent dumps of ThreatFox, URLhaus and MalwareBazaar.
+# The first sync of a feed (and one every FULL_REFRESH_DAYS) downloads the full
+# dump; the scheduled syncs in between merge the recent dump into the index.
+# Indexes are kept in memory and snapshotted to SNAPSHOT_DIR, so lookups work
+# offline and survive restarts.
+
+# Directory of the gzipped index snapshots
+SNAPSHOT_DIR = os.getenv("THREAT_FEED_DIR", "./data/threat_feeds")
+# Days after which a sync downloads the full dump again, dropping removed entries
+FULL_REFRESH_DAYS = float(os.getenv("THREAT_FEED_FULL_REFRESH_DAYS", "7"))
+# abuse.ch Auth-Key for the dump downloads; the feeds' stored API keys are used when unset
+AUTH_KEY = os.getenv("ABUSE_CH_AUTH_KEY")
+# Most records returned for one indicator
+MAX_MATCHES = 100
+
+SNAPSHOT_VERSION = 1
+
+FEEDS: Dict[str, Dict[str, Any]] = {
+    'threatfox': {
+        'full_url': os.getenv("THREATFOX_FULL_URL", "https://threatfox.abuse.ch/export/json/full/"),
+        'recent_url': os.getenv("THREATFOX_RECENT_URL", "https://threatfox.abuse.ch/export/json/recent/"),
+        'api_key_name': 'threatfox',
+        'fields': (
+            'id', 'ioc', 'ioc_type', 'threat_type', 'malware', 'malware_printable', 'confidence_level',
+            'first_seen', 'last_seen', 'reference', 'tags', 'reporter',
+        ),
+    },
+    'urlhaus': {
+        # The full URLhaus dump holds every URL ever reported, so the 30 day dump is the
+        # default for both; set URLHAUS_FULL_URL to https://urlhaus.abuse.ch/downloads/csv/
+        # to index the complete history
+        'full_url': os.getenv("URLHAUS_FULL_URL", "https://urlhaus.abuse.ch/downloads/csv_recent/"),
+        'recent_url': os.getenv("URLHAUS_RECENT_URL", "https://urlhaus.abuse.ch/downloads/csv_recent/"),
+        'api_key_name': 'urlhaus',
+        'fields': ('id', 'date_added', 'url', 'url_status', 'last_online', 'threat', 'tags', 'urlhaus_reference', 'reporter'),
+    },
+    'malwarebazaar': {
+        'full_url': os.getenv("MALWAREBAZAAR_FULL_URL", "https://bazaar.abuse.ch/export/csv/full/"),
+        'recent_url': os.getenv("MALWAREBAZAAR_RECENT_URL", "https://bazaar.abuse.ch/export/csv/recent/"),
+        'api_key_name': 'malwarebazaar',
+        'fields': (
+            'first_seen', 'sha256_hash', 'md5_hash', 'sha1_hash', 'reporter', 'file_name', 'file_type',
+            'file_type_mime', 'signature', 'clamav', 'vtpercent', 'imphash', 'ssdeep', 'tlsh',
+        ),
+    },
+}
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    Normalize a URL for exact matching: lowercase scheme and host, no default
+    port, user info or fragment, and ``/`` for an empty path.
+
+    Args:
+        url: URL as reported or queried
+
+    Returns:
+        The normalized URL, or None if it has no scheme and host
+    """
+    try:
+        parts = urlsplit(url.strip())
+        host = parts.hostname
+        port = parts.port
+    except ValueError:
+        return None
+    if not parts.scheme or not host:
+        return None
+    scheme = parts.scheme.lower()
+    host = host.rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"
+    netloc = host if port is None or port == _DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+    query = f"?{parts.query}" if parts.query else ''
+    return f"{scheme}://{netloc}{parts.path or '/'}{query}"
+
+
+def normalize_domain(domain: str) -> str:
+    """Lowercase a domain and strip a trailing dot and a leading wildcard label."""
+    domain = domain.strip().lower().rstrip('.')
+    return domain[2:] if domain.startswith('*.') else domain
+
+
+def _pack_ip(value: str) -> Optional[bytes]:
+    """Get an IP address in network byte order, or None if the value is not one."""
+    try:
+        return socket.inet_pton(socket.AF_INET6 if ':' in value else socket.AF_INET, value)
+    except OSError:
+        return None
+
+
+class _DomainTrie:
+    """
+    Domains stored label by label from the TLD down.
+
+    A node's ``.`` set holds entries for exactly that host, its ``*`` set
+    entries for the domain and all its subdomains, so one walk finds the host's
+    entries and those of every listed parent domain.
+    """
+
+    HOST = '.'
+    DOMAIN = '*'
+
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+
+    def add(self, name: str, kind: str, key: str) -> None:
+        node = self.root
+        for label in reversed(name.split('.')):
+            node = node.setdefault(label, {})
+        node.setdefault(kind, set()).add(key)
+
+    def remove(self, name: str, kind: str, key: str) -> None:
+        node = self.root
+        for label in reversed(name.split('.')):
+            node = node.get(label)
+            if node is None:
+                return
+        node.get(kind, set()).discard(key)
+
+    def copy(self) -> '_DomainTrie':
+        trie = _DomainTrie()
+        trie.root = copy.deepcopy(self.root)
+        return trie
+
+    def find(self, name: str) -> Set[str]:
+        found: Set[str] = set()
+        node = self.root
+        for label in reversed(name.split('.')):
+            node = node.get(label)
+            if node is None:
+                return found
+            found.update(node.get(self.DOMAIN, ()))
+        found.update(node.get(self.HOST, ()))
+        return found
+
+
+class _FeedIndex:
+    """
+    Records of one feed and the lookup structures over them.
+
+    Lookups read an index without locking, so an index is only changed
+    before it is published in ``_feeds``; syncs change a copy and swap it in.
+    """
+
+    def __init__(self, name: str, index_keys: Callable[[Dict[str, Any]], Iterable[Tuple[str, Any]]]):
+        self.name = name
+        self.fields = FEEDS[name]['fields']
+        self.index_keys = index_keys
+        self.sort_field = self.fields.index('date_added' if 'date_added' in self.fields else 'first_seen')
+        self.records: Dict[str, tuple] = {}
+        self.hashes: Dict[str, Set[str]] = {}
+        self.urls: Dict[str, Set[str]] = {}
+        self.ips: Dict[bytes, Set[str]] = {}
+        # (IP version, prefix length) -> network address as integer -> record keys
+        self.networks: Dict[Tuple[int, int], Dict[int, Set[str]]] = {}
+        self.domains = _DomainTrie()
+        self.state: Dict[str, Any] = {'synced_at': None, 'full_sync_at': None, 'etags': {}}
+
+    def copy(self) -> '_FeedIndex':
+        """Copy the records, lookup structures and sync state into a new index."""
+        index = _FeedIndex(self.name, self.index_keys)
+        index.records = dict(self.records)
+        index.hashes = {value: set(keys) for value, keys in self.hashes.items()}
+        index.urls = {value: set(keys) for value, keys in self.urls.items()}
+        index.ips = {value: set(keys) for value, keys in self.ips.items()}
+        index.networks = {
+            prefix: {network: set(keys) for network, keys in table.items()}
+            for prefix, table in self.networks.items()
+        }
+        index.domains = self.domains.copy()
+        index.state = copy.deepcopy(self.state)
+        return index
+
+    def record(self, key: str) -> Dict[str, Any]:
+        return dict(zip(self.fields, self.records[key]))
+
+    def _entries(self, record: tuple) -> Iterable[Tuple[str, Any]]:
+        return self.index_keys(dict(zip(self.fields, record)))
+
+    def put(self, key: str, record: tuple) -> bool:
+        """Add or replace a record; returns False if it was already stored unchanged."""
+        old = self.records.get(key)
+        if old == record:
+            return False
+        if old is not None:
+            for kind, value in self._entries(old):
+                self._unlink(kind, value, key)
+        self.records[key] = record
+        for kind, value in self._entries(record):
+            self._link(kind, value, key)
+        return True
+
+    def _link(self, kind: str, value: Any, key: str) -> None:
+        if kind == 'network':
+            version, prefix, network = value
+            self.networks.setdefault((version, prefix), {}).setdefault(network, set()).add(key)
+        elif kind in (_DomainTrie.HOST, _DomainTrie.DOMAIN):
+            self.domains.add(value, kind, key)
+        else:
+            getattr(self, kind).setdefault(value, set()).add(key)
+
+    def _unlink(self, kind: str, value: Any, key: str) -> None:
+        if kind == 'network':
+            version, prefix, network = value
+            self.networks.get((version, prefix), {}).get(network, set()).discard(key)
+        elif kind in (_DomainTrie.HOST, _DomainTrie.DOMAIN):
+            self.domains.remove(value, kind, key)
+        else:
+            getattr(self, kind).get(value, set()).discard(key)
+
+    def find_ip(self, packed: bytes) -> Set[str]:
+        """Keys of records for an address, from exact entries and the longest to shortest matching networks."""
+        found = set(self.ips.get(packed, ()))
+        if self.networks:
+            version = 4 if len(packed) == 4 else 6
+            bits = len(packed) * 8
+            address = int.from_bytes(packed, 'big')
+            for (net_version, prefix), table in self.networks.items():
+                if net_version == version:
+                    found.update(table.get(address >> (bits - prefix) << (bits - prefix), ()))
+        return found
+
+    def find(self, ioc: str, ioc_type: str) -> List[str]:
+        ioc = ioc.strip()
+        if ioc_type in ('md5', 'sha1', 'sha256'):
+            keys = self.hashes.get(ioc.lower(), set())
+        elif ioc_type in ('ipv4', 'ipv6'):
+            packed = _pack_ip(ioc)
+            keys = self.find_ip(packed) if packed else set()
+        elif ioc_type == 'url':
+            url = normalize_url(ioc)
+            keys = set(self.urls.get(url, ())) if url else set()
+        elif ioc_type == 'domain':
+            keys = self.domains.find(normalize_domain(ioc))
+        else:
+            keys = set()
+        return sorted(keys, key=self._sort_key, reverse=True)[:MAX_MATCHES]
+
+    def _sort_key(self, key: str) -> str:
+        record = self.records.get(key)
+        return str(record[self.sort_field] or '') if record else ''
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'records': len(self.records),
+            'hashes': len(self.hashes),
+            'urls': len(self.urls),
+            'ips': len(self.ips),
+            'networks': sum(len(table) for table in self.networks.values()),
+            'synced_at': self.state.get('synced_at'),
+            'full_sync_at': self.state.get('full_sync_at'),
+        }
+
+
+def _url_entries(url: str) -> List[Tuple[str, Any]]:
+    """Index entries of a URL: the normalized URL plus its host as IP or domain."""
+    normalized = normalize_url(url)
+    if not normalized:
+        return []
+    entries = [('urls', normalized)]
+    host = urlsplit(normalized).hostname
+    packed = _pack_ip(host) if host else None
+    if packed:
+        entries.append(('ips', packed))
+    elif host:
+        entries.append((_DomainTrie.HOST, host))
+    return entries
+
+
+def _threatfox_entries(record: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    ioc, ioc_type = record['ioc'], record['ioc_type']
+    if ioc_type in ('md5_hash', 'sha1_hash', 'sha256_hash'):
+        return [('hashes', ioc.lower())]
+    if ioc_type == 'url':
+        return _url_entries(ioc)
+    if ioc_type == 'domain':
+        return [(_DomainTrie.DOMAIN, normalize_domain(ioc))]
+    if ioc_type == 'ip:port':
+        ioc = ioc.rsplit(':', 1)[0].strip('[]')
+    try:
+        network = ipaddress.ip_network(ioc, strict=False)
+    except ValueError:
+        return []
+    if network.num_addresses == 1:
+        return [('ips', network.network_address.packed)]
+    return [('network', (network.version, network.prefixlen, int(network.network_address)))]
+
+
+def _urlhaus_entries(record: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    return _url_entries(record['url'])
+
+
+def _malwarebazaar_entries(record: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    return [('hashes', record[field].lower()) for field in ('sha256_hash', 'md5_hash', 'sha1_hash') if record[field]]
+
+
+_INDEX_KEYS = {
+    'threatfox': _threatfox_entries,
+    'urlhaus': _urlhaus_entries,
+    'malwarebazaar': _malwarebazaar_entries,
+}
+
+
+def _unpack(data: bytes) -> str:
+    """Get the text of a dump, unpacking the zip or gzip it may come in."""
+    if data[:2] == b'PK':
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            data = archive.read(archive.namelist()[0])
+    elif data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    return data.decode('utf-8', errors='replace')
+
+
+def _csv_rows(text: str) -> Iterator[List[str]]:
+    """Rows of an abuse.ch CSV dump, whose header and notes are ``#`` comment lines."""
+    lines = (line for line in io.StringIO(text) if line.strip() and not line.startswith('#'))
+    for row in csv.reader(lines, skipinitialspace=True):
+        yield [value.strip() for value in row]
+
+
+def _parse_threatfox(text: str) -> Iterator[Tuple[str, tuple]]:
+    for ioc_id, entries in json.loads(text).items():
+        for entry in entries:
+            tags = entry.get('tags') or ''
+            yield str(ioc_id), (
+                str(ioc_id), entry.get('ioc_value', ''), entry.get('ioc_type', ''), entry.get('threat_type'),
+                entry.get('malware'), entry.get('malware_printable'), entry.get('confidence_level'),
+                entry.get('first_seen_utc'), entry.get('last_seen_utc'), entry.get('reference'),
+                [tag.strip() for tag in tags.split(',') if tag.strip()] if isinstance(tags, str) else tags,
+                entry.get('reporter'),
+            )
+
+
+def _parse_urlhaus(text: str) -> Iterator[Tuple[str, tuple]]:
+    for row in _csv_rows(text):
+        if len(row) < 9:
+            continue
+        url_id, date_added, url, url_status, last_online, threat, tags, link, reporter = row[:9]
+        yield url_id, (
+            url_id, date_added, url, url_status, last_online or None, threat,
+            [tag for tag in tags.split(',') if tag], link, reporter,
+        )
+
+
+def _parse_malwarebazaar(text: str) -> Iterator[Tuple[str, tuple]]:
+    for row in _csv_rows(text):
+        if len(row) < 14:
+            continue
+        values = tuple(None if value in ('', 'n/a') else value for value in row[:14])
+        if values[1]:
+            yield values[1].lower(), values
+
+
+_PARSERS = {
+    'threatfox': _parse_threatfox,
+    'urlhaus': _parse_urlhaus,
+    'malwarebazaar': _parse_malwarebazaar,
+}
+
+_feeds: Dict[str, _FeedIndex] = {}
+_feeds_lock = threading.Lock()
+# Serializes syncs, so two syncs of a feed never both merge into the same index
+_sync_lock = threading.Lock()
+
+
+def _snapshot_path(name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json.gz")
+
+
+def _save_snapshot(index: _FeedIndex) -> None:
+    """Write a feed's records and sync state atomically."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = _snapshot_path(index.name)
+    payload = {
+        'version': SNAPSHOT_VERSION,
+        'fields': index.fields,
+        'state': index.state,
+        'records': index.records,
+    }
+    with gzip.open(f"{path}.tmp", 'wt', encoding='utf-8', compresslevel=3) as f:
+        json.dump(payload, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _load_snapshot(name: str) -> _FeedIndex:
+    """Build a feed's index from its snapshot, or an empty one if there is none."""
+    index = _FeedIndex(name, _INDEX_KEYS[name])
+    path = _snapshot_path(name)
+    if not os.path.exists(path):
+        return index
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read {name} feed snapshot {path}: {e}")
+        return index
+    if payload.get('version') != SNAPSHOT_VERSION or tuple(payload.get('fields', ())) != index.fields:
+        logger.warning(f"Ignoring {name} feed snapshot {path} written by another version")
+        return index
+    for key, record in payload['records'].items():
+        index.put(key, tuple(record))
+    index.state.update(payload.get('state') or {})
+    logger.info(f"Loaded {len(index.records)} {name} records from {path}")
+    return index
+
+
+def get_feed(name: str) -> Optional[_FeedIndex]:
+    """
+    Get a feed's index, loading its snapshot on first use.
+
+    Returns None while another thread is loading it, so lookups on the event
+    loop never wait for a snapshot to be read.
+
+    Args:
+        name: 'threatfox', 'urlhaus' or 'malwarebazaar'
+
+    Returns:
+        The feed index, or None while it is loading
+    """
+    index = _feeds.get(name)
+    if index is not None:
+        return index
+    if not _feeds_lock.acquire(blocking=False):
+        return None
+    try:
+        if name not in _feeds:
+            _feeds[name] = _load_snapshot(name)
+        return _feeds[name]
+    finally:
+        _feeds_lock.release()
+
+
+def load_all() -> None:
+    """Load the snapshots of every feed; called in the background at startup."""
+    with _feeds_lock:
+        for name in FEEDS:
+            if name not in _feeds:
+                _feeds[name] = _load_snapshot(name)
+
+
+def sync_feed(name: str, auth_key: Optional[str] = None, full: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Download a feed dump and update the feed's index and snapshot.
+
+    A full dump replaces the index; a recent dump is merged into a copy of it
+    that then replaces it, so lookups never see an index being changed.
+    Unchanged dumps are detected with the ETag of the previous download.
+
+    Args:
+        name: 'threatfox', 'urlhaus' or 'malwarebazaar'
+        auth_key: abuse.ch Auth-Key
+        full: Force (True) or prevent (False) a full download; by default it is
+            done when the index is empty or its last full sync is FULL_REFRESH_DAYS old
+
+    Returns:
+        Dictionary with the feed, the kind of sync and the number of changed records
+
+    Raises:
+        requests.exceptions.RequestException: If the download fails
+    """
+    load_all()
+    with _sync_lock:
+        return _sync_feed(name, auth_key, full)
+
+
+def _sync_feed(name: str, auth_key: Optional[str], full: Optional[bool]) -> Dict[str, Any]:
+    """Run one sync of :func:`sync_feed`, holding the sync lock."""
+    config = FEEDS[name]
+    index = _feeds[name]
+    if full is None:
+        last_full = index.state.get('full_sync_at')
+        full = not index.records or not last_full or time.time() - last_full > FULL_REFRESH_DAYS * 86400
+    url = config['full_url'] if full else config['recent_url']
+
+    headers = {'Auth-Key': auth_key} if auth_key else {}
+    etag = index.state['etags'].get(url)
+    if etag and index.records:
+        headers['If-None-Match'] = etag
+    started = time.monotonic()
+    response = http_client.get(url, headers=headers, timeout=(10, 300))
+    if response.status_code == 304:
+        logger.debug(f"{name} feed dump unchanged")
+        index.state['synced_at'] = time.time()
+        if full:
+            index.state['full_sync_at'] = index.state['synced_at']
+        return {'feed': name, 'sync': 'not_modified', 'changed': 0, 'records': len(index.records)}
+    response.raise_for_status()
+    records = _PARSERS[name](_unpack(response.content))
+
+    if full:
+        index = _FeedIndex(name, _INDEX_KEYS[name])
+        index.state['etags'] = dict(_feeds[name].state.get('etags') or {})
+        changed = sum(index.put(key, record) for key, record in records)
+        index.state['full_sync_at'] = time.time()
+    else:
+        index = index.copy()
+        index.state.setdefault('full_sync_at', None)
+        changed = sum(index.put(key, record) for key, record in records)
+    index.state['synced_at'] = time.time()
+    if response.headers.get('ETag'):
+        index.state['etags'][url] = response.headers['ETag']
+    _feeds[name] = index
+    _save_snapshot(index)
+
+    sync = 'full' if full else 'incremental'
+    logger.info(f"Synced {name} feed ({sync}) in {time.monotonic() - started:.1f}s: {changed} records changed, {len(index.records)} total")
+    return {'feed': name, 'sync': sync, 'changed': changed, 'records': len(index.records)}
+
+
+def sync_all(apikeys: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Sync every feed an abuse.ch Auth-Key is available for.
+
+    Args:
+        apikeys: API key snapshot; a feed's active stored key is its Auth-Key
+            unless ABUSE_CH_AUTH_KEY is set
+
+    Returns:
+        List of sync results; failed feeds report an ``error`` message
+    """
+    results = []
+    for name, config in FEEDS.items():
+        key_data = (apikeys or {}).get(config['api_key_name']) or {}
+        auth_key = AUTH_KEY or (key_data.get('key') if key_data.get('is_active') else None)
+        if not auth_key:
+            logger.debug(f"Skipping {name} feed sync: no abuse.ch Auth-Key")
+            continue
+        try:
+            results.append(sync_feed(name, auth_key))
+        except Exception as e:
+            logger.error(f"Error syncing {name} feed: {str(e)}")
+            results.append({'feed': name, 'error': str(e)})
+    return results
+
+
+def _not_ready(name: str, index: Optional[_FeedIndex]) -> Optional[Dict[str, Any]]:
+    if index is None:
+        return {"error": 503, "message": f"Offline {name} index is loading."}
+    if not index.records:
+        return {"error": 503, "message": f"Offline {name} index is empty. Add an abuse.ch API key to sync it."}
+    return None
+
+
+def threatfox_lookup(ioc: str, ioc_type: str) -> Dict[str, Any]:
+    """
+    Look up an IOC in the offline ThreatFox index.
+
+    IPs also match listed networks and domains match listed parent domains.
+
+    Args:
+        ioc: IOC value to lookup
+        ioc_type: 'ipv4', 'ipv6', 'domain', 'url', 'md5', 'sha1' or 'sha256'
+
+    Returns:
+        Dictionary shaped like the ThreatFox ``search_ioc`` answer, or error information
+    """
+    index = get_feed('threatfox')
+    error = _not_ready('ThreatFox', index)
+    if error:
+        return error
+    keys = index.find(ioc, ioc_type)
+    if not keys:
+        return {'query_status': 'no_result', 'source': 'offline'}
+    return {'query_status': 'ok', 'source': 'offline', 'data': [index.record(key) for key in keys]}
+
+
+def urlhaus_lookup(ioc: str, ioc_type: str) -> Dict[str, Any]:
+    """
+    Look up a URL, or the URLs hosted on a domain or IP, in the offline URLhaus index.
+
+    Args:
+        ioc: IOC value to lookup
+        ioc_type: 'url', 'domain' or 'ipv4'
+
+    Returns:
+        Dictionary shaped like the URLhaus ``url`` or ``host`` answer, or error information
+    """
+    index = get_feed('urlhaus')
+    error = _not_ready('URLhaus', index)
+    if error:
+        return error
+    keys = index.find(ioc, ioc_type)
+    if not keys:
+        return {'query_status': 'no_results', 'source': 'offline'}
+    if ioc_type == 'url':
+        return {'query_status': 'ok', 'source': 'offline', **index.record(keys[0])}
+    return {
+        'query_status': 'ok',
+        'source': 'offline',
+        'host': ioc.strip(),
+        'url_count': len(keys),
+        'urls': [index.record(key) for key in keys],
+    }
+
+
+def malwarebazaar_lookup(ioc: str) -> Dict[str, Any]:
+    """
+    Look up an MD5, SHA1 or SHA256 hash in the offline MalwareBazaar index.
+
+    Args:
+        ioc: File hash to lookup
+
+    Returns:
+        Dictionary shaped like the MalwareBazaar ``get_info`` answer, or error information
+    """
+    index = get_feed('malwarebazaar')
+    error = _not_ready('MalwareBazaar', index)
+    if error:
+        return error
+    keys = index.hashes.get(ioc.strip().lower())
+    if not keys:
+        return {'query_status': 'hash_not_found', 'source': 'offline'}
+    return {'query_status': 'ok', 'source': 'offline', 'data': [index.record(key) for key in keys]}
+
+
+def get_stats() -> Dict[str, Any]:
+    """
+    Get the size and last sync times of every loaded feed index.
+
+    Returns:
+        Dictionary mapping feed names to their index statistics
+    """
+    return {name: index.stats() for name, index in sorted(_feeds.items())}
+
+
+def main() -> int:
+    """
+    Sync or query the feed indexes from the command line (from the backend directory)::
+
+        python -m app.features.ioc_tools.ioc_lookup.single_lookup.service.threat_feed_index sync [--feed urlhaus] [--full] [--auth-key KEY]
+        python -m app.features.ioc_tools.ioc_lookup.single_lookup.service.threat_feed_index lookup threatfox 1.2.3.4 ipv4
+    """
+    parser = argparse.ArgumentParser(description="Sync and query the offline abuse.ch feed indexes")
+    commands = parser.add_subparsers(dest='command', required=True)
+    sync_parser = commands.add_parser('sync', help='download the dumps and update the indexes')
+    sync_parser.add_argument('--feed', choices=list(FEEDS), action='append', help='feed to sync (default all)')
+    sync_parser.add_argument('--full', action='store_true', default=None, help='download the full dump')
+    sync_parser.add_argument('--auth-key', default=AUTH_KEY, help='abuse.ch Auth-Key (default ABUSE_CH_AUTH_KEY)')
+    lookup_parser = commands.add_parser('lookup', help='look up an indicator in a feed index')
+    lookup_parser.add_argument('feed', choices=list(FEEDS))
+    lookup_parser.add_argument('ioc')
+    lookup_parser.add_argument('ioc_type', choices=['ipv4', 'ipv6', 'domain', 'url', 'md5', 'sha1', 'sha256'])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.command == 'sync':
+        for name in args.feed or FEEDS:
+            print(sync_feed(name, args.auth_key, args.full))
+    elif args.feed == 'malwarebazaar':
+        print(json.dumps(malwarebazaar_lookup(args.ioc), indent=2))
+    else:
+        lookup = threatfox_lookup if args.feed == 'threatfox' else urlhaus_lookup
+        print(json.dumps(lookup(args.ioc, args.ioc_type), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
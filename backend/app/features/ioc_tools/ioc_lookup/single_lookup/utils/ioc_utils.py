@@ -1,4 +1,7 @@
+import ipaddress
 import re
+from typing import Dict, Iterable, List
+from urllib.parse import urlsplit, urlunsplit
 
 IOC_TYPES = {
     'IPV4': 'IPv4',
@@ -25,10 +28,11 @@ IOC_TYPE_PATTERNS = {
     IOC_TYPES['CVE']: re.compile(r"^CVE-[0-9]{4}-[0-9]{4,}$", re.IGNORECASE),
 }
 
-def determine_ioc_type(ioc: str) -> str:
+def determine_ioc_type_regex(ioc: str) -> str:
     """
-    Determines the type of an Indicator of Compromise (IOC).
+    Determines the type of an Indicator of Compromise (IOC) with the full regex chain.
     The order of checks is important to prevent misclassification (e.g., URL before Domain).
+    Kept as the reference for determine_ioc_type, which returns the same labels.
     """
     ioc = ioc.strip()
     
@@ -55,4 +59,97 @@ def determine_ioc_type(ioc: str) -> str:
     if IOC_TYPE_PATTERNS[IOC_TYPES['EMAIL']].match(ioc):
         return IOC_TYPES['EMAIL']
         
-    return IOC_TYPES['UNKNOWN']
\ No newline at end of file
+    return IOC_TYPES['UNKNOWN']
+
+
+_HEX_CHARS = frozenset('0123456789abcdefABCDEF')
+_DIGITS = frozenset('0123456789')
+_HASH_TYPES = {32: IOC_TYPES['MD5'], 40: IOC_TYPES['SHA1'], 64: IOC_TYPES['SHA256']}
+# The IPv6 pattern is applied with re.match and is not anchored at the end, so only
+# the start of a value has to look like an address: eight hextets, "::", up to
+# seven hextets followed by "::" or "fe80:%<zone>". This is the same test.
+_IPV6_PREFIX = re.compile(
+    r"(?:[0-9a-f]{1,4}:){7}[0-9a-f]|::|(?:[0-9a-f]{1,4}:){1,7}:|fe80:%[0-9a-z]", re.IGNORECASE
+)
+
+
+def determine_ioc_type(ioc: str) -> str:
+    """
+    Determines the type of an Indicator of Compromise (IOC).
+    Dispatches on length and characters first, so every value is tested
+    against at most one or two patterns; returns the same labels as
+    determine_ioc_type_regex.
+    """
+    ioc = ioc.strip()
+    length = len(ioc)
+
+    hash_type = _HASH_TYPES.get(length)
+    if hash_type and _HEX_CHARS.issuperset(ioc):
+        return hash_type
+
+    if 7 <= length <= 15 and ioc[-1] in _DIGITS and IOC_TYPE_PATTERNS[IOC_TYPES['IPV4']].match(ioc):
+        return IOC_TYPES['IPV4']
+    if ':' in ioc[:6] and _IPV6_PREFIX.match(ioc):
+        return IOC_TYPES['IPV6']
+
+    if ioc[:4].upper() == 'CVE-' and IOC_TYPE_PATTERNS[IOC_TYPES['CVE']].match(ioc):
+        return IOC_TYPES['CVE']
+
+    if '://' in ioc:
+        if IOC_TYPE_PATTERNS[IOC_TYPES['URL']].match(ioc):
+            return IOC_TYPES['URL']
+    elif '@' in ioc:
+        # Neither a domain nor anything checked before can contain '@'
+        if IOC_TYPE_PATTERNS[IOC_TYPES['EMAIL']].match(ioc):
+            return IOC_TYPES['EMAIL']
+        return IOC_TYPES['UNKNOWN']
+    if '.' in ioc and IOC_TYPE_PATTERNS[IOC_TYPES['DOMAIN']].match(ioc):
+        return IOC_TYPES['DOMAIN']
+
+    if '@' in ioc and IOC_TYPE_PATTERNS[IOC_TYPES['EMAIL']].match(ioc):
+        return IOC_TYPES['EMAIL']
+
+    return IOC_TYPES['UNKNOWN']
+
+
+def determine_ioc_types(iocs: Iterable[str]) -> List[str]:
+    """
+    Determines the types of many IOCs at once, e.g. when importing indicator lists.
+    Repeated values are classified only once.
+    """
+    values = list(iocs)
+    types: Dict[str, str] = {ioc: determine_ioc_type(ioc) for ioc in dict.fromkeys(values)}
+    return [types[ioc] for ioc in values]
+
+
+def normalize_ioc(ioc: str, ioc_type: str) -> str:
+    """
+    Normalize an IOC value so equivalent spellings map to the same key.
+    Hashes, domains and emails are case-insensitive, IPv6 addresses are
+    compressed and URLs get a lower-case scheme and host without default
+    port or fragment.
+    """
+    value = ioc.strip()
+
+    if ioc_type in (IOC_TYPES['MD5'], IOC_TYPES['SHA1'], IOC_TYPES['SHA256'], IOC_TYPES['EMAIL']):
+        return value.lower()
+    if ioc_type == IOC_TYPES['DOMAIN']:
+        return value.lower().rstrip('.')
+    if ioc_type == IOC_TYPES['IPV6']:
+        try:
+            return ipaddress.IPv6Address(value.split('%')[0]).compressed
+        except ValueError:
+            return value.lower()
+    if ioc_type == IOC_TYPES['CVE']:
+        return value.upper()
+    if ioc_type == IOC_TYPES['URL']:
+        try:
+            parts = urlsplit(value)
+        except ValueError:
+            return value
+        scheme, netloc = parts.scheme.lower(), parts.netloc.lower()
+        host, _, port = netloc.rpartition(':')
+        if (scheme, port) in (('http', '80'), ('https', '443')):
+            netloc = host
+        return urlunsplit((scheme, netloc, parts.path, parts.query, ''))
+    return value
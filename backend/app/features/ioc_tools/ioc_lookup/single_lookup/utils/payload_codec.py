@@ -0,0 +1,53 @@
+import os
+import json
+import zlib
+import base64
+from typing import Any
+
+# Payloads whose JSON is at least this many bytes are stored compressed
+COMPRESS_MIN_BYTES = int(os.getenv("IOC_PAYLOAD_COMPRESS_MIN_BYTES", "1024"))
+COMPRESSION_LEVEL = 6
+
+# Prefix of compressed payloads; plain JSON never starts with it
+_COMPRESSED_PREFIX = 'z:'
+
+
+def encode_payload(payload: Any) -> str:
+    """
+    Serialize a lookup payload for a Text column, compressing large ones.
+
+    Vendor answers are repetitive JSON and shrink several times under zlib,
+    which more than makes up for the base64 needed to keep the column text.
+
+    Args:
+        payload: JSON-serializable payload
+
+    Returns:
+        Plain JSON, or the prefixed base64 of the zlib-compressed JSON
+    """
+    text = json.dumps(payload)
+    if len(text) < COMPRESS_MIN_BYTES:
+        return text
+    compressed = zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL)
+    return _COMPRESSED_PREFIX + base64.b64encode(compressed).decode('ascii')
+
+
+def decode_payload(text: str) -> Any:
+    """
+    Read a payload written by :func:`encode_payload` or stored as plain JSON before.
+
+    Args:
+        text: Stored payload
+
+    Returns:
+        The payload
+
+    Raises:
+        ValueError: If the payload is neither valid JSON nor a valid compressed payload
+    """
+    if text.startswith(_COMPRESSED_PREFIX):
+        try:
+            text = zlib.decompress(base64.b64decode(text[len(_COMPRESSED_PREFIX):])).decode('utf-8')
+        except (zlib.error, ValueError) as e:
+            raise ValueError(f"Corrupt compressed payload: {e}") from e
+    return json.loads(text)
@@ -0,0 +1,109 @@
+"""
+Benchmark the IOC type classifier against the regex chain it replaced.
+
+Builds a mixed corpus of indicators, checks that determine_ioc_type and
+determine_ioc_types return exactly the labels of determine_ioc_type_regex and
+reports the throughput of each.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_ioc_classifier [--count 200000] [--unique 0.5] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.ioc_utils import (  # noqa: E402
+    determine_ioc_type, determine_ioc_type_regex, determine_ioc_types
+)
+
+
+def _hex(length: int) -> str:
+    return ''.join(random.choice('0123456789abcdef') for _ in range(length))
+
+
+def _ipv4() -> str:
+    return '.'.join(str(random.randint(0, 255)) for _ in range(4))
+
+
+def _ipv6() -> str:
+    groups = [format(random.randint(0, 0xffff), 'x') for _ in range(8)]
+    if random.random() < 0.5:
+        start = random.randint(1, 6)
+        return ':'.join(groups[:start]) + '::' + ':'.join(groups[start + 1:])
+    return ':'.join(groups)
+
+
+def _domain() -> str:
+    label = ''.join(random.choice(string.ascii_lowercase) for _ in range(random.randint(3, 12)))
+    return f"{label}.{random.choice(['com', 'net', 'org', 'co.uk', 'io', 'ru'])}"
+
+
+GENERATORS = [
+    lambda: _hex(32),
+    lambda: _hex(40),
+    lambda: _hex(64),
+    _ipv4,
+    _ipv6,
+    _domain,
+    lambda: f"https://{_domain()}/{_hex(8)}?id={random.randint(1, 999)}",
+    lambda: f"http://{_ipv4()}:8080/login",
+    lambda: f"user{random.randint(1, 999)}@{_domain()}",
+    lambda: f"CVE-{random.randint(1999, 2025)}-{random.randint(1000, 99999)}",
+    lambda: ''.join(random.choice(string.printable.strip()) for _ in range(random.randint(1, 30))),
+]
+
+
+def build_corpus(count: int, unique: float, seed: int = 42) -> list:
+    """Mixed indicator values, roughly one tenth of each type plus noise; ``unique`` is the share of distinct values."""
+    random.seed(seed)
+    pool = [random.choice(GENERATORS)() for _ in range(max(int(count * unique), 1))]
+    return pool + [random.choice(pool) for _ in range(count - len(pool))]
+
+
+def _time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=200000, help='number of indicator values')
+    parser.add_argument('--unique', type=float, default=0.5, help='share of distinct values; indicator exports repeat a lot')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per classifier, the best one is reported')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.count, args.unique)
+    expected = [determine_ioc_type_regex(value) for value in corpus]
+    fast = [determine_ioc_type(value) for value in corpus]
+    batch = determine_ioc_types(corpus)
+    mismatches = [(v, e, f) for v, e, f in zip(corpus, expected, fast) if e != f]
+    if mismatches or batch != expected:
+        for value, old, new in mismatches[:20]:
+            print(f"MISMATCH {value!r}: regex={old} fast={new}")
+        print(f"{len(mismatches)} of {len(corpus)} labels differ")
+        return 1
+    print(f"Labels identical for {len(corpus)} values: {dict(Counter(expected))}")
+
+    regex_time = _time(lambda: [determine_ioc_type_regex(value) for value in corpus], args.repeat)
+    fast_time = _time(lambda: [determine_ioc_type(value) for value in corpus], args.repeat)
+    batch_time = _time(lambda: determine_ioc_types(corpus), args.repeat)
+    for name, seconds in (('regex chain', regex_time), ('determine_ioc_type', fast_time), ('determine_ioc_types', batch_time)):
+        print(
+            f"{name:<20} {seconds:8.3f}s  {len(corpus) / seconds:12,.0f} values/s  "
+            f"{regex_time / seconds:5.1f}x"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Benchmark lookups in the local GeoIP/ASN range index.
+
+Compiles a synthetic range table about the size of the public ip2asn table
+into a temporary index, checks a sample of lookups against a linear scan of the
+table and reports the latency of lookup_ip and of the raw range search.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_local_geoip [--ranges 500000] [--lookups 200000] [--repeat 3]
+    python -m benchmarks.bench_local_geoip --index data/geoip/ip2asn.idx   # time a real index instead
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import ipaddress
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import local_geoip  # noqa: E402
+
+COUNTRIES = ['US', 'DE', 'CN', 'RU', 'BR', 'NL', 'FR', 'GB', 'JP', 'IN']
+
+
+def build_ranges(count: int, seed: int = 42) -> list:
+    """Non-overlapping IPv4 ranges with gaps, plus one IPv6 range for every tenth IPv4 range."""
+    random.seed(seed)
+    rows = []
+    step = (2 ** 32) // count
+    for i in range(count):
+        start = i * step + random.randint(0, step // 4)
+        end = start + random.randint(0, step // 2)
+        asn = random.randint(1, 400000)
+        rows.append((ipaddress.IPv4Address(start), ipaddress.IPv4Address(end), asn, random.choice(COUNTRIES), f"AS-NAME-{asn % 50000}"))
+    step6 = (2 ** 128) // (count // 10 + 1)
+    for i in range(count // 10):
+        start = (1 << 125) + i * (step6 >> 3)
+        rows.append((ipaddress.IPv6Address(start), ipaddress.IPv6Address(start + (step6 >> 4)), i + 1, random.choice(COUNTRIES), f"AS-NAME-{i % 50000}"))
+    return rows
+
+
+def random_addresses(count: int, v6_share: float = 0.1) -> list:
+    addresses = []
+    for _ in range(count):
+        if random.random() < v6_share:
+            addresses.append(str(ipaddress.IPv6Address(random.getrandbits(128) >> 2 | (1 << 125))))
+        else:
+            addresses.append(str(ipaddress.IPv4Address(random.getrandbits(32))))
+    return addresses
+
+
+def check(rows: list, addresses: list) -> int:
+    """Compare lookups with a linear scan of the source rows; returns the number of mismatches."""
+    table = [(row[0].version, int(row[0]), int(row[1]), row[2]) for row in rows]
+    mismatches = 0
+    for value in addresses:
+        address = ipaddress.ip_address(value)
+        key = int(address)
+        expected = next((asn for version, start, end, asn in table if version == address.version and start <= key <= end), None)
+        if local_geoip.lookup_ip(value)['asn'] != expected:
+            mismatches += 1
+            print(f"MISMATCH {value}: expected AS{expected}")
+    return mismatches
+
+
+def _time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ranges', type=int, default=500000, help='IPv4 ranges in the synthetic table')
+    parser.add_argument('--lookups', type=int, default=200000, help='addresses looked up per run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs, the best one is reported')
+    parser.add_argument('--index', default=None, help='time an existing index file instead of a synthetic one')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.index:
+            path = args.index
+        else:
+            rows = build_ranges(args.ranges)
+            path = os.path.join(tmp, 'bench.idx')
+            started = time.perf_counter()
+            result = local_geoip.compile_index(rows, path)
+            print(f"Compiled {result['ipv4_ranges']} IPv4 and {result['ipv6_ranges']} IPv6 ranges "
+                  f"in {time.perf_counter() - started:.2f}s ({os.path.getsize(path) / 2 ** 20:.1f} MiB)")
+        if not local_geoip.load(path):
+            print(f"Could not load {path}")
+            return 1
+
+        addresses = random_addresses(args.lookups)
+        if not args.index:
+            mismatches = check(rows, addresses[:100])
+            if mismatches:
+                print(f"{mismatches} of 100 sampled lookups differ from a linear scan")
+                return 1
+            print("100 sampled lookups match a linear scan of the table")
+
+        packed = [local_geoip._pack_address(value) for value in addresses]
+        index = local_geoip._index
+        lookup_time = _time(lambda: [local_geoip.lookup_ip(value) for value in addresses], args.repeat)
+        find_time = _time(lambda: [index.find(address) for address in packed], args.repeat)
+        found = sum(1 for address in packed if index.find(address))
+        print(f"{found} of {len(addresses)} addresses inside a range")
+        for name, seconds in (('lookup_ip', lookup_time), ('range search', find_time)):
+            print(f"{name:<14} {seconds / len(addresses) * 1e6:8.2f} us/lookup  {len(addresses) / seconds:12,.0f} lookups/s")
+        # Drop the mapping before the temporary directory is removed
+        local_geoip._index = index = None
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+Load-test the IOC lookup path against the mock vendor server.
+
+Drives process_bulk_lookups and the /api/ioc/lookup/{service} endpoint at a
+series of concurrency levels and reports throughput, p50/p95/p99 latency and
+peak memory per level. Vendor calls go to benchmarks/mock_vendor_server.py
+(started in a background thread unless --mock-url points at a running one),
+API keys and the result cache live in a temporary database, and every lookup
+bypasses the cache so each one reaches the mock vendor.
+
+For the bulk target the concurrency is the number of bulk runs at the same
+time, each over its share of the indicators, and latency is that of a single
+service lookup (a batch call counts once per indicator in it). For the single
+target it is the number of requests in flight, and latency is that of one
+HTTP request. Peak memory is measured with tracemalloc, which slows Python
+allocations somewhat; compare runs with each other rather than with
+production timings.
+
+The services' configured rate limits are lifted unless --keep-rate-limits is
+given, so the numbers show what the pipeline itself can do.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_lookup_pipeline [--target bulk|single|both] [--concurrency 1,8,32]
+        [--iocs 2000] [--requests 2000] [--services virustotal,abuseipdb,alienvault,crowdsec,threatfox]
+        [--latency 0.05] [--jitter 0.02] [--error-rate 0] [--throttle-rate 0] [--quota N]
+        [--mock-url http://127.0.0.1:8900] [--keep-rate-limits] [--json results.json]
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from app.core import database  # noqa: E402
+from app.core.settings.api_keys.models.api_keys_settings_models import Apikey  # noqa: E402
+from app.core.settings.api_keys.crud.api_keys_settings_crud import invalidate_apikey_snapshot  # noqa: E402
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.models import bulk_lookup_job_models  # noqa: E402,F401
+from app.features.ioc_tools.ioc_lookup.single_lookup.models import lookup_cache_models  # noqa: E402,F401
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service import bulk_ioc_lookup_service  # noqa: E402
+from app.features.ioc_tools.ioc_lookup.single_lookup.routers import single_ioc_lookup_routes  # noqa: E402
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import http_client, rate_limiter  # noqa: E402
+from app.features.ioc_tools.ioc_lookup.single_lookup.service.service_registry import get_service  # noqa: E402
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.ioc_utils import determine_ioc_type  # noqa: E402
+from benchmarks import mock_vendor_server  # noqa: E402
+
+DEFAULT_SERVICES = 'virustotal,abuseipdb,alienvault,crowdsec,threatfox,safeBrowse,pulsedive'
+
+
+def _hex(length: int) -> str:
+    return '%0*x' % (length, random.getrandbits(length * 4))
+
+
+def build_iocs(count: int, seed: int = 42) -> List[str]:
+    """Distinct indicators of mixed types."""
+    random.seed(seed)
+    generators = [
+        lambda i: f"{random.randint(1, 223)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{i % 254 + 1}",
+        lambda i: f"{_hex(8)}-{i}.{random.choice(['com', 'net', 'org', 'io'])}",
+        lambda i: f"https://{_hex(8)}.com/{_hex(6)}/{i}",
+        lambda i: _hex(64),
+        lambda i: _hex(32),
+    ]
+    return list(dict.fromkeys(random.choice(generators)(i) for i in range(count)))
+
+
+def use_temp_database(directory: str, services: List[str]) -> None:
+    """Point the application at an empty database with a mock key for every selected service."""
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", connect_args={"check_same_thread": False})
+    database.SessionLocal.configure(bind=engine)
+    database.Base.metadata.create_all(bind=engine)
+    with database.SessionLocal() as db:
+        for name in services:
+            config = get_service(name) or {}
+            for key_name in config.get('api_key_names') or [config.get('api_key_name')]:
+                if key_name:
+                    db.merge(Apikey(name=key_name, key='mock', is_active=True, bulk_ioc_lookup=True))
+        db.commit()
+    invalidate_apikey_snapshot()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    return values[max(math.ceil(pct / 100 * len(values)) - 1, 0)]
+
+
+def report(target: str, concurrency: int, latencies: List[float], errors: int, seconds: float, peak: int) -> Dict[str, Any]:
+    latencies.sort()
+    result = {
+        'target': target,
+        'concurrency': concurrency,
+        'lookups': len(latencies),
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'throughput': round(len(latencies) / seconds, 1) if seconds else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'peak_mb': round(peak / 1024 / 1024, 1),
+    }
+    print(f"{target:<7}{concurrency:>6}{result['lookups']:>9}{errors:>8}{result['seconds']:>9.2f}"
+          f"{result['throughput']:>10.1f}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+          f"{result['peak_mb']:>9.1f}")
+    return result
+
+
+async def bench_bulk(iocs: List[str], services: List[str], concurrency: int) -> Dict[str, Any]:
+    """Run ``concurrency`` bulk lookups at the same time over a share of the indicators each.
+
+    Only lookups of a type the service supports are measured; the pipeline
+    answers the others at once without a request.
+    """
+    latencies: List[float] = []
+    errors = 0
+    run_single, run_batch = bulk_ioc_lookup_service.run_single_lookup, bulk_ioc_lookup_service.run_batch_lookup
+
+    async def timed_single(service_name, ioc, ioc_type, *args, **kwargs):
+        nonlocal errors
+        if not supports(service_name, ioc_type):
+            return await run_single(service_name, ioc, ioc_type, *args, **kwargs)
+        started = time.perf_counter()
+        outcome = await run_single(service_name, ioc, ioc_type, *args, **kwargs)
+        latencies.append(time.perf_counter() - started)
+        errors += isinstance(outcome[0], dict) and 'error' in outcome[0]
+        return outcome
+
+    async def timed_batch(service_name, batch, ioc_type, *args, **kwargs):
+        nonlocal errors
+        if not supports(service_name, ioc_type):
+            return await run_batch(service_name, batch, ioc_type, *args, **kwargs)
+        started = time.perf_counter()
+        outcomes = await run_batch(service_name, batch, ioc_type, *args, **kwargs)
+        latencies.extend([time.perf_counter() - started] * len(batch))
+        errors += sum(isinstance(result, dict) and 'error' in result for result, _ in outcomes.values())
+        return outcomes
+
+    async def one_run(share: List[str]) -> None:
+        with database.SessionLocal() as db:
+            async for _ in bulk_ioc_lookup_service.process_bulk_lookups(share, services, db, force_refresh=True):
+                pass
+
+    shares = [iocs[i::concurrency] for i in range(concurrency)]
+    bulk_ioc_lookup_service.run_single_lookup, bulk_ioc_lookup_service.run_batch_lookup = timed_single, timed_batch
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one_run(share) for share in shares if share))
+    finally:
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        bulk_ioc_lookup_service.run_single_lookup, bulk_ioc_lookup_service.run_batch_lookup = run_single, run_batch
+    return report('bulk', concurrency, latencies, errors, seconds, peak)
+
+
+async def bench_single(pairs: List[Tuple[str, str]], concurrency: int) -> Dict[str, Any]:
+    """Send the single lookup requests with ``concurrency`` requests in flight."""
+    app = FastAPI()
+    app.include_router(single_ioc_lookup_routes.router)
+    latencies: List[float] = []
+    errors = 0
+    queue = list(reversed(pairs))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while queue:
+            service, ioc = queue.pop()
+            started = time.perf_counter()
+            response = await client.get(f"/api/ioc/lookup/{service}", params={'ioc': ioc, 'force_refresh': 'true'})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200 or 'error' in response.json():
+                errors += 1
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=120) as client:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    finally:
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return report('single', concurrency, latencies, errors, seconds, peak)
+
+
+def supports(service: str, ioc_type: str) -> bool:
+    """Whether the service looks up indicators of the type."""
+    return ioc_type in (get_service(service) or {}).get('supported_ioc_types', [])
+
+
+def lookup_pairs(iocs: List[str], services: List[str], count: int) -> List[Tuple[str, str]]:
+    """(service, indicator) pairs of supported types, cycling through the services."""
+    types = {ioc: determine_ioc_type(ioc) for ioc in iocs}
+    pairs = [(service, ioc) for ioc in iocs for service in services if supports(service, types[ioc])]
+    random.shuffle(pairs)
+    return pairs[:count]
+
+
+async def run(args: argparse.Namespace, services: List[str]) -> List[Dict[str, Any]]:
+    iocs = build_iocs(args.iocs)
+    pairs = lookup_pairs(iocs, services, args.requests)
+    # Opens the client sessions and fetches OAuth tokens outside the measurements
+    with database.SessionLocal() as db:
+        async for _ in bulk_ioc_lookup_service.process_bulk_lookups(iocs[:len(services)], services, db, force_refresh=True):
+            pass
+
+    print(f"{'target':<7}{'conc':>6}{'lookups':>9}{'errors':>8}{'seconds':>9}{'per sec':>10}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'peak MB':>9}")
+    results = []
+    for concurrency in args.concurrency:
+        if args.target in ('bulk', 'both'):
+            results.append(await bench_bulk(iocs, services, concurrency))
+        if args.target in ('single', 'both'):
+            results.append(await bench_single(pairs, concurrency))
+    await http_client.async_close()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', choices=['bulk', 'single', 'both'], default='both')
+    parser.add_argument('--concurrency', type=lambda v: [int(c) for c in v.split(',')], default=[1, 8, 32],
+                        help='comma-separated concurrency levels')
+    parser.add_argument('--iocs', type=int, default=2000, help='indicators in the bulk runs')
+    parser.add_argument('--requests', type=int, default=2000, help='single lookup requests per level')
+    parser.add_argument('--services', default=DEFAULT_SERVICES, help='comma-separated services to query')
+    parser.add_argument('--latency', type=float, default=0.05, help='mock vendor answer delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.02, help='random extra mock delay of up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of mock answers that are 500/503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of mock answers that are 429')
+    parser.add_argument('--quota', type=int, default=None, help='mock requests per second per vendor before 429s')
+    parser.add_argument('--mock-url', default=None, help='use a running mock vendor server instead of starting one')
+    parser.add_argument('--keep-rate-limits', action='store_true', help="keep the services' configured rate limits")
+    parser.add_argument('--json', default=None, help='also write the results to this file')
+    args = parser.parse_args()
+
+    services = [s for s in args.services.split(',') if get_service(s)]
+    if not services:
+        parser.error("none of the given services is registered")
+
+    stop = None
+    mock_url = args.mock_url
+    if not mock_url:
+        mock_url, stop = mock_vendor_server.start_in_thread(
+            latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate, quota=args.quota, seed=42
+        )
+    http_client.configure(mock_url=mock_url)
+    if not args.keep_rate_limits:
+        for service in services:
+            rate_limiter.configure(service, per_second=None, per_day=None)
+
+    print(f"Mock vendor server: {mock_url}; services: {', '.join(services)}")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            use_temp_database(directory, services)
+            results = asyncio.run(run(args, services))
+    finally:
+        if stop:
+            stop()
+
+    print(f"Peak RSS of the process: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Benchmark the offline abuse.ch feed indexes.
+
+Fills the ThreatFox, URLhaus and MalwareBazaar indexes with synthetic records
+(no download, nothing written to disk) and runs a bulk lookup of mixed
+indicators, a share of them listed, through the lookup engine like a bulk job
+against the three offline services.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_threat_feed_index [--records 200000] [--lookups 100000] [--hit-rate 0.2]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import threat_feed_index  # noqa: E402
+from app.features.ioc_tools.ioc_lookup.single_lookup.service.ioc_lookup_engine import lookup_ioc_with_meta  # noqa: E402
+from app.features.ioc_tools.ioc_lookup.single_lookup.utils.ioc_utils import determine_ioc_type  # noqa: E402
+
+SERVICES = {
+    'IPv4': ['threatfoxoffline', 'urlhausoffline'],
+    'Domain': ['threatfoxoffline', 'urlhausoffline'],
+    'URL': ['threatfoxoffline', 'urlhausoffline'],
+    'MD5': ['threatfoxoffline', 'malwarebazaaroffline'],
+    'SHA256': ['threatfoxoffline', 'malwarebazaaroffline'],
+}
+
+
+def _hex(length: int) -> str:
+    return '%0*x' % (length, random.getrandbits(length * 4))
+
+
+def _ip() -> str:
+    return '.'.join(str(random.randint(1, 254)) for _ in range(4))
+
+
+def _domain() -> str:
+    return f"{_hex(10)}.{random.choice(['com', 'net', 'org', 'ru'])}"
+
+
+def build_feeds(count: int) -> list:
+    """Fill the three indexes with ``count`` records each; returns the listed indicators."""
+    listed = []
+    threatfox = threat_feed_index._FeedIndex('threatfox', threat_feed_index._INDEX_KEYS['threatfox'])
+    urlhaus = threat_feed_index._FeedIndex('urlhaus', threat_feed_index._INDEX_KEYS['urlhaus'])
+    bazaar = threat_feed_index._FeedIndex('malwarebazaar', threat_feed_index._INDEX_KEYS['malwarebazaar'])
+    for i in range(count):
+        kind, value = random.choice([
+            ('ip:port', f"{_ip()}:443"), ('domain', _domain()), ('url', f"http://{_domain()}/{_hex(6)}"),
+            ('md5_hash', _hex(32)), ('sha256_hash', _hex(64)),
+        ])
+        threatfox.put(str(i), (str(i), value, kind, 'botnet_cc', 'm', 'M', 75, '2026-01-01', None, None, [], 'r'))
+        listed.append(value.rsplit(':', 1)[0] if kind == 'ip:port' else value)
+
+        url = f"http://{_ip() if i % 3 == 0 else _domain()}/{_hex(8)}"
+        urlhaus.put(str(i), (str(i), '2026-01-01', url, 'online', None, 'malware_download', [], None, 'r'))
+        listed.append(url)
+
+        sha256, md5 = _hex(64), _hex(32)
+        bazaar.put(sha256, ('2026-01-01', sha256, md5, _hex(40), 'r', 'a.exe', 'exe', None, 'Sig', None, None, None, None, None))
+        listed.append(random.choice([sha256, md5]))
+    threat_feed_index._feeds.update({'threatfox': threatfox, 'urlhaus': urlhaus, 'malwarebazaar': bazaar})
+    return listed
+
+
+def build_queries(listed: list, count: int, hit_rate: float) -> list:
+    generators = [_ip, _domain, lambda: f"https://{_domain()}/{_hex(8)}", lambda: _hex(32), lambda: _hex(64)]
+    return [random.choice(listed) if random.random() < hit_rate else random.choice(generators)() for _ in range(count)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=200000, help='records per feed')
+    parser.add_argument('--lookups', type=int, default=100000, help='indicators in the bulk run')
+    parser.add_argument('--hit-rate', type=float, default=0.2, help='share of indicators that are listed')
+    args = parser.parse_args()
+
+    random.seed(42)
+    started = time.perf_counter()
+    listed = build_feeds(args.records)
+    print(f"Indexed {args.records} records per feed in {time.perf_counter() - started:.2f}s")
+    queries = build_queries(listed, args.lookups, args.hit_rate)
+
+    started = time.perf_counter()
+    lookups = hits = 0
+    for ioc in queries:
+        ioc_type = determine_ioc_type(ioc)
+        for service in SERVICES.get(ioc_type, ()):
+            result, _ = lookup_ioc_with_meta(service, ioc, ioc_type, None)
+            lookups += 1
+            hits += result.get('query_status') == 'ok'
+    seconds = time.perf_counter() - started
+    print(f"{len(queries)} indicators, {lookups} service lookups, {hits} hits in {seconds:.2f}s "
+          f"({lookups / seconds:,.0f} lookups/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,493 @@
+"""
+Local stand-in for the threat intelligence vendor APIs.
+
+Answers the requests of the clients in external_api_clients.py and
+async_external_api_clients.py with responses shaped like the vendors' own,
+so the lookup path can be load-tested without using real API quota. Every
+verdict is derived from a hash of the indicator, so the same indicator always
+gets the same answer and about ``--malicious-rate`` of them are flagged.
+
+Latency, error rates and 429 behaviour are configurable: ``--throttle-rate``
+answers a share of requests with 429 and a Retry-After header, ``--quota``
+enforces a per-vendor requests-per-second quota with the X-RateLimit headers
+the rate limiter reads.
+
+Point the application at it with OUTBOUND_MOCK_URL; requests then go to
+<mock url>/<vendor host><path>:
+
+    python -m benchmarks.mock_vendor_server --port 8900 --latency 0.2 --jitter 0.1
+    OUTBOUND_MOCK_URL=http://127.0.0.1:8900 uvicorn main:app
+
+Usage (from the backend directory):
+    python -m benchmarks.mock_vendor_server [--port 8900] [--latency 0.1] [--jitter 0.05]
+        [--error-rate 0.01] [--throttle-rate 0.01] [--quota 50] [--malicious-rate 0.1]
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from base64 import b64decode
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import unquote
+
+from aiohttp import web
+
+Answer = Tuple[int, Any]
+
+
+def _roll(ioc: str) -> float:
+    """Stable pseudo-random number in [0, 1) for an indicator."""
+    return int(hashlib.md5(ioc.lower().encode()).hexdigest()[:8], 16) / 0x100000000
+
+
+def _level(ioc: str, malicious_rate: float) -> str:
+    """'malicious', 'suspicious', 'clean' or 'unknown' for an indicator; the last for about a fifth of them."""
+    roll = _roll(ioc)
+    if roll < malicious_rate:
+        return 'malicious'
+    if roll < malicious_rate * 2:
+        return 'suspicious'
+    return 'unknown' if roll > 0.8 else 'clean'
+
+
+def _quoted(query: str) -> str:
+    """The first double-quoted or single-quoted value of a search query."""
+    for quote in ('"', "'"):
+        if quote in query:
+            return query.split(quote)[1]
+    return query
+
+
+def _token(request: Dict[str, Any], level: str) -> Answer:
+    return 201, {"access_token": "mock-token", "token_type": "bearer", "expires_in": 1799}
+
+
+def _abuseipdb(request: Dict[str, Any], level: str) -> Answer:
+    ip = request['query'].get('ipAddress', '')
+    score = {'malicious': 100, 'suspicious': 40, 'clean': 0, 'unknown': 0}[level]
+    return 200, {"data": {
+        "ipAddress": ip, "isPublic": True, "ipVersion": 4, "isWhitelisted": False,
+        "abuseConfidenceScore": score, "countryCode": "US", "usageType": "Data Center/Web Hosting/Transit",
+        "isp": "Mock Networks", "domain": "mock.example", "totalReports": score // 4,
+        "numDistinctUsers": score // 10, "lastReportedAt": None, "reports": []
+    }}
+
+
+def _alienvault(request: Dict[str, Any], level: str) -> Answer:
+    indicator = request['path'].split('/')[5] if request['path'].count('/') >= 5 else ''
+    pulses = {'malicious': 12, 'suspicious': 2}.get(level, 0)
+    activities = [{"name": "Malicious Host", "source": "mock"}] if level == 'malicious' else []
+    return 200, {
+        "indicator": indicator, "type_title": "IPv4", "reputation": {"activities": activities},
+        "pulse_info": {"count": pulses, "pulses": [{"name": f"Mock pulse {i}", "tags": []} for i in range(pulses)]},
+        "base_indicator": {"indicator": indicator}, "validation": []
+    }
+
+
+def _bgpview(request: Dict[str, Any], level: str) -> Answer:
+    ip = request['path'].rsplit('/', 1)[-1]
+    return 200, {"status": "ok", "status_message": "Query was successful", "data": {
+        "ip": ip, "ptr_record": None,
+        "prefixes": [{"prefix": f"{ip.rsplit('.', 1)[0]}.0/24", "asn": {"asn": 64500, "name": "MOCK-AS", "country_code": "US"}}],
+        "rir_allocation": {"rir_name": "ARIN", "country_code": "US"}
+    }}
+
+
+def _checkphish(request: Dict[str, Any], level: str) -> Answer:
+    url = (request['json'] or {}).get('urlInfo', {}).get('url', '')
+    return 200, {
+        "jobID": hashlib.md5(url.encode()).hexdigest(), "timestamp": int(time.time() * 1000), "url": url,
+        "status": "DONE", "disposition": "phish" if level == 'malicious' else "clean", "brand": "unknown",
+        "insights": True, "resolved": True
+    }
+
+
+def _crowdsec(request: Dict[str, Any], level: str) -> Answer:
+    ip = request['path'].rsplit('/', 1)[-1]
+    if level == 'unknown':
+        return 404, {"message": "IP address information not found"}
+    score = {'malicious': 0.9, 'suspicious': 0.6}.get(level, 0.1)
+    return 200, {
+        "ip": ip, "ip_range": f"{ip.rsplit('.', 1)[0]}.0/24", "ip_range_score": score, "as_name": "MOCK-AS",
+        "reputation": level, "behaviors": [], "classifications": {"classifications": [], "false_positives": []}
+    }
+
+
+def _crowdstrike(request: Dict[str, Any], level: str) -> Answer:
+    query = request['query'].get('filter', '')
+    values = [v for v in query.split("'")[1::2]] or [query]
+    resources = [
+        {"indicator": value, "type": "ip_address", "malicious_confidence": "high", "labels": [], "actors": []}
+        for value in values if _level(value, request['malicious_rate']) == 'malicious'
+    ]
+    return 200, {"meta": {"query_time": 0.01, "pagination": {"total": len(resources)}}, "resources": resources, "errors": []}
+
+
+def _emailrep(request: Dict[str, Any], level: str) -> Answer:
+    email = unquote(request['path'].rsplit('/', 1)[-1])
+    reputation = {'malicious': 'low', 'suspicious': 'low', 'clean': 'high'}.get(level, 'none')
+    return 200, {
+        "email": email, "reputation": reputation, "suspicious": level == 'malicious', "references": 3,
+        "details": {"blacklisted": level == 'malicious', "malicious_activity": level == 'malicious',
+                    "credentials_leaked": level != 'clean', "disposable": False, "free_provider": True}
+    }
+
+
+def _empty_search(request: Dict[str, Any], level: str) -> Answer:
+    return 200, {"total_count": 0, "incomplete_results": False, "items": []}
+
+
+def _hibp(request: Dict[str, Any], level: str) -> Answer:
+    if level in ('clean', 'unknown'):
+        return 404, ""
+    return 200, [{"Name": "MockBreach", "Title": "Mock Breach", "Domain": "mock.example", "BreachDate": "2020-01-01",
+                  "PwnCount": 100000, "DataClasses": ["Email addresses", "Passwords"]}]
+
+
+def _hunter(request: Dict[str, Any], level: str) -> Answer:
+    email = request['query'].get('email', '')
+    result = {'malicious': 'undeliverable', 'suspicious': 'risky'}.get(level, 'deliverable')
+    return 200, {"data": {"status": "valid" if result == 'deliverable' else "invalid", "result": result, "score": 80,
+                          "email": email, "disposable": False, "webmail": True, "mx_records": True}}
+
+
+def _ipqualityscore(request: Dict[str, Any], level: str) -> Answer:
+    score = {'malicious': 95, 'suspicious': 80, 'clean': 10, 'unknown': 0}[level]
+    return 200, {"success": True, "message": "Success", "fraud_score": score, "country_code": "US", "ISP": "Mock Networks",
+                 "proxy": level == 'malicious', "vpn": False, "tor": False, "recent_abuse": level != 'clean',
+                 "bot_status": False, "request_id": "mock"}
+
+
+def _maltiverse(request: Dict[str, Any], level: str) -> Answer:
+    if level == 'unknown':
+        return 404, {"message": "Not found"}
+    return 200, {"classification": {'clean': 'neutral'}.get(level, level), "blacklist": [
+        {"source": "Mock", "description": "Mock listing", "first_seen": "2026-01-01 00:00:00"}
+    ] if level != 'clean' else [], "tag": []}
+
+
+def _malwarebazaar(request: Dict[str, Any], level: str) -> Answer:
+    sha = request['form'].get('hash', '')
+    if level != 'malicious':
+        return 200, {"query_status": "hash_not_found"}
+    return 200, {"query_status": "ok", "data": [{"sha256_hash": sha, "file_name": "mock.exe", "file_type": "exe",
+                                                 "signature": "MockLoader", "first_seen": "2026-01-01 00:00:00", "tags": []}]}
+
+
+def _mandiant(request: Dict[str, Any], level: str) -> Answer:
+    requests = (request['json'] or {}).get('requests') or []
+    indicators = [
+        {"value": r.get('value'), "type": r.get('type'), "mscore": 90, "sources": []}
+        for r in requests if _level(str(r.get('value')), request['malicious_rate']) == 'malicious'
+    ]
+    return 200, {"indicators": indicators}
+
+
+def _nvd(request: Dict[str, Any], level: str) -> Answer:
+    cve = request['query'].get('cveId', '')
+    return 200, {"resultsPerPage": 1, "startIndex": 0, "totalResults": 1, "vulnerabilities": [{"cve": {
+        "id": cve, "published": "2026-01-01T00:00:00", "vulnStatus": "Analyzed",
+        "descriptions": [{"lang": "en", "value": "Mock vulnerability."}]
+    }}]}
+
+
+def _pulsedive(request: Dict[str, Any], level: str) -> Answer:
+    indicator = request['query'].get('indicator', '')
+    if level == 'unknown':
+        return 404, {"error": "Indicator not found."}
+    risk = {'malicious': 'high', 'suspicious': 'medium', 'clean': 'none'}[level]
+    return 200, {"iid": 1, "indicator": indicator, "type": "ip", "risk": risk, "risk_recommended": risk,
+                 "manualrisk": 0, "threats": [], "feeds": [], "attributes": {}}
+
+
+def _reddit(request: Dict[str, Any], level: str) -> Answer:
+    return 200, {"kind": "Listing", "data": {"after": None, "dist": 0, "children": [], "before": None}}
+
+
+def _safebrowse(request: Dict[str, Any], level: str) -> Answer:
+    entries = ((request['json'] or {}).get('threatInfo') or {}).get('threatEntries') or []
+    matches = [
+        {"threatType": "MALWARE", "platformType": "ANY_PLATFORM", "threat": {"url": e.get('url')},
+         "cacheDuration": "300s", "threatEntryType": "URL"}
+        for e in entries if _level(str(e.get('url')), request['malicious_rate']) == 'malicious'
+    ]
+    return 200, {"matches": matches} if matches else {}
+
+
+def _shodan(request: Dict[str, Any], level: str) -> Answer:
+    target = request['path'].rsplit('/', 1)[-1]
+    if '/dns/domain/' in request['path']:
+        return 200, {"domain": target, "tags": [], "subdomains": ["www", "mail"], "data": [], "more": False}
+    if level == 'unknown':
+        return 404, {"error": "No information available for that IP."}
+    return 200, {"ip_str": target, "ports": [22, 80, 443], "org": "Mock Networks", "isp": "Mock Networks",
+                 "country_code": "US", "hostnames": [], "vulns": [], "data": []}
+
+
+def _threatfox(request: Dict[str, Any], level: str) -> Answer:
+    term = (request['json'] or {}).get('search_term', '')
+    if level != 'malicious':
+        return 200, {"query_status": "no_result", "data": "Your search did not yield any results"}
+    return 200, {"query_status": "ok", "data": [{"id": "1", "ioc": term, "threat_type": "botnet_cc",
+                                                 "malware": "win.mock", "malware_printable": "Mock",
+                                                 "confidence_level": 75, "first_seen": "2026-01-01 00:00:00 UTC",
+                                                 "tags": []}]}
+
+
+def _twitter(request: Dict[str, Any], level: str) -> Answer:
+    return 200, {"meta": {"result_count": 0}}
+
+
+def _urlhaus(request: Dict[str, Any], level: str) -> Answer:
+    url = request['form'].get('url', '')
+    if level not in ('malicious', 'suspicious'):
+        return 200, {"query_status": "no_results"}
+    return 200, {"query_status": "ok", "id": "1", "url": url, "url_status": "online" if level == 'malicious' else "offline",
+                 "threat": "malware_download", "date_added": "2026-01-01 00:00:00 UTC", "tags": [], "payloads": []}
+
+
+def _urlscan(request: Dict[str, Any], level: str) -> Answer:
+    target = _quoted(request['query'].get('q', ''))
+    if level == 'unknown':
+        return 200, {"results": [], "total": 0, "took": 1, "has_more": False}
+    return 200, {"results": [{
+        "task": {"url": f"http://{target}/", "tags": ["phishing"] if level == 'malicious' else [], "time": "2026-01-01T00:00:00Z"},
+        "page": {"domain": target, "ip": target, "country": "US", "status": "200"},
+        "verdicts": {"overall": {"malicious": level == 'malicious', "score": 100 if level == 'malicious' else 0}}
+    }], "total": 1, "took": 1, "has_more": False}
+
+
+def _virustotal(request: Dict[str, Any], level: str) -> Answer:
+    parts = request['path'].split('/')
+    kind, identifier = (parts[3], parts[4]) if len(parts) > 4 else ('ip_addresses', '')
+    if level == 'unknown':
+        return 404, {"error": {"code": "NotFoundError", "message": f"{identifier} not found"}}
+    malicious = {'malicious': 12, 'suspicious': 0, 'clean': 0}[level]
+    suspicious = {'suspicious': 2}.get(level, 0)
+    return 200, {"data": {"id": identifier, "type": kind[:-1] if kind.endswith('s') else kind, "attributes": {
+        "last_analysis_stats": {"malicious": malicious, "suspicious": suspicious, "harmless": 60,
+                                "undetected": 20 - malicious, "timeout": 0},
+        "reputation": -malicious * 5, "tags": [], "last_analysis_date": 1767225600
+    }}}
+
+
+def _indicator(request: Dict[str, Any]) -> str:
+    """The indicator a request asks about, used to pick its verdict."""
+    query, form, body = request['query'], request['form'], request['json'] or {}
+    for key in ('ipAddress', 'email', 'indicator', 'cveId', 'filter', 'q', 'query'):
+        if key in query:
+            return _quoted(query[key]) if key in ('q', 'query') else query[key]
+    for key in ('hash', 'url'):
+        if key in form:
+            return form[key]
+    if body.get('search_term'):
+        return body['search_term']
+    if body.get('urlInfo'):
+        return body['urlInfo'].get('url', '')
+    segment = unquote(request['path'].rstrip('/').rsplit('/', 1)[-1])
+    if segment == 'general':
+        segment = request['path'].split('/')[5] if request['path'].count('/') >= 5 else segment
+    if '/api/v3/urls/' in request['path']:
+        try:
+            segment = b64decode(segment + '=' * (-len(segment) % 4)).decode()
+        except ValueError:
+            pass
+    return segment
+
+
+# (vendor host, path prefix) -> answer builder; the first matching prefix wins
+ROUTES: Dict[Tuple[str, str], Callable[[Dict[str, Any], str], Answer]] = {
+    ('api.abuseipdb.com', '/api/v2/check'): _abuseipdb,
+    ('otx.alienvault.com', '/api/v1/indicators/'): _alienvault,
+    ('api.bgpview.io', '/ip/'): _bgpview,
+    ('developers.checkphish.ai', '/api/neo/scan'): _checkphish,
+    ('cti.api.crowdsec.net', '/v2/smoke/'): _crowdsec,
+    ('api.crowdstrike.com', '/oauth2/token'): _token,
+    ('api.crowdstrike.com', '/intel/combined/indicators/v1'): _crowdstrike,
+    ('emailrep.io', '/'): _emailrep,
+    ('api.github.com', '/search/code'): _empty_search,
+    ('haveibeenpwned.com', '/api/v3/breachedaccount/'): _hibp,
+    ('api.hunter.io', '/v2/email-verifier'): _hunter,
+    ('www.ipqualityscore.com', '/api/json/ip/'): _ipqualityscore,
+    ('api.maltiverse.com', '/'): _maltiverse,
+    ('mb-api.abuse.ch', '/api/v1/'): _malwarebazaar,
+    ('api.intelligence.mandiant.com', '/token'): _token,
+    ('api.intelligence.mandiant.com', '/v4/indicator'): _mandiant,
+    ('services.nvd.nist.gov', '/rest/json/cves/2.0'): _nvd,
+    ('pulsedive.com', '/api/info.php'): _pulsedive,
+    ('www.reddit.com', '/api/v1/access_token'): _token,
+    ('oauth.reddit.com', '/search'): _reddit,
+    ('safebrowse.googleapis.com', '/v4/threatmatches:find'): _safebrowse,
+    ('api.shodan.io', '/shodan/'): _shodan,
+    ('threatfox-api.abuse.ch', '/api/v1/'): _threatfox,
+    ('api.twitter.com', '/2/tweets/search/recent'): _twitter,
+    ('urlhaus-api.abuse.ch', '/v1/url/'): _urlhaus,
+    ('urlscan.io', '/api/v1/search/'): _urlscan,
+    ('www.virustotal.com', '/api/v3/'): _virustotal,
+}
+
+
+class _Quota:
+    """Requests-per-second quota of one vendor, refilled every second."""
+
+    def __init__(self, per_second: int):
+        self.per_second = per_second
+        self.window = int(time.time())
+        self.used = 0
+
+    def take(self) -> Tuple[bool, int, int]:
+        """Count a request; returns (allowed, remaining, reset epoch second)."""
+        now = int(time.time())
+        if now != self.window:
+            self.window, self.used = now, 0
+        self.used += 1
+        return self.used <= self.per_second, max(self.per_second - self.used, 0), now + 1
+
+
+def build_app(
+    latency: float = 0.1,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    quota: Optional[int] = None,
+    malicious_rate: float = 0.1,
+    seed: Optional[int] = None
+) -> web.Application:
+    """
+    Build the mock vendor application.
+
+    Args:
+        latency: Base answer delay in seconds
+        jitter: Up to this many seconds are added to the delay at random
+        error_rate: Share of requests answered with a 500 or 503
+        throttle_rate: Share of requests answered with a 429 and Retry-After
+        quota: Requests per second allowed per vendor, beyond which the answer is 429
+        malicious_rate: Share of indicators flagged as malicious, and as suspicious
+        seed: Seed for the latency, error and throttling draws
+
+    Returns:
+        aiohttp application; ``GET /_mock/stats`` reports the requests it answered
+    """
+    rng = random.Random(seed)
+    quotas: Dict[str, _Quota] = {}
+    stats: Dict[str, Any] = {'requests': 0, 'errors': 0, 'throttled': 0, 'unmatched': 0, 'hosts': {}}
+
+    async def handle(request: web.Request) -> web.Response:
+        host = request.match_info['host'].lower()
+        path = '/' + request.match_info['path']
+        stats['requests'] += 1
+        stats['hosts'][host] = stats['hosts'].get(host, 0) + 1
+        builder = next(
+            (b for (h, prefix), b in ROUTES.items() if h == host and path.lower().startswith(prefix)), None
+        )
+        if builder is None:
+            stats['unmatched'] += 1
+            return web.json_response({"message": f"No mock for {host}{path}"}, status=404)
+
+        body = await request.read()
+        form, payload = {}, None
+        if request.content_type == 'application/json' and body:
+            payload = json.loads(body)
+        elif request.content_type == 'application/x-www-form-urlencoded':
+            form = dict((await request.post()).items())
+        call = {'path': path, 'query': dict(request.query), 'form': form, 'json': payload, 'malicious_rate': malicious_rate}
+
+        await asyncio.sleep(latency + (rng.uniform(0, jitter) if jitter else 0))
+
+        headers = {}
+        if quota:
+            allowed, remaining, reset = quotas.setdefault(host, _Quota(quota)).take()
+            headers = {'X-RateLimit-Limit': str(quota), 'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset': str(reset)}
+            if not allowed:
+                stats['throttled'] += 1
+                return web.json_response({"message": "Rate limit exceeded"}, status=429, headers={**headers, 'Retry-After': '1'})
+        if throttle_rate and rng.random() < throttle_rate:
+            stats['throttled'] += 1
+            return web.json_response({"message": "Rate limit exceeded"}, status=429, headers={'Retry-After': '1'})
+        if error_rate and rng.random() < error_rate:
+            stats['errors'] += 1
+            return web.json_response({"message": "Mock server error"}, status=rng.choice([500, 503]))
+
+        status, answer = builder(call, _level(_indicator(call), malicious_rate))
+        if answer == "":
+            return web.Response(status=status, headers=headers)
+        return web.json_response(answer, status=status, headers=headers)
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_get('/_mock/stats', get_stats)
+    app.router.add_route('*', '/{host}/{path:.*}', handle)
+    app['stats'] = stats
+    return app
+
+
+def start_in_thread(host: str = '127.0.0.1', port: int = 0, **options) -> Tuple[str, Callable[[], None]]:
+    """
+    Run the mock vendor server on its own event loop in a background thread.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on; 0 picks a free one
+        **options: Arguments of :func:`build_app`
+
+    Returns:
+        Tuple of (base URL of the server, function stopping it)
+    """
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(build_app(**options), access_log=None)
+    started = threading.Event()
+    address = {}
+
+    async def start():
+        await runner.setup()
+        site = web.TCPSite(runner, host, port, backlog=1024)
+        await site.start()
+        address['port'] = site._server.sockets[0].getsockname()[1]
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(start())
+        started.set()
+        loop.run_forever()
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+    thread = threading.Thread(target=serve, name='mock-vendor-server', daemon=True)
+    thread.start()
+    started.wait()
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+    return f"http://{host}:{address['port']}", stop
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.1, help='base answer delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.05, help='random extra delay of up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 500/503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--quota', type=int, default=None, help='requests per second per vendor before 429s')
+    parser.add_argument('--malicious-rate', type=float, default=0.1, help='share of indicators flagged as malicious')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    app = build_app(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.quota, args.malicious_rate, args.seed)
+    print(f"Mock vendor server on http://{args.host}:{args.port}; start the backend with "
+          f"OUTBOUND_MOCK_URL=http://{args.host}:{args.port}")
+    web.run_app(app, host=args.host, port=args.port, access_log=None, print=None)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
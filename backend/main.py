@@ -33,7 +33,9 @@ from app.features.email_analyzer.routers import internal_email_analyzer_routes
 from app.features.ioc_tools.ioc_extractor.routers import internal_ioc_extractor_routes
 from app.features.ioc_tools.ioc_defanger.routers import internal_defang_routes
 from app.features.ioc_tools.ioc_lookup.bulk_lookup.routers import bulk_ioc_lookup_routes
+from app.features.ioc_tools.ioc_lookup.bulk_lookup.service import bulk_lookup_jobs, bulk_lookup_streams
 from app.features.ioc_tools.ioc_lookup.single_lookup.routers import single_ioc_lookup_routes
+from app.features.ioc_tools.ioc_lookup.single_lookup.service import http_client, lookup_cache
 
 from app.features.newsfeed.routers import external_newsfeed_routes, internal_newsfeed_routes
 from app.features.newsfeed.service import newsfeed_service
@@ -74,6 +76,7 @@ async def lifespan(app: FastAPI):
     try:
         await initialize_defaults(db)
         start_scheduler()
+        bulk_lookup_jobs.resume_jobs()
         logger.info("Application startup completed successfully")
     except Exception as e:
         logger.error(f"Startup failed: {str(e)}")
@@ -87,6 +90,11 @@ async def lifespan(app: FastAPI):
     logger.info("Application shutting down...")
     try:
         shutdown_scheduler()
+        await bulk_lookup_jobs.stop_jobs()
+        await bulk_lookup_streams.stop_streams()
+        await asyncio.to_thread(lookup_cache.flush)
+        http_client.close()
+        await http_client.async_close()
         logger.info("Application shutdown completed successfully")
     except Exception as e:
         logger.error(f"Shutdown error: {str(e)}")
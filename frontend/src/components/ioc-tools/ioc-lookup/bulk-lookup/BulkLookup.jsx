@@ -23,6 +23,7 @@ const BulkLookup = () => {
     progress,
     processorError,
     setProcessorError,
+    verdictSummary,
     performLookup,
     orderedIocTypes,
   } = useBulkLookupProcessor();
@@ -113,15 +114,38 @@ const BulkLookup = () => {
     reader.readAsText(file);
   }, [processing]);
 
-  const handleSubmit = useCallback(() => {
+  const fetchOpenCircuits = useCallback(async () => {
+    try {
+      const response = await api.get('/api/ioc/services');
+      return new Set(
+        (response.data?.services || [])
+          .filter(s => s.circuit?.state === 'open')
+          .map(s => s.key)
+      );
+    } catch (error) {
+      console.error("Failed to fetch service circuit states:", error);
+      return new Set();
+    }
+  }, []);
+
+  const handleSubmit = useCallback(async () => {
     if (formError) setFormError('');
     
+    const openCircuits = await fetchOpenCircuits();
     const enabledServicesForLookup = serviceSettings
-      .filter(s => s.is_bulk_lookup_enabled)
+      .filter(s => s.is_bulk_lookup_enabled && !openCircuits.has(s.name))
       .map(s => s.name);
     
+    if (openCircuits.size > 0) {
+      console.warn(`Skipping services with open circuits: ${[...openCircuits].join(', ')}`);
+    }
+    if (enabledServicesForLookup.length === 0 && serviceSettings.some(s => s.is_bulk_lookup_enabled)) {
+      setFormError("All enabled services are temporarily unavailable after repeated failures. Please try again later.");
+      return;
+    }
+    
     performLookup(iocsInput, enabledServicesForLookup);
-  }, [formError, serviceSettings, iocsInput, performLookup]);
+  }, [formError, serviceSettings, iocsInput, performLookup, fetchOpenCircuits]);
 
   const hasEnabledServices = useMemo(() => {
     return serviceSettings.some(s => s.is_bulk_lookup_enabled);
@@ -287,6 +311,7 @@ const BulkLookup = () => {
           loading={processing}
           progress={progress}
           error={processorError}
+          verdictSummary={verdictSummary}
         />
     </Box>
   );
@@ -1,8 +1,8 @@
 import React from 'react';
 import {
-  Box, Typography, LinearProgress, Paper, Tabs, Tab, Alert
+  Box, Typography, LinearProgress, Paper, Tabs, Tab, Alert, Chip
 } from '@mui/material';
-import IocCard from './IocCard';
+import IocCard, { VERDICT_COLORS } from './IocCard';
 import WelcomeScreen from './WelcomeScreen';
 
 function TabPanel(props) {
@@ -35,6 +35,7 @@ export default function BulkLookupResults({
   loading,
   progress,
   error,
+  verdictSummary,
 }) {
 
   if (error) {
@@ -60,6 +61,28 @@ export default function BulkLookupResults({
   
   return (
     <Paper sx={{ mt: 2 }}>
+      {verdictSummary?.verdicts && (
+        <Box sx={{ display: 'flex', alignItems: 'center', flexWrap: 'wrap', gap: 1, px: 3, pt: 2 }}>
+          <Typography variant="subtitle2" sx={{ mr: 1 }}>
+            Verdicts
+          </Typography>
+          {Object.entries(verdictSummary.verdicts).map(([verdict, count]) => (
+            <Chip
+              key={verdict}
+              label={`${verdict}: ${count}`}
+              size="small"
+              color={VERDICT_COLORS[verdict] || 'default'}
+              variant={count > 0 ? 'filled' : 'outlined'}
+              sx={{ borderRadius: 1, textTransform: 'capitalize' }}
+            />
+          ))}
+          {verdictSummary.pending_lookups > 0 && (
+            <Typography variant="caption" color="text.secondary">
+              {verdictSummary.pending_lookups} lookup(s) did not complete
+            </Typography>
+          )}
+        </Box>
+      )}
       <Box sx={{ borderBottom: 1, borderColor: 'divider' }}>
         <Tabs 
           value={activeTab} 
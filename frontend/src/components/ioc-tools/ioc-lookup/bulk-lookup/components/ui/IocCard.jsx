@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import {
-  Card, CardHeader, CardContent, Collapse, IconButton, Typography, Box,
+  Card, CardHeader, CardContent, Collapse, IconButton, Typography, Box, Chip, Tooltip,
   Table, TableBody, TableCell, TableContainer, TableHead, TableRow, Paper
 } from '@mui/material';
 import { ExpandMore as ExpandMoreIcon } from '@mui/icons-material';
@@ -10,6 +10,13 @@ import ServiceRow from './ServiceRow';
 import { TLP_COLORS } from '../../../shared/utils/tlpUtils';
 import { SERVICE_DEFINITIONS } from '../../../shared/config/serviceConfig';
 
+export const VERDICT_COLORS = {
+  malicious: 'error',
+  suspicious: 'warning',
+  clean: 'success',
+  unknown: 'default',
+};
+
 const StyledExpandMoreIcon = styled(ExpandMoreIcon, {
   shouldForwardProp: (prop) => prop !== 'isExpanded',
 })(({ theme, isExpanded }) => ({
@@ -42,6 +49,18 @@ export default function IocCard({ ioc, onToggleExpand }) {
     borderColor: theme.palette.background.tableborder,
   };
 
+  const verdict = ioc.verdict;
+  const verdictLabel = verdict && (
+    verdict.score !== null && verdict.score !== undefined
+      ? `${verdict.verdict} (${verdict.score})`
+      : verdict.verdict
+  );
+  const verdictDetails = verdict && [
+    verdict.top_service && `Highest score from ${SERVICE_DEFINITIONS[verdict.top_service]?.name || verdict.top_service}`,
+    `${verdict.malicious} malicious, ${verdict.suspicious} suspicious`,
+    verdict.pending?.length > 0 && `${verdict.pending.length} service(s) pending`,
+  ].filter(Boolean).join(' · ');
+
   return (
     <Card sx={{ 
         mb: 1, 
@@ -56,9 +75,22 @@ export default function IocCard({ ioc, onToggleExpand }) {
           </IconButton>
         }
         title={
-            <Typography variant="h6" component="div" sx={{ wordBreak: 'break-all' }}>
-                {ioc.value}
-            </Typography>
+            <Box sx={{ display: 'flex', alignItems: 'center', gap: 1 }}>
+                <Typography variant="h6" component="div" sx={{ wordBreak: 'break-all' }}>
+                    {ioc.value}
+                </Typography>
+                {verdict && (
+                    <Tooltip title={verdictDetails}>
+                        <Chip
+                            label={verdictLabel}
+                            size="small"
+                            color={VERDICT_COLORS[verdict.verdict] || 'default'}
+                            variant={verdict.complete ? 'filled' : 'outlined'}
+                            sx={{ borderRadius: 1, textTransform: 'capitalize' }}
+                        />
+                    </Tooltip>
+                )}
+            </Box>
         }
         sx={{ '& .MuiCardHeader-content': { overflow: 'hidden' } }}
       />
@@ -15,6 +15,7 @@ import {
   KeyboardArrowUp as KeyboardArrowUpIcon,
 } from '@mui/icons-material';
 import useTheme from '@mui/material/styles/useTheme';
+import api from '../../../../../../api';
 import { TLP_COLORS } from '../../../shared/utils/tlpUtils';
 import { SERVICE_DEFINITIONS } from '../../../shared/config/serviceConfig';
 
@@ -28,6 +29,9 @@ export default function ServiceRow({
 }) {
   const theme = useTheme();
   const [open, setOpen] = useState(false);
+  const [fullData, setFullData] = useState(null);
+  const [loadingDetails, setLoadingDetails] = useState(false);
+  const [detailsError, setDetailsError] = useState(null);
 
   const config = SERVICE_DEFINITIONS[serviceName];
   const DetailComponent = config ? config.detailComponent : null;
@@ -74,6 +78,32 @@ export default function ServiceRow({
   };
   const tlpCellBgColor = getTlpCellBackgroundColor();
 
+  const handleToggle = async () => {
+    const opening = !open;
+    setOpen(opening);
+    if (!opening || fullData || !serviceData.fullResultUrl) return;
+    setLoadingDetails(true);
+    setDetailsError(null);
+    try {
+      const response = await fetch(serviceData.fullResultUrl);
+      if (response.ok) {
+        const event = await response.json();
+        setFullData(event.data);
+        return;
+      }
+      // Stream events are only kept for a while; the single lookup answers from the result cache
+      if (!config?.lookupEndpoint) throw new Error(`HTTP ${response.status}`);
+      const lookup = await api.get(config.lookupEndpoint(iocValue, iocType));
+      if (lookup.data?.error) throw new Error(String(lookup.data.message || lookup.data.error));
+      setFullData(lookup.data);
+    } catch (e) {
+      console.error(`Failed to load the full ${serviceName} result:`, e);
+      setDetailsError(e.response?.data?.detail || e.message);
+    } finally {
+      setLoadingDetails(false);
+    }
+  };
+
   if (serviceData.status === 'loading') {
     return (
       <TableRow>
@@ -131,7 +161,7 @@ export default function ServiceRow({
           <IconButton
             aria-label="expand row"
             size="small"
-            onClick={() => setOpen(!open)}
+            onClick={handleToggle}
             disabled={!serviceData.data || !DetailComponent}
           >
             {open ? <KeyboardArrowUpIcon /> : <KeyboardArrowDownIcon />}
@@ -178,11 +208,19 @@ export default function ServiceRow({
           >
             <Collapse in={open} timeout="auto" unmountOnExit>
               <Box sx={{ margin: 1, mt:2, mb:2 }}>
-                <DetailComponent
-                  result={serviceData.data}
-                  ioc={iocValue}
-                  type={iocType}
-                />
+                {loadingDetails ? (
+                  <CircularProgress size={20} />
+                ) : detailsError ? (
+                  <Typography variant="body2" color="error">
+                    Could not load the full result: {detailsError}
+                  </Typography>
+                ) : (
+                  <DetailComponent
+                    result={fullData || serviceData.data}
+                    ioc={iocValue}
+                    type={iocType}
+                  />
+                )}
               </Box>
             </Collapse>
           </TableCell>
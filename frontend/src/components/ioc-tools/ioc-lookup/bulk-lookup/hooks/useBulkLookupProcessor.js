@@ -2,6 +2,9 @@ import { useState, useCallback, useMemo, useRef } from 'react';
 import { determineIocType, IOC_TYPES, getOverallTlp } from '../utils/iocUtils';
 import { SERVICE_DEFINITIONS } from '../../shared/config/serviceConfig';
 
+const MAX_STREAM_RECONNECTS = 5;
+const STREAM_RECONNECT_DELAY_MS = 1000;
+
 const initialCategorizedIocsState = Object.fromEntries(
   Object.values(IOC_TYPES).map(type => [type, []])
 );
@@ -11,6 +14,7 @@ export function useBulkLookupProcessor() {
   const [loading, setLoading] = useState(false);
   const [progress, setProgress] = useState(0);
   const [processorError, setProcessorError] = useState('');
+  const [verdictSummary, setVerdictSummary] = useState(null);
   
   const iocMapRef = useRef(new Map());
 
@@ -47,8 +51,26 @@ export function useBulkLookupProcessor() {
     });
   }, []);
 
+  // Stores the server-side verdict aggregate of an IOC (score, verdict, top service)
+  const updateIocVerdict = useCallback((iocValue, aggregate) => {
+    setCategorizedIocs(prev => {
+      const iocToUpdate = iocMapRef.current.get(iocValue);
+      if (!iocToUpdate) return prev;
+      const iocType = iocToUpdate.type;
+      const iocIndex = prev[iocType].findIndex(i => i.id === iocToUpdate.id);
+      if (iocIndex === -1) return prev;
+
+      const updatedIoc = { ...prev[iocType][iocIndex], verdict: aggregate };
+      const newCategorized = { ...prev, [iocType]: [...prev[iocType]] };
+      newCategorized[iocType][iocIndex] = updatedIoc;
+      iocMapRef.current.set(iocValue, updatedIoc);
+      return newCategorized;
+    });
+  }, []);
+
   const performLookup = useCallback(async (iocsInput, selectedServices) => {
     setProcessorError('');
+    setVerdictSummary(null);
     if (selectedServices.length === 0) {
       setProcessorError("Please select at least one service to perform the lookup.");
       return;
@@ -89,68 +111,148 @@ export function useBulkLookupProcessor() {
     const isDevelopment = process.env.NODE_ENV === 'development';
     const baseURL = isDevelopment ? 'http://localhost:8000' : '';
 
-    try {
-        const response = await fetch(`${baseURL}/api/ioc-lookup/bulk`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'Accept': 'text/event-stream'
-            },
-            body: JSON.stringify({ iocs: uniqueIocs, services: selectedServices })
-        });
+    const handleEvent = (eventData, eventId) => {
+        const { ioc, inputs, service, data, error, fields } = eventData;
+        const inputValues = Array.isArray(inputs) && inputs.length > 0 ? inputs : [ioc];
 
-        if (!response.ok || !response.body) {
-            throw new Error(`Server error: ${response.statusText}`);
+        if (error) {
+            inputValues.forEach(inputValue => updateIocServiceData(inputValue, service, {
+                status: 'error',
+                summary: error,
+                tlp: 'WHITE',
+                error: { message: error }
+            }));
+        } else {
+            const serviceDef = SERVICE_DEFINITIONS[service];
+            if (serviceDef) {
+                const iocType = determineIocType(ioc);
+                const analysisResult = serviceDef.getSummaryAndTlp(data, iocType);
+                // Summary events only carry the fields above; the details view loads the full result
+                const separator = eventId ? eventId.lastIndexOf(':') : -1;
+                const fullResultUrl = fields === 'summary' && separator > 0
+                    ? `${baseURL}/api/ioc-lookup/bulk/jobs/${eventId.slice(0, separator)}/results/${eventId.slice(separator + 1)}`
+                    : null;
+                inputValues.forEach(inputValue => updateIocServiceData(inputValue, service, {
+                    status: 'completed',
+                    data: data,
+                    fullResultUrl,
+                    summary: analysisResult.summary,
+                    tlp: analysisResult.tlp,
+                    keyMetric: analysisResult.keyMetric,
+                }));
+            }
         }
+    };
 
-        const reader = response.body.getReader();
-        const decoder = new TextDecoder();
-        let buffer = '';
+    try {
+        let lastEventId = null;
+        let finished = false;
+        let reconnects = 0;
         let completedRequests = 0;
+        let hasStreamProgress = false;
         const totalRequests = uniqueIocs.length * selectedServices.length;
 
-        while (true) {
-            const { done, value } = await reader.read();
-            if (done) break;
-            
-            buffer += decoder.decode(value, { stream: true });
-            const eventChunks = buffer.split('\n\n');
-            buffer = eventChunks.pop(); 
-
-            for (const chunk of eventChunks) {
-                if (chunk.startsWith('data: ')) {
-                    completedRequests++;
-                    const dataStr = chunk.substring(6);
-                    try {
-                        const eventData = JSON.parse(dataStr);
-                        const { ioc, service, data, error } = eventData;
-                        
-                        if (error) {
-                            updateIocServiceData(ioc, service, {
-                                status: 'error',
-                                summary: error,
-                                tlp: 'WHITE',
-                                error: { message: error }
-                            });
-                        } else {
-                            const serviceDef = SERVICE_DEFINITIONS[service];
-                            if (serviceDef) {
-                                const iocType = determineIocType(ioc);
-                                const analysisResult = serviceDef.getSummaryAndTlp(data, iocType);
-                                updateIocServiceData(ioc, service, {
-                                    status: 'completed',
-                                    data: data,
-                                    summary: analysisResult.summary,
-                                    tlp: analysisResult.tlp,
-                                    keyMetric: analysisResult.keyMetric,
-                                });
+        while (!finished) {
+            const headers = {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            };
+            if (lastEventId) {
+                headers['Last-Event-ID'] = lastEventId;
+            }
+
+            try {
+                const response = await fetch(`${baseURL}/api/ioc-lookup/bulk`, {
+                    method: 'POST',
+                    headers,
+                    body: JSON.stringify({ iocs: uniqueIocs, services: selectedServices })
+                });
+
+                if (!response.ok || !response.body) {
+                    const serverError = new Error(`Server error: ${response.statusText}`);
+                    serverError.fatal = true;
+                    throw serverError;
+                }
+
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                let receivedEvents = 0;
+
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    
+                    buffer += decoder.decode(value, { stream: true });
+                    const eventChunks = buffer.split('\n\n');
+                    buffer = eventChunks.pop(); 
+
+                    for (const chunk of eventChunks) {
+                        let eventId = null;
+                        let eventType = null;
+                        const dataLines = [];
+                        chunk.split('\n').forEach(line => {
+                            if (line.startsWith('id: ')) eventId = line.substring(4);
+                            else if (line.startsWith('event: ')) eventType = line.substring(7);
+                            else if (line.startsWith('data: ')) dataLines.push(line.substring(6));
+                        });
+                        if (dataLines.length === 0) continue;
+
+                        const dataStr = dataLines.join('\n');
+                        if (eventType === 'aggregate' || eventType === 'summary') {
+                            try {
+                                const payload = JSON.parse(dataStr);
+                                if (eventType === 'summary') {
+                                    setVerdictSummary(payload);
+                                    finished = true;
+                                } else {
+                                    const inputValues = Array.isArray(payload.inputs) && payload.inputs.length > 0 ? payload.inputs : [payload.ioc];
+                                    inputValues.forEach(inputValue => updateIocVerdict(inputValue, payload));
+                                }
+                            } catch (e) {
+                                console.error("Error parsing SSE data:", e, "Data:", dataStr);
+                            }
+                            if (eventId) lastEventId = eventId;
+                            continue;
+                        }
+                        completedRequests++;
+                        receivedEvents++;
+                        try {
+                            const eventData = JSON.parse(dataStr);
+                            const streamProgress = eventData.progress;
+                            if (streamProgress && streamProgress.total > 0) {
+                                hasStreamProgress = true;
+                                setProgress((streamProgress.done / streamProgress.total) * 100);
+                                if (streamProgress.done >= streamProgress.total) finished = true;
+                            } else if (eventData.service === 'system' && !eventData.ioc) {
+                                finished = true;
                             }
+                            handleEvent(eventData, eventId);
+                        } catch (e) {
+                            console.error("Error parsing SSE data:", e, "Data:", dataStr);
+                        }
+                        if (eventId) {
+                            lastEventId = eventId;
+                            reconnects = 0;
+                        }
+                        if (!hasStreamProgress) {
+                            setProgress(totalRequests > 0 ? (completedRequests / totalRequests) * 100 : 0);
                         }
-                    } catch (e) {
-                        console.error("Error parsing SSE data:", e, "Data:", dataStr);
                     }
-                    setProgress(totalRequests > 0 ? (completedRequests / totalRequests) * 100 : 0);
                 }
+                // A clean end without new events means the server has nothing left to send
+                if (!lastEventId || receivedEvents === 0) finished = true;
+            } catch (err) {
+                if (err.fatal || !lastEventId || reconnects >= MAX_STREAM_RECONNECTS) throw err;
+            }
+
+            if (!finished) {
+                if (reconnects >= MAX_STREAM_RECONNECTS) {
+                    throw new Error('Lost connection to the bulk lookup stream.');
+                }
+                reconnects++;
+                console.warn(`Bulk lookup stream interrupted, reconnecting (attempt ${reconnects})`);
+                await new Promise(resolve => setTimeout(resolve, STREAM_RECONNECT_DELAY_MS * reconnects));
             }
         }
     } catch (err) {
@@ -161,7 +263,7 @@ export function useBulkLookupProcessor() {
         setProgress(100);
     }
 
-  }, [updateIocServiceData]);
+  }, [updateIocServiceData, updateIocVerdict]);
 
   const orderedIocTypes = useMemo(() => {
     const preferredOrder = [
@@ -181,6 +283,7 @@ export function useBulkLookupProcessor() {
     progress,
     processorError,
     setProcessorError,
+    verdictSummary,
     performLookup,
     orderedIocTypes,
   };
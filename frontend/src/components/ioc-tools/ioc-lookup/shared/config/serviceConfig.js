@@ -218,6 +218,24 @@ export const SERVICE_DEFINITIONS = {
         return { summary: `Fraud Score: ${score}`, tlp, keyMetric: score };
     },
   },
+  localgeoip: {
+    name: 'Local GeoIP/ASN',
+    icon: 'default_icon',
+    detailComponent: null,
+    requiredKeys: [],
+    supportedIocTypes: ['IPv4', 'IPv6'],
+    lookupEndpoint: createSingleEndpoint('localgeoip'),
+    getSummaryAndTlp: (responseData) => {
+      if (responseData?.error) return { summary: `Error: ${responseData.message || responseData.error}`, tlp: 'WHITE' };
+      if (!responseData?.found) return { summary: "Not in any announced range", tlp: 'WHITE' };
+      const country = responseData.country ? `, ${responseData.country}` : '';
+      return {
+        summary: `AS${responseData.asn} (${responseData.as_name || 'Unknown'})${country}`,
+        tlp: 'BLUE',
+        keyMetric: `AS${responseData.asn}`,
+      };
+    },
+  },
   maltiverse: {
     name: 'Maltiverse',
     icon: 'maltiverse_logo_small',
@@ -441,3 +459,20 @@ export const SERVICE_DEFINITIONS = {
     },
   },
 };
+
+/**
+ * Offline variants of the abuse.ch services, answered from the locally synced feed dumps.
+ * Their results have the same shape as the online services', so they reuse their rendering.
+ * @param {string} serviceKey - The key of the online service.
+ * @returns {object} The service definition of the offline variant.
+ */
+const offlineVariant = (serviceKey) => ({
+  ...SERVICE_DEFINITIONS[serviceKey],
+  name: `${SERVICE_DEFINITIONS[serviceKey].name} (offline)`,
+  requiredKeys: [],
+  lookupEndpoint: createSingleEndpoint(`${serviceKey}offline`),
+});
+
+SERVICE_DEFINITIONS.malwarebazaaroffline = offlineVariant('malwarebazaar');
+SERVICE_DEFINITIONS.threatfoxoffline = offlineVariant('threatfox');
+SERVICE_DEFINITIONS.urlhausoffline = offlineVariant('urlhaus');